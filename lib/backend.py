@@ -62,10 +62,7 @@ import tempfile
 import time
 import zlib
 
-import pycurl
-
 from ganeti import errors
-from ganeti import http
 from ganeti import utils
 from ganeti import ssh
 from ganeti import hypervisor
@@ -75,6 +72,7 @@ from ganeti.storage import bdev
 from ganeti.storage import drbd
 from ganeti.storage import extstorage
 from ganeti.storage import filestorage
+from ganeti.storage import imagecache
 from ganeti import objects
 from ganeti import ssconf
 from ganeti import serializer
@@ -82,6 +80,7 @@ from ganeti import netutils
 from ganeti import runtime
 from ganeti import compat
 from ganeti import pathutils
+from ganeti import providercache
 from ganeti import vcluster
 from ganeti import ht
 from ganeti.storage.base import BlockDev
@@ -3374,56 +3373,79 @@ def _DumpDevice(source_path, target_path, offset, size, truncate):
           result.fail_reason, result.output)
 
 
-def _DownloadAndDumpDevice(source_url, target_path, size):
-  """This function images a device using a downloaded image file.
+#: Size (in bytes) the image cache is pruned to, see L{SetImageCacheSize}
+_image_cache_size = imagecache.DEFAULT_CACHE_SIZE
 
-  @type source_url: string
-  @param source_url: URL of image to dump to disk
 
-  @type target_path: string
-  @param target_path: path of the device to image
+def SetImageCacheSize(size):
+  """Sets the size the node's image cache is pruned to.
+
+  Used by the node daemon, whose request processes inherit the setting.
 
   @type size: int
-  @param size: maximum size in MiB to write (data source might be smaller)
+  @param size: Size in bytes
 
-  @rtype: NoneType
-  @return: None
-  @raise RPCFail: in case of download or write failures
+  """
+  global _image_cache_size # pylint: disable=W0603
+  _image_cache_size = size
+
+
+def _GetImageCache():
+  """Returns the node's image cache.
+
+  @rtype: L{imagecache.ImageCache}
 
   """
-  class DDParams(object):
-    def __init__(self, current_size, total_size):
-      self.current_size = current_size
-      self.total_size = total_size
-      self.image_size_error = False
+  return imagecache.ImageCache(pathutils.IMAGE_CACHE_DIR,
+                               max_size=_image_cache_size)
 
-  def dd_write(ddparams, out):
-    if ddparams.current_size < ddparams.total_size:
-      ddparams.current_size += len(out)
-      target_file.write(out)
-    else:
-      ddparams.image_size_error = True
-      return -1
 
-  target_file = open(target_path, "r+")
-  ddparams = DDParams(0, 1024 * 1024 * size)
+def _FetchImage(source_url):
+  """Returns the path of a local copy of an image given by URL.
 
-  curl = pycurl.Curl()
-  curl.setopt(pycurl.VERBOSE, True)
-  curl.setopt(pycurl.NOSIGNAL, True)
-  curl.setopt(pycurl.USERAGENT, http.HTTP_GANETI_VERSION)
-  curl.setopt(pycurl.URL, source_url)
-  curl.setopt(pycurl.WRITEFUNCTION, lambda out: dd_write(ddparams, out))
+  The image is kept in the node's image cache, so deploying it again only
+  needs a conditional request to check whether it changed. The URL may
+  carry a checksum to verify the image against (see
+  L{imagecache.ParseImageUrl}).
 
+  @type source_url: string
+  @param source_url: URL of the image
+  @rtype: tuple; (string, L{utils.FileLock})
+  @return: path of the cached image and the lock keeping it in the cache,
+      to be closed once the image isn't needed anymore
+  @raise RPCFail: in case of download failures
+
+  """
   try:
-    curl.perform()
-  except pycurl.error:
-    if ddparams.image_size_error:
-      _Fail("Disk image larger than the disk")
-    else:
-      raise
+    return _GetImageCache().Fetch(source_url)
+  except (imagecache.ImageError, EnvironmentError) as err:
+    _Fail("Can't download image from '%s': %s", source_url, err)
+
 
-  target_file.close()
+def _WriteImage(image_path, target_path, size, cached=False):
+  """Writes an image file to a device, decompressing it if needed.
+
+  @type image_path: string
+  @param image_path: path of the image
+  @type target_path: string
+  @param target_path: path of the device to image
+  @type size: int
+  @param size: maximum size in MiB to write
+  @type cached: boolean
+  @param cached: whether the image is in the image cache, from which it is
+      discarded if it can't be read
+
+  """
+  try:
+    imagecache.WriteImage(image_path, target_path, size * 1024 * 1024)
+  except imagecache.ImageTooLargeError:
+    _Fail("Disk image larger than the disk")
+  except imagecache.ImageError as err:
+    if cached:
+      _GetImageCache().Discard(image_path)
+    _Fail("Can't write image '%s' to '%s': %s", image_path, target_path, err)
+  except EnvironmentError as err:
+    _Fail("Can't write image '%s' to '%s': %s", image_path, target_path, err)
 
 
 def BlockdevConvert(src_disk, target_disk):
@@ -3433,7 +3455,9 @@ def BlockdevConvert(src_disk, target_disk):
   target devices respectively, and then concatenates them to a single
   command using a pipe ("|"). Finally, executes the unified command that
   will transfer the data between the devices during the disk template
-  conversion operation.
+  conversion operation. If both devices support it, only the extents of the
+  source containing data are copied. Files on a file system supporting
+  reflinks are cloned instead of copied.
 
   @type src_disk: L{objects.Disk}
   @param src_disk: the disk object we want to copy from
@@ -3453,8 +3477,22 @@ def BlockdevConvert(src_disk, target_disk):
   if dest_dev is None:
     _Fail("Cannot copy to device '%s': device not found", target_disk.uuid)
 
-  src_cmd = src_dev.Export()
-  dest_cmd = dest_dev.Import()
+  if (isinstance(src_dev, filestorage.FileStorage) and
+      isinstance(dest_dev, filestorage.FileStorage)):
+    try:
+      if dest_dev.CloneFrom(src_dev):
+        logging.info("Cloned '%s' to '%s'", src_dev.dev_path,
+                     dest_dev.dev_path)
+        return
+    except (errors.BlockDeviceError, EnvironmentError) as err:
+      _Fail("Cannot clone '%s' to '%s': %s", src_dev.dev_path,
+            dest_dev.dev_path, err)
+
+  sparse = (src_dev.SupportsSparseTransfer() and
+            dest_dev.SupportsSparseTransfer())
+
+  src_cmd = src_dev.Export(sparse=sparse)
+  dest_cmd = dest_dev.Import(sparse=sparse)
   command = "%s | %s" % (utils.ShellQuoteArgs(src_cmd),
                          utils.ShellQuoteArgs(dest_cmd))
 
@@ -3494,7 +3532,7 @@ def BlockdevWipe(disk, offset, size):
   _DumpDevice("/dev/zero", rdev.dev_path, offset, size, True)
 
 
-def BlockdevImage(disk, image, size):
+def BlockdevImage(disk, image, size, clone=False):
   """Images a block device either by dumping a local file or
   downloading a URL.
 
@@ -3507,6 +3545,10 @@ def BlockdevImage(disk, image, size):
   @type size: int
   @param size: The size in MiB to write
 
+  @type clone: boolean
+  @param clone: whether to make the device a copy-on-write clone of a
+      golden copy of the image, if its storage supports it
+
   @rtype: NoneType
   @return: None
   @raise RPCFail: in case of failure
@@ -3528,9 +3570,35 @@ def BlockdevImage(disk, image, size):
     _Fail("Image size is bigger than device size")
 
   if utils.IsUrl(image):
-    _DownloadAndDumpDevice(image, rdev.dev_path, size)
+    (image_path, pin) = _FetchImage(image)
   else:
-    _DumpDevice(image, rdev.dev_path, 0, size, False)
+    (image_path, pin) = (image, None)
+
+  try:
+    if clone:
+      try:
+        cloned = rdev.CloneImage(imagecache.GetImageId(image_path),
+                                 image_path)
+      except imagecache.ImageTooLargeError:
+        _Fail("Disk image larger than the disk")
+      except (imagecache.ImageError, errors.BlockDeviceError,
+              EnvironmentError) as err:
+        _Fail("Can't clone image '%s' to device %s: %s", image, disk.iv_name,
+              err)
+      if cloned:
+        return
+      logging.info("Device %s can't be cloned from an image, writing the"
+                   " image instead", disk.iv_name)
+
+    if (utils.IsUrl(image) or
+        imagecache.DetectImageFormat(image_path) != imagecache.IMG_RAW):
+      _WriteImage(image_path, rdev.dev_path, size, cached=pin is not None)
+    else:
+      _DumpDevice(image_path, rdev.dev_path, 0, size, False)
+  finally:
+    if pin:
+      # The image may be removed from the cache from now on
+      pin.Close()
 
 
 def BlockdevPauseResumeSync(disks, pause):
@@ -3614,7 +3682,7 @@ def BlockdevRemove(disk):
     _Fail("; ".join(msgs))
 
 
-def _RecursiveAssembleBD(disk, owner, as_primary):
+def _RecursiveAssembleBD(disk, owner, as_primary, **kwargs):
   """Activate a block device for an instance.
 
   This is run on the primary and secondary nodes for an instance.
@@ -3628,6 +3696,7 @@ def _RecursiveAssembleBD(disk, owner, as_primary):
   @type as_primary: boolean
   @param as_primary: if we should make the block device
       read/write
+  @param kwargs: device caches as returned by L{_GetDeviceCaches}
 
   @return: the assembled device or None (in case no device
       was assembled)
@@ -3645,7 +3714,7 @@ def _RecursiveAssembleBD(disk, owner, as_primary):
       mcn = len(disk.children) - mcn # max number of Nones
     for chld_disk in disk.children:
       try:
-        cdev = _RecursiveAssembleBD(chld_disk, owner, as_primary)
+        cdev = _RecursiveAssembleBD(chld_disk, owner, as_primary, **kwargs)
       except errors.BlockDeviceError as err:
         if children.count(None) >= mcn:
           raise
@@ -3655,7 +3724,7 @@ def _RecursiveAssembleBD(disk, owner, as_primary):
       children.append(cdev)
 
   if as_primary or disk.AssembleOnSecondary():
-    r_dev = bdev.Assemble(disk, children)
+    r_dev = bdev.Assemble(disk, children, **kwargs)
     result = r_dev
     if as_primary or disk.OpenOnSecondary():
       r_dev.Open()
@@ -3667,18 +3736,19 @@ def _RecursiveAssembleBD(disk, owner, as_primary):
   return result
 
 
-def BlockdevAssemble(disk, instance, as_primary, idx):
+def BlockdevAssemble(disk, instance, as_primary, idx, **kwargs):
   """Activate a block device for an instance.
 
   This is a wrapper over _RecursiveAssembleBD.
 
+  @param kwargs: device caches as returned by L{_GetDeviceCaches}
   @rtype: str or boolean
   @return: a tuple with the C{/dev/...} path and the created symlink
       for primary nodes, and (C{True}, C{True}) for secondary nodes
 
   """
   try:
-    result = _RecursiveAssembleBD(disk, instance.name, as_primary)
+    result = _RecursiveAssembleBD(disk, instance.name, as_primary, **kwargs)
     if isinstance(result, BlockDev):
       # pylint: disable=E1103
       dev_path = result.dev_path
@@ -3699,7 +3769,34 @@ def BlockdevAssemble(disk, instance, as_primary, idx):
   return dev_path, link_name, uri
 
 
-def BlockdevShutdown(disk):
+def BlockdevAssembleMulti(disks, as_primary):
+  """Activate several block devices.
+
+  The state of the existing devices is read only once for all disks.
+
+  @type disks: list of tuples
+  @param disks: the disks to assemble, as (disk, instance, idx) tuples
+  @type as_primary: boolean
+  @param as_primary: if we should make the block devices read/write
+  @rtype: list of tuples
+  @return: (success, result) for each disk, where the result is the one of
+      L{BlockdevAssemble} on success and the error message otherwise
+
+  """
+  caches = _GetDeviceCaches([disk for (disk, _, _) in disks])
+
+  result = []
+  for (disk, instance, idx) in disks:
+    try:
+      result.append((True, BlockdevAssemble(disk, instance, as_primary, idx,
+                                            **caches)))
+    except RPCFail as err:
+      result.append((False, str(err)))
+
+  return result
+
+
+def BlockdevShutdown(disk, **kwargs):
   """Shut down a block device.
 
   First, if the device is assembled (Attach() is successful), then
@@ -3713,11 +3810,12 @@ def BlockdevShutdown(disk):
   @type disk: L{objects.Disk}
   @param disk: the description of the disk we should
       shutdown
+  @param kwargs: device caches as returned by L{_GetDeviceCaches}
   @rtype: None
 
   """
   msgs = []
-  r_dev = _RecursiveFindBD(disk)
+  r_dev = _RecursiveFindBD(disk, **kwargs)
   if r_dev is not None:
     r_path = r_dev.dev_path
     try:
@@ -3729,7 +3827,7 @@ def BlockdevShutdown(disk):
   if disk.children:
     for child in disk.children:
       try:
-        BlockdevShutdown(child)
+        BlockdevShutdown(child, **kwargs)
       except RPCFail as err:
         msgs.append(str(err))
 
@@ -3737,6 +3835,31 @@ def BlockdevShutdown(disk):
     _Fail("; ".join(msgs))
 
 
+def BlockdevShutdownMulti(disks):
+  """Shut down several block devices.
+
+  The state of the existing devices is read only once for all disks.
+
+  @type disks: list of L{objects.Disk}
+  @param disks: the disks to shut down
+  @rtype: list of tuples
+  @return: (success, error message) for each disk
+
+  """
+  caches = _GetDeviceCaches(disks)
+
+  result = []
+  for disk in disks:
+    try:
+      BlockdevShutdown(disk, **caches)
+    except RPCFail as err:
+      result.append((False, str(err)))
+    else:
+      result.append((True, None))
+
+  return result
+
+
 def BlockdevAddchildren(parent_cdev, new_cdevs):
   """Extend a mirrored block device.
 
@@ -3819,13 +3942,10 @@ def BlockdevGetmirrorstatusMulti(disks):
 
   """
   result = []
-  lvs_cache = None
-  is_plain_disk = compat.any([_CheckForPlainDisk(d) for d in disks])
-  if is_plain_disk:
-    lvs_cache = bdev.LogicalVolume.GetLvGlobalInfo()
+  caches = _GetDeviceCaches(disks)
   for disk in disks:
     try:
-      rbd = _RecursiveFindBD(disk, lvs_cache=lvs_cache)
+      rbd = _RecursiveFindBD(disk, **caches)
       if rbd is None:
         result.append((False, "Can't find device %s" % disk))
         continue
@@ -3842,29 +3962,44 @@ def BlockdevGetmirrorstatusMulti(disks):
   return result
 
 
-def _CheckForPlainDisk(disk):
-  """Check within a disk and its children if there is a plain disk type.
+def _GetDiskTypes(disks):
+  """Computes the disk types used by some disks and their children.
 
-  @type disk: L{objects.Disk}
-  @param disk: the disk we are checking
-  @rtype: bool
-  @return: whether or not there is a plain disk type
+  @type disks: list of L{objects.Disk}
+  @param disks: the disks we are checking
+  @rtype: set
+  @return: the disk types
 
   """
-  if disk.dev_type == constants.DT_PLAIN:
-    return True
-  if disk.children:
-    return compat.any([_CheckForPlainDisk(d) for d in disk.children])
-  return False
+  dev_types = set()
+  for disk in disks:
+    dev_types.add(disk.dev_type)
+    if disk.children:
+      dev_types.update(_GetDiskTypes(disk.children))
+  return dev_types
 
 
-def _RecursiveFindBD(disk, lvs_cache=None):
+def _GetDeviceCaches(disks):
+  """Reads the state of the existing devices needed to find some disks.
+
+  @type disks: list of L{objects.Disk}
+  @param disks: the disks which are going to be looked up
+  @rtype: dict
+  @return: keyword arguments for L{_RecursiveFindBD} and
+      L{_RecursiveAssembleBD}
+
+  """
+  return bdev.GetDeviceCaches(_GetDiskTypes(disks))
+
+
+def _RecursiveFindBD(disk, **kwargs):
   """Check if a device is activated.
 
   If so, return information about the real device.
 
   @type disk: L{objects.Disk}
   @param disk: the disk object we need to find
+  @param kwargs: device caches as returned by L{_GetDeviceCaches}
 
   @return: None if the device can't be found,
       otherwise the device instance
@@ -3873,9 +4008,9 @@ def _RecursiveFindBD(disk, lvs_cache=None):
   children = []
   if disk.children:
     for chdisk in disk.children:
-      children.append(_RecursiveFindBD(chdisk, lvs_cache=lvs_cache))
+      children.append(_RecursiveFindBD(chdisk, **kwargs))
 
-  return bdev.FindDevice(disk, children, lvs_cache=lvs_cache)
+  return bdev.FindDevice(disk, children, **kwargs)
 
 
 def _OpenRealBD(disk):
@@ -3894,20 +4029,21 @@ def _OpenRealBD(disk):
   return real_disk
 
 
-def BlockdevFind(disk):
+def BlockdevFind(disk, **kwargs):
   """Check if a device is activated.
 
   If it is, return information about the real device.
 
   @type disk: L{objects.Disk}
   @param disk: the disk to find
+  @param kwargs: device caches as returned by L{_GetDeviceCaches}
   @rtype: None or objects.BlockDevStatus
   @return: None if the disk cannot be found, otherwise a the current
            information
 
   """
   try:
-    rbd = _RecursiveFindBD(disk)
+    rbd = _RecursiveFindBD(disk, **kwargs)
   except errors.BlockDeviceError as err:
     _Fail("Failed to find device: %s", err, exc=True)
 
@@ -3917,6 +4053,30 @@ def BlockdevFind(disk):
   return rbd.GetSyncStatus()
 
 
+def BlockdevFindMulti(disks):
+  """Check if several devices are activated.
+
+  The state of the existing devices is read only once for all disks.
+
+  @type disks: list of L{objects.Disk}
+  @param disks: the disks to find
+  @rtype: list of tuples
+  @return: (success, result) for each disk, where the result is the one of
+      L{BlockdevFind} on success and the error message otherwise
+
+  """
+  caches = _GetDeviceCaches(disks)
+
+  result = []
+  for disk in disks:
+    try:
+      result.append((True, BlockdevFind(disk, **caches)))
+    except RPCFail as err:
+      result.append((False, str(err)))
+
+  return result
+
+
 def BlockdevGetdimensions(disks):
   """Computes the size of the given disks.
 
@@ -4123,6 +4283,21 @@ def _TryOSFromDisk(name, base_dir=None):
   if os_dir is None:
     return False, "Directory for OS %s not found in search path" % name
 
+  return _OS_CACHE.Get(os_dir)
+
+
+def _LoadOSFromDir(name, os_dir):
+  """Create an OS instance from its directory.
+
+  @type name: string
+  @param name: name of the OS
+  @type os_dir: string
+  @param os_dir: directory containing the OS definition
+  @rtype: tuple
+  @return: success and either the OS instance if we find a valid one,
+      or error message
+
+  """
   status, api_versions = _OSOndiskAPIVersion(os_dir)
   if not status:
     # push the error up
@@ -4214,6 +4389,20 @@ def _TryOSFromDisk(name, base_dir=None):
   return True, os_obj
 
 
+#: Cache of the OS definitions loaded by L{_TryOSFromDisk}
+_OS_CACHE = providercache.ProviderCache("OS", _LoadOSFromDir)
+
+
+def StartWatchingProviders():
+  """Keeps the OS and ExtStorage provider caches up to date using inotify.
+
+  Used by the node daemon, whose request processes inherit the caches.
+
+  """
+  _OS_CACHE.StartWatching(pathutils.OS_SEARCH_PATH)
+  extstorage.StartWatchingProviders()
+
+
 def OSFromDisk(name, base_dir=None):
   """Create an OS instance from disk.
 
@@ -5213,16 +5402,37 @@ def _GetImportExportIoCommand(instance, mode, ieio, ieargs):
       else:
         exp_size = utils.BytesToMebibyte(st.st_size)
 
-  elif ieio == constants.IEIO_RAW_DISK:
-    (disk, ) = ieargs
+  elif ieio in (constants.IEIO_RAW_DISK, constants.IEIO_SPARSE_DISK):
+    # A part of the disk can be selected by passing offset and size (in MiB)
+    if len(ieargs) == 3:
+      (disk, offset, size) = ieargs
+    else:
+      (disk, ) = ieargs
+      (offset, size) = (None, None)
+
+    sparse = (ieio == constants.IEIO_SPARSE_DISK)
+
     real_disk = _OpenRealBD(disk)
 
+    if sparse and not real_disk.SupportsSparseTransfer():
+      _Fail("Disk '%s' can't be transferred as a sparse stream", disk.uuid)
+
     if mode == constants.IEM_IMPORT:
-      suffix = "| %s" % utils.ShellQuoteArgs(real_disk.Import())
+      suffix = "| %s" % utils.ShellQuoteArgs(real_disk.Import(offset=offset,
+                                                               size=size,
+                                                               sparse=sparse))
 
     elif mode == constants.IEM_EXPORT:
-      prefix = "%s |" % utils.ShellQuoteArgs(real_disk.Export())
-      exp_size = disk.size
+      prefix = "%s |" % utils.ShellQuoteArgs(real_disk.Export(offset=offset,
+                                                              size=size,
+                                                              sparse=sparse))
+      if sparse:
+        # The amount of data depends on how much of the disk is in use
+        exp_size = None
+      elif size is None:
+        exp_size = disk.size
+      else:
+        exp_size = size
 
   elif ieio == constants.IEIO_SCRIPT:
     (disk, disk_index, ) = ieargs
@@ -5617,11 +5827,10 @@ def DrbdNeedsActivation(disks):
   """
   faulty_disks = []
 
-  is_plain_disk = compat.any([_CheckForPlainDisk(d) for d in disks])
-  lvs_cache = bdev.LogicalVolume.GetLvGlobalInfo() if is_plain_disk else None
+  caches = _GetDeviceCaches(disks)
 
   for disk in disks:
-    rd = _RecursiveFindBD(disk, lvs_cache=lvs_cache)
+    rd = _RecursiveFindBD(disk, **caches)
     if rd is None:
       faulty_disks.append(disk)
       continue
@@ -5922,6 +6131,39 @@ def GetFileInfo(file_path):
     return False, {}
 
 
+def _ReadHooksMaxParallel(filename=pathutils.HOOKS_MAX_PARALLEL_FILE):
+  """Reads how many hook scripts may run at the same time.
+
+  @type filename: string
+  @param filename: path of the file containing the number
+  @rtype: int
+  @return: the configured number, or 1 if the file doesn't exist or is
+      invalid, in which case the scripts are run one after the other
+
+  """
+  try:
+    value = utils.ReadOneLineFile(filename, strict=True)
+  except EnvironmentError as err:
+    if err.errno != errno.ENOENT:
+      logging.warning("Can't read %s: %s", filename, err)
+    return 1
+  except errors.GenericError as err:
+    logging.warning("Ignoring %s: %s", filename, err)
+    return 1
+
+  try:
+    max_parallel = int(value)
+  except ValueError:
+    max_parallel = 0
+
+  if max_parallel < 1:
+    logging.warning("Ignoring invalid number of parallel hooks '%s' in %s",
+                    value, filename)
+    return 1
+
+  return max_parallel
+
+
 class HooksRunner(object):
   """Hook runner.
 
@@ -5929,19 +6171,26 @@ class HooksRunner(object):
   on the master side.
 
   """
-  def __init__(self, hooks_base_dir=None):
+  def __init__(self, hooks_base_dir=None, max_parallel=None):
     """Constructor for hooks runner.
 
     @type hooks_base_dir: str or None
     @param hooks_base_dir: if not None, this overrides the
         L{pathutils.HOOKS_BASE_DIR} (useful for unittests)
+    @type max_parallel: int or None
+    @param max_parallel: how many scripts of a hooks directory may run at
+        the same time; if None, this is read from
+        L{pathutils.HOOKS_MAX_PARALLEL_FILE}
 
     """
     if hooks_base_dir is None:
       hooks_base_dir = pathutils.HOOKS_BASE_DIR
+    if max_parallel is None:
+      max_parallel = _ReadHooksMaxParallel()
     # yeah, _BASE_DIR is not valid for attributes, we use it like a
     # constant
     self._BASE_DIR = hooks_base_dir # pylint: disable=C0103
+    self._max_parallel = max_parallel
 
   def RunLocalHooks(self, node_list, hpath, phase, env):
     """Check that the hooks will be run only locally and then run them.
@@ -5969,11 +6218,14 @@ class HooksRunner(object):
     @type env: dict
     @param env: dictionary with the environment for the hook
     @rtype: list
-    @return: list of 3-element tuples:
+    @return: list of tuples, sorted by script name:
       - script path
       - script result, either L{constants.HKR_SUCCESS} or
         L{constants.HKR_FAIL}
       - output of the script
+      - run time of the script in seconds, or None if it wasn't run; only
+        if C{env} contains L{constants.HOOKS_RESULT_DURATION_ENV}, as
+        masters of older versions expect 3-element tuples
 
     @raise errors.ProgrammerError: for invalid input
         parameters
@@ -5989,6 +6241,10 @@ class HooksRunner(object):
     subdir = "%s-%s.d" % (hpath, suffix)
     dir_name = utils.PathJoin(self._BASE_DIR, subdir)
 
+    env = env.copy()
+    with_duration = \
+      env.pop(constants.HOOKS_RESULT_DURATION_ENV, None) is not None
+
     results = []
 
     if not os.path.isdir(dir_name):
@@ -5996,9 +6252,11 @@ class HooksRunner(object):
       # warning at every operation
       return results
 
-    runparts_results = utils.RunParts(dir_name, env=env, reset_env=True)
+    runparts_results = utils.RunParts(dir_name, env=env, reset_env=True,
+                                      max_parallel=self._max_parallel)
 
     for (relname, relstatus, runresult) in runparts_results:
+      duration = None
       if relstatus == constants.RUNPARTS_SKIP:
         rrval = constants.HKR_SKIP
         output = ""
@@ -6011,7 +6269,12 @@ class HooksRunner(object):
         else:
           rrval = constants.HKR_SUCCESS
         output = utils.SafeEncode(runresult.output.strip())
-      results.append(("%s/%s" % (subdir, relname), rrval, output))
+        duration = runresult.duration
+      if with_duration:
+        results.append(("%s/%s" % (subdir, relname), rrval, output,
+                        duration))
+      else:
+        results.append(("%s/%s" % (subdir, relname), rrval, output))
 
     return results
 
@@ -46,13 +46,10 @@ from optparse import (OptionParser, TitledHelpFormatter)
 from ganeti import utils
 from ganeti import errors
 from ganeti import constants
-from ganeti import opcodes
 import ganeti.rpc.errors as rpcerr
 from ganeti import ssh
 from ganeti import compat
 from ganeti import netutils
-from ganeti import qlang
-from ganeti import objects
 from ganeti import pathutils
 from ganeti import serializer
 import ganeti.cli_opts
@@ -61,6 +58,12 @@ from ganeti.cli_opts import *  # pylint: disable=W0401,W0614
 
 from ganeti.runtime import (GetClient)
 
+# Only needed by some commands, imported on first use to keep the start of the
+# command line clients fast
+opcodes = compat.LazyModule("ganeti.opcodes")
+qlang = compat.LazyModule("ganeti.qlang")
+objects = compat.LazyModule("ganeti.objects")
+
 
 __all__ = [
   # Generic functions for CLI programs
@@ -771,7 +774,27 @@ def GenericPollJob(job_id, cbs, report_cbs, cancel_fn=None,
   if not jobs:
     raise errors.JobLost("Job with id %s lost" % job_id)
 
-  status, opstatus, result = jobs[0]
+  return _EvaluateJobResult(job_id, jobs[0])
+
+
+def _EvaluateJobResult(job_id, job_data):
+  """Evaluates the outcome of a finished job.
+
+  @type job_id: number
+  @param job_id: Job ID
+  @type job_data: list or None
+  @param job_data: The job's "status", "opstatus" and "opresult" fields, or
+      C{None} if the job could not be found
+  @return: the opresult of the job
+  @raise errors.JobLost: If job can't be found
+  @raise errors.JobCanceled: If job is canceled
+  @raise errors.OpExecError: If job didn't succeed
+
+  """
+  if not job_data:
+    raise errors.JobLost("Job with id %s lost" % job_id)
+
+  status, opstatus, result = job_data
 
   if status == constants.JOB_STATUS_SUCCESS:
     return result
@@ -917,12 +940,17 @@ class FeedbackFnJobPollReportCb(JobPollReportCbBase):
 
 
 class StdioJobPollReportCb(JobPollReportCbBase):
-  def __init__(self):
+  def __init__(self, show_job_id=False):
     """Initializes this class.
 
+    @type show_job_id: bool
+    @param show_job_id: Whether to prefix log messages with the job ID, for
+        when messages of several jobs are interleaved
+
     """
     JobPollReportCbBase.__init__(self)
 
+    self.show_job_id = show_job_id
     self.notified_queued = False
     self.notified_waitlock = False
 
@@ -930,8 +958,12 @@ class StdioJobPollReportCb(JobPollReportCbBase):
     """Handles a log message.
 
     """
-    ToStdout("%s %s", time.ctime(utils.MergeTime(timestamp)),
-             FormatLogMessage(log_type, log_msg))
+    if self.show_job_id:
+      ToStdout("%s job %s: %s", time.ctime(utils.MergeTime(timestamp)),
+               job_id, FormatLogMessage(log_type, log_msg))
+    else:
+      ToStdout("%s %s", time.ctime(utils.MergeTime(timestamp)),
+               FormatLogMessage(log_type, log_msg))
 
   def ReportNotChanged(self, job_id, status):
     """Called if a job hasn't changed in a while.
@@ -1430,6 +1462,7 @@ def GenericInstanceCreate(mode, opts, args):
     src_node = None
     src_path = None
     no_install = opts.no_install
+    clone_image = opts.clone_image
     identify_defaults = False
     compress = constants.IEC_NONE
     if opts.instance_communication is None:
@@ -1446,6 +1479,7 @@ def GenericInstanceCreate(mode, opts, args):
     src_node = opts.src_node
     src_path = opts.src_dir
     no_install = None
+    clone_image = False
     identify_defaults = opts.identify_defaults
     compress = opts.compress
     instance_communication = False
@@ -1484,6 +1518,7 @@ def GenericInstanceCreate(mode, opts, args):
     compress=compress,
     tags=tags,
     no_install=no_install,
+    clone_image=clone_image,
     identify_defaults=identify_defaults,
     ignore_ipolicy=opts.ignore_ipolicy,
     instance_communication=instance_communication,
@@ -2425,8 +2460,13 @@ class JobExecutor(object):
   Note that instances of this class should not be reused between
   GetResults() calls.
 
+  In multiplexed mode, all submitted jobs are watched at once over the
+  same connection and their results are reported as soon as they finish,
+  instead of waiting for one job after the other.
+
   """
-  def __init__(self, cl=None, verbose=True, opts=None, feedback_fn=None):
+  def __init__(self, cl=None, verbose=True, opts=None, feedback_fn=None,
+               multiplex=False):
     self.queue = []
     if cl is None:
       cl = GetClient()
@@ -2435,6 +2475,7 @@ class JobExecutor(object):
     self.jobs = []
     self.opts = opts
     self.feedback_fn = feedback_fn
+    self.multiplex = multiplex
     self._counter = itertools.count()
 
   @staticmethod
@@ -2502,6 +2543,108 @@ class JobExecutor(object):
     # no job found
     return self.jobs.pop(0)
 
+  def _EvaluateJob(self, jid, name, fn):
+    """Retrieves the result of a job, reporting any failure.
+
+    @type fn: callable
+    @param fn: Function returning the job's result
+    @rtype: tuple
+    @return: tuple of (success, job result or error message)
+
+    """
+    try:
+      return (True, fn())
+    except errors.JobLost as err:
+      _, job_result = FormatError(err)
+      ToStderr("Job %s%s has been archived, cannot check its result",
+               jid, self._IfName(name, " for %s"))
+    except (errors.GenericError, rpcerr.ProtocolError) as err:
+      _, job_result = FormatError(err)
+      # the error message will always be shown, verbose or not
+      ToStderr("Job %s%s has failed: %s",
+               jid, self._IfName(name, " for %s"), job_result)
+
+    return (False, job_result)
+
+  def _WaitSequential(self, results):
+    """Waits for the submitted jobs one after the other.
+
+    """
+    while self.jobs:
+      (idx, _, jid, name) = self._ChooseJob()
+      ToStdout("Waiting for job %s%s ...", jid, self._IfName(name, " for %s"))
+      (success, job_result) = \
+        self._EvaluateJob(jid, name,
+                          lambda: PollJob(jid, cl=self.cl,
+                                          feedback_fn=self.feedback_fn))
+      results.append((idx, success, job_result))
+
+  def _WaitMultiplexed(self, results):
+    """Waits for all submitted jobs at once.
+
+    Results are collected in the order in which the jobs finish.
+
+    """
+    if self.feedback_fn:
+      reporter = FeedbackFnJobPollReportCb(self.feedback_fn)
+    else:
+      reporter = StdioJobPollReportCb(show_job_id=True)
+
+    # job ID -> [index, original job ID, name, job info, log serial]
+    pending = dict((int(jid), [idx, jid, name, None, None])
+                   for (idx, _, jid, name) in self.jobs)
+    self.jobs = []
+
+    if self.verbose and pending:
+      ToStdout("Waiting for jobs %s ...",
+               utils.CommaJoin(row[1] for row in pending.values()))
+
+    while pending:
+      changes = self.cl.WaitForJobsChangeOnce(
+        [(job_id, row[3], row[4]) for (job_id, row) in pending.items()],
+        ["status"])
+
+      if not changes:
+        for (job_id, row) in pending.items():
+          reporter.ReportNotChanged(job_id, row[3] and row[3][0])
+        continue
+
+      finished = []
+      for (job_id, update) in changes:
+        row = pending[job_id]
+
+        if update is None:
+          # the job is gone, it will be reported as lost below
+          finished.append(job_id)
+          continue
+
+        (job_info, log_entries) = update
+        for (serial, timestamp, log_type, message) in log_entries:
+          reporter.ReportLogMessage(job_id, serial, timestamp,
+                                    log_type, message)
+          row[4] = serial if row[4] is None else max(row[4], serial)
+
+        row[3] = job_info
+        if job_info[0] in (constants.JOB_STATUS_SUCCESS,
+                           constants.JOB_STATUS_ERROR,
+                           constants.JOB_STATUS_CANCELING,
+                           constants.JOB_STATUS_CANCELED):
+          finished.append(job_id)
+
+      if not finished:
+        continue
+
+      job_data = self.cl.QueryJobs(finished,
+                                   ["status", "opstatus", "opresult"])
+      for (job_id, data) in zip(finished, job_data):
+        (idx, jid, name, _, _) = pending.pop(job_id)
+        (success, job_result) = \
+          self._EvaluateJob(jid, name,
+                            compat.partial(_EvaluateJobResult, jid, data))
+        if success and self.verbose:
+          ToStdout("Job %s%s has finished", jid, self._IfName(name, " for %s"))
+        results.append((idx, success, job_result))
+
   def GetResults(self):
     """Wait for and return the results of all jobs.
 
@@ -2525,25 +2668,10 @@ class JobExecutor(object):
       ToStderr("Failed to submit job%s: %s", self._IfName(name, " for %s"), jid)
       results.append((idx, False, jid))
 
-    while self.jobs:
-      (idx, _, jid, name) = self._ChooseJob()
-      ToStdout("Waiting for job %s%s ...", jid, self._IfName(name, " for %s"))
-      try:
-        job_result = PollJob(jid, cl=self.cl, feedback_fn=self.feedback_fn)
-        success = True
-      except errors.JobLost as err:
-        _, job_result = FormatError(err)
-        ToStderr("Job %s%s has been archived, cannot check its result",
-                 jid, self._IfName(name, " for %s"))
-        success = False
-      except (errors.GenericError, rpcerr.ProtocolError) as err:
-        _, job_result = FormatError(err)
-        success = False
-        # the error message will always be shown, verbose or not
-        ToStderr("Job %s%s has failed: %s",
-                 jid, self._IfName(name, " for %s"), job_result)
-
-      results.append((idx, success, job_result))
+    if self.multiplex:
+      self._WaitMultiplexed(results)
+    else:
+      self._WaitSequential(results)
 
     # sort based on the index, then drop it
     results.sort()
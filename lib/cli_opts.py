@@ -61,6 +61,7 @@ __all__ = [
   "CAPAB_MASTER_OPT",
   "CAPAB_VM_OPT",
   "CLEANUP_OPT",
+  "CLONE_IMAGE_OPT",
   "cli_option",
   "CLUSTER_DOMAIN_SECRET_OPT",
   "COMMIT_OPT",
@@ -129,6 +130,7 @@ __all__ = [
   "INSTALL_IMAGE_OPT",
   "INSTANCE_COMMUNICATION_NETWORK_OPT",
   "INSTANCE_COMMUNICATION_OPT",
+  "INSTANCE_CONCURRENCY_OPT",
   "INSTANCE_POLICY_OPTS",
   "INTERVAL_OPT",
   "IPOLICY_BOUNDS_SPECS_STR",
@@ -202,11 +204,13 @@ __all__ = [
   "OPT_COMPL_ONE_NODE",
   "OPT_COMPL_ONE_NODEGROUP",
   "OPT_COMPL_ONE_OS",
+  "ORDER_TAGS_OPT",
   "OS_OPT",
   "OS_SIZE_OPT",
   "OSPARAMS_OPT",
   "OSPARAMS_PRIVATE_OPT",
   "OSPARAMS_SECRET_OPT",
+  "PARALLEL_OPT",
   "POWER_DELAY_OPT",
   "PREALLOC_WIPE_DISKS_OPT",
   "PRIMARY_IP_VERSION_OPT",
@@ -254,6 +258,7 @@ __all__ = [
   "TAG_SRC_OPT",
   "TIMEOUT_OPT",
   "TO_GROUP_OPT",
+  "TRANSFER_STREAMS_OPT",
   "TRANSPORT_COMPRESSION_OPT",
   "UIDPOOL_OPT",
   "USE_EXTERNAL_MIP_SCRIPT",
@@ -737,6 +742,12 @@ NO_INSTALL_OPT = cli_option("--no-install", dest="no_install",
                             help="Do not install the OS (will"
                             " enable no-start)")
 
+CLONE_IMAGE_OPT = cli_option("--clone-image", dest="clone_image",
+                             action="store_true", default=False,
+                             help="Create the disks as copy-on-write clones"
+                             " of a golden copy of the OS image, if the"
+                             " storage supports it")
+
 NORUNTIME_CHGS_OPT = cli_option("--no-runtime-changes",
                                 dest="allow_runtime_chgs",
                                 default=True, action="store_false",
@@ -1232,6 +1243,11 @@ COMPRESS_OPT = cli_option("--compress", dest="compress",
                           type="string", default=constants.IEC_NONE,
                           help="The compression mode to use")
 
+TRANSFER_STREAMS_OPT = \
+  cli_option("--transfer-streams", dest="transfer_streams", type="int",
+             default=constants.IE_DEFAULT_TRANSFER_STREAMS,
+             help="Number of parallel streams to use for each disk")
+
 TRANSPORT_COMPRESSION_OPT = \
     cli_option("--transport-compression", dest="transport_compression",
                type="string", default=constants.IEC_NONE,
@@ -1377,6 +1393,10 @@ FAILURE_ONLY_OPT = cli_option("--failure-only", default=False,
                               help=("Hide successful results and show failures"
                                     " only (determined by the exit code)"))
 
+PARALLEL_OPT = cli_option("--parallel", dest="parallel", type="int",
+                          default=1, metavar="<N>",
+                          help="Number of nodes to work on at the same time")
+
 REASON_OPT = cli_option("--reason", default=[],
                         help="The reason for executing the command")
 
@@ -1463,6 +1483,19 @@ STARTUP_PAUSED_OPT = cli_option("--paused", dest="startup_paused",
                                 action="store_true", default=False,
                                 help="Pause instance at startup")
 
+ORDER_TAGS_OPT = cli_option("--order-tags", dest="order_tags",
+                            type="list", default=[],
+                            help="Comma-separated list of instance tags;"
+                            " instances with the first tag are started first"
+                            " and stopped last, untagged instances are"
+                            " started last and stopped first")
+
+INSTANCE_CONCURRENCY_OPT = \
+  cli_option("--concurrency", dest="concurrency", type="int",
+             default=constants.NODE_INSTANCE_CONCURRENCY,
+             help="Maximum number of instances to start or stop at the"
+             " same time")
+
 TO_GROUP_OPT = cli_option("--to", dest="to", metavar="<group>",
                           help="Destination node group (name or uuid)",
                           default=None, action="append",
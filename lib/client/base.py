@@ -31,9 +31,24 @@
 """Utils for CLI commands"""
 
 from ganeti import cli
+from ganeti import compat
 from ganeti import constants
 from ganeti import ht
 
+rpc = compat.LazyModule("ganeti.rpc.node")
+
+
+def RunWithRPC(fn):
+  """RPC-wrapper decorator importing the RPC module on first use.
+
+  Like L{ganeti.rpc.node.RunWithRPC}, but the RPC module, which is expensive
+  to import, is only imported when the decorated function is called.
+
+  """
+  def wrapper(*args, **kwargs):
+    return rpc.RunWithRPC(fn)(*args, **kwargs)
+  return wrapper
+
 
 def GetResult(cl, opts, result):
   """Waits for jobs and returns whether they have succeeded
@@ -36,10 +36,14 @@
 # C0103: Invalid name gnt-backup
 
 from ganeti.cli import *
-from ganeti import opcodes
 from ganeti import constants
 from ganeti import errors
-from ganeti import qlang
+from ganeti import compat
+
+# Only needed by some commands, imported on first use to keep the start of the
+# command line client fast
+opcodes = compat.LazyModule("ganeti.opcodes")
+qlang = compat.LazyModule("ganeti.qlang")
 
 
 _LIST_DEF_FIELDS = ["node", "export"]
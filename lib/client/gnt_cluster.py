@@ -37,6 +37,8 @@
 
 import itertools
 import os
+import queue
+import threading
 import time
 import tempfile
 
@@ -45,24 +47,27 @@ from io import StringIO
 import OpenSSL
 
 from ganeti.cli import *
-from ganeti import bootstrap
 from ganeti import compat
 from ganeti import constants
-from ganeti import config
 from ganeti import errors
 from ganeti import netutils
-from ganeti import objects
-from ganeti import opcodes
 from ganeti import pathutils
-from ganeti import qlang
-from ganeti.rpc.node import RunWithRPC
+from ganeti.client.base import RunWithRPC
 from ganeti import serializer
 from ganeti import ssconf
 from ganeti import ssh
-from ganeti import uidpool
 from ganeti import utils
 from ganeti.client import base
 
+# Only needed by some commands, imported on first use to keep the start of the
+# command line client fast
+bootstrap = compat.LazyModule("ganeti.bootstrap")
+config = compat.LazyModule("ganeti.config")
+objects = compat.LazyModule("ganeti.objects")
+opcodes = compat.LazyModule("ganeti.opcodes")
+qlang = compat.LazyModule("ganeti.qlang")
+uidpool = compat.LazyModule("ganeti.uidpool")
+
 
 ON_OPT = cli_option("--on", default=False,
                     action="store_true", dest="on",
@@ -656,6 +661,53 @@ def ShowClusterConfig(opts, args):
   return 0
 
 
+def _RunOnNodes(fn, nodes, parallel, report_fn):
+  """Runs a function for each of the given nodes.
+
+  @type fn: callable
+  @param fn: function to call for each element of C{nodes}
+  @type nodes: list
+  @param nodes: the nodes to work on
+  @type parallel: int
+  @param parallel: maximum number of nodes to work on at the same time
+  @type report_fn: callable
+  @param report_fn: function called with each node and the result of C{fn}
+      for it; it is always called from the calling thread, as soon as the
+      node has been dealt with
+
+  """
+  if parallel <= 1 or len(nodes) <= 1:
+    for node in nodes:
+      report_fn(node, fn(node))
+    return
+
+  pending = list(nodes)
+  lock = threading.Lock()
+  results = queue.Queue()
+
+  def _Worker():
+    while True:
+      with lock:
+        if not pending:
+          return
+        node = pending.pop(0)
+      try:
+        results.put((node, fn(node), None))
+      except Exception as err: # pylint: disable=W0703
+        results.put((node, None, err))
+
+  for _ in range(min(parallel, len(nodes))):
+    thread = threading.Thread(target=_Worker)
+    thread.daemon = True
+    thread.start()
+
+  for _ in nodes:
+    (node, result, err) = results.get()
+    if err is not None:
+      raise err
+    report_fn(node, result)
+
+
 def ClusterCopyFile(opts, args):
   """Copy a file from master to some nodes.
 
@@ -687,10 +739,18 @@ def ClusterCopyFile(opts, args):
     cl.Close()
     qcl.Close()
 
-  srun = ssh.SshRunner(cluster_name)
-  for (node, port) in zip(results, ports):
-    if not srun.CopyFileToNode(node, port, filename):
-      ToStderr("Copy of file %s to node %s:%d failed", filename, node, port)
+  srun = ssh.SshRunner(cluster_name,
+                       control_persist=ssh.CONTROL_PERSIST_TIMEOUT)
+
+  def _Copy(node_port):
+    (node, port) = node_port
+    return srun.CopyFileToNode(node, port, filename)
+
+  def _Report(node_port, success):
+    if not success:
+      ToStderr("Copy of file %s to node %s:%d failed", filename, *node_port)
+
+  _RunOnNodes(_Copy, list(zip(results, ports)), opts.parallel, _Report)
 
   return 0
 
@@ -716,22 +776,32 @@ def RunClusterCommand(opts, args):
   cluster_name, master_node = cl.QueryConfigValues(["cluster_name",
                                                     "master_node"])
 
-  srun = ssh.SshRunner(cluster_name=cluster_name)
+  srun = ssh.SshRunner(cluster_name=cluster_name,
+                       control_persist=ssh.CONTROL_PERSIST_TIMEOUT)
 
   # Make sure master node is at list end
-  if master_node in nodes:
-    nodes.remove(master_node)
-    nodes.append(master_node)
+  node_ports = [(name, port) for (name, port) in zip(nodes, ports)
+                if name != master_node]
+  master_ports = [(name, port) for (name, port) in zip(nodes, ports)
+                  if name == master_node]
+
+  # Output of nodes running in parallel is not ordered, hence every line
+  # needs to carry the node name
+  show_machine_names = opts.show_machine_names or opts.parallel > 1
 
-  for (name, port) in zip(nodes, ports):
-    result = srun.Run(name, constants.SSH_LOGIN_USER, command, port=port)
+  def _Run(node_port):
+    (name, port) = node_port
+    return srun.Run(name, constants.SSH_LOGIN_USER, command, port=port)
+
+  def _Report(node_port, result):
+    (name, _) = node_port
 
     if opts.failure_only and result.exit_code == constants.EXIT_SUCCESS:
       # Do not output anything for successful commands
-      continue
+      return
 
     ToStdout("------------------------------------------------")
-    if opts.show_machine_names:
+    if show_machine_names:
       for line in result.output.splitlines():
         ToStdout("%s: %s", name, line)
     else:
@@ -739,6 +809,10 @@ def RunClusterCommand(opts, args):
       ToStdout("%s", result.output)
     ToStdout("return code = %s", result.exit_code)
 
+  _RunOnNodes(_Run, node_ports, opts.parallel, _Report)
+  # The master node always comes last, even if running in parallel
+  _RunOnNodes(_Run, master_ports, 1, _Report)
+
   return 0
 
 
@@ -2529,12 +2603,13 @@ commands = {
     "", "Shows the cluster master"),
   "copyfile": (
     ClusterCopyFile, [ArgFile(min=1, max=1)],
-    [NODE_LIST_OPT, USE_REPL_NET_OPT, NODEGROUP_OPT],
+    [NODE_LIST_OPT, USE_REPL_NET_OPT, NODEGROUP_OPT, PARALLEL_OPT],
     "[-n <node-name>...] <filename>",
     "Copies a file to all (or only some) nodes"),
   "command": (
     RunClusterCommand, [ArgCommand(min=1)],
-    [NODE_LIST_OPT, NODEGROUP_OPT, SHOW_MACHINE_OPT, FAILURE_ONLY_OPT],
+    [NODE_LIST_OPT, NODEGROUP_OPT, SHOW_MACHINE_OPT, FAILURE_ONLY_OPT,
+     PARALLEL_OPT],
     "[-n <node-name>...] <command>",
     "Runs a command on all (or only some) nodes"),
   "info": (
@@ -43,13 +43,16 @@ import json
 from ganeti.cli import *
 from ganeti import cli
 from ganeti import constants
-from ganeti import opcodes
 from ganeti import utils
 from ganeti import errors
 from ganeti import compat
 from ganeti import ht
-from ganeti import metad
-from ganeti import wconfd
+
+# Only needed by some commands, imported on first use to keep the start of the
+# command line client fast
+opcodes = compat.LazyModule("ganeti.opcodes")
+metad = compat.LazyModule("ganeti.metad")
+wconfd = compat.LazyModule("ganeti.wconfd")
 
 
 #: Default fields for L{ListLocks}
@@ -37,11 +37,14 @@ from io import StringIO
 
 from ganeti.cli import *
 from ganeti import constants
-from ganeti import opcodes
 from ganeti import utils
 from ganeti import compat
 from ganeti.client import base
 
+# Only needed by some commands, imported on first use to keep the start of the
+# command line client fast
+opcodes = compat.LazyModule("ganeti.opcodes")
+
 
 #: default list of fields for L{ListGroups}
 _LIST_DEF_FIELDS = ["name", "node_cnt", "pinst_cnt", "alloc_policy", "ndparams"]
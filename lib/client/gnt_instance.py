@@ -40,16 +40,19 @@ import json
 import logging
 
 from ganeti.cli import *
-from ganeti import opcodes
 from ganeti import constants
 from ganeti import compat
 from ganeti import utils
 from ganeti import errors
 from ganeti import netutils
 from ganeti import ssh
-from ganeti import objects
 from ganeti import ht
 
+# Only needed by some commands, imported on first use to keep the start of the
+# command line client fast
+opcodes = compat.LazyModule("ganeti.opcodes")
+objects = compat.LazyModule("ganeti.objects")
+
 
 _EXPAND_CLUSTER = "cluster"
 _EXPAND_NODES_BOTH = "nodes"
@@ -201,7 +204,7 @@ def GenericManyOps(operation, fn):
     if not (opts.force_multi or not multi_on
             or ConfirmOperation(inames, "instances", operation)):
       return 1
-    jex = JobExecutor(verbose=multi_on, cl=cl, opts=opts)
+    jex = JobExecutor(verbose=multi_on, cl=cl, opts=opts, multiplex=multi_on)
     for name in inames:
       op = fn(name, opts)
       jex.QueueJob(name, op)
@@ -846,6 +849,7 @@ def MoveInstance(opts, args):
   op = opcodes.OpInstanceMove(instance_name=instance_name,
                               target_node=opts.node,
                               compress=opts.compress,
+                              transfer_streams=opts.transfer_streams,
                               shutdown_timeout=opts.shutdown_timeout,
                               ignore_consistency=opts.ignore_consistency,
                               ignore_ipolicy=opts.ignore_ipolicy)
@@ -1559,6 +1563,7 @@ add_opts = [
   OS_OPT,
   FORCE_VARIANT_OPT,
   NO_INSTALL_OPT,
+  CLONE_IMAGE_OPT,
   IGNORE_IPOLICY_OPT,
   INSTANCE_COMMUNICATION_OPT,
   HELPER_STARTUP_TIMEOUT_OPT,
@@ -1602,7 +1607,7 @@ commands = {
   "move": (
     MoveInstance, ARGS_ONE_INSTANCE,
     [FORCE_OPT] + SUBMIT_OPTS +
-    [SINGLE_NODE_OPT, COMPRESS_OPT,
+    [SINGLE_NODE_OPT, COMPRESS_OPT, TRANSFER_STREAMS_OPT,
      SHUTDOWN_TIMEOUT_OPT, DRY_RUN_OPT, PRIORITY_OPT, IGNORE_CONSIST_OPT,
      IGNORE_IPOLICY_OPT],
     "[-f] <instance-name>", "Move instance to an arbitrary node"
@@ -40,7 +40,11 @@ from ganeti import constants
 from ganeti import errors
 from ganeti import utils
 from ganeti import cli
-from ganeti import qlang
+from ganeti import compat
+
+# Only needed by some commands, imported on first use to keep the start of the
+# command line client fast
+qlang = compat.LazyModule("ganeti.qlang")
 
 
 #: default list of fields for L{ListJobs}
@@ -38,10 +38,14 @@ import itertools
 
 from ganeti.cli import *
 from ganeti import constants
-from ganeti import opcodes
 from ganeti import utils
 from ganeti import errors
-from ganeti import objects
+from ganeti import compat
+
+# Only needed by some commands, imported on first use to keep the start of the
+# command line client fast
+opcodes = compat.LazyModule("ganeti.opcodes")
+objects = compat.LazyModule("ganeti.objects")
 
 
 #: default list of fields for L{ListNetworks}
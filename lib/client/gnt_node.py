@@ -40,19 +40,22 @@ import errno
 
 from ganeti.cli import *
 from ganeti import cli
-from ganeti import bootstrap
-from ganeti import opcodes
 from ganeti import utils
 from ganeti import constants
 from ganeti import errors
 from ganeti import netutils
 from ganeti import pathutils
-from ganeti.rpc.node import RunWithRPC
+from ganeti.client.base import RunWithRPC
 from ganeti import ssh
 from ganeti import compat
 
-from ganeti import confd
-from ganeti.confd import client as confd_client
+# Only needed by some commands, imported on first use to keep the start of the
+# command line client fast
+bootstrap = compat.LazyModule("ganeti.bootstrap")
+opcodes = compat.LazyModule("ganeti.opcodes")
+confd = compat.LazyModule("ganeti.confd")
+confd_client = compat.LazyModule("ganeti.confd.client")
+
 
 #: default list of field for L{ListNodes}
 _LIST_DEF_FIELDS = [
@@ -592,6 +595,78 @@ def MigrateNode(opts, args):
   return rcode
 
 
+def _ReportNodeInstancesResult(result, action):
+  """Prints the result of starting or stopping the instances of a node.
+
+  @type result: list of tuples
+  @param result: (instance name, success, error message) for each instance
+  @type action: string
+  @param action: the action, as used in messages
+  @rtype: int
+  @return: the desired exit code
+
+  """
+  bad_cnt = 0
+  for (name, success, msg) in result:
+    if not success:
+      ToStderr("Failed to %s instance %s: %s", action, name, msg)
+      bad_cnt += 1
+
+  if bad_cnt:
+    ToStdout("Failed to %s %s of %s instance(s).", action, bad_cnt,
+             len(result))
+    return constants.EXIT_FAILURE
+
+  ToStdout("All %s instance(s) processed successfully.", len(result))
+  return constants.EXIT_SUCCESS
+
+
+def StartupNodeInstances(opts, args):
+  """Start the primary instances of a node.
+
+  @param opts: the command line options selected by the user
+  @type args: list
+  @param args: the node name, optionally followed by the names of the
+      instances to start
+  @rtype: int
+  @return: the desired exit code
+
+  """
+  op = opcodes.OpNodeStartupInstances(node_name=args[0], instances=args[1:],
+                                      force=opts.force,
+                                      no_remember=opts.no_remember,
+                                      startup_paused=opts.startup_paused,
+                                      order_tags=opts.order_tags,
+                                      concurrency=opts.concurrency)
+  result = SubmitOrSend(op, opts)
+  return _ReportNodeInstancesResult(result, "start")
+
+
+def ShutdownNodeInstances(opts, args):
+  """Stop the primary instances of a node.
+
+  @param opts: the command line options selected by the user
+  @type args: list
+  @param args: the node name, optionally followed by the names of the
+      instances to stop
+  @rtype: int
+  @return: the desired exit code
+
+  """
+  if not (args[1:] or opts.force or
+          AskUser("Stop all running primary instances of node %s?" %
+                  args[0])):
+    return constants.EXIT_CONFIRMATION
+
+  op = opcodes.OpNodeShutdownInstances(node_name=args[0], instances=args[1:],
+                                       timeout=opts.timeout,
+                                       no_remember=opts.no_remember,
+                                       order_tags=opts.order_tags,
+                                       concurrency=opts.concurrency)
+  result = SubmitOrSend(op, opts)
+  return _ReportNodeInstancesResult(result, "stop")
+
+
 def _FormatNodeInfo(node_info):
   """Format node information for L{cli.PrintGenericInfo()}.
 
@@ -1184,6 +1259,20 @@ commands = {
     "[-f] <node>",
     "Migrate all the primary instance on a node away from it"
     " (only for instances of type drbd)"),
+  "start-instances": (
+    StartupNodeInstances, [ArgNode(min=1, max=1), ArgInstance()],
+    [FORCE_OPT, NO_REMEMBER_OPT, STARTUP_PAUSED_OPT, ORDER_TAGS_OPT,
+     INSTANCE_CONCURRENCY_OPT, PRIORITY_OPT] + SUBMIT_OPTS,
+    "[--order-tags <tag>,...] [--concurrency <n>] <node> [<instance>...]",
+    "Start the primary instances of a node, all of those marked as running"
+    " if no instance is given"),
+  "stop-instances": (
+    ShutdownNodeInstances, [ArgNode(min=1, max=1), ArgInstance()],
+    [FORCE_OPT, TIMEOUT_OPT, NO_REMEMBER_OPT, ORDER_TAGS_OPT,
+     INSTANCE_CONCURRENCY_OPT, PRIORITY_OPT] + SUBMIT_OPTS,
+    "[--order-tags <tag>,...] [--concurrency <n>] <node> [<instance>...]",
+    "Stop the primary instances of a node, all of those marked as running"
+    " if no instance is given"),
   "info": (
     ShowNodeConfig, ARGS_MANY_NODES, [],
     "[<node>...]", "Show information about the node(s)"),
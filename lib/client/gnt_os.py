@@ -37,8 +37,12 @@
 
 from ganeti.cli import *
 from ganeti import constants
-from ganeti import opcodes
 from ganeti import utils
+from ganeti import compat
+
+# Only needed by some commands, imported on first use to keep the start of the
+# command line client fast
+opcodes = compat.LazyModule("ganeti.opcodes")
 
 
 def ListOS(opts, args):
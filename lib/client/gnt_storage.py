@@ -36,8 +36,12 @@
 # C0103: Invalid name gnt-storage
 
 from ganeti.cli import *
-from ganeti import opcodes
 from ganeti import utils
+from ganeti import compat
+
+# Only needed by some commands, imported on first use to keep the start of the
+# command line client fast
+opcodes = compat.LazyModule("ganeti.opcodes")
 
 
 def ShowExtStorageInfo(opts, args):
@@ -98,7 +98,9 @@ from ganeti.cmdlib.instance_operation import \
   LUInstanceShutdown, \
   LUInstanceReinstall, \
   LUInstanceReboot, \
-  LUInstanceConsole
+  LUInstanceConsole, \
+  LUNodeStartupInstances, \
+  LUNodeShutdownInstances
 from ganeti.cmdlib.instance_set_params import \
   LUInstanceSetParams
 from ganeti.cmdlib.instance_query import \
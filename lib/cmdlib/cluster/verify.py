@@ -955,8 +955,8 @@ class LUClusterVerifyGroup(LogicalUnit, _VerifyErrors):
                            reserved):
     """Verify if there are any unknown volumes in the cluster.
 
-    The .os, .swap and backup volumes are ignored. All other volumes are
-    reported as unknown.
+    The .os, .swap and backup volumes as well as golden images are ignored.
+    All other volumes are reported as unknown.
 
     @type vg_name: string
     @param vg_name: the name of the Ganeti-administered volume group
@@ -977,6 +977,9 @@ class LUClusterVerifyGroup(LogicalUnit, _VerifyErrors):
         # skip volumes not belonging to the ganeti-administered volume group
         if volume.split('/')[0] != vg_name:
           continue
+        # golden images, from which disks are cloned, are not orphans
+        if volume.split('/')[1].startswith(constants.GOLDEN_IMAGE_PREFIX):
+          continue
 
         test = ((node_uuid not in node_vol_should or
                 volume not in node_vol_should[node_uuid]) and
@@ -2294,7 +2297,9 @@ class LUClusterVerifyGroup(LogicalUnit, _VerifyErrors):
         if res.offline:
           # No need to investigate payload if node is offline
           continue
-        for script, hkr, output in res.payload:
+        for hook_result in res.payload:
+          # Newer nodes also return the script's run time
+          (script, hkr, output) = hook_result[:3]
           test = hkr == constants.HKR_FAIL
           self._ErrorIf(test, constants.CV_ENODEHOOKS, node_name,
                         "Script %s failed, output:", script)
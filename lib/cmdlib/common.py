@@ -1305,6 +1305,25 @@ def CheckDiskAccessModeValidity(parameters):
                                                        o=valid_vals_str))
 
 
+def CheckFilePreallocationValidity(parameters):
+  """Checks if the preallocation parameter of file disks is legal.
+
+  @raise errors.OpPrereqError: if the check fails.
+
+  """
+  for disk_template in parameters:
+    prealloc = parameters[disk_template].get(constants.FILE_PREALLOCATION,
+                                             constants.FILE_PREALLOC_DEFAULT)
+    if prealloc not in constants.FILE_PREALLOC_MODES:
+      valid_vals_str = utils.CommaJoin(constants.FILE_PREALLOC_MODES)
+      raise errors.OpPrereqError("Invalid value of '{d}:{a}': '{v}' (expected"
+                                 " one of {o})".format(
+                                   d=disk_template,
+                                   a=constants.FILE_PREALLOCATION,
+                                   v=prealloc, o=valid_vals_str),
+                                 errors.ECODE_INVAL)
+
+
 def CheckDiskAccessModeConsistency(parameters, cfg, group=None):
   """Checks if the access param is consistent with the cluster configuration.
 
@@ -47,7 +47,8 @@ from ganeti.cmdlib.common import MergeAndVerifyHvState, \
   ComputeNewInstanceViolations, GetDefaultIAllocator, ShareAll, \
   CheckInstancesNodeGroups, LoadNodeEvacResult, MapInstanceLvsToNodes, \
   CheckIpolicyVsDiskTemplates, CheckDiskAccessModeValidity, \
-  CheckDiskAccessModeConsistency, ConnectInstanceCommunicationNetworkOp
+  CheckFilePreallocationValidity, CheckDiskAccessModeConsistency, \
+  ConnectInstanceCommunicationNetworkOp
 
 import ganeti.masterd.instance
 
@@ -121,6 +122,7 @@ class LUGroupAdd(LogicalUnit):
       self.new_diskparams = self.op.diskparams
       try:
         utils.VerifyDictOptions(self.new_diskparams, constants.DISK_DT_DEFAULTS)
+        CheckFilePreallocationValidity(self.new_diskparams)
       except errors.OpPrereqError as err:
         raise errors.OpPrereqError("While verify diskparams options: %s" % err,
                                    errors.ECODE_INVAL)
@@ -356,6 +358,7 @@ class LUGroupSetParams(LogicalUnit):
 
     if self.op.diskparams:
       CheckDiskAccessModeValidity(self.op.diskparams)
+      CheckFilePreallocationValidity(self.op.diskparams)
 
   def ExpandNames(self):
     # This raises errors.OpPrereqError on its own:
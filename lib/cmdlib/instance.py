@@ -341,6 +341,16 @@ class LUInstanceMove(LogicalUnit):
   HTYPE = constants.HTYPE_INSTANCE
   REQ_BGL = False
 
+  def CheckArguments(self):
+    """Check arguments.
+
+    """
+    if not (0 < self.op.transfer_streams <= constants.IE_MAX_TRANSFER_STREAMS):
+      raise errors.OpPrereqError("Number of transfer streams must be between"
+                                 " 1 and %s" %
+                                 constants.IE_MAX_TRANSFER_STREAMS,
+                                 errors.ECODE_INVAL)
+
   def ExpandNames(self):
     self._ExpandAndLockInstance()
     (self.op.target_node_uuid, self.op.target_node) = \
@@ -477,10 +487,11 @@ class LUInstanceMove(LogicalUnit):
     disks = self.cfg.GetInstanceDisks(self.instance.uuid)
     for idx, disk in enumerate(disks):
       # FIXME: pass debug option from opcode to backend
+      # Only the parts of the disk containing data are sent
       dt = masterd.instance.DiskTransfer("disk/%s" % idx,
-                                         constants.IEIO_RAW_DISK,
+                                         constants.IEIO_SPARSE_DISK,
                                          (disk, self.instance),
-                                         constants.IEIO_RAW_DISK,
+                                         constants.IEIO_SPARSE_DISK,
                                          (disk, self.instance),
                                          None)
       transfers.append(dt)
@@ -492,7 +503,8 @@ class LUInstanceMove(LogicalUnit):
                                             target_node.uuid,
                                             target_node.secondary_ip,
                                             self.op.compress,
-                                            self.instance, transfers)
+                                            self.instance, transfers,
+                                            streams=self.op.transfer_streams)
     if not compat.all(import_result):
       errs.append("Failed to transfer instance data")
 
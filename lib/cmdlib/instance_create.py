@@ -183,6 +183,10 @@ class LUInstanceCreate(LogicalUnit):
     if self.op.no_install and self.op.start:
       self.LogInfo("No-installation mode selected, disabling startup")
       self.op.start = False
+
+    if self.op.clone_image and self.op.mode != constants.INSTANCE_CREATE:
+      raise errors.OpPrereqError("Disks can only be cloned from an image when"
+                                 " creating an instance", errors.ECODE_INVAL)
     # validate/normalize the instance name
     self.op.instance_name = \
       netutils.Hostname.GetNormalizedName(self.op.instance_name)
@@ -978,6 +982,10 @@ class LUInstanceCreate(LogicalUnit):
       raise errors.OpPrereqError("Disk template %s not supported with"
                                  " exclusive storage" % self.op.disk_template,
                                  errors.ECODE_STATE)
+    if excl_stor and self.op.clone_image:
+      # Clones live in a thin pool, not on the disk's own spindles
+      raise errors.OpPrereqError("Disks can't be cloned from an image with"
+                                 " exclusive storage", errors.ECODE_STATE)
     for disk in self.disks:
       CheckSpindlesExclusiveStorage(disk, excl_stor, True)
 
@@ -1555,7 +1563,7 @@ class LUInstanceCreate(LogicalUnit):
     if not self.adopt_disks and os_image is not None:
       feedback_fn("* imaging instance disks...")
       try:
-        ImageDisks(self, iobj, os_image)
+        ImageDisks(self, iobj, os_image, clone=self.op.clone_image)
       except errors.OpExecError as err:
         logging.exception("Imaging disks failed")
         self.LogWarning("Imaging instance disks failed (%s)", err)
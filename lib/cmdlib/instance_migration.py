@@ -943,18 +943,34 @@ class TLMigrateInstance(Tasklet):
         raise errors.OpExecError("Could not migrate instance %s: %s" %
                                  (self.instance.name, msg))
 
+      for adjustment in ms.adjustments or []:
+        self.feedback_fn("* %s" % adjustment)
+
       if ms.postcopy_status == constants.HV_KVM_MIGRATION_POSTCOPY_ACTIVE:
         self.feedback_fn("* memory transfer has switched to postcopy")
 
+      rate = None
+      if ms.throughput:
+        rate = "%s/s" % utils.FormatUnit(ms.throughput / (1024 * 1024), "h")
+
       if ms.status not in constants.HV_KVM_MIGRATION_ACTIVE_STATUSES:
-        self.feedback_fn("* memory transfer complete")
+        if rate:
+          self.feedback_fn("* memory transfer complete (average throughput"
+                           " %s)" % rate)
+        else:
+          self.feedback_fn("* memory transfer complete")
         break
 
       if (utils.TimeoutExpired(last_feedback,
                                self._MIGRATION_FEEDBACK_INTERVAL) and
           ms.transferred_ram is not None):
         mem_progress = 100 * float(ms.transferred_ram) / float(ms.total_ram)
-        self.feedback_fn("* memory transfer progress: %.2f %%" % mem_progress)
+        if rate:
+          self.feedback_fn("* memory transfer progress: %.2f %% (%s)" %
+                           (mem_progress, rate))
+        else:
+          self.feedback_fn("* memory transfer progress: %.2f %%" %
+                           mem_progress)
         last_feedback = time.time()
 
       time.sleep(self._MIGRATION_POLL_INTERVAL)
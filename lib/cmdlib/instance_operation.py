@@ -35,10 +35,12 @@ running instance directly.
 
 """
 
+import concurrent.futures
 import logging
 
 from ganeti import constants
 from ganeti import errors
+from ganeti import hooksmaster
 from ganeti import hypervisor
 from ganeti import locking
 from ganeti import objects
@@ -46,9 +48,11 @@ from ganeti import utils
 from ganeti.cmdlib.base import LogicalUnit, NoHooksLU
 from ganeti.cmdlib.common import INSTANCE_ONLINE, INSTANCE_DOWN, \
   CheckHVParams, CheckInstanceState, CheckNodeOnline, GetUpdatedParams, \
-  CheckOSParams, CheckOSImage, ShareAll
+  CheckOSParams, CheckOSImage, ShareAll, ExpandNodeUuidAndName, \
+  GetWantedInstances
 from ganeti.cmdlib.instance_storage import StartInstanceDisks, \
-  ShutdownInstanceDisks, ImageDisks
+  ShutdownInstanceDisks, ImageDisks, AssembleInstancesDisks, \
+  ShutdownInstancesDisks
 from ganeti.cmdlib.instance_utils import BuildInstanceHookEnvByObject, \
   CheckInstanceBridgesExist, CheckNodeFreeMemory, UpdateMetadata
 from ganeti.hypervisor import hv_base
@@ -310,6 +314,401 @@ class LUInstanceShutdown(LogicalUnit):
       ShutdownInstanceDisks(self, self.instance)
 
 
+def _OrderInstancesByTags(instances, order_tags):
+  """Splits instances into stages according to ordering tags.
+
+  @type instances: list of L{objects.Instance}
+  @param instances: the instances to order
+  @type order_tags: list of strings
+  @param order_tags: the ordering tags
+  @rtype: list of lists of L{objects.Instance}
+  @return: the instances carrying the first tag, followed by the ones
+      carrying the second tag and so on, followed by the instances carrying
+      none of the tags; empty stages are left out
+
+  """
+  stages = [[] for _ in range(len(order_tags) + 1)]
+  for instance in sorted(instances, key=lambda inst: inst.name):
+    tags = instance.GetTags()
+    pos = next((idx for (idx, tag) in enumerate(order_tags) if tag in tags),
+               len(order_tags))
+    stages[pos].append(instance)
+  return [stage for stage in stages if stage]
+
+
+def _RunConcurrently(fn, instances, concurrency):
+  """Runs an RPC call for several instances at the same time.
+
+  The calls are prepared in the calling thread, as the configuration can't
+  be used from several threads; the worker threads only send them.
+
+  @type fn: callable
+  @param fn: function taking an instance and returning a prepared RPC call,
+      see L{rpc.node.RpcRunner.PrepareCalls}
+  @type instances: list of L{objects.Instance}
+  @param instances: the instances to run the function for
+  @type concurrency: int
+  @param concurrency: maximum number of calls running at the same time
+  @rtype: list
+  @return: the error message of each call, C{None} on success, in the order
+      of C{instances}
+
+  """
+  calls = [fn(inst) for inst in instances]
+  if len(calls) <= 1 or concurrency <= 1:
+    results = [send_fn() for send_fn in calls]
+  else:
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as pool:
+      results = list(pool.map(lambda send_fn: send_fn(), calls))
+  return [result.fail_msg or None for result in results]
+
+
+class _LUNodeInstancesBase(NoHooksLU):
+  """Base class for starting or stopping the primary instances of a node.
+
+  The node and all affected instances are locked once for the whole
+  operation. Instances are processed in stages computed from the ordering
+  tags; within a stage, disks are handled by one RPC call per node and up to
+  C{concurrency} instances are started or stopped at the same time.
+
+  The logical unit has no hooks of its own. Instead, the hooks of
+  C{INSTANCE_HPATH} are run for every instance, on the same nodes and with
+  the same environment as when the instance is started or stopped on its
+  own; only C{GANETI_OP_CODE} differs. An instance whose pre-hooks fail is
+  skipped, the post-hooks only run for the instances handled successfully.
+
+  """
+  REQ_BGL = False
+  REVERSE_ORDER = False
+  INSTANCE_HPATH = None
+
+  def CheckArguments(self):
+    if not (1 <= self.op.concurrency <=
+            constants.NODE_MAX_INSTANCE_CONCURRENCY):
+      raise errors.OpPrereqError("The concurrency must be between 1 and %s" %
+                                 constants.NODE_MAX_INSTANCE_CONCURRENCY,
+                                 errors.ECODE_INVAL)
+
+  def ExpandNames(self):
+    (self.op.node_uuid, self.op.node_name) = \
+      ExpandNodeUuidAndName(self.cfg, self.op.node_uuid, self.op.node_name)
+
+    if self.op.instances:
+      (self.wanted_inst_uuids, _) = GetWantedInstances(self, self.op.instances)
+    else:
+      self.wanted_inst_uuids = None
+
+    self.share_locks = ShareAll()
+    self.share_locks[locking.LEVEL_INSTANCE] = 0
+    self.needed_locks = {
+      locking.LEVEL_INSTANCE: [],
+      locking.LEVEL_NODE: [self.op.node_uuid],
+      locking.LEVEL_NODE_RES: [self.op.node_uuid],
+      }
+
+  def _DetermineInstances(self):
+    """Returns the UUIDs of the instances to operate on.
+
+    """
+    if self.wanted_inst_uuids is not None:
+      return self.wanted_inst_uuids
+    (primary, _) = self.cfg.GetNodeInstances(self.op.node_uuid)
+    return primary
+
+  def DeclareLocks(self, level):
+    if level == locking.LEVEL_INSTANCE:
+      # Lock instances optimistically, needs verification once the locks
+      # have been acquired
+      self.needed_locks[locking.LEVEL_INSTANCE] = \
+        self.cfg.GetInstanceNames(self._DetermineInstances())
+
+  def CheckPrereq(self):
+    """Check prerequisites.
+
+    This checks that the instances are primary instances of the node and
+    queries the node for the instances currently running.
+
+    """
+    inst_uuids = self._DetermineInstances()
+    owned_instance_names = self.owned_locks(locking.LEVEL_INSTANCE)
+    instance_names = self.cfg.GetInstanceNames(inst_uuids)
+    if set(instance_names) != owned_instance_names:
+      raise errors.OpPrereqError("Instances on node '%s' changed since locks"
+                                 " were acquired, current instances are '%s',"
+                                 " used to be '%s'; retry the operation" %
+                                 (self.op.node_name,
+                                  utils.CommaJoin(instance_names),
+                                  utils.CommaJoin(owned_instance_names)),
+                                 errors.ECODE_STATE)
+
+    instances = [self.cfg.GetInstanceInfo(uuid) for uuid in inst_uuids]
+    for instance in instances:
+      if instance.primary_node != self.op.node_uuid:
+        raise errors.OpPrereqError("Instance '%s' is not a primary instance"
+                                   " of node '%s'" %
+                                   (instance.name, self.op.node_name),
+                                   errors.ECODE_INVAL)
+      if self.wanted_inst_uuids is not None:
+        CheckInstanceState(self, instance, INSTANCE_ONLINE)
+
+    if self.wanted_inst_uuids is None:
+      # Only the instances which are supposed to be running
+      instances = [inst for inst in instances
+                   if inst.admin_state == constants.ADMINST_UP]
+
+    CheckNodeOnline(self, self.op.node_uuid)
+
+    cluster = self.cfg.GetClusterInfo()
+    hypervisors = sorted(set(inst.hypervisor for inst in instances))
+    if hypervisors:
+      result = self.rpc.call_all_instances_info(
+                 [self.op.node_uuid], hypervisors,
+                 cluster.hvparams)[self.op.node_uuid]
+      result.Raise("Error checking node %s" % self.op.node_name,
+                   prereq=True, ecode=errors.ECODE_ENVIRON)
+      self.instances_info = result.payload
+    else:
+      self.instances_info = {}
+
+    self.instances = instances
+
+  def _BuildInstanceHooksEnv(self, instance):
+    """Builds the hooks environment of one instance.
+
+    """
+    return BuildInstanceHookEnvByObject(self, instance)
+
+  def _BuildInstanceHooksMaster(self, instance):
+    """Builds the hooks master running the hooks of one instance.
+
+    """
+    nl = [self.cfg.GetMasterNode()] + \
+      list(self.cfg.GetInstanceNodes(instance.uuid))
+    return hooksmaster.HooksMaster.BuildForLuObject(
+             self.rpc.call_hooks_runner, self, self.INSTANCE_HPATH,
+             constants.HTYPE_INSTANCE, (nl, nl),
+             lambda: self._BuildInstanceHooksEnv(
+                       self.cfg.GetInstanceInfo(instance.uuid)))
+
+  def _ProcessStage(self, instances, feedback_fn):
+    """Starts or stops one stage of instances.
+
+    @rtype: list of tuples
+    @return: (instance name, success, error message) for each instance
+
+    """
+    raise NotImplementedError()
+
+  def _ProcessStageWithHooks(self, instances, feedback_fn):
+    """Runs the instances' hooks around L{_ProcessStage}.
+
+    The hooks are run one instance after the other, as the configuration
+    can't be used from several threads.
+
+    """
+    result = []
+    hms = {}
+    allowed = []
+    for instance in instances:
+      hm = self._BuildInstanceHooksMaster(instance)
+      try:
+        hm.RunPhase(constants.HOOKS_PHASE_PRE)
+      except errors.HooksFailure as err:
+        result.append((instance.name, False, "Hooks failed: %s" % err))
+        continue
+      hms[instance.name] = hm
+      allowed.append(instance)
+
+    if allowed:
+      stage_result = self._ProcessStage(allowed, feedback_fn)
+      result.extend(stage_result)
+      for (name, success, _) in stage_result:
+        if success:
+          hms[name].RunPhase(constants.HOOKS_PHASE_POST)
+
+    return result
+
+  def Exec(self, feedback_fn):
+    """Start or stop the instances, stage by stage.
+
+    """
+    stages = _OrderInstancesByTags(self.instances, self.op.order_tags)
+    if self.REVERSE_ORDER:
+      stages.reverse()
+
+    result = []
+    for instances in stages:
+      result.extend(self._ProcessStageWithHooks(instances, feedback_fn))
+
+    for (name, success, msg) in result:
+      if not success:
+        self.LogWarning("Instance '%s' failed: %s", name, msg)
+
+    return result
+
+
+class LUNodeStartupInstances(_LUNodeInstancesBase):
+  """Starts the primary instances of a node.
+
+  """
+  INSTANCE_HPATH = "instance-start"
+
+  def _BuildInstanceHooksEnv(self, instance):
+    env = {
+      "FORCE": self.op.force,
+      }
+
+    env.update(BuildInstanceHookEnvByObject(self, instance))
+
+    return env
+
+  def CheckPrereq(self):
+    """Check prerequisites.
+
+    On top of the base class checks, this checks that the node has enough
+    memory for all instances to be started.
+
+    """
+    _LUNodeInstancesBase.CheckPrereq(self)
+
+    cluster = self.cfg.GetClusterInfo()
+    self.requires_cleanup = set()
+    needed_mem = {}
+    for instance in self.instances:
+      info = self.instances_info.get(instance.name)
+      if info:
+        if _IsInstanceUserDown(cluster, instance, info):
+          self.requires_cleanup.add(instance.uuid)
+        continue
+
+      CheckInstanceBridgesExist(self, instance)
+      needed_mem[instance.hypervisor] = \
+        (needed_mem.get(instance.hypervisor, 0) +
+         cluster.FillBE(instance)[constants.BE_MINMEM])
+
+    for (hv_name, mem) in needed_mem.items():
+      CheckNodeFreeMemory(self, self.op.node_uuid, "starting instances",
+                          mem, hv_name, cluster.hvparams[hv_name])
+
+  def _StartInstance(self, instance):
+    return self.rpc.PrepareCalls().call_instance_start(
+             self.op.node_uuid, (instance, None, None), self.op.startup_paused,
+             self.op.reason)
+
+  def _ShutdownInstance(self, instance):
+    return self.rpc.PrepareCalls().call_instance_shutdown(
+             self.op.node_uuid, instance, constants.DEFAULT_SHUTDOWN_TIMEOUT,
+             self.op.reason)
+
+  def _ProcessStage(self, instances, feedback_fn):
+    if not self.op.no_remember:
+      instances = [self.cfg.MarkInstanceUp(inst.uuid) for inst in instances]
+
+    result = []
+    to_start = []
+    cleanup = []
+    for instance in instances:
+      if instance.uuid in self.requires_cleanup:
+        cleanup.append(instance)
+      elif instance.name in self.instances_info:
+        # Already running
+        result.append((instance.name, True, ""))
+      else:
+        to_start.append(instance)
+
+    if cleanup:
+      feedback_fn("Cleaning up instances %s" %
+                  utils.CommaJoin(inst.name for inst in cleanup))
+      msgs = _RunConcurrently(self._ShutdownInstance, cleanup,
+                              self.op.concurrency)
+      for (instance, msg) in zip(cleanup, msgs):
+        if msg:
+          result.append((instance.name, False,
+                         "Could not shutdown instance: %s" % msg))
+        else:
+          to_start.append(instance)
+      ShutdownInstancesDisks(self, cleanup)
+
+    if not to_start:
+      return result
+
+    feedback_fn("Starting instances %s" %
+                utils.CommaJoin(inst.name for inst in to_start))
+
+    disks_ok = AssembleInstancesDisks(self, to_start,
+                                      ignore_secondaries=self.op.force)
+    for instance in to_start:
+      if not disks_ok[instance.uuid]:
+        result.append((instance.name, False, "Disk consistency error"))
+    failed = [inst for inst in to_start if not disks_ok[inst.uuid]]
+    to_start = [self.cfg.GetInstanceInfo(inst.uuid) for inst in to_start
+                if disks_ok[inst.uuid]]
+
+    msgs = _RunConcurrently(self._StartInstance, to_start, self.op.concurrency)
+    for (instance, msg) in zip(to_start, msgs):
+      if msg:
+        failed.append(instance)
+        result.append((instance.name, False,
+                       "Could not start instance: %s" % msg))
+      else:
+        result.append((instance.name, True, ""))
+
+    if failed:
+      ShutdownInstancesDisks(self, failed)
+
+    return result
+
+
+class LUNodeShutdownInstances(_LUNodeInstancesBase):
+  """Stops the primary instances of a node.
+
+  """
+  REVERSE_ORDER = True
+  INSTANCE_HPATH = "instance-stop"
+
+  def _BuildInstanceHooksEnv(self, instance):
+    env = BuildInstanceHookEnvByObject(self, instance)
+    env["TIMEOUT"] = self.op.timeout
+    return env
+
+  def _ShutdownInstance(self, instance):
+    return self.rpc.PrepareCalls().call_instance_shutdown(
+             self.op.node_uuid, instance, self.op.timeout, self.op.reason)
+
+  def _ProcessStage(self, instances, feedback_fn):
+    feedback_fn("Stopping instances %s" %
+                utils.CommaJoin(inst.name for inst in instances))
+
+    # If an instance is offline we shouldn't mark it as down, as that
+    # resets the offline flag.
+    if not self.op.no_remember:
+      instances = [self.cfg.MarkInstanceDown(inst.uuid)
+                   if inst.admin_state in INSTANCE_ONLINE else inst
+                   for inst in instances]
+
+    result = []
+    stopped = []
+    msgs = _RunConcurrently(self._ShutdownInstance, instances,
+                            self.op.concurrency)
+    for (instance, msg) in zip(instances, msgs):
+      if msg:
+        result.append((instance.name, False,
+                       "Could not shutdown instance: %s" % msg))
+      else:
+        stopped.append(instance)
+
+    if stopped:
+      disks_ok = ShutdownInstancesDisks(self, stopped)
+      for instance in stopped:
+        if disks_ok[instance.uuid]:
+          result.append((instance.name, True, ""))
+        else:
+          result.append((instance.name, False,
+                         "Could not shutdown all disks"))
+
+    return result
+
+
 class LUInstanceReinstall(LogicalUnit):
   """Reinstall an instance.
 
@@ -33,6 +33,7 @@
 import itertools
 
 from ganeti import constants
+from ganeti import errors
 from ganeti import locking
 from ganeti import utils
 from ganeti.cmdlib.base import NoHooksLU
@@ -129,41 +130,71 @@ class LUInstanceQueryData(NoHooksLU):
 
     self.wanted_instances = list(instances.values())
 
-  def _ComputeBlockdevStatus(self, node_uuid, instance, dev):
-    """Returns the status of a block device
+  def _ComputeBlockdevStatuses(self, instance, node_devs):
+    """Returns the status of block devices, with one call per node.
+
+    @type node_devs: dict
+    @param node_devs: node UUID -> list of (annotated) devices
+    @rtype: dict
+    @return: (node UUID, device ID) -> status tuple or None
 
     """
-    if self.op.static or not node_uuid:
-      return None
+    statuses = {}
+    for (node_uuid, devs) in node_devs.items():
+      result = self.rpc.call_blockdev_find_multi(node_uuid,
+                                                 [(devs, instance)])
+      if result.offline:
+        continue
+
+      result.Raise("Can't compute disk status for %s" % instance.name)
+      if len(result.payload) != len(devs):
+        raise errors.OpExecError("Can't compute disk status for %s: invalid"
+                                 " result from node %s" %
+                                 (instance.name,
+                                  self.cfg.GetNodeName(node_uuid)))
+
+      for (dev, (success, status)) in zip(devs, result.payload):
+        if not success:
+          raise errors.OpExecError("Can't compute disk status for %s: %s" %
+                                   (instance.name, status))
+        if status is not None:
+          statuses[(node_uuid, id(dev))] = \
+            (status.dev_path, status.major, status.minor,
+             status.sync_percent, status.estimated_time,
+             status.is_degraded, status.ldisk_status)
+
+    return statuses
+
+  def _ComputeDisksStatus(self, instance, node_uuid2name_fn, disks):
+    """Compute block device status of several disks.
 
-    result = self.rpc.call_blockdev_find(node_uuid, (dev, instance))
-    if result.offline:
-      return None
+    """
+    anno_disks = AnnotateDiskParams(instance, disks, self.cfg)
 
-    result.Raise("Can't compute disk status for %s" % instance.name)
+    # A first pass finds out which devices are looked up on which nodes
+    node_devs = {}
 
-    status = result.payload
-    if status is None:
-      return None
+    def _Collect(node_uuid, dev):
+      if not (self.op.static or node_uuid is None):
+        node_devs.setdefault(node_uuid, []).append(dev)
 
-    return (status.dev_path, status.major, status.minor,
-            status.sync_percent, status.estimated_time,
-            status.is_degraded, status.ldisk_status)
+    for dev in anno_disks:
+      self._ComputeDiskStatusInner(instance, None, node_uuid2name_fn, dev,
+                                   _Collect)
 
-  def _ComputeDiskStatus(self, instance, node_uuid2name_fn, dev):
-    """Compute block device status.
-
-    """
-    (anno_dev,) = AnnotateDiskParams(instance, [dev], self.cfg)
+    statuses = self._ComputeBlockdevStatuses(instance, node_devs)
+    status_fn = lambda node_uuid, dev: statuses.get((node_uuid, id(dev)))
 
-    return self._ComputeDiskStatusInner(instance, None, node_uuid2name_fn,
-                                        anno_dev)
+    return [self._ComputeDiskStatusInner(instance, None, node_uuid2name_fn,
+                                         dev, status_fn)
+            for dev in anno_disks]
 
   def _ComputeDiskStatusInner(self, instance, snode_uuid, node_uuid2name_fn,
-                              dev):
+                              dev, status_fn):
     """Compute block device status.
 
     @attention: The device has to be annotated already.
+    @param status_fn: function returning the status of a device on a node
 
     """
     drbd_info = None
@@ -188,13 +219,13 @@ class LUInstanceQueryData(NoHooksLU):
       # replace the secret present at the end of the ids with None
       output_logical_id = dev.logical_id[:-1] + (None,)
 
-    dev_pstatus = self._ComputeBlockdevStatus(instance.primary_node,
-                                              instance, dev)
-    dev_sstatus = self._ComputeBlockdevStatus(snode_uuid, instance, dev)
+    dev_pstatus = status_fn(instance.primary_node, dev)
+    dev_sstatus = status_fn(snode_uuid, dev)
 
     if dev.children:
       dev_children = [
-        self._ComputeDiskStatusInner(instance, snode_uuid, node_uuid2name_fn, d)
+        self._ComputeDiskStatusInner(instance, snode_uuid, node_uuid2name_fn, d,
+                                     status_fn)
         for d in dev.children
       ]
     else:
@@ -273,8 +304,8 @@ class LUInstanceQueryData(NoHooksLU):
       node_uuid2name_fn = lambda uuid: nodes[uuid].name
 
       disk_objects = self.cfg.GetInstanceDisks(instance.uuid)
-      output_disks = [self._ComputeDiskStatus(instance, node_uuid2name_fn, d)
-                      for d in disk_objects]
+      output_disks = self._ComputeDisksStatus(instance, node_uuid2name_fn,
+                                              disk_objects)
 
       secondary_nodes = self.cfg.GetInstanceSecondaryNodes(instance.uuid)
       snodes_group_uuids = [nodes[snode_uuid].group
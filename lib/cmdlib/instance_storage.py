@@ -1326,7 +1326,7 @@ def WipeDisks(lu, instance, disks=None):
                         " failed", idx, instance.name)
 
 
-def ImageDisks(lu, instance, image, disks=None):
+def ImageDisks(lu, instance, image, disks=None, clone=False):
   """Dumps an image onto an instance disk.
 
   @type lu: L{LogicalUnit}
@@ -1337,6 +1337,9 @@ def ImageDisks(lu, instance, image, disks=None):
   @param image: the image whose disks we should create
   @type disks: None or list of ints
   @param disks: disk indices
+  @type clone: boolean
+  @param clone: whether to replace the disks with copy-on-write clones of a
+      golden copy of the image, where the storage supports it
 
   """
   node_uuid = instance.primary_node
@@ -1367,7 +1370,7 @@ def ImageDisks(lu, instance, image, disks=None):
                  idx, instance.name, node_name)
 
       result = lu.rpc.call_blockdev_image(node_uuid, (device, instance),
-                                          image, device.size)
+                                          image, device.size, clone)
       result.Raise("Could not image disk '%d' for instance '%s' on node '%s'" %
                    (idx, instance.name, node_name))
   finally:
@@ -1529,10 +1532,13 @@ def ShutdownInstanceDisks(lu, instance, disks=None, ignore_primary=False):
   inst_disks = lu.cfg.GetInstanceDisks(instance.uuid)
   disks = ExpandCheckDisks(inst_disks, disks)
 
-  for disk in disks:
-    for node_uuid, top_disk in disk.ComputeNodeTree(instance.primary_node):
-      result = lu.rpc.call_blockdev_shutdown(node_uuid, (top_disk, instance))
-      msg = result.fail_msg
+  for (node_uuid, node_disks) in _GroupDisksByNode(instance, disks).items():
+    top_disks = [top_disk for (_, _, top_disk) in node_disks]
+    result = lu.rpc.call_blockdev_shutdown_multi(node_uuid,
+                                                 [(top_disks, instance)])
+    for ((_, disk, _), (msg, _)) in zip(node_disks,
+                                        _SplitMultiResult(result,
+                                                          len(node_disks))):
       if msg:
         lu.LogWarning("Could not shutdown block device %s on node %s: %s",
                       disk.iv_name, lu.cfg.GetNodeName(node_uuid), msg)
@@ -1542,6 +1548,114 @@ def ShutdownInstanceDisks(lu, instance, disks=None, ignore_primary=False):
   return all_result
 
 
+def _GroupDisksByNode(instance, disks, ignore_size=False):
+  """Computes the devices of some disks on each of the instance's nodes.
+
+  @type instance: L{objects.Instance}
+  @param instance: the instance owning the disks
+  @type disks: list of L{objects.Disk}
+  @param disks: the disks of the instance
+  @type ignore_size: boolean
+  @param ignore_size: whether to unset the size of the node devices
+  @rtype: dict
+  @return: node UUID -> list of (disk index, disk, node device) tuples, in
+      the order of the disks
+
+  """
+  result = {}
+  for idx, inst_disk in enumerate(disks):
+    for node_uuid, node_disk in inst_disk.ComputeNodeTree(
+                                  instance.primary_node):
+      if ignore_size:
+        node_disk = node_disk.Copy()
+        node_disk.UnsetSize()
+      result.setdefault(node_uuid, []).append((idx, inst_disk, node_disk))
+  return result
+
+
+def _SplitMultiResult(result, count):
+  """Splits the result of a multi-disk block device RPC.
+
+  @type result: L{rpc.RpcResult}
+  @param result: the result of the RPC
+  @type count: int
+  @param count: the number of disks passed to the RPC
+  @rtype: list of tuples
+  @return: (error message, payload) for each disk, where the error message
+      is C{None} on success
+
+  """
+  if result.fail_msg:
+    return [(result.fail_msg, None)] * count
+
+  if len(result.payload) != count:
+    msg = ("Invalid result, expected %s disk results but got %s" %
+           (count, len(result.payload)))
+    return [(msg, None)] * count
+
+  return [(None, payload) if success else (payload, None)
+          for (success, payload) in result.payload]
+
+
+def _GroupInstancesDisksByNode(lu, instances):
+  """Computes the devices of all disks of several instances on each node.
+
+  @type instances: list of L{objects.Instance}
+  @param instances: the instances owning the disks
+  @rtype: dict
+  @return: node UUID -> list of (instance, disk index, disk, node device)
+      tuples
+
+  """
+  result = {}
+  for instance in instances:
+    inst_disks = lu.cfg.GetInstanceDisks(instance.uuid)
+    for (node_uuid, entries) in _GroupDisksByNode(instance,
+                                                  inst_disks).items():
+      result.setdefault(node_uuid, []).extend(
+        (instance, idx, inst_disk, node_disk)
+        for (idx, inst_disk, node_disk) in entries)
+  return result
+
+
+def ShutdownInstancesDisks(lu, instances):
+  """Shutdown the block devices of several instances.
+
+  This is the batched version of L{ShutdownInstanceDisks}: the disks of all
+  instances are shut down by a single RPC call per node.
+
+  @type lu: L{LogicalUnit}
+  @param lu: the logical unit on whose behalf we execute
+  @type instances: list of L{objects.Instance}
+  @param instances: the instances whose disks should be shut down
+  @rtype: dict
+  @return: instance UUID -> whether all disks were shut down, errors on
+      offline secondary nodes being ignored
+
+  """
+  all_result = dict((instance.uuid, True) for instance in instances)
+
+  for instance in instances:
+    lu.cfg.MarkInstanceDisksInactive(instance.uuid)
+
+  for (node_uuid, node_disks) in \
+        _GroupInstancesDisksByNode(lu, instances).items():
+    result = lu.rpc.call_blockdev_shutdown_multi(
+               node_uuid,
+               [([node_disk], instance)
+                for (instance, _, _, node_disk) in node_disks])
+    for ((instance, _, disk, _), (msg, _)) in \
+          zip(node_disks, _SplitMultiResult(result, len(node_disks))):
+      if msg:
+        lu.LogWarning("Could not shutdown block device %s of instance %s on"
+                      " node %s: %s", disk.iv_name, instance.name,
+                      lu.cfg.GetNodeName(node_uuid), msg)
+        if node_uuid == instance.primary_node or not result.offline:
+          all_result[instance.uuid] = False
+
+  return all_result
+
+
 def _SafeShutdownInstanceDisks(lu, instance, disks=None, req_states=None):
   """Shutdown block devices of an instance.
 
@@ -1603,16 +1717,19 @@ def AssembleInstanceDisks(lu, instance, disks=None, ignore_secondaries=False,
   # into any other network-connected state (Connected, SyncTarget,
   # SyncSource, etc.)
 
+  # All disks of a node are assembled by a single RPC call
+  node_disks = _GroupDisksByNode(instance, disks, ignore_size=ignore_size)
+
   # 1st pass, assemble on all nodes in secondary mode
-  for idx, inst_disk in enumerate(disks):
-    for node_uuid, node_disk in inst_disk.ComputeNodeTree(
-                                  instance.primary_node):
-      if ignore_size:
-        node_disk = node_disk.Copy()
-        node_disk.UnsetSize()
-      result = lu.rpc.call_blockdev_assemble(node_uuid, (node_disk, instance),
-                                             instance, False, idx)
-      msg = result.fail_msg
+  for (node_uuid, entries) in node_disks.items():
+    result = lu.rpc.call_blockdev_assemble_multi(
+               node_uuid,
+               [(node_disk, instance, idx)
+                for (idx, _, node_disk) in entries],
+               False)
+    for ((_, inst_disk, _), (msg, _)) in zip(entries,
+                                             _SplitMultiResult(result,
+                                                               len(entries))):
       if msg:
         secondary_nodes = lu.cfg.GetInstanceSecondaryNodes(instance.uuid)
         is_offline_secondary = (node_uuid in secondary_nodes and
@@ -1626,30 +1743,30 @@ def AssembleInstanceDisks(lu, instance, disks=None, ignore_secondaries=False,
   # FIXME: race condition on drbd migration to primary
 
   # 2nd pass, do only the primary node
-  for idx, inst_disk in enumerate(disks):
-    dev_path = None
-
-    for node_uuid, node_disk in inst_disk.ComputeNodeTree(
-                                  instance.primary_node):
-      if node_uuid != instance.primary_node:
-        continue
-      if ignore_size:
-        node_disk = node_disk.Copy()
-        node_disk.UnsetSize()
-      result = lu.rpc.call_blockdev_assemble(node_uuid, (node_disk, instance),
-                                             instance, True, idx)
-      payloads.append(result.payload)
-      msg = result.fail_msg
+  dev_paths = {}
+  primary_disks = node_disks.get(instance.primary_node, [])
+  if primary_disks:
+    result = lu.rpc.call_blockdev_assemble_multi(
+               instance.primary_node,
+               [(node_disk, instance, idx)
+                for (idx, _, node_disk) in primary_disks],
+               True)
+    for ((idx, inst_disk, _), (msg, payload)) in \
+          zip(primary_disks, _SplitMultiResult(result, len(primary_disks))):
+      payloads.append(payload)
       if msg:
         lu.LogWarning("Could not prepare block device %s on node %s"
                       " (is_primary=True, pass=2): %s",
-                      inst_disk.iv_name, lu.cfg.GetNodeName(node_uuid), msg)
+                      inst_disk.iv_name,
+                      lu.cfg.GetNodeName(instance.primary_node), msg)
         disks_ok = False
       else:
-        dev_path, _, __ = result.payload
+        (dev_path, _, __) = payload
+        dev_paths[idx] = dev_path
 
+  for idx, inst_disk in enumerate(disks):
     device_info.append((lu.cfg.GetNodeName(instance.primary_node),
-                        inst_disk.iv_name, dev_path))
+                        inst_disk.iv_name, dev_paths.get(idx)))
 
   if not disks_ok:
     lu.cfg.MarkInstanceDisksInactive(instance.uuid)
@@ -1657,6 +1774,65 @@ def AssembleInstanceDisks(lu, instance, disks=None, ignore_secondaries=False,
   return disks_ok, device_info, payloads
 
 
+def AssembleInstancesDisks(lu, instances, ignore_secondaries=False):
+  """Prepare the block devices of several instances.
+
+  This is the batched version of L{AssembleInstanceDisks}: in each of the
+  two passes, the disks of all instances are assembled by a single RPC call
+  per node.
+
+  @type lu: L{LogicalUnit}
+  @param lu: the logical unit on whose behalf we execute
+  @type instances: list of L{objects.Instance}
+  @param instances: the instances whose disks should be assembled
+  @type ignore_secondaries: boolean
+  @param ignore_secondaries: if true, errors on secondary nodes
+      won't mark the disks of an instance as failed
+  @rtype: dict
+  @return: instance UUID -> whether all disks of the instance are assembled;
+      the disks of failed instances are marked inactive again
+
+  """
+  instances = [lu.cfg.MarkInstanceDisksActive(instance.uuid)
+               for instance in instances]
+  disks_ok = dict((instance.uuid, True) for instance in instances)
+  node_disks = _GroupInstancesDisksByNode(lu, instances)
+
+  def _Assemble(node_uuid, entries, as_primary, pass_no):
+    result = lu.rpc.call_blockdev_assemble_multi(
+               node_uuid,
+               [(node_disk, instance, idx)
+                for (instance, idx, _, node_disk) in entries],
+               as_primary)
+    for ((instance, _, inst_disk, _), (msg, _)) in \
+          zip(entries, _SplitMultiResult(result, len(entries))):
+      if msg:
+        lu.LogWarning("Could not prepare block device %s of instance %s on"
+                      " node %s (is_primary=%s, pass=%s): %s",
+                      inst_disk.iv_name, instance.name,
+                      lu.cfg.GetNodeName(node_uuid), as_primary, pass_no,
+                      msg)
+        is_secondary = node_uuid != instance.primary_node
+        if not (is_secondary and (ignore_secondaries or result.offline)):
+          disks_ok[instance.uuid] = False
+
+  # See AssembleInstanceDisks for the reason of the two passes
+  for (node_uuid, entries) in node_disks.items():
+    _Assemble(node_uuid, entries, False, 1)
+
+  for (node_uuid, entries) in node_disks.items():
+    primary_entries = [entry for entry in entries
+                       if entry[0].primary_node == node_uuid]
+    if primary_entries:
+      _Assemble(node_uuid, primary_entries, True, 2)
+
+  for (inst_uuid, ok) in disks_ok.items():
+    if not ok:
+      lu.cfg.MarkInstanceDisksInactive(inst_uuid)
+
+  return disks_ok
+
+
 def StartInstanceDisks(lu, instance, force):
   """Start the disks of an instance.
 
@@ -2149,30 +2325,38 @@ def _CheckDiskConsistencyInner(lu, instance, dev, node_uuid, on_primary,
   the device(s)) to the ldisk (representing the local storage status).
 
   """
-  result = True
+  # The device and its children are looked up by a single RPC call; the
+  # ldisk parameter only applies to the device itself
+  checks = []
+
+  def _Collect(disk, check_ldisk):
+    if on_primary or disk.AssembleOnSecondary():
+      checks.append((disk, check_ldisk))
+    for child in disk.children or []:
+      _Collect(child, False)
+
+  _Collect(dev, ldisk)
+  if not checks:
+    return True
 
-  if on_primary or dev.AssembleOnSecondary():
-    rstats = lu.rpc.call_blockdev_find(node_uuid, (dev, instance))
-    msg = rstats.fail_msg
+  result = lu.rpc.call_blockdev_find_multi(
+             node_uuid, [([disk for (disk, _) in checks], instance)])
+  for ((_, check_ldisk), (msg, status)) in \
+        zip(checks, _SplitMultiResult(result, len(checks))):
     if msg:
       lu.LogWarning("Can't find disk on node %s: %s",
                     lu.cfg.GetNodeName(node_uuid), msg)
-      result = False
-    elif not rstats.payload:
+      return False
+    elif not status:
       lu.LogWarning("Can't find disk on node %s", lu.cfg.GetNodeName(node_uuid))
-      result = False
-    else:
-      if ldisk:
-        result = result and rstats.payload.ldisk_status == constants.LDS_OKAY
-      else:
-        result = result and not rstats.payload.is_degraded
-
-  if dev.children:
-    for child in dev.children:
-      result = result and _CheckDiskConsistencyInner(lu, instance, child,
-                                                     node_uuid, on_primary)
+      return False
+    elif check_ldisk:
+      if status.ldisk_status != constants.LDS_OKAY:
+        return False
+    elif status.is_degraded:
+      return False
 
-  return result
+  return True
 
 
 def CheckDiskConsistency(lu, instance, dev, node_uuid, on_primary, ldisk=False):
@@ -2184,18 +2368,21 @@ def CheckDiskConsistency(lu, instance, dev, node_uuid, on_primary, ldisk=False):
                                     ldisk=ldisk)
 
 
-def _BlockdevFind(lu, node_uuid, dev, instance):
-  """Wrapper around call_blockdev_find to annotate diskparams.
+def _BlockdevFindMulti(lu, node_uuid, devs, instance):
+  """Wrapper around call_blockdev_find_multi to annotate diskparams.
 
   @param lu: A reference to the lu object
   @param node_uuid: The node to call out
-  @param dev: The device to find
-  @param instance: The instance object the device belongs to
-  @returns The result of the rpc call
+  @type devs: list of L{objects.Disk}
+  @param devs: The devices to find
+  @param instance: The instance object the devices belong to
+  @rtype: list of tuples
+  @return: (error message, status) for each device, see L{_SplitMultiResult}
 
   """
-  (disk,) = AnnotateDiskParams(instance, [dev], lu.cfg)
-  return lu.rpc.call_blockdev_find(node_uuid, (disk, instance))
+  disks = AnnotateDiskParams(instance, devs, lu.cfg)
+  result = lu.rpc.call_blockdev_find_multi(node_uuid, [(disks, instance)])
+  return _SplitMultiResult(result, len(disks))
 
 
 def _GenerateUniqueNames(lu, exts):
@@ -2287,17 +2474,23 @@ class TLReplaceDisks(Tasklet):
 
     """
     node_uuids = self.cfg.GetInstanceNodes(instance.uuid)
+    disks = self.cfg.GetInstanceDisks(instance.uuid)
+    if not disks:
+      return True
 
-    for idx, dev in enumerate(self.cfg.GetInstanceDisks(instance.uuid)):
-      for node_uuid in node_uuids:
+    for node_uuid in node_uuids:
+      for idx in range(len(disks)):
         self.lu.LogInfo("Checking disk/%d on %s", idx,
                         self.cfg.GetNodeName(node_uuid))
 
-        result = _BlockdevFind(self, node_uuid, dev, instance)
+      devs = AnnotateDiskParams(instance, disks, self.cfg)
+      result = self.rpc.call_blockdev_find_multi(node_uuid,
+                                                 [(devs, instance)])
+      if result.offline:
+        continue
 
-        if result.offline:
-          continue
-        elif result.fail_msg or not result.payload:
+      for (msg, status) in _SplitMultiResult(result, len(devs)):
+        if msg or not status:
           return False
 
     return True
@@ -2546,19 +2739,22 @@ class TLReplaceDisks(Tasklet):
                                  (vgname, self.cfg.GetNodeName(node_uuid)))
 
   def _CheckDisksExistence(self, node_uuids):
-    # Check disk existence
-    for idx, dev in enumerate(self.cfg.GetInstanceDisks(self.instance.uuid)):
-      if idx not in self.disks:
-        continue
+    # Check disk existence, with one call per node
+    disks = [(idx, dev) for (idx, dev)
+             in enumerate(self.cfg.GetInstanceDisks(self.instance.uuid))
+             if idx in self.disks]
+    if not disks:
+      return
 
-      for node_uuid in node_uuids:
+    for node_uuid in node_uuids:
+      for (idx, _) in disks:
         self.lu.LogInfo("Checking disk/%d on %s", idx,
                         self.cfg.GetNodeName(node_uuid))
 
-        result = _BlockdevFind(self, node_uuid, dev, self.instance)
-
-        msg = result.fail_msg
-        if msg or not result.payload:
+      results = _BlockdevFindMulti(self, node_uuid,
+                                   [dev for (_, dev) in disks], self.instance)
+      for ((idx, _), (msg, status)) in zip(disks, results):
+        if msg or not status:
           if not msg:
             msg = "disk not found"
           if not self._CheckDisksActivated(self.instance):
@@ -2635,17 +2831,19 @@ class TLReplaceDisks(Tasklet):
     return iv_names
 
   def _CheckDevices(self, node_uuid, iv_names):
-    for name, (dev, _, _) in iv_names.items():
-      result = _BlockdevFind(self, node_uuid, dev, self.instance)
-
-      msg = result.fail_msg
-      if msg or not result.payload:
+    devices = [(name, dev) for (name, (dev, _, _)) in iv_names.items()]
+    if not devices:
+      return
+    results = _BlockdevFindMulti(self, node_uuid,
+                                 [dev for (_, dev) in devices], self.instance)
+    for ((name, _), (msg, status)) in zip(devices, results):
+      if msg or not status:
         if not msg:
           msg = "disk not found"
         raise errors.OpExecError("Can't find DRBD device %s: %s" %
                                  (name, msg))
 
-      if result.payload.is_degraded:
+      if status.is_degraded:
         raise errors.OpExecError("DRBD device %s is degraded!" % name)
 
   def _RemoveOldStorage(self, node_uuid, iv_names):
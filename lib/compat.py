@@ -32,6 +32,7 @@
 
 """
 
+import importlib
 import itertools
 import operator
 
@@ -184,6 +185,36 @@ def UniqueFrozenset(seq):
   return result
 
 
+class LazyModule(object):
+  """Module which is only imported once one of its attributes is used.
+
+  This is meant for modules which are expensive to import and only needed by
+  some code paths, such as the modules used by few commands of a command line
+  client. Unlike C{importlib.util.LazyLoader}, the proxy is not registered in
+  C{sys.modules}, so other importers of the module are not affected, and the
+  actual import is protected by the import lock.
+
+  Note that errors importing the module are only raised on first use.
+
+  """
+  def __init__(self, name):
+    """Initializes this class.
+
+    @type name: string
+    @param name: the full name of the module
+
+    """
+    self._lazy_name = name
+
+  def __getattr__(self, name):
+    if name == "_lazy_name":
+      raise AttributeError(name)
+    return getattr(importlib.import_module(self._lazy_name), name)
+
+  def __repr__(self):
+    return "<lazy module %r>" % self._lazy_name
+
+
 #: returns the first element of a list-like value
 fst = operator.itemgetter(0)
 
@@ -54,10 +54,11 @@ import time
 import threading
 import itertools
 
+from ganeti.config.indexes import ConfigIndexes
 from ganeti.config.temporary_reservations import TemporaryReservationManager
 from ganeti.config.utils import ConfigSync, ConfigManager
 from ganeti.config.verify import (VerifyType, VerifyNic, VerifyIpolicy,
-                                  ValidateConfig)
+                                  ValidateConfig, VerificationCache)
 
 from ganeti import errors
 from ganeti import utils
@@ -168,6 +169,9 @@ class ConfigWriter(object):
                accept_foreign=False, wconfdcontext=None, wconfd=None):
     self.write_count = 0
     self._config_data = None
+    self._indexes = None
+    self._verify_cache = VerificationCache()
+    self._verify_lock = threading.Lock()
     self._SetConfigData(None)
     self._offline = offline
     if cfg_file is None:
@@ -195,9 +199,21 @@ class ConfigWriter(object):
 
   def OutDate(self):
     self._config_data = None
+    self._indexes = None
 
   def _SetConfigData(self, cfg):
     self._config_data = cfg
+    self._indexes = None
+
+  def _Indexes(self):
+    """Returns the secondary indexes over the current configuration data.
+
+    @rtype: L{ConfigIndexes}
+
+    """
+    if self._indexes is None or not self._indexes.IsFor(self._ConfigData()):
+      self._indexes = ConfigIndexes(self._ConfigData())
+    return self._indexes
 
   def _GetWConfdContext(self):
     return self._wconfdcontext
@@ -328,14 +344,16 @@ class ConfigWriter(object):
       raise errors.ConfigurationError("Disk %s doesn't exist" % disk_uuid)
 
     # Disk must not be attached anywhere
-    for inst in self._ConfigData().instances.values():
-      if disk_uuid in inst.disks:
-        raise errors.ReservationError("Cannot remove disk %s. Disk is"
-                                      " attached to instance %s"
-                                      % (disk_uuid, inst.name))
+    inst_uuid = self._Indexes().GetInstanceForDisk(disk_uuid)
+    if inst_uuid is not None:
+      inst = self._ConfigData().instances[inst_uuid]
+      raise errors.ReservationError("Cannot remove disk %s. Disk is"
+                                    " attached to instance %s"
+                                    % (disk_uuid, inst.name))
 
     # Remove disk from config file
-    del self._ConfigData().disks[disk_uuid]
+    disk = self._ConfigData().disks.pop(disk_uuid)
+    self._Indexes().RemoveDisk(disk)
     self._ConfigData().cluster.serial_no += 1
 
   def RemoveInstanceDisk(self, inst_uuid, disk_uuid):
@@ -387,18 +405,7 @@ class ConfigWriter(object):
     @return: the disk object
 
     """
-    disk = None
-    count = 0
-    for d in self._ConfigData().disks.values():
-      if d.name == disk_name:
-        count += 1
-        disk = d
-
-    if count > 1:
-      raise errors.ConfigurationError("There are %s disks with this name: %s"
-                                      % (count, disk_name))
-
-    return disk
+    return self._Indexes().GetDiskByName(disk_name)
 
   @ConfigSync(shared=1)
   def GetDiskInfoByName(self, disk_name):
@@ -671,17 +678,11 @@ class ConfigWriter(object):
     """
     return self._wconfd.GenerateDRBDSecret(self._GetWConfdContext())
 
-  # FIXME: After _AllIDs is removed, move it to config_mock.py
   def _AllLVs(self):
-    """Compute the list of all LVs.
+    """Return the set of all LVs of instances.
 
     """
-    lvnames = set()
-    for instance in self._ConfigData().instances.values():
-      node_data = self._UnlockedGetInstanceLVsByNode(instance.uuid)
-      for lv_list in node_data.values():
-        lvnames.update(lv_list)
-    return lvnames
+    return self._Indexes().GetLVs()
 
   def _AllNICs(self):
     """Compute the list of all NICs.
@@ -692,23 +693,17 @@ class ConfigWriter(object):
       nics.extend(instance.nics)
     return nics
 
-  def _AllIDs(self, include_temporary):
-    """Compute the list of all UUIDs and names we have.
+  def _IsUsedID(self, uuid, include_temporary):
+    """Check whether an UUID or name is already in use.
 
     @type include_temporary: boolean
     @param include_temporary: whether to include the _temporary_ids set
-    @rtype: set
-    @return: a set of IDs
+    @rtype: boolean
 
     """
-    existing = set()
-    if include_temporary:
-      existing.update(self._temporary_ids.GetReserved())
-    existing.update(self._AllLVs())
-    existing.update(self._ConfigData().instances)
-    existing.update(self._ConfigData().nodes)
-    existing.update([i.uuid for i in self._AllUUIDObjects() if i.uuid])
-    return existing
+    if include_temporary and uuid in self._temporary_ids.GetReserved():
+      return True
+    return uuid in self._Indexes().GetIDs()
 
   def _GenerateUniqueID(self, ec_id):
     """Generate an unique UUID.
@@ -720,8 +715,8 @@ class ConfigWriter(object):
     @return: the unique id
 
     """
-    existing = self._AllIDs(include_temporary=False)
-    return self._temporary_ids.Generate(existing, utils.NewUUID, ec_id)
+    return self._temporary_ids.Generate(self._Indexes().GetIDs(),
+                                        utils.NewUUID, ec_id)
 
   @ConfigSync(shared=1)
   def GenerateUniqueID(self, ec_id):
@@ -738,40 +733,39 @@ class ConfigWriter(object):
   def _AllMACs(self):
     """Return all MACs present in the config.
 
-    @rtype: list
-    @return: the list of all MACs
+    @return: a set-like container of all MACs
 
     """
-    result = []
-    for instance in self._ConfigData().instances.values():
-      for nic in instance.nics:
-        result.append(nic.mac)
-
-    return result
+    return self._Indexes().GetMACs()
 
   def _AllDRBDSecrets(self):
     """Return all DRBD secrets present in the config.
 
-    @rtype: list
-    @return: the list of all DRBD secrets
+    @return: a set-like container of all DRBD secrets
 
     """
-    def helper(disk, result):
-      """Recursively gather secrets from this disk."""
-      if disk.dev_type == constants.DT_DRBD8:
-        result.append(disk.logical_id[5])
-      if disk.children:
-        for child in disk.children:
-          helper(child, result)
+    return self._Indexes().GetDRBDSecrets()
 
-    result = []
-    for disk in self._ConfigData().disks.values():
-      helper(disk, result)
+  @staticmethod
+  def _VerifySignature(objs):
+    """Computes the signature of objects for L{VerificationCache}.
 
-    return result
+    @type objs: list
+    @param objs: the objects the checks of an object depend on, including
+        itself
+    @rtype: tuple or None
+    @return: the UUIDs, serial numbers and modification times of the objects,
+        or C{None} if one of them has no serial number
 
-  @staticmethod
-  def _VerifyDisks(data, result):
+    """
+    result = []
+    for obj in objs:
+      if obj.serial_no is None:
+        return None
+      result.append((obj.uuid, obj.serial_no, obj.mtime))
+    return tuple(result)
+
+  def _VerifyDisks(self, data, result, cache):
     """Per-disk verification checks
 
     Extends L{result} with diagnostic information about the disks.
@@ -782,18 +776,206 @@ class ConfigWriter(object):
     @type result: list of strings
     @param result: list containing diagnostic messages
 
+    @type cache: L{VerificationCache}
+    @param cache: results of the previous checks, updated with the new ones
+
     """
     for disk_uuid in data.disks:
       disk = data.disks[disk_uuid]
-      result.extend(["disk %s error: %s" % (disk.uuid, msg)
-                     for msg in disk.Verify()])
+      key = ("disk", disk_uuid)
+      signature = self._VerifySignature([disk])
+      messages = cache.Lookup(key, signature)
+      if messages is None:
+        messages = ["disk %s error: %s" % (disk.uuid, msg)
+                    for msg in disk.Verify()]
+        cache.Store(key, signature, messages, {})
+      result.extend(messages)
       if disk.uuid != disk_uuid:
         result.append("disk '%s' is indexed by wrong UUID '%s'" %
                       (disk.name, disk_uuid))
 
-  def _UnlockedVerifyConfig(self):
+  @staticmethod
+  def _VerifyInstanceParams(instance, instance_disks, cluster):
+    """Per-instance checks which don't involve other instances.
+
+    @rtype: tuple
+    @return: the list of error messages and the contributions of the
+        instance to the cross-object checks, see L{VerificationCache.Store}
+
+    """
+    messages = []
+    macs = []
+    ports = []
+    ips = []
+    default_nicparams = cluster.nicparams[constants.PP_DEFAULT]
+
+    for idx, nic in enumerate(instance.nics):
+      macs.append((nic.mac, (instance.name, idx)))
+      if nic.nicparams:
+        filled = cluster.SimpleFillNIC(nic.nicparams)
+        owner = "instance %s nic %d" % (instance.name, idx)
+        VerifyType(owner, "nicparams",
+                   filled, constants.NICS_PARAMETER_TYPES, messages.append)
+        VerifyNic(owner, filled, messages.append)
+
+      if nic.ip is not None:
+        nicparams = objects.FillDict(default_nicparams, nic.nicparams)
+        nic_mode = nicparams[constants.NIC_MODE]
+        nic_link = nicparams[constants.NIC_LINK]
+
+        if nic_mode == constants.NIC_MODE_BRIDGED:
+          link = "bridge:%s" % nic_link
+        elif nic_mode == constants.NIC_MODE_ROUTED:
+          link = "route:%s" % nic_link
+        elif nic_mode == constants.NIC_MODE_OVS:
+          link = "ovs:%s" % nic_link
+        else:
+          raise errors.ProgrammerError("NIC mode '%s' not handled" % nic_mode)
+
+        ips.append(("%s/%s/%s" % (link, nic.ip, nic.network),
+                    "instance:%s/nic:%d" % (instance.name, idx)))
+
+    # parameter checks
+    if instance.beparams:
+      VerifyType("instance %s" % instance.name, "beparams",
+                 cluster.FillBE(instance), constants.BES_PARAMETER_TYPES,
+                 messages.append)
+
+    # gather the drbd ports for duplicate checks
+    for (idx, dsk) in enumerate(instance_disks):
+      if dsk.dev_type in constants.DTS_DRBD:
+        ports.append((dsk.logical_id[2],
+                      (instance.name, "drbd disk %s" % idx)))
+    # gather network port reservation
+    net_port = getattr(instance, "network_port", None)
+    if net_port is not None:
+      ports.append((net_port, (instance.name, "network port")))
+
+    wrong_names = _CheckInstanceDiskIvNames(instance_disks)
+    if wrong_names:
+      tmp = "; ".join(("name of disk %s should be '%s', but is '%s'" %
+                       (idx, exp_name, actual_name))
+                      for (idx, exp_name, actual_name) in wrong_names)
+
+      messages.append("Instance '%s' has wrongly named disks: %s" %
+                      (instance.name, tmp))
+
+    return (messages, {"macs": macs, "ports": ports, "ips": ips})
+
+  def _VerifyObjects(self, data, incremental):
+    """Per-object and cross-object verification checks.
+
+    Checks the disks and instances, reusing the results of the previous
+    verification for the unchanged ones if L{incremental} is set, and looks
+    for duplicate MAC addresses, TCP/UDP ports and IP addresses.
+
+    @type data: see L{_ConfigData}
+    @param data: configuration data
+    @type incremental: boolean
+    @param incremental: whether to reuse the previous results
+    @rtype: list of strings
+    @return: the diagnostic messages
+
+    """
+    result = []
+    cluster = data.cluster
+    cache = self._verify_cache
+
+    # the cluster parameters the per-object checks depend on
+    context = repr((cluster.beparams, cluster.nicparams, cluster.ndparams))
+    if not (incremental and cache.IsValidFor(context)):
+      cache.Reset(context)
+    seen_keys = set()
+
+    self._VerifyDisks(data, result, cache)
+    seen_keys.update(("disk", disk_uuid) for disk_uuid in data.disks)
+
+    # per-instance checks
+    for instance_uuid in data.instances:
+      instance = data.instances[instance_uuid]
+      if instance.uuid != instance_uuid:
+        result.append("instance '%s' is indexed by wrong UUID '%s'" %
+                      (instance.name, instance_uuid))
+      if instance.primary_node not in data.nodes:
+        result.append("instance '%s' has invalid primary node '%s'" %
+                      (instance.name, instance.primary_node))
+      for snode in self._UnlockedGetInstanceSecondaryNodes(instance.uuid):
+        if snode not in data.nodes:
+          result.append("instance '%s' has invalid secondary node '%s'" %
+                        (instance.name, snode))
+
+      # check that disks exists
+      for disk_uuid in instance.disks:
+        if disk_uuid not in data.disks:
+          result.append("Instance '%s' has invalid disk '%s'" %
+                        (instance.name, disk_uuid))
+
+      instance_disks = self._UnlockedGetInstanceDisks(instance.uuid)
+      key = ("instance", instance_uuid)
+      seen_keys.add(key)
+      signature = self._VerifySignature([instance] + instance_disks)
+      messages = cache.Lookup(key, signature)
+      if messages is None:
+        (messages, contributions) = \
+          self._VerifyInstanceParams(instance, instance_disks, cluster)
+        cache.Store(key, signature, messages, contributions)
+      result.extend(messages)
+
+    # addresses and ports of the nodes and the cluster, which are few enough
+    # to be gathered on every verification
+    for node in data.nodes.values():
+      key = ("node", node.uuid)
+      seen_keys.add(key)
+      node_ips = [(node.primary_ip, "node:%s/primary" % node.name)]
+      if node.secondary_ip != node.primary_ip:
+        node_ips.append((node.secondary_ip,
+                         "node:%s/secondary" % node.name))
+      cache.Store(key, None, [], {"ips": node_ips})
+
+    # cluster-wide pool of free ports
+    key = ("cluster", None)
+    seen_keys.add(key)
+    cache.Store(key, None, [], {
+      "ips": [(cluster.master_ip, "cluster_ip")],
+      "ports": [(free_port, ("cluster", "port marked as free"))
+                for free_port in cluster.tcpudp_port_pool],
+      })
+
+    cache.Prune(seen_keys)
+
+    for (mac, owners) in cache.GetDuplicates("macs"):
+      for (name, idx) in owners[1:]:
+        result.append("instance '%s' has NIC %d mac %s duplicate" %
+                      (name, idx, mac))
+
+    # compute tcp/udp duplicate ports
+    for (pnum, pdata) in cache.GetDuplicates("ports"):
+      txt = utils.CommaJoin(["%s/%s" % val for val in pdata])
+      result.append("tcp/udp port %s has duplicates: %s" % (pnum, txt))
+
+    # highest used tcp port check
+    ports = cache.GetValues("ports")
+    if ports:
+      highest_port = max(ports)
+      if highest_port > cluster.highest_used_port:
+        result.append("Highest used port mismatch, saved %s, computed %s" %
+                      (cluster.highest_used_port, highest_port))
+
+    # IP checks
+    for (ip, owners) in cache.GetDuplicates("ips"):
+      result.append("IP address %s is used by multiple owners: %s" %
+                    (ip, utils.CommaJoin(owners)))
+
+    return result
+
+  def _UnlockedVerifyConfig(self, incremental=False):
     """Verify function.
 
+    @type incremental: boolean
+    @param incremental: whether to only check the objects which changed since
+        the previous verification, reusing its results for the others;
+        changes made in place, without updating the serial number of an
+        object, are only found by a full verification
     @rtype: list
     @return: a list of error messages; a non-empty list signifies
         configuration errors
@@ -801,8 +983,6 @@ class ConfigWriter(object):
     """
     # pylint: disable=R0914
     result = []
-    seen_macs = []
-    ports = {}
     data = self._ConfigData()
     cluster = data.cluster
 
@@ -841,90 +1021,9 @@ class ConfigWriter(object):
           )
         )
 
-    self._VerifyDisks(data, result)
-
-    # per-instance checks
-    for instance_uuid in data.instances:
-      instance = data.instances[instance_uuid]
-      if instance.uuid != instance_uuid:
-        result.append("instance '%s' is indexed by wrong UUID '%s'" %
-                      (instance.name, instance_uuid))
-      if instance.primary_node not in data.nodes:
-        result.append("instance '%s' has invalid primary node '%s'" %
-                      (instance.name, instance.primary_node))
-      for snode in self._UnlockedGetInstanceSecondaryNodes(instance.uuid):
-        if snode not in data.nodes:
-          result.append("instance '%s' has invalid secondary node '%s'" %
-                        (instance.name, snode))
-      for idx, nic in enumerate(instance.nics):
-        if nic.mac in seen_macs:
-          result.append("instance '%s' has NIC %d mac %s duplicate" %
-                        (instance.name, idx, nic.mac))
-        else:
-          seen_macs.append(nic.mac)
-        if nic.nicparams:
-          filled = cluster.SimpleFillNIC(nic.nicparams)
-          owner = "instance %s nic %d" % (instance.name, idx)
-          VerifyType(owner, "nicparams",
-                     filled, constants.NICS_PARAMETER_TYPES, result.append)
-          VerifyNic(owner, filled, result.append)
-
-      # parameter checks
-      if instance.beparams:
-        VerifyType("instance %s" % instance.name, "beparams",
-                   cluster.FillBE(instance), constants.BES_PARAMETER_TYPES,
-                   result.append)
-
-      # check that disks exists
-      for disk_uuid in instance.disks:
-        if disk_uuid not in data.disks:
-          result.append("Instance '%s' has invalid disk '%s'" %
-                        (instance.name, disk_uuid))
-
-      instance_disks = self._UnlockedGetInstanceDisks(instance.uuid)
-      # gather the drbd ports for duplicate checks
-      for (idx, dsk) in enumerate(instance_disks):
-        if dsk.dev_type in constants.DTS_DRBD:
-          tcp_port = dsk.logical_id[2]
-          if tcp_port not in ports:
-            ports[tcp_port] = []
-          ports[tcp_port].append((instance.name, "drbd disk %s" % idx))
-      # gather network port reservation
-      net_port = getattr(instance, "network_port", None)
-      if net_port is not None:
-        if net_port not in ports:
-          ports[net_port] = []
-        ports[net_port].append((instance.name, "network port"))
-
-      wrong_names = _CheckInstanceDiskIvNames(instance_disks)
-      if wrong_names:
-        tmp = "; ".join(("name of disk %s should be '%s', but is '%s'" %
-                         (idx, exp_name, actual_name))
-                        for (idx, exp_name, actual_name) in wrong_names)
-
-        result.append("Instance '%s' has wrongly named disks: %s" %
-                      (instance.name, tmp))
-
-    # cluster-wide pool of free ports
-    for free_port in cluster.tcpudp_port_pool:
-      if free_port not in ports:
-        ports[free_port] = []
-      ports[free_port].append(("cluster", "port marked as free"))
-
-    # compute tcp/udp duplicate ports
-    keys = list(ports)
-    keys.sort()
-    for pnum in keys:
-      pdata = ports[pnum]
-      if len(pdata) > 1:
-        txt = utils.CommaJoin(["%s/%s" % val for val in pdata])
-        result.append("tcp/udp port %s has duplicates: %s" % (pnum, txt))
-
-    # highest used tcp port check
-    if keys:
-      if keys[-1] > cluster.highest_used_port:
-        result.append("Highest used port mismatch, saved %s, computed %s" %
-                      (cluster.highest_used_port, keys[-1]))
+    # verifications may run concurrently under the shared lock
+    with self._verify_lock:
+      result.extend(self._VerifyObjects(data, incremental))
 
     if not data.nodes[cluster.master_node].master_candidate:
       result.append("Master node is not a master candidate")
@@ -982,46 +1081,6 @@ class ConfigWriter(object):
     # drbd minors check
     # FIXME: The check for DRBD map needs to be implemented in WConfd
 
-    # IP checks
-    default_nicparams = cluster.nicparams[constants.PP_DEFAULT]
-    ips = {}
-
-    def _AddIpAddress(ip, name):
-      ips.setdefault(ip, []).append(name)
-
-    _AddIpAddress(cluster.master_ip, "cluster_ip")
-
-    for node in data.nodes.values():
-      _AddIpAddress(node.primary_ip, "node:%s/primary" % node.name)
-      if node.secondary_ip != node.primary_ip:
-        _AddIpAddress(node.secondary_ip, "node:%s/secondary" % node.name)
-
-    for instance in data.instances.values():
-      for idx, nic in enumerate(instance.nics):
-        if nic.ip is None:
-          continue
-
-        nicparams = objects.FillDict(default_nicparams, nic.nicparams)
-        nic_mode = nicparams[constants.NIC_MODE]
-        nic_link = nicparams[constants.NIC_LINK]
-
-        if nic_mode == constants.NIC_MODE_BRIDGED:
-          link = "bridge:%s" % nic_link
-        elif nic_mode == constants.NIC_MODE_ROUTED:
-          link = "route:%s" % nic_link
-        elif nic_mode == constants.NIC_MODE_OVS:
-          link = "ovs:%s" % nic_link
-        else:
-          raise errors.ProgrammerError("NIC mode '%s' not handled" % nic_mode)
-
-        _AddIpAddress("%s/%s/%s" % (link, nic.ip, nic.network),
-                      "instance:%s/nic:%d" % (instance.name, idx))
-
-    for ip, owners in ips.items():
-      if len(owners) > 1:
-        result.append("IP address %s is used by multiple owners: %s" %
-                      (ip, utils.CommaJoin(owners)))
-
     return result
 
   @ConfigSync(shared=1)
@@ -1047,7 +1106,7 @@ class ConfigWriter(object):
     # configuration has already been modified, and we can't revert;
     # the best we can do is to warn the user and save as is, leaving
     # recovery to the user
-    config_errors = self._UnlockedVerifyConfig()
+    config_errors = self._UnlockedVerifyConfig(incremental=True)
     if config_errors:
       errmsg = ("Configuration data is not consistent: %s" %
                 (utils.CommaJoin(config_errors)))
@@ -1057,17 +1116,20 @@ class ConfigWriter(object):
     return config_errors
 
   @ConfigSync(shared=1)
-  def VerifyConfig(self):
+  def VerifyConfig(self, incremental=False):
     """Verify function.
 
     This is just a wrapper over L{_UnlockedVerifyConfig}.
 
+    @type incremental: boolean
+    @param incremental: whether to only check the objects changed since the
+        previous verification
     @rtype: list
     @return: a list of error messages; a non-empty list signifies
         configuration errors
 
     """
-    return self._UnlockedVerifyConfig()
+    return self._UnlockedVerifyConfig(incremental=incremental)
 
   def AddTcpUdpPort(self, port):
     """Adds a new port to the available port pool."""
@@ -1456,6 +1518,7 @@ class ConfigWriter(object):
     group.UpgradeConfig()
 
     self._ConfigData().nodegroups[group.uuid] = group
+    self._Indexes().AddNodeGroup(group)
     self._ConfigData().cluster.serial_no += 1
 
   @ConfigSync()
@@ -1474,7 +1537,8 @@ class ConfigWriter(object):
     assert len(self._ConfigData().nodegroups) != 1, \
             "Group '%s' is the only group, cannot be removed" % group_uuid
 
-    del self._ConfigData().nodegroups[group_uuid]
+    group = self._ConfigData().nodegroups.pop(group_uuid)
+    self._Indexes().RemoveNodeGroup(group)
     self._ConfigData().cluster.serial_no += 1
 
   def _UnlockedLookupNodeGroup(self, target):
@@ -1638,7 +1702,7 @@ class ConfigWriter(object):
     """
     if not item.uuid:
       raise errors.ConfigurationError("'%s' must have an UUID" % (item.name,))
-    if item.uuid in self._AllIDs(include_temporary=include_temporary):
+    if self._IsUsedID(item.uuid, include_temporary):
       raise errors.ConfigurationError("Cannot add '%s': UUID %s already"
                                       " in use" % (item.name, item.uuid))
 
@@ -1651,7 +1715,7 @@ class ConfigWriter(object):
     """
     if not item.uuid:
       raise errors.ConfigurationError("'%s' must have an UUID" % (item.name,))
-    if item.uuid not in self._AllIDs(include_temporary=False):
+    if not self._IsUsedID(item.uuid, False):
       raise errors.ConfigurationError("Cannot replace '%s': UUID %s not present"
                                       % (item.name, item.uuid))
 
@@ -1718,8 +1782,13 @@ class ConfigWriter(object):
     if inst_uuid not in self._ConfigData().instances:
       raise errors.ConfigurationError("Unknown instance '%s'" % inst_uuid)
 
+    now = time.time()
     inst = self._ConfigData().instances[inst_uuid]
+    self._Indexes().RenameInstance(inst_uuid, inst.name, new_name)
     inst.name = new_name
+    # The verification messages of the instance contain its name
+    inst.serial_no += 1
+    inst.mtime = now
 
     instance_disks = self._UnlockedGetInstanceDisks(inst_uuid)
     for (_, disk) in enumerate(instance_disks):
@@ -1729,6 +1798,8 @@ class ConfigWriter(object):
         disk.logical_id = (disk.logical_id[0],
                            utils.PathJoin(file_storage_dir, inst.name,
                                           os.path.basename(disk.logical_id[1])))
+        disk.serial_no += 1
+        disk.mtime = now
 
     # Force update of ssconf files
     self._ConfigData().cluster.serial_no += 1
@@ -1950,10 +2021,7 @@ class ConfigWriter(object):
     return self._UnlockedGetInstanceInfoByName(inst_name)
 
   def _UnlockedGetInstanceInfoByName(self, inst_name):
-    for inst in self._UnlockedGetAllInstancesInfo().values():
-      if inst.name == inst_name:
-        return inst
-    return None
+    return self._Indexes().GetInstanceByName(inst_name)
 
   def _UnlockedGetInstanceName(self, inst_uuid):
     inst_info = self._UnlockedGetInstanceInfo(inst_uuid)
@@ -2009,6 +2077,7 @@ class ConfigWriter(object):
 
     """
     self._UnlockedGetDiskInfo(disk_uuid).nodes = nodes
+    self._Indexes().UpdateDisk(disk_uuid)
 
   @ConfigSync()
   def SetDiskLogicalID(self, disk_uuid, logical_id):
@@ -2031,6 +2100,7 @@ class ConfigWriter(object):
                                    logical_id)
 
     disk.logical_id = logical_id
+    self._Indexes().UpdateDisk(disk_uuid)
 
   def _UnlockedGetInstanceNames(self, inst_uuids):
     return [self._UnlockedGetInstanceName(uuid) for uuid in inst_uuids]
@@ -2051,6 +2121,7 @@ class ConfigWriter(object):
     self._UnlockedAddNodeToGroup(node.uuid, node.group)
     assert node.uuid in self._ConfigData().nodegroups[node.group].members
     self._ConfigData().nodes[node.uuid] = node
+    self._Indexes().AddNode(node)
     self._ConfigData().cluster.serial_no += 1
 
   @ConfigSync()
@@ -2073,8 +2144,9 @@ class ConfigWriter(object):
     if node_uuid not in self._ConfigData().nodes:
       raise errors.ConfigurationError("Unknown node '%s'" % node_uuid)
 
-    self._UnlockedRemoveNodeFromGroup(self._ConfigData().nodes[node_uuid])
-    del self._ConfigData().nodes[node_uuid]
+    node = self._ConfigData().nodes.pop(node_uuid)
+    self._UnlockedRemoveNodeFromGroup(node)
+    self._Indexes().RemoveNode(node)
     self._ConfigData().cluster.serial_no += 1
 
   def ExpandNodeName(self, short_name):
@@ -2134,14 +2206,7 @@ class ConfigWriter(object):
     @return: a tuple with two lists: the primary and the secondary instances
 
     """
-    pri = []
-    sec = []
-    for inst in self._ConfigData().instances.values():
-      if inst.primary_node == node_uuid:
-        pri.append(inst.uuid)
-      if node_uuid in self._UnlockedGetInstanceSecondaryNodes(inst.uuid):
-        sec.append(inst.uuid)
-    return (pri, sec)
+    return self._Indexes().GetNodeInstances(node_uuid)
 
   @ConfigSync(shared=1)
   def GetNodeGroupInstances(self, uuid, primary_only=False):
@@ -2153,15 +2218,15 @@ class ConfigWriter(object):
     @return: List of instance UUIDs in node group
 
     """
-    if primary_only:
-      nodes_fn = lambda inst: [inst.primary_node]
-    else:
-      nodes_fn = lambda inst: self._UnlockedGetInstanceNodes(inst.uuid)
-
-    return frozenset(inst.uuid
-                     for inst in self._ConfigData().instances.values()
-                     for node_uuid in nodes_fn(inst)
-                     if self._UnlockedGetNodeInfo(node_uuid).group == uuid)
+    result = set()
+    for node in self._ConfigData().nodes.values():
+      if node.group != uuid:
+        continue
+      (pri, sec) = self._Indexes().GetNodeInstances(node.uuid)
+      result.update(pri)
+      if not primary_only:
+        result.update(sec)
+    return frozenset(result)
 
   def _UnlockedGetHvparamsString(self, hvname):
     """Return the string representation of the list of hyervisor parameters of
@@ -2283,10 +2348,7 @@ class ConfigWriter(object):
     return self._UnlockedGetAllNodesInfo()
 
   def _UnlockedGetNodeInfoByName(self, node_name):
-    for node in self._UnlockedGetAllNodesInfo().values():
-      if node.name == node_name:
-        return node
-    return None
+    return self._Indexes().GetNodeByName(node_name)
 
   @ConfigSync(shared=1)
   def GetNodeInfoByName(self, node_name):
@@ -2719,6 +2781,8 @@ class ConfigWriter(object):
     for item in self._AllUUIDObjects():
       if item.uuid is None:
         item.uuid = self._GenerateUniqueID(_UPGRADE_CONFIG_JID)
+    # The objects which just got an UUID are not yet known to the indexes
+    self._Indexes().Reset()
     if not self._ConfigData().nodegroups:
       default_nodegroup_name = constants.INITIAL_NODE_GROUP_NAME
       default_nodegroup = objects.NodeGroup(name=default_nodegroup_name,
@@ -3159,6 +3223,7 @@ class ConfigWriter(object):
     net.serial_no = 1
     net.ctime = net.mtime = time.time()
     self._ConfigData().networks[net.uuid] = net
+    self._Indexes().AddNetwork(net)
     self._ConfigData().cluster.serial_no += 1
 
   def _UnlockedLookupNetwork(self, target):
@@ -3208,7 +3273,8 @@ class ConfigWriter(object):
     if network_uuid not in self._ConfigData().networks:
       raise errors.ConfigurationError("Unknown network '%s'" % network_uuid)
 
-    del self._ConfigData().networks[network_uuid]
+    net = self._ConfigData().networks.pop(network_uuid)
+    self._Indexes().RemoveNetwork(net)
     self._ConfigData().cluster.serial_no += 1
 
   def _UnlockedGetGroupNetParams(self, net_uuid, node_uuid):
@@ -3374,9 +3440,7 @@ class ConfigWriter(object):
     @rtype: string
     @return: uuid of instance the disk is attached to.
     """
-    for inst_uuid, inst_info in self._UnlockedGetAllInstancesInfo().items():
-      if disk_uuid in inst_info.disks:
-        return inst_uuid
+    return self._Indexes().GetInstanceForDisk(disk_uuid)
 
 
 class DetachedConfig(ConfigWriter):
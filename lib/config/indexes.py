@@ -0,0 +1,527 @@
+#
+#
+
+# Copyright (C) 2026 the Ganeti project
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+
+"""Secondary indexes over the configuration data.
+
+The configuration data is keyed by UUID only, so looking up an object by
+name, or the instances of a node, would otherwise require a scan over all
+objects. The same holds for the values which must be unique in the
+configuration (UUIDs, LV names, MAC addresses and DRBD secrets) when
+generating or reserving a new one.
+
+"""
+
+from ganeti import constants
+from ganeti import errors
+
+
+class _UniqueSet(object):
+  """Set of the values which must be unique within the configuration.
+
+  Values are recorded per contributing object, so that updating or removing
+  one object keeps the values still used by others.
+
+  """
+  def __init__(self):
+    self._counts = {}
+    self._contributions = {}
+
+  def __contains__(self, value):
+    return value in self._counts
+
+  def __iter__(self):
+    return iter(self._counts)
+
+  def __len__(self):
+    return len(self._counts)
+
+  def Update(self, key, values):
+    """Replaces the values contributed by an object.
+
+    @param key: identifies the contributing object
+    @type values: iterable
+    @param values: the new values of the object, empty if it was removed
+
+    """
+    for value in self._contributions.pop(key, ()):
+      count = self._counts[value] - 1
+      if count:
+        self._counts[value] = count
+      else:
+        del self._counts[value]
+
+    values = tuple(values)
+    if values:
+      self._contributions[key] = values
+    for value in values:
+      self._counts[value] = self._counts.get(value, 0) + 1
+
+
+class ConfigIndexes(object):
+  """Lookup tables over a L{objects.ConfigData} object.
+
+  Each table is computed on first use and kept up to date by the
+  configuration writer for the changes it makes locally; changes received
+  from WConfd replace the whole configuration data and thus the indexes.
+
+  Name lookups verify the object they find and fall back to a scan when the
+  table is out of date (e.g. after an object has been renamed in place), so
+  they never return a wrong result.
+
+  """
+  def __init__(self, config_data):
+    self._data = config_data
+    self.Reset()
+
+  def IsFor(self, config_data):
+    """Returns whether the indexes describe the given configuration data.
+
+    """
+    return self._data is config_data
+
+  def Reset(self):
+    """Drops all tables, to be recomputed on their next use.
+
+    """
+    self._instance_names = None
+    self._node_names = None
+    self._disk_names = None
+    self._disk_instance = None
+    self._instance_nodes = None
+    self._node_primaries = None
+    self._node_secondaries = None
+    self._unique = {}
+
+  # Name lookups
+
+  @staticmethod
+  def _BuildNameIndex(objs):
+    result = {}
+    for obj in objs:
+      result.setdefault(obj.name, []).append(obj.uuid)
+    return result
+
+  @staticmethod
+  def _LookupByName(index, objs, name):
+    """Returns all objects with the given name.
+
+    @type index: dict
+    @param index: name to UUIDs table
+    @type objs: dict
+    @param objs: UUID to object table of the configuration
+    @rtype: list or None
+    @return: the objects with the given name, or C{None} if the index turned
+        out to be out of date
+
+    """
+    found = []
+    for uuid in index.get(name, []):
+      obj = objs.get(uuid)
+      if obj is None or obj.name != name:
+        return None
+      found.append(obj)
+    return found
+
+  def _FindByName(self, attr, objs, name):
+    index = getattr(self, attr)
+    if index is None:
+      index = self._BuildNameIndex(objs.values())
+      setattr(self, attr, index)
+
+    found = self._LookupByName(index, objs, name)
+    if not found:
+      # Either really unknown or the object was renamed in place; in both
+      # cases only a scan gives the right answer
+      found = [obj for obj in objs.values() if obj.name == name]
+      if found:
+        setattr(self, attr, None)
+    return found
+
+  def GetInstanceByName(self, name):
+    """Returns the instance with the given name, or C{None}.
+
+    """
+    found = self._FindByName("_instance_names", self._data.instances, name)
+    if found:
+      return found[0]
+    return None
+
+  def GetNodeByName(self, name):
+    """Returns the node with the given name, or C{None}.
+
+    """
+    found = self._FindByName("_node_names", self._data.nodes, name)
+    if found:
+      return found[0]
+    return None
+
+  def GetDiskByName(self, name):
+    """Returns the disk with the given name, or C{None}.
+
+    @raise errors.ConfigurationError: if several disks have this name
+
+    """
+    found = self._FindByName("_disk_names", self._data.disks, name)
+    if len(found) > 1:
+      raise errors.ConfigurationError("There are %s disks with this name: %s"
+                                      % (len(found), name))
+    if found:
+      return found[0]
+    return None
+
+  def AddInstance(self, inst):
+    """Records the addition of an instance to the configuration data.
+
+    """
+    if self._instance_names is not None:
+      self._instance_names.setdefault(inst.name, []).append(inst.uuid)
+    self.UpdateInstance(inst.uuid)
+
+  def RemoveInstance(self, inst):
+    """Records the removal of an instance from the configuration data.
+
+    """
+    if self._instance_names is not None:
+      self._RemoveName(self._instance_names, inst.name, inst.uuid)
+    self.UpdateInstance(inst.uuid)
+
+  def RenameInstance(self, inst_uuid, old_name, new_name):
+    """Records the rename of an instance.
+
+    """
+    if self._instance_names is not None:
+      self._RemoveName(self._instance_names, old_name, inst_uuid)
+      self._instance_names.setdefault(new_name, []).append(inst_uuid)
+
+  def AddNode(self, node):
+    """Records the addition of a node.
+
+    """
+    if self._node_names is not None:
+      self._node_names.setdefault(node.name, []).append(node.uuid)
+    self._UpdateUnique("node", node.uuid)
+
+  def RemoveNode(self, node):
+    """Records the removal of a node.
+
+    """
+    if self._node_names is not None:
+      self._RemoveName(self._node_names, node.name, node.uuid)
+    for table in (self._node_primaries, self._node_secondaries):
+      if table is not None:
+        table.pop(node.uuid, None)
+    self._UpdateUnique("node", node.uuid)
+
+  def AddDisk(self, disk):
+    """Records the addition of a disk.
+
+    """
+    if self._disk_names is not None:
+      self._disk_names.setdefault(disk.name, []).append(disk.uuid)
+    self._UpdateUnique("disk", disk.uuid)
+
+  def RemoveDisk(self, disk):
+    """Records the removal of a disk.
+
+    """
+    if self._disk_names is not None:
+      self._RemoveName(self._disk_names, disk.name, disk.uuid)
+    self._UpdateUnique("disk", disk.uuid)
+
+  def AddNodeGroup(self, group):
+    """Records the addition of a node group.
+
+    """
+    self._UpdateUnique("nodegroup", group.uuid)
+
+  def RemoveNodeGroup(self, group):
+    """Records the removal of a node group.
+
+    """
+    self._UpdateUnique("nodegroup", group.uuid)
+
+  def AddNetwork(self, net):
+    """Records the addition of a network.
+
+    """
+    self._UpdateUnique("network", net.uuid)
+
+  def RemoveNetwork(self, net):
+    """Records the removal of a network.
+
+    """
+    self._UpdateUnique("network", net.uuid)
+
+  @staticmethod
+  def _RemoveName(index, name, uuid):
+    uuids = index.get(name, [])
+    if uuid in uuids:
+      uuids.remove(uuid)
+    if not uuids:
+      index.pop(name, None)
+
+  # Disk to instance
+
+  def GetInstanceForDisk(self, disk_uuid):
+    """Returns the UUID of the instance a disk is attached to, or C{None}.
+
+    """
+    if self._disk_instance is None:
+      self._disk_instance = dict((disk, inst.uuid)
+                                 for inst in self._data.instances.values()
+                                 for disk in inst.disks)
+
+    inst_uuid = self._disk_instance.get(disk_uuid)
+    inst = self._data.instances.get(inst_uuid)
+    if inst is not None and disk_uuid in inst.disks:
+      return inst_uuid
+
+    # Out of date or not attached at all
+    for inst in self._data.instances.values():
+      if disk_uuid in inst.disks:
+        self._disk_instance = None
+        return inst.uuid
+    return None
+
+  # Node to instances
+
+  def _ComputeInstanceNodes(self, inst):
+    """Computes the primary and secondary nodes of an instance.
+
+    @rtype: tuple
+    @return: (primary node UUID, frozenset of secondary node UUIDs)
+
+    """
+    all_nodes = set()
+    for disk_uuid in inst.disks:
+      disk = self._data.disks.get(disk_uuid)
+      if disk is not None:
+        all_nodes.update(disk.all_nodes)
+    all_nodes.discard(inst.primary_node)
+    return (inst.primary_node, frozenset(all_nodes))
+
+  def _AddInstanceNodes(self, inst_uuid, nodes):
+    (primary, secondaries) = nodes
+    self._instance_nodes[inst_uuid] = nodes
+    # Dictionaries are used as insertion-ordered sets
+    self._node_primaries.setdefault(primary, {})[inst_uuid] = None
+    for node_uuid in secondaries:
+      self._node_secondaries.setdefault(node_uuid, {})[inst_uuid] = None
+
+  def _RemoveInstanceNodes(self, inst_uuid):
+    nodes = self._instance_nodes.pop(inst_uuid, None)
+    if nodes is None:
+      return
+    (primary, secondaries) = nodes
+    self._node_primaries.get(primary, {}).pop(inst_uuid, None)
+    for node_uuid in secondaries:
+      self._node_secondaries.get(node_uuid, {}).pop(inst_uuid, None)
+
+  def _EnsureNodeIndex(self):
+    if self._instance_nodes is not None:
+      return
+    self._instance_nodes = {}
+    self._node_primaries = {}
+    self._node_secondaries = {}
+    for inst in self._data.instances.values():
+      self._AddInstanceNodes(inst.uuid, self._ComputeInstanceNodes(inst))
+
+  def GetNodeInstances(self, node_uuid):
+    """Returns the primary and secondary instances of a node.
+
+    @rtype: tuple
+    @return: (list of primary instance UUIDs, list of secondary instance
+        UUIDs), in the order of the configuration data
+
+    """
+    self._EnsureNodeIndex()
+    return (list(self._node_primaries.get(node_uuid, [])),
+            list(self._node_secondaries.get(node_uuid, [])))
+
+  def UpdateInstance(self, inst_uuid):
+    """Recomputes the entries of an instance after it changed.
+
+    This must be called after an instance is added, removed, moved to another
+    primary node or had its disks changed.
+
+    """
+    self._UpdateUnique("instance", inst_uuid)
+    if self._instance_nodes is None:
+      return
+    self._RemoveInstanceNodes(inst_uuid)
+    inst = self._data.instances.get(inst_uuid)
+    if inst is not None:
+      self._AddInstanceNodes(inst_uuid, self._ComputeInstanceNodes(inst))
+
+  def UpdateDisk(self, disk_uuid):
+    """Recomputes the entries of the instance owning a disk.
+
+    This must be called after the nodes or the logical ID of a disk changed.
+
+    """
+    self._UpdateUnique("disk", disk_uuid)
+    if self._instance_nodes is None and "lvs" not in self._unique:
+      return
+    inst_uuid = self.GetInstanceForDisk(disk_uuid)
+    if inst_uuid is not None:
+      self.UpdateInstance(inst_uuid)
+
+  # Uniqueness sets
+
+  def _InstanceIDs(self, inst):
+    # LV names are checked together with the UUIDs
+    return ([inst.uuid] + [nic.uuid for nic in inst.nics if nic.uuid] +
+            self._InstanceLVs(inst))
+
+  def _InstanceMACs(self, inst): # pylint: disable=R0201
+    return [nic.mac for nic in inst.nics]
+
+  def _InstanceLVs(self, inst):
+    def _DiskLVs(disk):
+      if disk.dev_type == constants.DT_PLAIN:
+        if not disk.forthcoming:
+          yield disk.logical_id[0] + "/" + disk.logical_id[1]
+      elif disk.children:
+        for child in disk.children:
+          for lv_name in _DiskLVs(child):
+            yield lv_name
+
+    result = []
+    for disk_uuid in inst.disks:
+      disk = self._data.disks.get(disk_uuid)
+      if disk is not None:
+        result.extend(_DiskLVs(disk))
+    return result
+
+  def _DiskDRBDSecrets(self, disk): # pylint: disable=R0201
+    def _Secrets(disk):
+      if disk.dev_type == constants.DT_DRBD8:
+        yield disk.logical_id[5]
+      for child in disk.children or []:
+        for secret in _Secrets(child):
+          yield secret
+
+    return list(_Secrets(disk))
+
+  def _ObjectUUID(self, obj): # pylint: disable=R0201
+    if obj.uuid:
+      return [obj.uuid]
+    return []
+
+  # Table name to the function computing the values of each kind of object
+  _UNIQUE_VALUES = {
+    "ids": {
+      "instance": _InstanceIDs,
+      "node": _ObjectUUID,
+      "nodegroup": _ObjectUUID,
+      "network": _ObjectUUID,
+      "disk": _ObjectUUID,
+      "cluster": _ObjectUUID,
+      },
+    "lvs": {
+      "instance": _InstanceLVs,
+      },
+    "macs": {
+      "instance": _InstanceMACs,
+      },
+    "drbd_secrets": {
+      "disk": _DiskDRBDSecrets,
+      },
+    }
+
+  def _Objects(self, kind):
+    """Returns the UUID to object table of the given kind of object.
+
+    """
+    if kind == "cluster":
+      return {self._data.cluster.uuid: self._data.cluster}
+    return {
+      "instance": self._data.instances,
+      "node": self._data.nodes,
+      "nodegroup": self._data.nodegroups,
+      "network": self._data.networks,
+      "disk": self._data.disks,
+      }[kind]
+
+  def _GetUnique(self, table):
+    """Returns a uniqueness set, building it on first use.
+
+    @rtype: L{_UniqueSet}
+
+    """
+    result = self._unique.get(table)
+    if result is None:
+      result = _UniqueSet()
+      for (kind, fn) in self._UNIQUE_VALUES[table].items():
+        for (uuid, obj) in self._Objects(kind).items():
+          result.Update((kind, uuid), fn(self, obj))
+      self._unique[table] = result
+    return result
+
+  def _UpdateUnique(self, kind, uuid):
+    """Recomputes the values an object contributes to the uniqueness sets.
+
+    """
+    if not self._unique:
+      return
+    obj = self._Objects(kind).get(uuid)
+    for (table, values) in self._unique.items():
+      fn = self._UNIQUE_VALUES[table].get(kind)
+      if fn is None:
+        continue
+      if obj is None:
+        values.Update((kind, uuid), [])
+      else:
+        values.Update((kind, uuid), fn(self, obj))
+
+  def GetIDs(self):
+    """Returns all UUIDs and LV names in the configuration.
+
+    """
+    return self._GetUnique("ids")
+
+  def GetLVs(self):
+    """Returns the names of the logical volumes of all instances.
+
+    """
+    return self._GetUnique("lvs")
+
+  def GetMACs(self):
+    """Returns the MAC addresses of all instance NICs.
+
+    """
+    return self._GetUnique("macs")
+
+  def GetDRBDSecrets(self):
+    """Returns the shared secrets of all DRBD disks.
+
+    """
+    return self._GetUnique("drbd_secrets")
@@ -84,15 +84,18 @@ class TemporaryReservationManager(object):
   def Generate(self, existing, generate_one_fn, ec_id):
     """Generate a new resource of this type
 
+    @param existing: the resources already in use; any container supporting
+        membership tests, which is not copied
+
     """
     assert callable(generate_one_fn)
 
-    all_elems = self.GetReserved()
-    all_elems.update(existing)
+    reserved = self.GetReserved()
     retries = 64
     while retries > 0:
       new_resource = generate_one_fn()
-      if new_resource is not None and new_resource not in all_elems:
+      if (new_resource is not None and new_resource not in reserved and
+          new_resource not in existing):
         break
     else:
       raise errors.ConfigurationError("Not able generate new resource"
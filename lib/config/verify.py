@@ -151,3 +151,121 @@ def VerifyIspecs(owner, parentkey, params, callback):
     fullkey = "/".join([parentkey, key])
     VerifyType(owner, fullkey, value, constants.ISPECS_PARAMETER_TYPES,
                callback)
+
+
+class VerificationCache(object):
+  """Results of the per-object checks of previous configuration verifications.
+
+  An object is considered unchanged as long as its signature, usually made of
+  its serial number and modification time, stays the same; its messages are
+  then reused. Each object also contributes values to the cross-object checks
+  (MAC addresses, TCP/UDP ports and IP addresses). These are kept in tables
+  mapping every value to its owners, together with the set of values having
+  more than one owner, so that duplicates are found without looking at the
+  unchanged objects again.
+
+  """
+  TABLES = ("macs", "ports", "ips")
+
+  def __init__(self):
+    self.Reset(None)
+
+  def Reset(self, context):
+    """Forgets all results.
+
+    @param context: the values all cached results depend on, see
+        L{IsValidFor}
+
+    """
+    self._context = context
+    self._entries = {}
+    self._owners = dict((table, {}) for table in self.TABLES)
+    self._duplicates = dict((table, set()) for table in self.TABLES)
+
+  def IsValidFor(self, context):
+    """Returns whether the results were computed in the given context.
+
+    """
+    return self._context is not None and self._context == context
+
+  def Lookup(self, key, signature):
+    """Returns the cached messages of an unchanged object.
+
+    @param key: the kind and UUID of the object
+    @param signature: the current signature of the object, C{None} if it
+        can't be cached
+    @rtype: list or None
+    @return: the messages of the object, or C{None} if it has to be checked
+
+    """
+    entry = self._entries.get(key)
+    if signature is None or entry is None or entry[0] != signature:
+      return None
+    return entry[1]
+
+  def Store(self, key, signature, messages, contributions):
+    """Records the results of checking an object.
+
+    @type contributions: dict
+    @param contributions: table name to list of (value, owner) pairs
+
+    """
+    self._UpdateOwners(key, contributions)
+    self._entries[key] = (signature, messages, contributions)
+
+  def Prune(self, keys):
+    """Forgets the objects not in the given set of keys.
+
+    """
+    for key in [key for key in self._entries if key not in keys]:
+      self._UpdateOwners(key, {})
+      del self._entries[key]
+
+  def _UpdateOwners(self, key, contributions):
+    old = self._entries.get(key)
+    changed = []
+    if old is not None:
+      for (table, items) in old[2].items():
+        owners = self._owners[table]
+        for (value, _) in items:
+          by_key = owners.get(value)
+          if by_key is not None and by_key.pop(key, None) is not None:
+            changed.append((table, value))
+
+    for (table, items) in contributions.items():
+      owners = self._owners[table]
+      for (value, owner) in items:
+        owners.setdefault(value, {}).setdefault(key, []).append(owner)
+        changed.append((table, value))
+
+    for (table, value) in changed:
+      by_key = self._owners[table].get(value)
+      count = sum(len(i) for i in by_key.values()) if by_key else 0
+      if count == 0:
+        self._owners[table].pop(value, None)
+      if count > 1:
+        self._duplicates[table].add(value)
+      else:
+        self._duplicates[table].discard(value)
+
+  def GetValues(self, table):
+    """Returns all values of a table.
+
+    """
+    return self._owners[table].keys()
+
+  def GetDuplicates(self, table):
+    """Returns the values of a table which have more than one owner.
+
+    @rtype: list of tuples
+    @return: sorted list of (value, list of owners)
+
+    """
+    result = []
+    for value in sorted(self._duplicates[table],
+                        key=lambda value: (value is None, value)):
+      owners = []
+      for items in self._owners[table][value].values():
+        owners.extend(items)
+      result.append((value, owners))
+    return result
@@ -32,6 +32,8 @@
 
 """
 
+import logging
+
 from ganeti import constants
 from ganeti import errors
 from ganeti import utils
@@ -164,6 +166,8 @@ class HooksMaster(object):
       "GANETI_DATA_DIR": pathutils.DATA_DIR,
       "GANETI_HOOKS_PHASE": phase,
       "GANETI_HOOKS_PATH": hpath,
+      # Results include each script's run time
+      constants.HOOKS_RESULT_DURATION_ENV: "1",
       }
 
     if self.htype:
@@ -244,7 +248,12 @@ class HooksMaster(object):
         self.log_fn("Communication failure to node %s: %s", node_name, fail_msg)
         continue
 
-      for script, hkr, output in hooks_results:
+      for hook_result in hooks_results:
+        # Newer nodes also return the script's run time
+        (script, hkr, output) = hook_result[:3]
+        if len(hook_result) > 3 and hook_result[3] is not None:
+          logging.debug("Hook script %s on %s took %.3f seconds", script,
+                        node_name, hook_result[3])
         if hkr == constants.HKR_FAIL:
           if phase == constants.HOOKS_PHASE_PRE:
             errs.append((node_name, script, output))
@@ -291,3 +300,34 @@ class HooksMaster(object):
                        _RpcResultsToHooksResults, lu.BuildHooksEnv,
                        lu.PreparePostHookNodes, lu.LogWarning, lu.HTYPE,
                        cluster_name, master_name)
+
+  @staticmethod
+  def BuildForLuObject(hooks_execution_fn, lu, hooks_path, htype, nodes,
+                       build_env_fn):
+    """Builds a hooks master for one of the objects a LU operates on.
+
+    This is used by logical units acting on many objects at once, e.g. all
+    instances of a node, to run the hooks of each object as the logical unit
+    operating on a single object would.
+
+    @type hooks_path: string
+    @param hooks_path: prefix of the hooks directories
+    @type htype: string
+    @param htype: one of L{constants.HTYPE_CLUSTER}, L{constants.HTYPE_NODE},
+      L{constants.HTYPE_INSTANCE}
+    @type nodes: 2-tuple of lists
+    @param nodes: node UUIDs on which the pre- and post-hooks are run
+    @type build_env_fn: function returning a dictionary
+    @param build_env_fn: function that builds the environment for the hooks
+
+    """
+    master_name = cluster_name = None
+    if lu.cfg:
+      master_name = lu.cfg.GetMasterNodeName()
+      cluster_name = lu.cfg.GetClusterName()
+
+    return HooksMaster(lu.op.OP_ID, hooks_path,
+                       (frozenset(nodes[0]), frozenset(nodes[1])),
+                       hooks_execution_fn, _RpcResultsToHooksResults,
+                       build_env_fn, None, lu.LogWarning, htype, cluster_name,
+                       master_name)
@@ -68,6 +68,7 @@ HTTP_DATE = "Date"
 HTTP_USER_AGENT = "User-Agent"
 HTTP_CONTENT_TYPE = "Content-Type"
 HTTP_CONTENT_LENGTH = "Content-Length"
+HTTP_TRANSFER_ENCODING = "Transfer-Encoding"
 HTTP_CONNECTION = "Connection"
 HTTP_KEEP_ALIVE = "Keep-Alive"
 HTTP_WWW_AUTHENTICATE = "WWW-Authenticate"
@@ -77,6 +78,9 @@ HTTP_ALLOW = "Allow"
 
 HTTP_APP_OCTET_STREAM = "application/octet-stream"
 HTTP_APP_JSON = "application/json"
+HTTP_APP_NDJSON = "application/x-ndjson"
+
+HTTP_CHUNKED = "chunked"
 
 _SSL_UNEXPECTED_EOF = "Unexpected EOF"
 _SSL_SHUTDOWN_DURING_INIT = ('SSL routines', 'SSL_shutdown',
@@ -691,6 +695,31 @@ class HttpBase(object):
             self._ssl_cert.digest("md5") == cert.digest("md5"))
 
 
+class HttpStreamingBody(object):
+  """Message body which is generated while it is being sent.
+
+  Streaming bodies are sent using chunked transfer encoding to HTTP/1.1
+  peers. For older protocol versions the end of the body is signalled by
+  closing the connection.
+
+  """
+  def __init__(self, chunks):
+    """Initializes this class.
+
+    @type chunks: iterable
+    @param chunks: Iterable producing the body's content piece by piece as
+        bytes; empty pieces are skipped
+
+    """
+    self._chunks = chunks
+
+  def __iter__(self):
+    return iter(self._chunks)
+
+  def __bool__(self):
+    return True
+
+
 class HttpMessage(object):
   """Data structure for HTTP message.
 
@@ -746,8 +775,27 @@ class HttpMessageWriter(object):
 
     self._PrepareMessage()
 
-    buf = self._FormatMessage()
+    self._Send(sock, self._FormatMessage(), write_timeout)
 
+    if self._IsStreaming() and self.HasMessageBody():
+      for chunk in self._msg.body:
+        if not chunk:
+          continue
+        if self._UseChunkedEncoding():
+          self._Send(sock, "%x\r\n%s\r\n" % (len(chunk), chunk.decode()),
+                     write_timeout)
+        else:
+          self._Send(sock, chunk.decode(), write_timeout)
+
+      if self._UseChunkedEncoding():
+        # Last chunk
+        self._Send(sock, "0\r\n\r\n", write_timeout)
+
+  @staticmethod
+  def _Send(sock, buf, write_timeout):
+    """Sends a buffer to the socket.
+
+    """
     pos = 0
     end = len(buf)
     while pos < end:
@@ -761,6 +809,18 @@ class HttpMessageWriter(object):
 
     assert pos == end, "Message wasn't sent completely"
 
+  def _IsStreaming(self):
+    """Checks whether the message body is generated while being sent.
+
+    """
+    return isinstance(self._msg.body, HttpStreamingBody)
+
+  def _UseChunkedEncoding(self):
+    """Checks whether the message body is sent in chunks.
+
+    """
+    return self._IsStreaming() and self._msg.start_line.version == HTTP_1_1
+
   def _PrepareMessage(self):
     """Prepares the HTTP message by setting mandatory headers.
 
@@ -768,7 +828,9 @@ class HttpMessageWriter(object):
     # RFC2616, section 4.3: "The presence of a message-body in a request is
     # signaled by the inclusion of a Content-Length or Transfer-Encoding header
     # field in the request's message-headers."
-    if self._msg.body:
+    if self._UseChunkedEncoding():
+      self._msg.headers[HTTP_TRANSFER_ENCODING] = HTTP_CHUNKED
+    elif self._msg.body and not self._IsStreaming():
       self._msg.headers[HTTP_CONTENT_LENGTH] = len(self._msg.body)
 
   def _FormatMessage(self):
@@ -788,8 +850,11 @@ class HttpMessageWriter(object):
 
     buf.write("\r\n")
 
-    # Add message body if needed
-    if self.HasMessageBody():
+    # Add message body if needed, streaming bodies are sent separately
+    if self._IsStreaming():
+      pass
+
+    elif self.HasMessageBody():
       buf.write(self._msg.body.decode())
 
     elif self._msg.body:
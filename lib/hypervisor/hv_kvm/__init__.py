@@ -75,6 +75,7 @@ from ganeti.hypervisor.hv_kvm.netdev import OpenTap
 from ganeti.hypervisor.hv_kvm.validation import check_boot_parameters, \
                                                 check_console_parameters, \
                                                 check_disk_cache_parameters, \
+                                                check_migration_parameters, \
                                                 check_security_model,\
                                                 check_spice_parameters, \
                                                 check_vnc_parameters, \
@@ -82,7 +83,8 @@ from ganeti.hypervisor.hv_kvm.validation import check_boot_parameters, \
                                                 validate_security_model, \
                                                 validate_spice_parameters, \
                                                 validate_vnc_parameters, \
-                                                validate_disk_parameters
+                                                validate_disk_parameters, \
+                                                validate_migration_parameters
 
 import ganeti.hypervisor.hv_kvm.kvm_utils as kvm_utils
 
@@ -167,6 +169,120 @@ _MIGRATION_CAPS_DELIM = ":"
 # in future make dirty_sync_count configurable
 _POSTCOPY_SYNC_COUNT_THRESHOLD = 2 # Precopy passes before enabling postcopy
 
+# Adaptive migration tuning, see L{_AdaptMigration}
+_MIGRATION_ADAPT_BANDWIDTH = "bandwidth"
+_MIGRATION_ADAPT_DOWNTIME = "downtime"
+_MIGRATION_ADAPT_POSTCOPY = "postcopy"
+# The migration is considered stuck if the guest dirties memory at least at
+# this fraction of the achieved transfer rate
+_MIGRATION_DIRTY_RATE_RATIO = 0.9
+# The bandwidth limit is only raised if the transfer actually runs into it
+_MIGRATION_BANDWIDTH_SATURATION = 0.9
+_MIGRATION_DEFAULT_PAGE_SIZE = 4096
+
+
+def _GetMigrationCapabilities(hvparams):
+  """Return the QEMU migration capabilities configured for an instance.
+
+  This combines the free-form L{constants.HV_KVM_MIGRATION_CAPS} list with
+  the capabilities implied by the dedicated migration parameters.
+
+  @type hvparams: dict
+  @param hvparams: the instance's hypervisor parameters
+  @rtype: list of strings
+
+  """
+  caps = []
+  if hvparams[constants.HV_KVM_MIGRATION_CAPS]:
+    caps.extend(hvparams[constants.HV_KVM_MIGRATION_CAPS]
+                .split(_MIGRATION_CAPS_DELIM))
+  if hvparams[constants.HV_KVM_MIGRATION_MULTIFD_CHANNELS] > 0:
+    caps.append("multifd")
+  if (hvparams[constants.HV_KVM_MIGRATION_COMPRESSION] ==
+      constants.HT_MIGRATION_COMPRESSION_XBZRLE):
+    caps.append("xbzrle")
+  if hvparams[constants.HV_KVM_MIGRATION_AUTO_CONVERGE]:
+    caps.append("auto-converge")
+  return utils.UniqueSequence(caps)
+
+
+def _GetMigrationThroughput(query_migrate):
+  """Return the throughput of a migration in bytes per second.
+
+  For a completed migration this is the average over the whole migration,
+  otherwise the current transfer rate.
+
+  @type query_migrate: dict
+  @param query_migrate: the result of the C{query-migrate} QMP command
+  @rtype: float or None
+
+  """
+  ram = query_migrate.get("ram", {})
+  total_time = query_migrate.get("total-time")
+  if (query_migrate.get("status") == constants.HV_MIGRATION_COMPLETED and
+      total_time and "transferred" in ram):
+    return ram["transferred"] * 1000.0 / total_time
+  if "mbps" in ram:
+    # QEMU reports the throughput in megabits per second
+    return ram["mbps"] * 1000000 / 8
+  return None
+
+
+def _AdaptMigration(query_migrate, parameters, hvparams):
+  """Decide how to tune a live migration which does not converge.
+
+  A migration can only complete once the remaining dirty memory can be
+  sent within the allowed downtime. If the guest dirties memory about as
+  fast as it can be transferred, this never happens. In that case the
+  bandwidth limit is raised first (as long as the transfer is limited by
+  it), then the allowed downtime and finally, if the instance allows it,
+  the migration is switched to postcopy mode.
+
+  @type query_migrate: dict
+  @param query_migrate: the result of the C{query-migrate} QMP command
+  @type parameters: dict
+  @param parameters: the result of the C{query-migrate-parameters} QMP command
+  @type hvparams: dict
+  @param hvparams: the instance's hypervisor parameters
+  @rtype: tuple or None
+  @return: C{None} if the migration should be left alone, otherwise a
+      tuple of one of the C{_MIGRATION_ADAPT_*} actions and the new value
+      (in bytes per second for bandwidth and milliseconds for downtime)
+
+  """
+  ram = query_migrate.get("ram")
+  if query_migrate.get("status") != constants.HV_MIGRATION_ACTIVE or not ram:
+    return None
+  # Wait for the first full pass, dirty page statistics are only meaningful
+  # afterwards
+  if ram.get("dirty-sync-count", 0) < _POSTCOPY_SYNC_COUNT_THRESHOLD:
+    return None
+
+  page_size = ram.get("page-size", _MIGRATION_DEFAULT_PAGE_SIZE)
+  dirty_rate = ram.get("dirty-pages-rate", 0) * page_size
+  throughput = _GetMigrationThroughput(query_migrate) or 0
+  if dirty_rate < throughput * _MIGRATION_DIRTY_RATE_RATIO:
+    return None
+
+  bandwidth = parameters["max-bandwidth"]
+  max_bandwidth = \
+      hvparams[constants.HV_KVM_MIGRATION_MAX_BANDWIDTH] * 1024 * 1024
+  if (bandwidth < max_bandwidth and
+      throughput >= bandwidth * _MIGRATION_BANDWIDTH_SATURATION):
+    return (_MIGRATION_ADAPT_BANDWIDTH, min(max_bandwidth, 2 * bandwidth))
+
+  downtime = parameters["downtime-limit"]
+  max_downtime = hvparams[constants.HV_KVM_MIGRATION_MAX_DOWNTIME]
+  if downtime < max_downtime:
+    wanted = max(2 * downtime, query_migrate.get("expected-downtime", 0))
+    return (_MIGRATION_ADAPT_DOWNTIME, min(max_downtime, wanted))
+
+  if "postcopy-ram" in _GetMigrationCapabilities(hvparams):
+    return (_MIGRATION_ADAPT_POSTCOPY, None)
+
+  return None
+
+
 def _with_qmp(fn):
   """Wrapper used on hotplug related methods"""
   def wrapper(self, *args, **kwargs):
@@ -598,6 +714,15 @@ class KVMHypervisor(hv_base.BaseHypervisor):
     constants.HV_KVM_EXTRA: hv_base.NO_CHECK,
     constants.HV_KVM_MACHINE_VERSION: hv_base.NO_CHECK,
     constants.HV_KVM_MIGRATION_CAPS: hv_base.NO_CHECK,
+    constants.HV_KVM_MIGRATION_ADAPTIVE: hv_base.NO_CHECK,
+    constants.HV_KVM_MIGRATION_AUTO_CONVERGE: hv_base.NO_CHECK,
+    constants.HV_KVM_MIGRATION_COMPRESSION:
+      hv_base.ParamInSet(
+        True, constants.HT_KVM_VALID_MIGRATION_COMPRESSION_TYPES),
+    constants.HV_KVM_MIGRATION_MAX_BANDWIDTH: hv_base.REQ_NONNEGATIVE_INT_CHECK,
+    constants.HV_KVM_MIGRATION_MAX_DOWNTIME: hv_base.REQ_NONNEGATIVE_INT_CHECK,
+    constants.HV_KVM_MIGRATION_MULTIFD_CHANNELS:
+      hv_base.REQ_NONNEGATIVE_INT_CHECK,
     constants.HV_KVM_PCI_RESERVATIONS:
       (False, lambda x: (x >= 0 and x <= constants.QEMU_PCI_SLOTS),
        "The number of PCI slots managed by QEMU (max: %s)" %
@@ -1044,10 +1169,19 @@ class KVMHypervisor(hv_base.BaseHypervisor):
     @type instance: L{objects.Instance} object
     @param instance: the VM this command acts upon
     """
-    migration_caps = instance.hvparams[constants.HV_KVM_MIGRATION_CAPS]
+    migration_caps = _GetMigrationCapabilities(instance.hvparams)
     if migration_caps:
-      migration_caps_list = migration_caps.split(_MIGRATION_CAPS_DELIM)
-      self.qmp.SetMigrationCapabilities(migration_caps_list, True)
+      self.qmp.SetMigrationCapabilities(migration_caps, True)
+
+    # Both sides need to agree on the number of channels and the compression
+    channels = instance.hvparams[constants.HV_KVM_MIGRATION_MULTIFD_CHANNELS]
+    if channels > 0:
+      compression = None
+      if (instance.hvparams[constants.HV_KVM_MIGRATION_COMPRESSION] ==
+          constants.HT_MIGRATION_COMPRESSION_ZSTD):
+        compression = constants.HT_MIGRATION_COMPRESSION_ZSTD
+      self.qmp.SetMigrationParameters(multifd_channels=channels,
+                                      multifd_compression=compression)
 
   @_with_qmp
   def _ClearInstanceMigrationCapabilities(self, instance):
@@ -1056,10 +1190,26 @@ class KVMHypervisor(hv_base.BaseHypervisor):
     @type instance: L{objects.Instance} object
     @param instance: the VM this command acts upon
     """
-    migration_caps = instance.hvparams[constants.HV_KVM_MIGRATION_CAPS]
+    migration_caps = _GetMigrationCapabilities(instance.hvparams)
     if migration_caps:
-      migration_caps_list = migration_caps.split(_MIGRATION_CAPS_DELIM)
-      self.qmp.SetMigrationCapabilities(migration_caps_list, False)
+      self.qmp.SetMigrationCapabilities(migration_caps, False)
+
+  @_with_qmp
+  def _StartIncomingMigration(self, instance, target, port):
+    """Start listening for an incoming migration
+
+    This is needed if the instance has been started with C{-incoming defer},
+    see L{_ExecuteKVMRuntime}.
+
+    @type instance: L{objects.Instance} object
+    @param instance: the VM this command acts upon
+    @type target: string
+    @param target: the address to listen on
+    @type port: int
+    @param port: the port to listen on
+
+    """
+    self.qmp.StartIncomingMigration(target, port)
 
   def ListInstances(self, hvparams=None):
     """Get the list of running instances.
@@ -1982,8 +2132,13 @@ class KVMHypervisor(hv_base.BaseHypervisor):
           kvm_cmd.extend(["-net", tap_val, "-net", nic_val])
 
     if incoming:
-      target, port = incoming
-      kvm_cmd.extend(["-incoming", "tcp:%s:%s" % (target, port)])
+      if conf_hvp[constants.HV_KVM_MIGRATION_MULTIFD_CHANNELS] > 0:
+        # multifd has to be set up before QEMU starts listening, which
+        # happens in AcceptInstance
+        kvm_cmd.extend(["-incoming", "defer"])
+      else:
+        target, port = incoming
+        kvm_cmd.extend(["-incoming", "tcp:%s:%s" % (target, port)])
 
     # Changing the vnc password doesn't bother the guest that much. At most it
     # will surprise people who connect to it. Whether positively or negatively
@@ -2512,6 +2667,8 @@ class KVMHypervisor(hv_base.BaseHypervisor):
     self._ExecuteKVMRuntime(instance, kvm_runtime, kvmhelp,
                             incoming=incoming_address)
     self._SetInstanceMigrationCapabilities(instance)
+    if instance.hvparams[constants.HV_KVM_MIGRATION_MULTIFD_CHANNELS] > 0:
+      self._StartIncomingMigration(instance, *incoming_address)
 
   def _ConfigureRoutedNICs(self, instance, info):
     """Configures all NICs in routed mode
@@ -2614,6 +2771,46 @@ class KVMHypervisor(hv_base.BaseHypervisor):
       else:
         self.CleanupInstance(instance.name)
 
+  @_with_qmp
+  def _TuneMigration(self, instance, query_migrate, migration_status):
+    """Adapt the parameters of a running migration
+
+    See L{_AdaptMigration} for the logic. Any change made is recorded in
+    the C{adjustments} field of the migration status, so that it can be
+    reported to the user.
+
+    @type instance: L{objects.Instance}
+    @param instance: the instance that is being migrated
+    @type query_migrate: dict
+    @param query_migrate: the result of the C{query-migrate} QMP command
+    @type migration_status: L{objects.MigrationStatus}
+    @param migration_status: the migration status to update
+
+    """
+    parameters = self.qmp.GetMigrationParameters()
+    adjustment = _AdaptMigration(query_migrate, parameters, instance.hvparams)
+    if adjustment is None:
+      return
+
+    (action, value) = adjustment
+    if action == _MIGRATION_ADAPT_BANDWIDTH:
+      self.qmp.SetMigrationParameters(max_bandwidth=value)
+      msg = ("raised migration bandwidth limit to %d MiB/s" %
+             (value // (1024 * 1024)))
+    elif action == _MIGRATION_ADAPT_DOWNTIME:
+      self.qmp.SetMigrationParameters(downtime_limit=value)
+      msg = "raised migration downtime limit to %d ms" % value
+    else:
+      self.qmp.StartPostcopyMigration()
+      migration_status.postcopy_status = \
+          constants.HV_KVM_MIGRATION_POSTCOPY_ACTIVE
+      msg = "switched migration to postcopy mode"
+
+    logging.info("Instance %s is not converging (dirty rate %s pages/s): %s",
+                 instance.name, query_migrate["ram"].get("dirty-pages-rate"),
+                 msg)
+    migration_status.adjustments = [msg]
+
   @_with_qmp
   def GetMigrationStatus(self, instance):
     """Get the migration status
@@ -2638,8 +2835,14 @@ class KVMHypervisor(hv_base.BaseHypervisor):
             migration_status.transferred_ram = \
                 query_migrate["ram"]["transferred"]
             migration_status.total_ram = query_migrate["ram"]["total"]
+            migration_status.throughput = \
+                _GetMigrationThroughput(query_migrate)
 
             migration_status.postcopy_status = None
+            if instance.hvparams[constants.HV_KVM_MIGRATION_ADAPTIVE]:
+              self._TuneMigration(instance, query_migrate, migration_status)
+              return migration_status
+
             migration_caps = instance.hvparams[constants.HV_KVM_MIGRATION_CAPS]
             # migration_caps is a ':' delimited string, so checking
             # if 'postcopy-ram' is a substring also covers using
@@ -2783,6 +2986,7 @@ class KVMHypervisor(hv_base.BaseHypervisor):
     check_vnc_parameters(hvparams)
     check_spice_parameters(hvparams)
     check_disk_cache_parameters(hvparams)
+    check_migration_parameters(hvparams)
 
   @classmethod
   def ValidateParameters(cls, hvparams):
@@ -2806,6 +3010,7 @@ class KVMHypervisor(hv_base.BaseHypervisor):
     kvmpath = constants.KVM_PATH
     kvm_version = cls._GetKVMVersion(kvmpath)
     validate_disk_parameters(hvparams, kvm_version)
+    validate_migration_parameters(hvparams, kvm_version)
 
     kvm_output = cls._GetKVMOutput(kvm_path, cls._KVMOPT_MLIST)
     validate_machine_version(hvparams, kvm_output)
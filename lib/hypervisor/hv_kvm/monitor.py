@@ -704,21 +704,40 @@ class QmpConnection(QemuMonitorSocket):
                 if "dynamic-auto-read-only" in x.get("features",[])])
 
   @_ensure_connection
-  def SetMigrationParameters(self, max_bandwidth, downtime_limit):
+  def SetMigrationParameters(self, max_bandwidth=None, downtime_limit=None,
+                             multifd_channels=None, multifd_compression=None):
     """Configute live migration parameters
 
+    Parameters which are C{None} are left unchanged.
+
     """
 
-    arguments = {
-      "max-bandwidth": max_bandwidth,
-      "downtime-limit": downtime_limit,
-    }
+    arguments = {}
+
+    if max_bandwidth is not None:
+      arguments["max-bandwidth"] = max_bandwidth
+      if self.version >= (3, 0, 0):
+        arguments["max-postcopy-bandwidth"] = max_bandwidth
+
+    if downtime_limit is not None:
+      arguments["downtime-limit"] = downtime_limit
+
+    if multifd_channels is not None:
+      arguments["multifd-channels"] = multifd_channels
 
-    if self.version >= (3, 0, 0):
-      arguments["max-postcopy-bandwidth"] = max_bandwidth
+    if multifd_compression is not None:
+      arguments["multifd-compression"] = multifd_compression
 
     self.execute_qmp("migrate-set-parameters", arguments)
 
+  @_ensure_connection
+  def GetMigrationParameters(self):
+    """Retrieve the current live migration parameters
+
+    """
+
+    return self.execute_qmp("query-migrate-parameters")
+
   @_ensure_connection
   def SetMigrationCapabilities(self, capabilities, state):
     """Configure live migration capabilities
@@ -764,6 +783,20 @@ class QmpConnection(QemuMonitorSocket):
 
     self.execute_qmp("migrate", arguments)
 
+  @_ensure_connection
+  def StartIncomingMigration(self, target, port):
+    """Start listening for an incoming migration
+
+    Only valid if QEMU has been started with C{-incoming defer}.
+
+    """
+
+    arguments = {
+      "uri": "tcp:%s:%s" % (target, port)
+    }
+
+    self.execute_qmp("migrate-incoming", arguments)
+
   @_ensure_connection
   def StartPostcopyMigration(self):
     """ Start postcopy-ram migration
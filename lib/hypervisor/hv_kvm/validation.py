@@ -215,3 +215,38 @@ def validate_disk_parameters(hvparams, kvm_version):
         if v_maj < 5:
             raise errors.HypervisorError("At least QEMU 5.0 required to use"
                                          "'disk_aio=io_uring'.")
+
+
+def check_migration_parameters(hvparams):
+    compression = hvparams[constants.HV_KVM_MIGRATION_COMPRESSION]
+    channels = hvparams[constants.HV_KVM_MIGRATION_MULTIFD_CHANNELS]
+    if compression == constants.HT_MIGRATION_COMPRESSION_ZSTD and \
+            channels < 1:
+        raise errors.HypervisorError("'migration_compression=zstd' requires"
+                                     " 'migration_multifd_channels' to be"
+                                     " set.")
+    if compression == constants.HT_MIGRATION_COMPRESSION_XBZRLE and \
+            channels > 0:
+        raise errors.HypervisorError("'migration_compression=xbzrle' can not"
+                                     " be used together with"
+                                     " 'migration_multifd_channels'.")
+    for (param, base) in [(constants.HV_KVM_MIGRATION_MAX_BANDWIDTH,
+                           constants.HV_MIGRATION_BANDWIDTH),
+                          (constants.HV_KVM_MIGRATION_MAX_DOWNTIME,
+                           constants.HV_MIGRATION_DOWNTIME)]:
+        if hvparams[param] and hvparams[param] < hvparams[base]:
+            raise errors.HypervisorError("'%s' must not be lower than '%s'" %
+                                         (param, base))
+    return True
+
+
+def validate_migration_parameters(hvparams, kvm_version):
+    v_all, v_maj, v_min, v_rev = kvm_version
+
+    if hvparams[constants.HV_KVM_MIGRATION_MULTIFD_CHANNELS] > 0 and v_maj < 4:
+        raise errors.HypervisorError("At least QEMU 4.0 required to use"
+                                     " 'migration_multifd_channels'.")
+    if (hvparams[constants.HV_KVM_MIGRATION_COMPRESSION] ==
+            constants.HT_MIGRATION_COMPRESSION_ZSTD and v_maj < 5):
+        raise errors.HypervisorError("At least QEMU 5.0 required to use"
+                                     " 'migration_compression=zstd'.")
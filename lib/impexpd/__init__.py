@@ -336,7 +336,8 @@ class CommandBuilder(object):
       parts.append(socat_cmd)
 
       if compr in [constants.IEC_GZIP, constants.IEC_GZIP_FAST,
-                   constants.IEC_GZIP_SLOW, constants.IEC_LZOP]:
+                   constants.IEC_GZIP_SLOW, constants.IEC_LZOP,
+                   constants.IEC_PIGZ, constants.IEC_ZSTD]:
         utility_name = constants.IEC_COMPRESSION_UTILITIES.get(compr, compr)
         parts.append("%s -d -c" % utility_name)
       elif compr != constants.IEC_NONE:
@@ -355,6 +356,12 @@ class CommandBuilder(object):
         parts.append("%s -c" % utility_name)
       elif compr in [constants.IEC_GZIP_FAST, constants.IEC_GZIP]:
         parts.append("gzip -1 -c")
+      elif compr == constants.IEC_PIGZ:
+        # pigz uses one compression thread per online core by default
+        parts.append("pigz -1 -c")
+      elif compr == constants.IEC_ZSTD:
+        # Let zstd(1) pick the number of worker threads from the core count
+        parts.append("zstd -T0 -c")
       elif compr != constants.IEC_NONE:
         parts.append(compr)
       else:
@@ -628,6 +635,44 @@ class ChildIOProcessor(object):
     self._status_file.SetProgress(mbytes, throughput, percent, eta)
 
 
+def CombineProgress(progress, exp_size):
+  """Combines the progress of several streams transferring one piece of data.
+
+  @type progress: list of tuples
+  @param progress: Progress information as reported by each stream, a tuple
+    of (mbytes, throughput, percent, eta) or C{None} if not yet available
+  @type exp_size: number or None
+  @param exp_size: Expected size of all streams together (MiB)
+  @rtype: tuple
+  @return: Combined progress as (mbytes, throughput, percent, eta), or C{None}
+    if no stream has reported progress yet
+
+  """
+  reported = [i for i in progress if i and i[0] is not None]
+  if not reported:
+    return None
+
+  mbytes = sum(i[0] for i in reported)
+
+  throughputs = [i[1] for i in reported if i[1] is not None]
+  if throughputs:
+    throughput = sum(throughputs)
+  else:
+    throughput = None
+
+  percent = None
+  eta = None
+
+  if exp_size is not None:
+    if exp_size != 0:
+      percent = max(0, min(100, (100.0 * mbytes) / exp_size))
+
+    if throughput:
+      eta = max(0, float(exp_size - mbytes) / throughput)
+
+  return (mbytes, throughput, percent, eta)
+
+
 def _CalcThroughput(samples):
   """Calculates the throughput in MiB/second.
 
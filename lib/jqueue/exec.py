@@ -28,163 +28,225 @@
 # SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 
-"""Module implementing executing of a job as a separate process
+"""Script starting the execution of a job as a separate process
+
+Importing Ganeti and setting up the job processing takes longer than most
+short jobs need to run. Therefore jobs are preferably executed by processes
+forked from a zygote, a long-running process which has already imported
+everything (see L{ganeti.jqueue.executor.Zygote}). This script only passes
+its standard input, output and error, connected to the master process, to the
+zygote, and stays around until the job process exits, forwarding the signals
+it receives. The job process itself performs the handshake with the master
+process, so the protocol described in the haskell module Ganeti.Query.Exec
+stays the same.
+
+If no zygote is running, or it runs a different version of the code, a new one
+is started in the background and the job is executed by this process. The
+zygote exits together with the master process starting it.
 
-The complete protocol of initializing a job is described in the haskell
-module Ganeti.Query.Exec
 """
 
-import contextlib
-import logging
+import array
+import json
 import os
 import signal
+import socket
+import struct
+import subprocess
 import sys
-import time
 
-from ganeti import mcpu
-from ganeti.server import masterd
-from ganeti.rpc import transport
-from ganeti import serializer
-from ganeti import utils
+from ganeti import constants
 from ganeti import pathutils
-from ganeti.utils import livelock
 
-from ganeti.jqueue import _JobProcessor
 
+#: Command line argument starting a zygote instead of a job
+_ZYGOTE_ARG = "--zygote"
 
-def _SetupJob():
-  """Setup the process to execute the job
+#: Signals forwarded to the job process
+_FORWARDED_SIGNALS = (signal.SIGTERM, signal.SIGHUP, signal.SIGUSR1)
 
-  Retrieve the job id from argv, create a livelock and pass it to the master
-  process and finally obtain any secret parameters.
+#: Exit status reported if the job process died without reporting one
+_UNKNOWN_STATUS = 1
 
-  This also closes standard input/output.
+# Structure returned by getsockopt(SOL_SOCKET, SO_PEERCRED, ...), see
+# L{ganeti.netutils.GetSocketCredentials}, which isn't imported to keep the
+# start of jobs fast
+_STRUCT_UCRED = "iII"
 
-  @rtype: (int, string, json encoding of a list of dicts)
+
+def _LoadExecutor():
+  """Imports the job executor, together with the rest of Ganeti.
+
+  This is deferred to keep the start of jobs executed by a zygote fast.
 
   """
-  job_id = int(sys.argv[1])
-  ts = time.time()
-  llock = livelock.LiveLock("job_%06d" % job_id)
-  logging.debug("Opening transport over stdin/out")
-  with contextlib.closing(transport.FdTransport((0, 1))) as trans:
-    logging.debug("Sending livelock name to master")
-    trans.Call(llock.GetPath()) # pylint: disable=E1101
-    logging.debug("Reading secret parameters from the master process")
-    secret_params = trans.Call("") # pylint: disable=E1101
-    logging.debug("Got secret parameters.")
-  return (job_id, llock, secret_params)
+  from ganeti.jqueue import executor # pylint: disable=C0415
+  return executor
 
 
-def RestorePrivateValueWrapping(json):
-  """Wrap private values in JSON decoded structure.
+def _GetCodeVersion():
+  """Returns an identifier of the code a zygote runs.
 
-  @param json: the json-decoded value to protect.
+  A zygote only forks job processes for the installed Ganeti version it was
+  started by, so that jobs don't keep running old code after an upgrade.
 
   """
-  result = []
+  package = os.path.dirname(os.path.realpath(constants.__file__))
+  return "%s:%s:%s" % (constants.RELEASE_VERSION, constants.VCS_VERSION,
+                       package)
 
-  for secrets_dict in json:
-    if secrets_dict is None:
-      data = serializer.PrivateDict()
-    else:
-      data = serializer.PrivateDict(secrets_dict)
-    result.append(data)
-  return result
 
+def _GetPeerUid(sock):
+  """Returns the user ID of the process at the other end of a Unix socket.
 
-def main():
+  """
+  peercred = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED,
+                             struct.calcsize(_STRUCT_UCRED))
+  (_, uid, _) = struct.unpack(_STRUCT_UCRED, peercred)
+  return uid
 
-  debug = int(os.environ["GNT_DEBUG"])
 
-  logname = pathutils.GetLogFilename("jobs")
-  utils.SetupLogging(logname, "job-startup", debug=debug)
+def _ForwardSignals(pid):
+  """Forwards the signals sent by the master process to the job process.
+
+  """
+  def _Handler(signum, _frame):
+    try:
+      os.kill(pid, signum)
+    except OSError:
+      pass
+
+  for signum in _FORWARDED_SIGNALS:
+    signal.signal(signum, _Handler)
 
-  (job_id, llock, secret_params_serialized) = _SetupJob()
 
-  secret_params = ""
-  if secret_params_serialized:
-    secret_params_json = serializer.LoadJson(secret_params_serialized)
-    secret_params = RestorePrivateValueWrapping(secret_params_json)
+def _ReadStatus(fd):
+  """Reads the exit status the job process reports before exiting.
 
-  utils.SetupLogging(logname, "job-%s" % (job_id,), debug=debug)
+  The job process holds the only writing end of the pipe, so this returns
+  once it has exited.
+
+  @type fd: int
+  @param fd: the reading end of the status pipe
+  @rtype: int
+
+  """
+  data = b""
+  while True:
+    chunk = os.read(fd, 64)
+    if not chunk:
+      break
+    data += chunk
 
   try:
-    logging.debug("Preparing the context and the configuration")
-    context = masterd.GanetiContext(llock)
-
-    logging.debug("Registering signal handlers")
-
-    cancel = [False]
-    prio_change = [False]
-
-    def _TermHandler(signum, _frame):
-      logging.info("Killed by signal %d", signum)
-      cancel[0] = True
-    signal.signal(signal.SIGTERM, _TermHandler)
-
-    def _HupHandler(signum, _frame):
-      logging.debug("Received signal %d, old flag was %s, will set to True",
-                    signum, mcpu.sighupReceived)
-      mcpu.sighupReceived[0] = True
-    signal.signal(signal.SIGHUP, _HupHandler)
-
-    def _User1Handler(signum, _frame):
-      logging.info("Received signal %d, indicating priority change", signum)
-      prio_change[0] = True
-    signal.signal(signal.SIGUSR1, _User1Handler)
-
-    job = context.jobqueue.SafeLoadJobFromDisk(job_id, False)
-
-    job.SetPid(os.getpid())
-
-    if secret_params:
-      for i in range(0, len(secret_params)):
-        if hasattr(job.ops[i].input, "osparams_secret"):
-          job.ops[i].input.osparams_secret = secret_params[i]
-
-    execfun = mcpu.Processor(context, job_id, job_id).ExecOpCode
-    proc = _JobProcessor(context.jobqueue, execfun, job)
-    result = _JobProcessor.DEFER
-    while result != _JobProcessor.FINISHED:
-      result = proc()
-      if result == _JobProcessor.WAITDEP and not cancel[0]:
-        # Normally, the scheduler should avoid starting a job where the
-        # dependencies are not yet finalised. So warn, but wait an continue.
-        logging.warning("Got started despite a dependency not yet finished")
-        time.sleep(5)
-      if cancel[0]:
-        logging.debug("Got cancel request, cancelling job %d", job_id)
-        r = context.jobqueue.CancelJob(job_id)
-        job = context.jobqueue.SafeLoadJobFromDisk(job_id, False)
-        proc = _JobProcessor(context.jobqueue, execfun, job)
-        logging.debug("CancelJob result for job %d: %s", job_id, r)
-        cancel[0] = False
-      if prio_change[0]:
-        logging.debug("Received priority-change request")
-        try:
-          fname = os.path.join(pathutils.LUXID_MESSAGE_DIR, "%d.prio" % job_id)
-          new_prio = int(utils.ReadFile(fname))
-          utils.RemoveFile(fname)
-          logging.debug("Changing priority of job %d to %d", job_id, new_prio)
-          r = context.jobqueue.ChangeJobPriority(job_id, new_prio)
-          job = context.jobqueue.SafeLoadJobFromDisk(job_id, False)
-          proc = _JobProcessor(context.jobqueue, execfun, job)
-          logging.debug("Result of changing priority of %d to %d: %s", job_id,
-                        new_prio, r)
-        except Exception: # pylint: disable=W0703
-          logging.warning("Informed of priority change, but could not"
-                          " read new priority")
-        prio_change[0] = False
-
-  except Exception: # pylint: disable=W0703
-    logging.exception("Exception when trying to run job %d", job_id)
+    return int(data.strip())
+  except ValueError:
+    # The job process was killed by a signal; only the zygote knows which
+    return _UNKNOWN_STATUS
+
+
+def _ExecuteInZygote(job_id, debug, path=pathutils.JOB_ZYGOTE_SOCKET):
+  """Lets the zygote fork a process executing the job.
+
+  Besides its standard input, output and error, this process passes the
+  writing end of a pipe, on which the job process reports its exit status.
+  This way the status is known even if the zygote exits first.
+
+  @type job_id: int
+  @param job_id: the job to execute
+  @type debug: int
+  @param debug: the debug level of the logging
+  @type path: string
+  @param path: the path of the socket of the zygote
+  @rtype: int or None
+  @return: the exit status of the job process, or C{None} if the job has to
+      be executed by this process
+
+  """
+  sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+  (status_read, status_write) = os.pipe()
+  try:
+    request = json.dumps({
+      "job_id": job_id,
+      "debug": debug,
+      "version": _GetCodeVersion(),
+      })
+    fds = array.array("i", (0, 1, 2, status_write))
+    try:
+      sock.connect(path)
+      if _GetPeerUid(sock) != os.getuid():
+        # Don't hand the connection to the master process to a stranger
+        return None
+      sock.sendmsg([request.encode() + b"\n"],
+                   [(socket.SOL_SOCKET, socket.SCM_RIGHTS, fds)])
+      os.close(status_write)
+      status_write = None
+      replies = sock.makefile("rb")
+      reply = replies.readline().strip()
+    except EnvironmentError:
+      return None
+
+    if not reply:
+      # The zygote refused the request, e.g. because it runs other code
+      return None
+
+    pid = int(reply)
+    _ForwardSignals(pid)
+
+    # The job process has taken over the connection to the master process
+    null_fd = os.open(os.devnull, os.O_RDWR)
+    os.dup2(null_fd, 0)
+    os.dup2(null_fd, 1)
+    os.close(null_fd)
+
+    try:
+      status = replies.readline().strip()
+    except EnvironmentError:
+      status = None
+    if status:
+      return int(status)
+
+    # The zygote is gone, wait for the job process ourselves
+    return _ReadStatus(status_read)
   finally:
-    logging.debug("Job %d finalized", job_id)
-    logging.debug("Removing livelock file %s", llock.GetPath())
-    os.remove(llock.GetPath())
+    sock.close()
+    os.close(status_read)
+    if status_write is not None:
+      os.close(status_write)
+
+
+def _StartZygote():
+  """Starts a zygote in the background, to be used by the following jobs.
+
+  The zygote is passed the process ID of the master process, this process'
+  parent, so that it can exit when the master process stops.
+
+  """
+  subprocess.Popen([sys.executable, os.path.abspath(__file__), _ZYGOTE_ARG,
+                    str(os.getppid())],
+                   stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                   stderr=subprocess.DEVNULL, close_fds=True,
+                   start_new_session=True)
+
 
+def main():
+  debug = int(os.environ["GNT_DEBUG"])
+
+  if sys.argv[1] == _ZYGOTE_ARG:
+    _LoadExecutor().Zygote(pathutils.JOB_ZYGOTE_SOCKET, _GetCodeVersion(),
+                           int(sys.argv[2]), debug).Run()
+    sys.exit(0)
+
+  job_id = int(sys.argv[1])
+
+  status = _ExecuteInZygote(job_id, debug)
+  if status is not None:
+    sys.exit(status)
+
+  _StartZygote()
+  _LoadExecutor().RunJob(job_id, debug)
   sys.exit(0)
 
-if __name__ == '__main__':
+
+if __name__ == "__main__":
   main()
@@ -0,0 +1,534 @@
+#
+#
+
+# Copyright (C) 2026 the Ganeti project
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""Module implementing executing of a job as a separate process
+
+The complete protocol of initializing a job is described in the haskell
+module Ganeti.Query.Exec. The process is started by L{ganeti.jqueue.exec},
+either directly or by forking a pre-initialized zygote.
+"""
+
+import array
+import contextlib
+import gc
+import json
+import logging
+import os
+import select
+import signal
+import socket
+import time
+
+from ganeti import errors
+from ganeti import mcpu
+from ganeti import netutils
+from ganeti.server import masterd
+from ganeti.rpc import transport
+from ganeti import serializer
+from ganeti import utils
+from ganeti import pathutils
+from ganeti.utils import livelock
+
+from ganeti.jqueue import _JobProcessor
+
+
+def _SetupJob(job_id):
+  """Setup the process to execute the job
+
+  Create a livelock and pass it to the master process and finally obtain any
+  secret parameters.
+
+  This also closes standard input/output.
+
+  @type job_id: int
+  @param job_id: the job to execute
+  @rtype: (int, string, json encoding of a list of dicts)
+
+  """
+  llock = livelock.LiveLock("job_%06d" % job_id)
+  logging.debug("Opening transport over stdin/out")
+  with contextlib.closing(transport.FdTransport((0, 1))) as trans:
+    logging.debug("Sending livelock name to master")
+    trans.Call(llock.GetPath()) # pylint: disable=E1101
+    logging.debug("Reading secret parameters from the master process")
+    secret_params = trans.Call("") # pylint: disable=E1101
+    logging.debug("Got secret parameters.")
+  return (job_id, llock, secret_params)
+
+
+def RestorePrivateValueWrapping(json):
+  """Wrap private values in JSON decoded structure.
+
+  @param json: the json-decoded value to protect.
+
+  """
+  result = []
+
+  for secrets_dict in json:
+    if secrets_dict is None:
+      data = serializer.PrivateDict()
+    else:
+      data = serializer.PrivateDict(secrets_dict)
+    result.append(data)
+  return result
+
+
+def RunJob(job_id, debug):
+  """Executes a job in the current process.
+
+  Standard input and output must be connected to the master process.
+
+  @type job_id: int
+  @param job_id: the job to execute
+  @type debug: int
+  @param debug: the debug level of the logging
+
+  """
+  logname = pathutils.GetLogFilename("jobs")
+  utils.SetupLogging(logname, "job-startup", debug=debug)
+
+  (job_id, llock, secret_params_serialized) = _SetupJob(job_id)
+
+  secret_params = ""
+  if secret_params_serialized:
+    secret_params_json = serializer.LoadJson(secret_params_serialized)
+    secret_params = RestorePrivateValueWrapping(secret_params_json)
+
+  utils.SetupLogging(logname, "job-%s" % (job_id,), debug=debug)
+
+  try:
+    logging.debug("Preparing the context and the configuration")
+    context = masterd.GanetiContext(llock)
+
+    logging.debug("Registering signal handlers")
+
+    cancel = [False]
+    prio_change = [False]
+
+    def _TermHandler(signum, _frame):
+      logging.info("Killed by signal %d", signum)
+      cancel[0] = True
+    signal.signal(signal.SIGTERM, _TermHandler)
+
+    def _HupHandler(signum, _frame):
+      logging.debug("Received signal %d, old flag was %s, will set to True",
+                    signum, mcpu.sighupReceived)
+      mcpu.sighupReceived[0] = True
+    signal.signal(signal.SIGHUP, _HupHandler)
+
+    def _User1Handler(signum, _frame):
+      logging.info("Received signal %d, indicating priority change", signum)
+      prio_change[0] = True
+    signal.signal(signal.SIGUSR1, _User1Handler)
+
+    job = context.jobqueue.SafeLoadJobFromDisk(job_id, False)
+
+    job.SetPid(os.getpid())
+
+    if secret_params:
+      for i in range(0, len(secret_params)):
+        if hasattr(job.ops[i].input, "osparams_secret"):
+          job.ops[i].input.osparams_secret = secret_params[i]
+
+    execfun = mcpu.Processor(context, job_id, job_id).ExecOpCode
+    proc = _JobProcessor(context.jobqueue, execfun, job)
+    result = _JobProcessor.DEFER
+    while result != _JobProcessor.FINISHED:
+      result = proc()
+      if result == _JobProcessor.WAITDEP and not cancel[0]:
+        # Normally, the scheduler should avoid starting a job where the
+        # dependencies are not yet finalised. So warn, but wait an continue.
+        logging.warning("Got started despite a dependency not yet finished")
+        time.sleep(5)
+      if cancel[0]:
+        logging.debug("Got cancel request, cancelling job %d", job_id)
+        r = context.jobqueue.CancelJob(job_id)
+        job = context.jobqueue.SafeLoadJobFromDisk(job_id, False)
+        proc = _JobProcessor(context.jobqueue, execfun, job)
+        logging.debug("CancelJob result for job %d: %s", job_id, r)
+        cancel[0] = False
+      if prio_change[0]:
+        logging.debug("Received priority-change request")
+        try:
+          fname = os.path.join(pathutils.LUXID_MESSAGE_DIR, "%d.prio" % job_id)
+          new_prio = int(utils.ReadFile(fname))
+          utils.RemoveFile(fname)
+          logging.debug("Changing priority of job %d to %d", job_id, new_prio)
+          r = context.jobqueue.ChangeJobPriority(job_id, new_prio)
+          job = context.jobqueue.SafeLoadJobFromDisk(job_id, False)
+          proc = _JobProcessor(context.jobqueue, execfun, job)
+          logging.debug("Result of changing priority of %d to %d: %s", job_id,
+                        new_prio, r)
+        except Exception: # pylint: disable=W0703
+          logging.warning("Informed of priority change, but could not"
+                          " read new priority")
+        prio_change[0] = False
+
+  except Exception: # pylint: disable=W0703
+    logging.exception("Exception when trying to run job %d", job_id)
+  finally:
+    logging.debug("Job %d finalized", job_id)
+    logging.debug("Removing livelock file %s", llock.GetPath())
+    os.remove(llock.GetPath())
+
+
+class Zygote(object):
+  """Process forking pre-initialized job processes on request.
+
+  The zygote listens on a Unix socket, accessible only to the user it runs
+  as. A process started by the master process to execute a job (see
+  L{ganeti.jqueue.exec}) connects to it and sends a single line with a JSON
+  object containing the job ID, the debug level and the version of the code.
+  As ancillary data it passes its standard input, output and error and the
+  writing end of a pipe. The zygote forks a process executing the job with
+  these file descriptors and answers with the process ID. Before exiting, the
+  job process writes its exit status to the pipe. Once it has exited, the
+  zygote sends the exit status as well, on a line of its own; this also
+  covers job processes killed by a signal.
+
+  Requests for a different version of the code are answered with an empty
+  line; the zygote then stops accepting requests and exits as soon as its job
+  processes are done, leaving the place to a zygote running the new code. The
+  same happens when the master process exits or the zygote has been idle for
+  too long.
+
+  """
+  #: Number of file descriptors passed with each request
+  _FD_COUNT = 4
+
+  #: Permissions of the socket
+  _SOCKET_MODE = 0o600
+
+  #: Seconds after which a zygote without job processes exits
+  _IDLE_TIMEOUT = 15 * 60
+
+  #: Seconds between checks whether the master process is still running
+  _CHECK_INTERVAL = 10
+
+  def __init__(self, path, version, master_pid, debug):
+    """Initializes this class.
+
+    @type path: string
+    @param path: the path of the socket to listen on
+    @type version: string
+    @param version: the version of the code, see L{ganeti.jqueue.exec}
+    @type master_pid: int
+    @param master_pid: the process ID of the master process
+    @type debug: int
+    @param debug: the debug level of the logging
+
+    """
+    self._path = path
+    self._version = version
+    self._master_pid = master_pid
+    self._debug = debug
+    self._lock = None
+    self._listener = None
+    self._wakeup = None
+    self._master_fd = None
+    self._terminate = False
+    # Job process ID to the connection to the process which requested it
+    self._children = {}
+
+  def Run(self):
+    """Serves requests until the zygote retires.
+
+    """
+    utils.SetupLogging(pathutils.GetLogFilename("jobs"), "job-zygote",
+                       debug=self._debug)
+
+    self._lock = utils.FileLock.Open(self._path + ".lock")
+    try:
+      self._lock.Exclusive(blocking=False)
+    except errors.LockError:
+      logging.debug("Another zygote is already running")
+      return
+
+    utils.RemoveFile(self._path)
+    self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    self._listener.bind(self._path)
+    # Connections are refused until listen is called, so the socket is never
+    # accessible with the permissions resulting from the umask
+    os.chmod(self._path, self._SOCKET_MODE)
+    self._listener.listen(128)
+
+    # SIGCHLD interrupts the select call below by writing to a pipe
+    self._wakeup = os.pipe()
+    for fd in self._wakeup:
+      os.set_blocking(fd, False)
+    signal.set_wakeup_fd(self._wakeup[1])
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+    signal.signal(signal.SIGTERM, self._TermHandler)
+
+    # A process file descriptor becomes readable once the process exits;
+    # without support for them, the master process is polled
+    if hasattr(os, "pidfd_open"):
+      try:
+        self._master_fd = os.pidfd_open(self._master_pid)
+      except OSError as err:
+        logging.debug("Can't watch the master process: %s", err)
+
+    # Keep the imported modules out of garbage collections, so that their
+    # memory stays shared with the job processes
+    if hasattr(gc, "freeze"):
+      gc.freeze()
+
+    logging.info("Zygote ready, version %s", self._version)
+
+    last_active = time.time()
+    while self._listener or self._children:
+      connections = [conn for conn in self._children.values()
+                     if conn is not None]
+      readable = [self._wakeup[0]] + connections
+      if self._listener:
+        readable.append(self._listener)
+        if self._master_fd is not None:
+          readable.append(self._master_fd)
+      (readable, _, _) = select.select(readable, [], [],
+                                       min(self._IDLE_TIMEOUT,
+                                           self._CHECK_INTERVAL))
+
+      if self._wakeup[0] in readable:
+        try:
+          while os.read(self._wakeup[0], 4096):
+            pass
+        except BlockingIOError:
+          pass
+      self._ReapChildren()
+
+      for conn in readable:
+        if conn is self._listener:
+          self._Accept()
+        elif conn in connections:
+          self._CheckRequester(conn)
+
+      if self._terminate:
+        self._Retire()
+      elif self._listener and not self._IsMasterAlive():
+        logging.info("Master process %s is gone", self._master_pid)
+        self._Retire()
+      elif self._children:
+        last_active = time.time()
+      elif time.time() - last_active > self._IDLE_TIMEOUT:
+        logging.info("Zygote idle for too long")
+        self._Retire()
+
+    logging.info("Zygote exiting")
+
+  def _IsMasterAlive(self):
+    """Checks whether the master process is still running.
+
+    """
+    if self._master_fd is not None:
+      (readable, _, _) = select.select([self._master_fd], [], [], 0)
+      return not readable
+
+    try:
+      os.kill(self._master_pid, 0)
+    except ProcessLookupError:
+      return False
+    except OSError:
+      pass
+    return True
+
+  def _TermHandler(self, signum, _frame):
+    """Makes the zygote retire when it is asked to terminate.
+
+    """
+    logging.info("Received signal %d, retiring", signum)
+    self._terminate = True
+
+  def _Retire(self):
+    """Stops accepting requests.
+
+    """
+    if self._listener is None:
+      return
+    utils.RemoveFile(self._path)
+    self._listener.close()
+    self._listener = None
+    self._lock.Close()
+    if self._master_fd is not None:
+      os.close(self._master_fd)
+      self._master_fd = None
+
+  def _Accept(self):
+    """Accepts a request and forks a job process for it.
+
+    """
+    (conn, _) = self._listener.accept()
+    fds = array.array("i")
+    try:
+      (data, ancdata, _, _) = \
+        conn.recvmsg(4096, socket.CMSG_SPACE(self._FD_COUNT * fds.itemsize))
+      for (level, kind, payload) in ancdata:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+          fds.frombytes(payload[:len(payload) - len(payload) % fds.itemsize])
+      (_, uid, _) = netutils.GetSocketCredentials(conn)
+      if uid != os.getuid():
+        raise ValueError("Request from user %s" % uid)
+      request = json.loads(data.decode())
+      job_id = int(request["job_id"])
+      debug = int(request["debug"])
+      version = request["version"]
+      if len(fds) != self._FD_COUNT:
+        raise ValueError("Expected %s file descriptors, got %s" %
+                         (self._FD_COUNT, len(fds)))
+    except (EnvironmentError, ValueError, KeyError, TypeError) as err:
+      logging.error("Invalid request: %s", err)
+      self._CloseFds(fds)
+      conn.close()
+      return
+
+    if version != self._version:
+      logging.info("Got a request for version %s, retiring", version)
+      self._CloseFds(fds)
+      self._Reply(conn, "")
+      conn.close()
+      self._Retire()
+      return
+
+    pid = os.fork()
+    if pid == 0:
+      self._RunChild(job_id, debug, fds, conn)
+
+    logging.debug("Forked process %s for job %s", pid, job_id)
+    self._CloseFds(fds)
+    self._children[pid] = conn
+    self._Reply(conn, "%d" % pid)
+
+  def _RunChild(self, job_id, debug, fds, request_conn):
+    """Executes a job in a newly forked process.
+
+    """
+    status = 1
+    status_fd = fds[-1]
+    try:
+      request_conn.close()
+      signal.set_wakeup_fd(-1)
+      signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+      signal.signal(signal.SIGTERM, signal.SIG_DFL)
+      if self._listener:
+        self._listener.close()
+        self._lock.Close()
+      if self._master_fd is not None:
+        os.close(self._master_fd)
+      for conn in self._children.values():
+        if conn is not None:
+          conn.close()
+      self._CloseFds(self._wakeup)
+
+      # Processes started by the job must not keep the status pipe open
+      os.set_inheritable(status_fd, False)
+      for (target, fd) in enumerate(fds[:-1]):
+        os.dup2(fd, target)
+      self._CloseFds(fds[:-1])
+
+      RunJob(job_id, debug)
+      status = 0
+    except: # pylint: disable=W0702
+      logging.exception("Executing job %s failed", job_id)
+    finally:
+      try:
+        os.write(status_fd, b"%d\n" % status)
+      except: # pylint: disable=W0702
+        pass
+      os._exit(status) # pylint: disable=W0212
+
+  def _ReapChildren(self):
+    """Reports the exit status of the finished job processes.
+
+    """
+    while self._children:
+      try:
+        (pid, status) = os.waitpid(-1, os.WNOHANG)
+      except ChildProcessError:
+        break
+      if pid == 0:
+        break
+
+      conn = self._children.pop(pid, None)
+      if os.WIFSIGNALED(status):
+        status = 128 + os.WTERMSIG(status)
+      else:
+        status = os.WEXITSTATUS(status)
+      logging.debug("Job process %s exited with status %s", pid, status)
+      if conn is not None:
+        self._Reply(conn, "%d" % status)
+        conn.close()
+
+  def _CheckRequester(self, conn):
+    """Handles the requesting process of a job closing its connection.
+
+    The master process only kills the requesting process, so the job process
+    is killed as well.
+
+    """
+    for (pid, child_conn) in self._children.items():
+      if child_conn is conn:
+        break
+    else:
+      return
+
+    try:
+      data = conn.recv(4096)
+    except EnvironmentError:
+      data = b""
+    if data:
+      return
+
+    logging.warning("Requester of job process %s is gone, killing it", pid)
+    conn.close()
+    self._children[pid] = None
+    try:
+      os.kill(pid, signal.SIGKILL)
+    except OSError:
+      pass
+
+  @staticmethod
+  def _Reply(conn, line):
+    """Sends a line to a requesting process, ignoring errors.
+
+    """
+    try:
+      conn.sendall(line.encode() + b"\n")
+    except EnvironmentError as err:
+      logging.debug("Can't reply to the requesting process: %s", err)
+
+  @staticmethod
+  def _CloseFds(fds):
+    """Closes a list of file descriptors.
+
+    """
+    for fd in fds:
+      try:
+        os.close(fd)
+      except OSError:
+        pass
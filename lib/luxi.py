@@ -38,13 +38,17 @@ The module is also used by the master daemon.
 
 """
 
+from ganeti import compat
 from ganeti import constants
 from ganeti import pathutils
-from ganeti import objects
 import ganeti.rpc.client as cl
 from ganeti.rpc.errors import RequestError
 from ganeti.rpc.transport import Transport
 
+# Only needed for queries, imported on first use to keep the start of the
+# command line clients fast
+objects = compat.LazyModule("ganeti.objects")
+
 __all__ = [
   # classes:
   "Client"
@@ -55,6 +59,7 @@ REQ_SUBMIT_JOB_TO_DRAINED_QUEUE = constants.LUXI_REQ_SUBMIT_JOB_TO_DRAINED_QUEUE
 REQ_SUBMIT_MANY_JOBS = constants.LUXI_REQ_SUBMIT_MANY_JOBS
 REQ_PICKUP_JOB = constants.LUXI_REQ_PICKUP_JOB
 REQ_WAIT_FOR_JOB_CHANGE = constants.LUXI_REQ_WAIT_FOR_JOB_CHANGE
+REQ_WAIT_FOR_JOBS_CHANGE = constants.LUXI_REQ_WAIT_FOR_JOBS_CHANGE
 REQ_CANCEL_JOB = constants.LUXI_REQ_CANCEL_JOB
 REQ_ARCHIVE_JOB = constants.LUXI_REQ_ARCHIVE_JOB
 REQ_CHANGE_JOB_PRIORITY = constants.LUXI_REQ_CHANGE_JOB_PRIORITY
@@ -180,6 +185,32 @@ class Client(cl.AbstractClient):
                             prev_log_serial,
                             min(WFJC_TIMEOUT, timeout)))
 
+  def WaitForJobsChangeOnce(self, jobs, fields, timeout=WFJC_TIMEOUT):
+    """Waits for changes on any of several jobs.
+
+    @type jobs: list of tuples
+    @param jobs: List of (job ID, previously received job information,
+                 highest log serial number previously received) tuples
+    @type fields: list
+    @param fields: List of field names to be observed
+    @type timeout: int/float
+    @param timeout: Timeout in seconds (values larger than L{WFJC_TIMEOUT} will
+                    be capped to that value)
+    @rtype: list of tuples
+    @return: List of (job ID, result) tuples for the jobs which changed, where
+             result is a (job information, log entries) tuple or C{None} if the
+             job could not be found; the list is empty if no job changed
+             within the timeout
+
+    """
+    assert timeout >= 0, "Timeout can not be negative"
+    jobs = [(Client._PrepareJobId(REQ_WAIT_FOR_JOBS_CHANGE, job_id),
+             prev_job_info, prev_log_serial)
+            for (job_id, prev_job_info, prev_log_serial) in jobs]
+    result = self.CallMethod(REQ_WAIT_FOR_JOBS_CHANGE,
+                             (jobs, fields, min(WFJC_TIMEOUT, timeout)))
+    return [(job_id, update) for (job_id, update) in result]
+
   def WaitForJobChange(self, job_id, fields, prev_job_info, prev_log_serial):
     job_id = Client._PrepareJobId(REQ_WAIT_FOR_JOB_CHANGE, job_id)
     while True:
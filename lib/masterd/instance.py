@@ -45,6 +45,7 @@ from ganeti import utils
 from ganeti import objects
 from ganeti import netutils
 from ganeti import pathutils
+from ganeti import impexpd
 
 
 class _ImportExportError(Exception):
@@ -869,11 +870,21 @@ class _TransferInstSourceCb(_TransferInstCbBase):
     """Called when new progress information should be reported.
 
     """
-    progress = ie.progress
+    if dtp.group:
+      # Progress of split transfers is reported once for all streams
+      if not dtp.group.IsReporter(dtp):
+        return
+
+      name = dtp.group.name
+      progress = dtp.group.GetProgress()
+    else:
+      name = dtp.data.name
+      progress = ie.progress
+
     if not progress:
       return
 
-    self.feedback_fn("%s sent %s" % (dtp.data.name, FormatProgress(progress)))
+    self.feedback_fn("%s sent %s" % (name, FormatProgress(progress)))
 
   def ReportFinished(self, ie, dtp):
     """Called when a transfer has finished.
@@ -975,16 +986,19 @@ class DiskTransfer(object):
 
 
 class _DiskTransferPrivate(object):
-  def __init__(self, data, success, export_opts):
+  def __init__(self, data, success, export_opts, group=None):
     """Initializes this class.
 
     @type data: L{DiskTransfer}
     @type success: bool
+    @type group: L{_DiskTransferGroup} or None
+    @param group: Group this transfer is a part of, if any
 
     """
     self.data = data
     self.success = success
     self.export_opts = export_opts
+    self.group = group
 
     self.src_export = None
     self.dest_import = None
@@ -998,7 +1012,130 @@ class _DiskTransferPrivate(object):
     self.success = self.success and success
 
 
-def _GetInstDiskMagic(base, instance_name, index):
+class _DiskTransferGroup(object):
+  def __init__(self, data, size):
+    """Initializes this class.
+
+    @type data: L{DiskTransfer}
+    @param data: The transfer which has been split into parts
+    @type size: int
+    @param size: Total size of all parts (MiB)
+
+    """
+    self.data = data
+    self.size = size
+    self.parts = []
+
+    self._pending = 0
+
+  @property
+  def name(self):
+    """Returns the user-visible name of the whole transfer.
+
+    """
+    return self.data.name
+
+  def AddPart(self, dtp):
+    """Registers a part of this transfer.
+
+    @type dtp: L{_DiskTransferPrivate}
+
+    """
+    self.parts.append(dtp)
+    self._pending += 1
+
+  def PartFinished(self):
+    """Called when the source of a part has finished.
+
+    The finish callback of the whole transfer is only called once the last
+    part is done.
+
+    """
+    assert self._pending > 0
+    self._pending -= 1
+
+    if self._pending == 0 and self.data.finished_fn:
+      self.data.finished_fn()
+
+  def IsReporter(self, dtp):
+    """Returns whether a part should report progress for the whole group.
+
+    The first part still sending data is chosen so that progress is only
+    reported once per round instead of once per stream.
+
+    """
+    for part in self.parts:
+      if part.src_export and part.src_export.active:
+        return part is dtp
+
+    return False
+
+  def GetProgress(self):
+    """Returns the combined progress of all parts.
+
+    """
+    return impexpd.CombineProgress([part.src_export.progress
+                                    for part in self.parts
+                                    if part.src_export],
+                                   self.size)
+
+
+#: Disk types whose data can be transferred in several ranges at once
+_RANGED_TRANSFER_DEV_TYPES = compat.UniqueFrozenset([
+  constants.DT_PLAIN,
+  constants.DT_DRBD8,
+  constants.DT_FILE,
+  constants.DT_SHARED_FILE,
+  ])
+
+
+#: I/O types supporting ranges
+_RANGED_TRANSFER_IO = compat.UniqueFrozenset([
+  constants.IEIO_RAW_DISK,
+  constants.IEIO_SPARSE_DISK,
+  ])
+
+
+def _SplitDiskTransfer(transfer, streams):
+  """Splits a raw disk transfer into ranges to be sent in parallel.
+
+  Only transfers reading from and writing to a disk can be split. Each
+  stream is given at least L{constants.IE_MIN_STREAM_SIZE} MiB of data.
+
+  @type transfer: L{DiskTransfer}
+  @param transfer: Disk transfer
+  @type streams: int
+  @param streams: Maximum number of parallel streams
+  @rtype: list of tuples
+  @return: List of (offset, size) tuples in MiB, empty if the transfer can't
+    or shouldn't be split
+
+  """
+  if (streams < 2 or
+      transfer.src_io not in _RANGED_TRANSFER_IO or
+      transfer.dest_io != transfer.src_io):
+    return []
+
+  src_disk = transfer.src_ioargs[0]
+  dest_disk = transfer.dest_ioargs[0]
+
+  if not (src_disk.dev_type in _RANGED_TRANSFER_DEV_TYPES and
+          dest_disk.dev_type in _RANGED_TRANSFER_DEV_TYPES):
+    return []
+
+  size = src_disk.size
+  count = min(streams, size // constants.IE_MIN_STREAM_SIZE)
+  if count < 2:
+    return []
+
+  # Round up so the last range isn't larger than the others
+  chunk = (size + count - 1) // count
+
+  return [(offset, min(chunk, size - offset))
+          for offset in range(0, size, chunk)]
+
+
+def _GetInstDiskMagic(base, instance_name, index, part=None):
   """Computes the magic value for a disk export or import.
 
   @type base: string
@@ -1007,18 +1144,28 @@ def _GetInstDiskMagic(base, instance_name, index):
   @param instance_name: Name of instance
   @type index: number
   @param index: Disk index
+  @type part: number or None
+  @param part: Index of the range if the disk is sent in several streams
 
   """
+  values = [str(constants.RIE_VERSION), base, instance_name, str(index)]
+  if part is not None:
+    values.append(str(part))
+
   h = sha1()
-  for value in (str(constants.RIE_VERSION), base, instance_name, str(index)):
+  for value in values:
     h.update(value.encode("utf-8"))
   return h.hexdigest()
 
 
 def TransferInstanceData(lu, feedback_fn, src_node_uuid, dest_node_uuid,
-                         dest_ip, compress, instance, all_transfers):
+                         dest_ip, compress, instance, all_transfers,
+                         streams=constants.IE_DEFAULT_TRANSFER_STREAMS):
   """Transfers an instance's data from one node to another.
 
+  Raw disk transfers can be split into several ranges, each of which is sent
+  by its own pair of import/export daemons over a separate connection.
+
   @param lu: Logical unit instance
   @param feedback_fn: Feedback function
   @type src_node_uuid: string
@@ -1033,6 +1180,8 @@ def TransferInstanceData(lu, feedback_fn, src_node_uuid, dest_node_uuid,
   @param instance: Instance object
   @type all_transfers: list of L{DiskTransfer} instances
   @param all_transfers: List of all disk transfers to be made
+  @type streams: int
+  @param streams: Maximum number of parallel streams per disk
   @rtype: list
   @return: List with a boolean (True=successful, False=failed) for success for
            each transfer
@@ -1041,8 +1190,9 @@ def TransferInstanceData(lu, feedback_fn, src_node_uuid, dest_node_uuid,
   src_node_name = lu.cfg.GetNodeName(src_node_uuid)
   dest_node_name = lu.cfg.GetNodeName(dest_node_uuid)
 
-  logging.debug("Source node %s, destination node %s, compression '%s'",
-                src_node_name, dest_node_name, compress)
+  logging.debug("Source node %s, destination node %s, compression '%s',"
+                " streams %s", src_node_name, dest_node_name, compress,
+                streams)
 
   timeouts = ImportExportTimeouts(constants.DISK_TRANSFER_CONNECT_TIMEOUT)
   src_cbs = _TransferInstSourceCb(lu, feedback_fn, instance, timeouts,
@@ -1055,6 +1205,18 @@ def TransferInstanceData(lu, feedback_fn, src_node_uuid, dest_node_uuid,
 
   base_magic = utils.GenerateSecret(6)
 
+  def _StartImport(dtp, transfer, component, magic):
+    opts = objects.ImportExportOptions(key_name=None, ca_pem=None,
+                                       compress=compress, magic=magic)
+    dtp.export_opts = opts
+
+    di = DiskImport(lu, dest_node_uuid, opts, instance, component,
+                    transfer.dest_io, transfer.dest_ioargs,
+                    timeouts, dest_cbs, private=dtp)
+    ieloop.Add(di)
+
+    dtp.dest_import = di
+
   ieloop = ImportExportLoop(lu)
   try:
     for idx, transfer in enumerate(all_transfers):
@@ -1062,22 +1224,40 @@ def TransferInstanceData(lu, feedback_fn, src_node_uuid, dest_node_uuid,
         feedback_fn("Exporting %s from %s to %s" %
                     (transfer.name, src_node_name, dest_node_name))
 
-        magic = _GetInstDiskMagic(base_magic, instance.name, idx)
-        opts = objects.ImportExportOptions(key_name=None, ca_pem=None,
-                                           compress=compress, magic=magic)
+        ranges = _SplitDiskTransfer(transfer, streams)
+        if ranges:
+          feedback_fn("Sending %s in %d parallel streams" %
+                      (transfer.name, len(ranges)))
 
-        dtp = _DiskTransferPrivate(transfer, True, opts)
+          group = _DiskTransferGroup(transfer, transfer.src_ioargs[0].size)
 
-        di = DiskImport(lu, dest_node_uuid, opts, instance, "disk%d" % idx,
-                        transfer.dest_io, transfer.dest_ioargs,
-                        timeouts, dest_cbs, private=dtp)
-        ieloop.Add(di)
+          for part, (offset, size) in enumerate(ranges):
+            part_transfer = \
+              DiskTransfer("%s (part %d/%d)" %
+                           (transfer.name, part + 1, len(ranges)),
+                           transfer.src_io,
+                           transfer.src_ioargs + (offset, size),
+                           transfer.dest_io,
+                           transfer.dest_ioargs + (offset, size),
+                           group.PartFinished)
 
-        dtp.dest_import = di
-      else:
-        dtp = _DiskTransferPrivate(None, False, None)
+            dtp = _DiskTransferPrivate(part_transfer, True, None, group=group)
+            group.AddPart(dtp)
 
-      all_dtp.append(dtp)
+            _StartImport(dtp, part_transfer, "disk%d.%d" % (idx, part),
+                         _GetInstDiskMagic(base_magic, instance.name, idx,
+                                           part=part))
+
+          all_dtp.append(group.parts)
+        else:
+          dtp = _DiskTransferPrivate(transfer, True, None)
+
+          _StartImport(dtp, transfer, "disk%d" % idx,
+                       _GetInstDiskMagic(base_magic, instance.name, idx))
+
+          all_dtp.append([dtp])
+      else:
+        all_dtp.append([_DiskTransferPrivate(None, False, None)])
 
     ieloop.Run()
   finally:
@@ -1088,10 +1268,13 @@ def TransferInstanceData(lu, feedback_fn, src_node_uuid, dest_node_uuid,
                       dtp.src_export.success is not None) and
                      (dtp.dest_import is None or
                       dtp.dest_import.success is not None)
-                     for dtp in all_dtp), \
+                     for parts in all_dtp
+                     for dtp in parts), \
          "Not all imports/exports are finalized"
 
-  return [bool(dtp.success) for dtp in all_dtp]
+  # A transfer split into several streams fails if any of its parts failed
+  return [compat.all(bool(dtp.success) for dtp in parts)
+          for parts in all_dtp]
 
 
 class _RemoteExportCb(ImportExportCbBase):
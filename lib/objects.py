@@ -48,6 +48,7 @@ pass to and from external parties.
 # R0902: Allow instances of these objects to have more than 20 attributes
 
 import configparser
+import keyword
 import re
 import copy
 import logging
@@ -70,6 +71,36 @@ __all__ = ["ConfigObject", "ConfigData", "NIC", "Disk", "Instance",
 _TIMESTAMPS = ["ctime", "mtime"]
 _UUID = ["uuid"]
 
+#: Types of values which can be shared instead of copied
+_IMMUTABLE_TYPES = frozenset([type(None), bool, int, float, str, bytes])
+
+
+def _CopyValue(value):
+  """Returns a deep copy of a value, or the value itself if it is immutable.
+
+  """
+  if type(value) in _IMMUTABLE_TYPES:
+    return value
+  return copy.deepcopy(value)
+
+
+def _CopyDefaults(defaults_dict):
+  """Returns a deep copy of a dictionary of default values.
+
+  Parameter dictionaries mostly hold scalars, for which a full
+  C{copy.deepcopy} with its bookkeeping is needlessly slow; only the values
+  which are not immutable are copied. Dictionary subclasses are left to
+  C{copy.deepcopy} to keep their type.
+
+  """
+  if type(defaults_dict) is not dict:
+    return copy.deepcopy(defaults_dict)
+  for value in defaults_dict.values():
+    if type(value) not in _IMMUTABLE_TYPES:
+      return dict((key, _CopyValue(value))
+                  for (key, value) in defaults_dict.items())
+  return defaults_dict.copy()
+
 
 def FillDict(defaults_dict, custom_dict, skip_keys=None):
   """Basic function to apply settings on top a default dict.
@@ -84,7 +115,7 @@ def FillDict(defaults_dict, custom_dict, skip_keys=None):
   @return: dict with the 'full' values
 
   """
-  ret_dict = copy.deepcopy(defaults_dict)
+  ret_dict = _CopyDefaults(defaults_dict)
   ret_dict.update(custom_dict)
   if skip_keys:
     for k in skip_keys:
@@ -101,7 +132,7 @@ def FillIPolicy(default_ipolicy, custom_ipolicy):
   ret_dict = copy.deepcopy(custom_ipolicy)
   for key in default_ipolicy:
     if key not in ret_dict:
-      ret_dict[key] = copy.deepcopy(default_ipolicy[key])
+      ret_dict[key] = _CopyValue(default_ipolicy[key])
     elif key == constants.ISPECS_STD:
       ret_dict[key] = FillDict(default_ipolicy[key], ret_dict[key])
   return ret_dict
@@ -209,13 +240,13 @@ class ConfigObject(outils.ValidatedSlots):
   __slots__ = []
 
   def __getattr__(self, name):
-    if name not in self.GetAllSlots():
+    if name not in self._all_slots_set:
       raise AttributeError("Invalid object attribute %s.%s" %
                            (type(self).__name__, name))
     return None
 
   def __setstate__(self, state):
-    slots = self.GetAllSlots()
+    slots = self.GetSlotSet()
     for name in state:
       if name in slots:
         setattr(self, name, state[name])
@@ -254,15 +285,35 @@ class ConfigObject(outils.ValidatedSlots):
                           will be replaced with None.
 
     """
-    result = {}
-    for name in self.GetAllSlots():
-      value = getattr(self, name, None)
-      if value is not None:
-        result[name] = value
-    return result
+    return self._GetEncoder()(self)
 
   __getstate__ = ToDict
 
+  @classmethod
+  def _GetEncoder(cls):
+    """Returns the function implementing the generic L{ToDict} for a class.
+
+    The function is generated once per class from its slots, so that each
+    attribute is read directly instead of being looked up by name.
+
+    """
+    encoder = cls.__dict__.get("_encoder")
+    if encoder is None:
+      lines = ["def encoder(self):", "  result = {}"]
+      for name in cls.GetAllSlots():
+        if name.isidentifier() and not keyword.iskeyword(name):
+          lines.append("  value = self.%s" % name)
+        else:
+          lines.append("  value = getattr(self, %r, None)" % name)
+        lines.append("  if value is not None:")
+        lines.append("    result[%r] = value" % name)
+      lines.append("  return result")
+      namespace = {}
+      exec("\n".join(lines), namespace) # pylint: disable=W0122
+      encoder = namespace["encoder"]
+      cls._encoder = encoder
+    return encoder
+
   @classmethod
   def FromDict(cls, val):
     """Create an object from a dictionary.
@@ -279,8 +330,18 @@ class ConfigObject(outils.ValidatedSlots):
     if not isinstance(val, dict):
       raise errors.ConfigurationError("Invalid object passed to FromDict:"
                                       " expected dict, got %s" % type(val))
-    val_str = dict([(str(k), v) for k, v in val.items()])
-    obj = cls(**val_str)
+    if cls.__init__ is not outils.ValidatedSlots.__init__:
+      val_str = dict([(str(k), v) for k, v in val.items()])
+      return cls(**val_str)
+
+    # Same as the constructor, without the keyword arguments dictionary
+    slots = cls.GetSlotSet()
+    obj = cls.__new__(cls)
+    for (key, value) in val.items():
+      if key not in slots:
+        raise TypeError("Object %s doesn't support the parameter '%s'" %
+                        (cls.__name__, key))
+      setattr(obj, key, value)
     return obj
 
   def Copy(self):
@@ -2319,6 +2380,10 @@ class MigrationStatus(ConfigObject):
     "total_ram",
     # to signal, if migration has switched to postcopy
     "postcopy_status",
+    # transfer rate in bytes per second
+    "throughput",
+    # changes made to the migration parameters, as messages for the user
+    "adjustments",
     ]
 
 
@@ -72,6 +72,11 @@ class ValidatedSlots(object):
   """
   __slots__ = []
 
+  # All slots of the class including the inherited ones, set for each
+  # subclass by L{__init_subclass__}
+  _all_slots = []
+  _all_slots_set = frozenset()
+
   def __init__(self, **kwargs):
     """Constructor for BaseOpCode.
 
@@ -81,22 +86,41 @@ class ValidatedSlots(object):
     __slots__ attribute for this class.
 
     """
-    slots = self.GetAllSlots()
+    slots = self.GetSlotSet()
     for (key, value) in kwargs.items():
       if key not in slots:
         raise TypeError("Object %s doesn't support the parameter '%s'" %
                         (self.__class__.__name__, key))
       setattr(self, key, value)
 
-  @classmethod
-  def GetAllSlots(cls):
-    """Compute the list of all declared slots for a class.
+  def __init_subclass__(cls, **kwargs):
+    """Computes the slots of a new class.
 
     """
+    super().__init_subclass__(**kwargs)
     slots = []
     for parent in cls.__mro__:
       slots.extend(getattr(parent, "__slots__", []))
-    return slots
+    cls._all_slots = slots
+    cls._all_slots_set = frozenset(slots)
+
+  @classmethod
+  def GetAllSlots(cls):
+    """Compute the list of all declared slots for a class.
+
+    The list is computed once per class and must not be modified.
+
+    """
+    return cls._all_slots
+
+  @classmethod
+  def GetSlotSet(cls):
+    """Return the names of all declared slots for a class as a set.
+
+    @rtype: frozenset
+
+    """
+    return cls._all_slots_set
 
   def Validate(self):
     """Validates the slots.
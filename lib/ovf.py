@@ -39,17 +39,21 @@
 # C0413 Wrong import position
 
 
+import concurrent.futures
 import configparser
 import errno
+import hashlib
 import logging
 import os
 import os.path
 import re
 import shutil
+import subprocess
 import tarfile
 import tempfile
 import xml.dom.minidom
 import xml.parsers.expat
+import zlib
 try:
   import xml.etree.ElementTree as ET
 except ImportError:
@@ -88,6 +92,7 @@ FILE_EXTENSIONS = [
 ]
 
 COMPRESSION_TYPE = "gzip"
+COMPRESSION_ZSTD = "zstd"
 NO_COMPRESSION = [None, "identity"]
 COMPRESS = "compression"
 DECOMPRESS = "decompression"
@@ -98,6 +103,41 @@ RAW = "raw"
 COW = "cow"
 ALLOWED_FORMATS = [RAW, COW, VMDK]
 
+# Magic numbers of the disk formats which need to be converted to raw
+DISK_MAGIC = {
+  b"KDMV": VMDK,
+  b"QFI\xfb": COW,
+}
+
+# Checksum algorithms supported in manifest files
+MANIFEST_HASHES = {
+  "SHA1": hashlib.sha1,
+  "SHA256": hashlib.sha256,
+}
+
+# Size of the blocks in which disks are read from a streamed .ova package
+STREAM_BUFSIZE = 1024 * 1024
+
+# Tools available for disk compression; for each of them the compression type
+# written to the .ovf file, the file extension and the commands used for
+# compression and decompression
+COMPRESSION_TOOLS = {
+  "gzip": (COMPRESSION_TYPE, ".gz", ["gzip", "-c"], ["gzip", "-dc"]),
+  "pigz": (COMPRESSION_TYPE, ".gz", ["pigz", "-c"], ["pigz", "-dc"]),
+  "zstd": (COMPRESSION_ZSTD, ".zst", ["zstd", "-q", "-c", "-T0"],
+           ["zstd", "-q", "-dc"]),
+}
+DEFAULT_COMPRESSION_TOOL = "gzip"
+
+# Tools used for decompressing each compression type, in order of preference
+DECOMPRESSION_TOOLS = {
+  COMPRESSION_TYPE: ["pigz", "gzip"],
+  COMPRESSION_ZSTD: ["zstd"],
+}
+
+# Default number of disks processed at the same time
+DEFAULT_DISK_WORKERS = 4
+
 # ResourceType values
 RASD_TYPE = {
   "vcpus": "3",
@@ -207,6 +247,112 @@ def LinkFile(old_path, prefix=None, suffix=None, directory=None):
   return new_path
 
 
+def _ParseManifest(content):
+  """Parses the content of a manifest file.
+
+  @type content: string
+  @param content: content of the .mf file
+  @rtype: dict
+  @return: file name as key, tuple of checksum algorithm (one of
+    L{MANIFEST_HASHES}) and checksum as value
+
+  """
+  results = {}
+  regexp = r"(%s)\((\S+)\)= (\S+)" % "|".join(MANIFEST_HASHES)
+  for line in content.splitlines():
+    match = re.match(regexp, line)
+    if match:
+      results[match.group(2)] = (match.group(1), match.group(3).lower())
+  return results
+
+
+def _HashFile(path, algorithm):
+  """Computes the checksum of a file.
+
+  @type algorithm: string
+  @param algorithm: one of L{MANIFEST_HASHES}
+  @rtype: string
+  @return: hex digest of the file's checksum
+
+  """
+  hasher = MANIFEST_HASHES[algorithm]()
+  with open(path, "rb") as fh:
+    for data in iter(lambda: fh.read(STREAM_BUFSIZE), b""):
+      hasher.update(data)
+  return hasher.hexdigest()
+
+
+def _DetectDiskFormat(header):
+  """Detects the format of a disk image from its first bytes.
+
+  @type header: bytes
+  @param header: beginning of the disk image
+  @rtype: string
+  @return: disk format, L{RAW} if no other format is recognized
+
+  """
+  return DISK_MAGIC.get(header[:4], RAW)
+
+
+def _GetCompressionCommand(compression, action):
+  """Chooses the command used for (de)compression of a disk.
+
+  @type compression: string
+  @param compression: for compression the name of the tool (one of
+    L{COMPRESSION_TOOLS}), for decompression the compression type as given in
+    the .ovf file
+  @type action: string
+  @param action: whether the action is compression or decompression
+  @rtype: tuple
+  @return: (file extension, command) tuple
+
+  @raise errors.OpPrereqError: the tool or the compression type is not
+    supported, or the compression tool is not installed
+
+  """
+  assert action in ALLOWED_ACTIONS
+  if action == COMPRESS:
+    if compression not in COMPRESSION_TOOLS:
+      raise errors.OpPrereqError("Unsupported compression tool: %s"
+                                 % compression, errors.ECODE_INVAL)
+    (_, ext, args, _) = COMPRESSION_TOOLS[compression]
+    if not shutil.which(args[0]):
+      raise errors.OpPrereqError("Compression tool %s not found"
+                                 % compression, errors.ECODE_ENVIRON)
+    return (ext, args)
+
+  if compression not in DECOMPRESSION_TOOLS:
+    raise errors.OpPrereqError("Unsupported compression type: %s"
+                               % compression, errors.ECODE_INVAL)
+  tools = DECOMPRESSION_TOOLS[compression]
+  # Fall back to the last tool, a missing one will be reported when running it
+  tool = ([name for name in tools if shutil.which(name)] + tools[-1:])[0]
+  (_, ext, _, args) = COMPRESSION_TOOLS[tool]
+  return (ext, args)
+
+
+def _RunInParallel(fn, args_list, workers):
+  """Runs a function for each set of arguments using a pool of threads.
+
+  @type fn: callable
+  @param fn: function to run
+  @type args_list: list
+  @param args_list: list of argument tuples, one for each call of C{fn}
+  @type workers: int
+  @param workers: maximum number of calls running at the same time
+  @rtype: list
+  @return: results of the calls, in the order of C{args_list}; if any of the
+    calls failed, the exception of the first one is raised
+
+  """
+  if len(args_list) <= 1 or workers <= 1:
+    return [fn(*args) for args in args_list]
+
+  with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+    futures = [pool.submit(fn, *args) for args in args_list]
+  return [future.result() for future in futures]
+
+
 class OVFReader(object):
   """Reader class for OVF files.
 
@@ -220,7 +366,7 @@ class OVFReader(object):
   @ivar input_dir: directory in which the .ovf file resides
 
   """
-  def __init__(self, input_path):
+  def __init__(self, input_path, check_files=True):
     """Initialiaze the reader - load the .ovf file to XML parser.
 
     It is assumed that names of manifesto (.mf), certificate (.cert) and ovf
@@ -230,6 +376,9 @@ class OVFReader(object):
 
     @type input_path: string
     @param input_path: absolute path to the .ovf file
+    @type check_files: bool
+    @param check_files: whether to check that all files of the package exist;
+      not the case when they are still being streamed from an .ova package
 
     @raise errors.OpPrereqError: when .ovf file is not a proper XML file or some
       of the files mentioned in Resources section do not exist
@@ -256,7 +405,7 @@ class OVFReader(object):
                                       "{%s}href" % OVF_SCHEMA)
     for file_name in files_list:
       file_path = utils.PathJoin(input_dir, file_name)
-      if not os.path.exists(file_path):
+      if check_files and not os.path.exists(file_path):
         raise errors.OpPrereqError("File does not exist: %s" % file_path,
                                    errors.ECODE_ENVIRON)
     logging.info("Files in the OVF package: %s", " ".join(files_list))
@@ -351,31 +500,31 @@ class OVFReader(object):
   def VerifyManifest(self):
     """Verifies manifest for the OVF package, if one is given.
 
-    @raise errors.OpPrereqError: if SHA1 checksums do not match
+    @raise errors.OpPrereqError: if SHA1 or SHA256 checksums do not match
 
     """
     if "%s%s" % (self.schema_name, MF_EXT) in self.files_list:
-      logging.warning("Verifying SHA1 checksums, this may take a while")
+      logging.warning("Verifying checksums, this may take a while")
       manifest_filename = "%s%s" % (self.schema_name, MF_EXT)
       manifest_path = utils.PathJoin(self.input_dir, manifest_filename)
-      manifest_content = utils.ReadFile(manifest_path).splitlines()
-      manifest_files = {}
-      regexp = r"SHA1\((\S+)\)= (\S+)"
-      for line in manifest_content:
-        match = re.match(regexp, line)
-        if match:
-          file_name = match.group(1)
-          sha1_sum = match.group(2)
-          manifest_files[file_name] = sha1_sum
+      manifest_files = _ParseManifest(utils.ReadFile(manifest_path))
       files_with_paths = [utils.PathJoin(self.input_dir, file_name)
                           for file_name in self.files_list]
       sha1_sums = utils.FingerprintFiles(files_with_paths)
-      for file_name, value in manifest_files.items():
-        if sha1_sums.get(utils.PathJoin(self.input_dir, file_name)) != value:
-          raise errors.OpPrereqError("SHA1 checksum of %s does not match the"
-                                     " value in manifest file" % file_name,
+      for file_name, (algorithm, value) in manifest_files.items():
+        file_path = utils.PathJoin(self.input_dir, file_name)
+        if algorithm == "SHA1":
+          checksum = sha1_sums.get(file_path)
+        elif os.path.isfile(file_path):
+          checksum = _HashFile(file_path, algorithm)
+        else:
+          checksum = None
+        if checksum != value:
+          raise errors.OpPrereqError("%s checksum of %s does not match the"
+                                     " value in manifest file" %
+                                     (algorithm, file_name),
                                      errors.ECODE_ENVIRON)
-      logging.info("SHA1 checksums verified")
+      logging.info("Checksums verified")
 
   def GetInstanceName(self):
     """Provides information about instance name.
@@ -863,6 +1012,8 @@ class Converter(object):
     conversion
   @type temp_dir: string
   @ivar temp_dir: temporary directory created then we deal with OVA
+  @type disk_workers: int
+  @ivar disk_workers: maximum number of disks processed at the same time
 
   """
   def __init__(self, input_path, options):
@@ -884,6 +1035,8 @@ class Converter(object):
     self.temp_file_manager = utils.TemporaryFileManager()
     self.temp_dir = None
     self.output_dir = None
+    self.disk_workers = (getattr(options, "disk_workers", None) or
+                         DEFAULT_DISK_WORKERS)
     self._ReadInputData(input_path)
 
   def _ReadInputData(self, input_path):
@@ -901,7 +1054,8 @@ class Converter(object):
     @type disk_path: string
     @param disk_path: path to the disk
     @type compression: string
-    @param compression: compression type
+    @param compression: for compression the tool to use, for decompression
+      the compression type (see L{_GetCompressionCommand})
     @type action: string
     @param action: whether the action is compression or decompression
     @rtype: string
@@ -911,28 +1065,23 @@ class Converter(object):
       is not supported
 
     """
-    assert(action in ALLOWED_ACTIONS)
-    # For now we only support gzip, as it is used in ovftool
-    if compression != COMPRESSION_TYPE:
-      raise errors.OpPrereqError("Unsupported compression type: %s"
-                                 % compression, errors.ECODE_INVAL)
+    (ext, args) = _GetCompressionCommand(compression, action)
     disk_file = os.path.basename(disk_path)
     if action == DECOMPRESS:
       (disk_name, _) = os.path.splitext(disk_file)
       prefix = disk_name
     elif action == COMPRESS:
       prefix = disk_file
-    new_path = utils.GetClosedTempfile(suffix=COMPRESSION_EXT, prefix=prefix,
+    new_path = utils.GetClosedTempfile(suffix=ext, prefix=prefix,
                                        dir=self.output_dir)
     self.temp_file_manager.Add(new_path)
-    args = ["gzip", "-c", disk_path]
-    run_result = utils.RunCmd(args, output=new_path)
+    run_result = utils.RunCmd(args + [disk_path], output=new_path)
     if run_result.failed:
       raise errors.OpPrereqError("Disk %s failed with output: %s"
                                  % (action, run_result.stderr),
                                  errors.ECODE_ENVIRON)
     logging.info("The %s of the disk is completed", action)
-    return (COMPRESSION_EXT, new_path)
+    return (ext, new_path)
 
   def _ConvertDisk(self, disk_format, disk_path):
     """Performes conversion to specified format.
@@ -1063,6 +1212,11 @@ class OVFImporter(Converter):
   @ivar results_disk: disk information gathered from .ovf file or command line
     arguments
 
+  In streaming mode, an .ova package is read only once: only the descriptor
+  files are unpacked, while the disks are decompressed, checksummed and
+  written to the output directory straight from the archive. Disks which need
+  a format conversion are converted in parallel to reading the next ones.
+
   """
   def _ReadInputData(self, input_path):
     """Reads the data on which the conversion will take place.
@@ -1076,11 +1230,16 @@ class OVFImporter(Converter):
     (input_dir, input_file) = os.path.split(input_path)
     (_, input_extension) = os.path.splitext(input_file)
 
+    self._ova_stream = None
+
     if input_extension == OVF_EXT:
       logging.info("%s file extension found, no unpacking necessary", OVF_EXT)
       self.input_dir = input_dir
       self.input_path = input_path
       self.temp_dir = None
+    elif input_extension == OVA_EXT and getattr(self.options, "stream", False):
+      logging.info("%s file extension found, streaming the package", OVA_EXT)
+      self._OpenOVAStream(input_path)
     elif input_extension == OVA_EXT:
       logging.info("%s file extension found, proceeding to unpacking", OVA_EXT)
       self._UnpackOVA(input_path)
@@ -1102,8 +1261,12 @@ class OVFImporter(Converter):
     else:
       self.output_dir = pathutils.EXPORT_DIR
 
-    self.ovf_reader = OVFReader(self.input_path)
-    self.ovf_reader.VerifyManifest()
+    if self._ova_stream:
+      self.ovf_reader = OVFReader(self.input_path, check_files=False)
+      self._VerifyStreamedFiles()
+    else:
+      self.ovf_reader = OVFReader(self.input_path)
+      self.ovf_reader.VerifyManifest()
 
   def _UnpackOVA(self, input_path):
     """Unpacks the .ova package into temporary directory.
@@ -1153,6 +1316,133 @@ class OVFImporter(Converter):
                                  (OVA_EXT, err), errors.ECODE_ENVIRON)
     logging.info("OVA package extracted to %s directory", self.temp_dir)
 
+  def _OpenOVAStream(self, input_path):
+    """Starts reading the .ova package as a stream.
+
+    The descriptor files at the beginning of the package are unpacked into a
+    temporary directory, the rest of the package is read in L{_StreamDisks}.
+
+    @type input_path: string
+    @param input_path: path to the .ova package file
+
+    @raise errors.OpPrereqError: if file is not a proper tarball, one of the
+        files in the archive seem malicious or the .ovf file is not at the
+        beginning of the package
+
+    """
+    try:
+      self._ova_stream = tarfile.open(input_path, "r|*")
+    except tarfile.TarError:
+      raise errors.OpPrereqError("The provided %s file is not a proper tar"
+                                 " archive" % OVA_EXT, errors.ECODE_ENVIRON)
+    self.temp_dir = tempfile.mkdtemp()
+    self._stream_checksums = {}
+
+    input_name = None
+    member = self._NextOVAMember()
+    while member and os.path.splitext(member.name)[1] in FILE_EXTENSIONS:
+      (data, checksums) = self._ReadOVAMember(member)
+      self._stream_checksums[member.name] = checksums
+      utils.WriteFile(utils.PathJoin(self.temp_dir, member.name), data=data)
+      if member.name.endswith(OVF_EXT):
+        input_name = member.name
+      member = self._NextOVAMember()
+    self._next_member = member
+
+    if not input_name:
+      raise errors.OpPrereqError("No %s file found at the beginning of the %s"
+                                 " package, which is required for streaming"
+                                 % (OVF_EXT, OVA_EXT), errors.ECODE_ENVIRON)
+    self.input_dir = self.temp_dir
+    self.input_path = utils.PathJoin(self.temp_dir, input_name)
+
+  def _NextOVAMember(self):
+    """Returns the next regular file of the streamed .ova package.
+
+    @rtype: tarfile.TarInfo or None
+    @return: next file with a normalized name, C{None} at the end of the
+      package
+
+    """
+    try:
+      member = self._ova_stream.next()
+      while member and not member.isfile():
+        member = self._ova_stream.next()
+    except tarfile.TarError as err:
+      raise errors.OpPrereqError("Error while reading %s archive: %s" %
+                                 (OVA_EXT, err), errors.ECODE_ENVIRON)
+    if member:
+      file_normname = os.path.normpath(member.name)
+      if os.path.dirname(file_normname) or file_normname.startswith("."):
+        raise errors.OpPrereqError("File %s inside %s package is not safe" %
+                                   (member.name, OVA_EXT),
+                                   errors.ECODE_ENVIRON)
+      member.name = file_normname
+    return member
+
+  def _ReadOVAMember(self, member, output_fn=None):
+    """Reads the current file of the streamed .ova package.
+
+    @type member: tarfile.TarInfo
+    @param member: the current member of the package
+    @type output_fn: callable
+    @param output_fn: function called with every block read; if not given, the
+      whole content is returned
+    @rtype: tuple
+    @return: content (or C{None} if C{output_fn} is given) and a dictionary
+      with the checksums of the file for all L{MANIFEST_HASHES}
+
+    """
+    hashers = dict((algorithm, fn()) for (algorithm, fn)
+                   in MANIFEST_HASHES.items())
+    blocks = []
+    if output_fn is None:
+      output_fn = blocks.append
+    try:
+      fh = self._ova_stream.extractfile(member)
+      for data in iter(lambda: fh.read(STREAM_BUFSIZE), b""):
+        for hasher in hashers.values():
+          hasher.update(data)
+        output_fn(data)
+    except (tarfile.TarError, EnvironmentError, zlib.error) as err:
+      raise errors.OpPrereqError("Error while reading %s from %s archive: %s" %
+                                 (member.name, OVA_EXT, err),
+                                 errors.ECODE_ENVIRON)
+    checksums = dict((algorithm, hasher.hexdigest())
+                     for (algorithm, hasher) in hashers.items())
+    return (b"".join(blocks), checksums)
+
+  def _VerifyStreamedFiles(self, complete=False):
+    """Verifies the checksums of the files read from the stream so far.
+
+    @type complete: boolean
+    @param complete: whether the whole package has been read; if not, files
+      which have not been read yet are skipped
+    @raise errors.OpPrereqError: if checksums do not match or, once the
+      package is complete, files listed in the manifest are missing
+
+    """
+    manifest_name = "%s%s" % (self.ovf_reader.schema_name, MF_EXT)
+    if manifest_name not in self._stream_checksums:
+      return
+    manifest_path = utils.PathJoin(self.temp_dir, manifest_name)
+    manifest_files = _ParseManifest(utils.ReadFile(manifest_path))
+    if complete:
+      missing = [file_name for file_name in manifest_files
+                 if file_name not in self._stream_checksums]
+      if missing:
+        raise errors.OpPrereqError("Files listed in the manifest are missing"
+                                   " from the %s package: %s" %
+                                   (OVA_EXT, utils.CommaJoin(missing)),
+                                   errors.ECODE_ENVIRON)
+    for file_name, (algorithm, value) in manifest_files.items():
+      checksums = self._stream_checksums.get(file_name)
+      if checksums and checksums[algorithm] != value:
+        raise errors.OpPrereqError("%s checksum of %s does not match the"
+                                   " value in manifest file" %
+                                   (algorithm, file_name),
+                                   errors.ECODE_ENVIRON)
+
   def Parse(self):
     """Parses the data and creates a structure containing all required info.
 
@@ -1407,23 +1697,16 @@ class OVFImporter(Converter):
     """
     results = {}
     disks_list = self.ovf_reader.GetDisksNames()
-    for (counter, (disk_name, disk_compression)) in enumerate(disks_list):
+    for (disk_name, _) in disks_list:
       if os.path.dirname(disk_name):
         raise errors.OpPrereqError("Disks are not allowed to have absolute"
                                    " paths or paths outside main OVF"
                                    " directory", errors.ECODE_ENVIRON)
-      disk, _ = os.path.splitext(disk_name)
-      disk_path = utils.PathJoin(self.input_dir, disk_name)
-      if disk_compression not in NO_COMPRESSION:
-        _, disk_path = self._CompressDisk(disk_path, disk_compression,
-                                          DECOMPRESS)
-        disk, _ = os.path.splitext(disk)
-      if self._GetDiskQemuInfo(disk_path, r"file format: (\S+)") != "raw":
-        logging.info("Conversion to raw format is required")
-      ext, new_disk_path = self._ConvertDisk("raw", disk_path)
-
-      final_disk_path = LinkFile(new_disk_path, prefix=disk, suffix=ext,
-                                 directory=self.output_dir)
+    if self._ova_stream:
+      return self._StreamDisks(disks_list)
+    final_disk_paths = _RunInParallel(self._ImportDisk, disks_list,
+                                      self.disk_workers)
+    for (counter, final_disk_path) in enumerate(final_disk_paths):
       final_name = os.path.basename(final_disk_path)
       disk_size = os.path.getsize(final_disk_path) // (1024 * 1024)
       results["disk%s_dump" % counter] = final_name
@@ -1433,6 +1716,202 @@ class OVFImporter(Converter):
       results["disk_count"] = str(len(disks_list))
     return results
 
+  def _ImportDisk(self, disk_name, disk_compression):
+    """Decompresses a disk and converts it to raw format.
+
+    @type disk_name: string
+    @param disk_name: file name of the disk, relative to the input directory
+    @type disk_compression: string
+    @param disk_compression: compression of the disk as given in the .ovf file
+    @rtype: string
+    @return: path of the final disk in the output directory
+
+    """
+    disk, _ = os.path.splitext(disk_name)
+    disk_path = utils.PathJoin(self.input_dir, disk_name)
+    if disk_compression not in NO_COMPRESSION:
+      _, disk_path = self._CompressDisk(disk_path, disk_compression,
+                                        DECOMPRESS)
+      disk, _ = os.path.splitext(disk)
+    if self._GetDiskQemuInfo(disk_path, r"file format: (\S+)") != "raw":
+      logging.info("Conversion to raw format is required")
+    ext, new_disk_path = self._ConvertDisk("raw", disk_path)
+
+    return LinkFile(new_disk_path, prefix=disk, suffix=ext,
+                    directory=self.output_dir)
+
+  def _StreamDisks(self, disks_list):
+    """Reads the disks from the streamed .ova package into the output directory.
+
+    @type disks_list: list
+    @param disks_list: list of (file name, compression) tuples of the disks
+    @rtype: dict
+    @return: dictionary of disk-related options
+
+    @raise errors.OpPrereqError: a disk is missing from the package, can not be
+      decompressed or converted, or its checksum does not match
+
+    """
+    wanted = dict((disk_name, (counter, disk_compression))
+                  for (counter, (disk_name, disk_compression))
+                  in enumerate(disks_list))
+    pending = []
+    results = {}
+
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=self.disk_workers)
+    try:
+      member = self._next_member
+      while member:
+        if member.name in wanted:
+          (counter, disk_compression) = wanted.pop(member.name)
+          pending.append((counter,
+                          self._StreamDisk(member, disk_compression, pool)))
+        else:
+          (data, checksums) = self._ReadOVAMember(member)
+          if os.path.splitext(member.name)[1] in FILE_EXTENSIONS:
+            utils.WriteFile(utils.PathJoin(self.temp_dir, member.name),
+                            data=data)
+          self._stream_checksums[member.name] = checksums
+        member = self._NextOVAMember()
+      self._next_member = None
+
+      if wanted:
+        raise errors.OpPrereqError("Disks missing from the %s package: %s" %
+                                   (OVA_EXT, utils.CommaJoin(wanted)),
+                                   errors.ECODE_ENVIRON)
+
+      # Wait for the conversions still running in the background
+      for (counter, wait_fn) in pending:
+        final_disk_path = wait_fn()
+        disk_size = os.path.getsize(final_disk_path) // (1024 * 1024)
+        results["disk%s_dump" % counter] = os.path.basename(final_disk_path)
+        results["disk%s_size" % counter] = str(disk_size)
+        results["disk%s_ivname" % counter] = "disk/%s" % str(counter)
+    finally:
+      pool.shutdown()
+
+    self._VerifyStreamedFiles(complete=True)
+
+    if disks_list:
+      results["disk_count"] = str(len(disks_list))
+    return results
+
+  def _StreamDisk(self, member, disk_compression, pool):
+    """Decompresses a disk from the streamed .ova package.
+
+    Raw disks are written to the output directory directly, other formats are
+    converted to raw in the background.
+
+    @type member: tarfile.TarInfo
+    @param member: the current member of the package, containing the disk
+    @type disk_compression: string
+    @param disk_compression: compression of the disk as given in the .ovf file
+    @type pool: concurrent.futures.Executor
+    @param pool: executor running the conversions
+    @rtype: callable
+    @return: function returning the path of the final disk once it is ready
+
+    """
+    disk = os.path.splitext(member.name)[0]
+    process = None
+    decompressor = None
+    if disk_compression not in NO_COMPRESSION:
+      (_, args) = _GetCompressionCommand(disk_compression, DECOMPRESS)
+      disk = os.path.splitext(disk)[0]
+      if disk_compression == COMPRESSION_TYPE:
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    logging.info("Streaming disk %s from the %s package", member.name, OVA_EXT)
+    with tempfile.NamedTemporaryFile(prefix=disk, dir=self.output_dir,
+                                     delete=False) as fh:
+      self.temp_file_manager.Add(fh.name)
+      state = {"format": None, "decompressor": decompressor}
+
+      def _Write(data):
+        if not data:
+          return
+        if state["format"] is None:
+          state["format"] = _DetectDiskFormat(data)
+        # Keep the resulting file sparse
+        if data.count(0) == len(data):
+          fh.seek(len(data), os.SEEK_CUR)
+        else:
+          fh.write(data)
+
+      def _Output(data):
+        if state["decompressor"] is None:
+          _Write(data)
+          return
+        while data:
+          current = state["decompressor"]
+          if current.eof:
+            # Concatenated gzip members
+            current = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            state["decompressor"] = current
+          # Limit the output per call, highly compressed input could
+          # otherwise expand to a huge buffer
+          _Write(current.decompress(data, STREAM_BUFSIZE))
+          data = current.unconsumed_tail or current.unused_data
+
+      if disk_compression in NO_COMPRESSION or decompressor:
+        (_, checksums) = self._ReadOVAMember(member, output_fn=_Output)
+        if decompressor:
+          current = state["decompressor"]
+          _Write(current.flush())
+          if not current.eof:
+            raise errors.OpPrereqError("Disk %s in the %s package is"
+                                       " truncated" % (member.name, OVA_EXT),
+                                       errors.ECODE_ENVIRON)
+        fh.truncate()
+      else:
+        # No in-process decompressor, feed the external tool instead
+        try:
+          process = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=fh,
+                                     stderr=subprocess.PIPE)
+        except OSError as err:
+          raise errors.OpPrereqError("Disk %s failed: %s" % (DECOMPRESS, err),
+                                     errors.ECODE_ENVIRON)
+        try:
+          (_, checksums) = self._ReadOVAMember(member,
+                                               output_fn=process.stdin.write)
+        finally:
+          process.stdin.close()
+          stderr = process.stderr.read()
+          process.wait()
+        if process.returncode:
+          raise errors.OpPrereqError("Disk %s failed with output: %s"
+                                     % (DECOMPRESS, stderr),
+                                     errors.ECODE_ENVIRON)
+    if process:
+      with open(fh.name, "rb") as disk_fh:
+        state["format"] = _DetectDiskFormat(disk_fh.read(4))
+    self._stream_checksums[member.name] = checksums
+    self._VerifyStreamedFiles()
+
+    if state["format"] in (None, RAW):
+      final_disk_path = LinkFile(fh.name, prefix=disk, suffix=".%s" % RAW,
+                                 directory=self.output_dir)
+      return lambda: final_disk_path
+
+    logging.info("Conversion of %s from %s to raw format is required",
+                 member.name, state["format"])
+
+    def _Convert():
+      (ext, new_disk_path) = self._ConvertDisk(RAW, fh.name)
+      return LinkFile(new_disk_path, prefix=disk, suffix=ext,
+                      directory=self.output_dir)
+
+    return pool.submit(_Convert).result
+
+  def Cleanup(self):
+    """Closes the streamed .ova package and cleans the temporary files.
+
+    """
+    if self._ova_stream:
+      self._ova_stream.close()
+      self._ova_stream = None
+    Converter.Cleanup(self)
+
   def Save(self):
     """Saves all the gathered information in a constant.EXPORT_CONF_FILE file.
 
@@ -1701,8 +2180,9 @@ class OVFExporter(Converter):
 
     @type disk_file: string
     @param disk_file: name of the disk (without the full path)
-    @type compression: bool
-    @param compression: whether the disk should be compressed or not
+    @type compression: string
+    @param compression: tool used to compress the disk (one of
+      L{COMPRESSION_TOOLS}), or None if the disk should not be compressed
 
     @raise errors.OpPrereqError: when disk image does not exist
 
@@ -1721,18 +2201,17 @@ class OVFExporter(Converter):
     results["virt-size"] = self._GetDiskQemuInfo(
       new_disk_path, r"virtual size: \S+ \((\d+) bytes\)")
     if compression:
-      ext2, new_disk_path = self._CompressDisk(new_disk_path, "gzip",
+      ext2, new_disk_path = self._CompressDisk(new_disk_path, compression,
                                                COMPRESS)
       disk_name, _ = os.path.splitext(disk_name)
-      results["compression"] = "gzip"
+      results["compression"] = COMPRESSION_TOOLS[compression][0]
       ext += ext2
     final_disk_path = LinkFile(new_disk_path, prefix=disk_name, suffix=ext,
                                directory=self.output_dir)
     final_disk_name = os.path.basename(final_disk_path)
     results["real-size"] = os.path.getsize(final_disk_path)
     results["path"] = final_disk_name
-    self.references_files.append(final_disk_path)
-    return results
+    return (results, final_disk_path)
 
   def _ParseDisks(self):
     """Parses disk data from config file.
@@ -1741,15 +2220,27 @@ class OVFExporter(Converter):
     @return: list of dictionaries of disk options
 
     """
-    results = []
+    compression_tool = getattr(self.options, "compression_tool", None)
+    if self.options.compression or compression_tool:
+      compression = compression_tool or DEFAULT_COMPRESSION_TOOL
+    else:
+      compression = None
+
+    disk_files = []
     counter = 0
     while True:
       disk_file = \
         self.config_parser.get(constants.INISECT_INS, "disk%s_dump" % counter)
       if disk_file is None:
         break
-      results.append(self._GetDiskOptions(disk_file, self.options.compression))
+      disk_files.append((disk_file, compression))
       counter += 1
+
+    results = []
+    for (disk_results, final_disk_path) in \
+        _RunInParallel(self._GetDiskOptions, disk_files, self.disk_workers):
+      results.append(disk_results)
+      self.references_files.append(final_disk_path)
     return results
 
   def Parse(self):
@@ -67,6 +67,7 @@ PREPARE_NODE_JOIN = _constants.PKGLIBDIR + "/prepare-node-join"
 SSH_UPDATE = _constants.PKGLIBDIR + "/ssh-update"
 NODE_DAEMON_SETUP = _constants.PKGLIBDIR + "/node-daemon-setup"
 SSL_UPDATE = _constants.PKGLIBDIR + "/ssl-update"
+SPARSE_COPY = _constants.PKGLIBDIR + "/sparse-copy"
 XEN_CONSOLE_WRAPPER = _constants.PKGLIBDIR + "/tools/xen-console-wrapper"
 CFGUPGRADE = _constants.PKGLIBDIR + "/tools/cfgupgrade"
 POST_UPGRADE = _constants.PKGLIBDIR + "/tools/post-upgrade"
@@ -93,6 +94,7 @@ SSH_PUB_KEYS = DATA_DIR + "/ganeti_pub_keys"
 BDEV_CACHE_DIR = RUN_DIR + "/bdev-cache"
 DISK_LINKS_DIR = RUN_DIR + "/instance-disks"
 SOCKET_DIR = RUN_DIR + "/socket"
+SSH_CONTROL_DIR = RUN_DIR + "/ssh-control"
 CRYPTO_KEYS_DIR = RUN_DIR + "/crypto"
 IMPORT_EXPORT_DIR = RUN_DIR + "/import-export"
 INSTANCE_STATUS_FILE = RUN_DIR + "/instance-status"
@@ -117,12 +119,14 @@ SSH_KNOWN_HOSTS_FILE = DATA_DIR + "/known_hosts"
 RAPI_DATA_DIR = DATA_DIR + "/rapi"
 RAPI_USERS_FILE = RAPI_DATA_DIR + "/users"
 QUEUE_DIR = DATA_DIR + "/queue"
+IMAGE_CACHE_DIR = DATA_DIR + "/image-cache"
 INTENT_TO_UPGRADE = DATA_DIR + "/intent-to-upgrade"
 CONF_DIR = SYSCONFDIR + "/ganeti"
 XEN_IFUP_OS = CONF_DIR + "/xen-ifup-os"
 USER_SCRIPTS_DIR = CONF_DIR + "/scripts"
 VNC_PASSWORD_FILE = CONF_DIR + "/vnc-cluster-password"
 HOOKS_BASE_DIR = CONF_DIR + "/hooks"
+HOOKS_MAX_PARALLEL_FILE = CONF_DIR + "/hooks-max-parallel"
 FILE_STORAGE_PATHS_FILE = CONF_DIR + "/file-storage-paths"
 RESTRICTED_COMMANDS_DIR = CONF_DIR + "/restricted-commands"
 
@@ -147,6 +151,10 @@ WATCHER_GROUP_STATE_FILE = DATA_DIR + "/watcher.%s.data"
 #: per-group processes
 WATCHER_GROUP_INSTANCE_STATUS_FILE = DATA_DIR + "/watcher.%s.instance-status"
 
+#: Per-group instance status last merged into L{INSTANCE_STATUS_FILE}, used
+#: to merge only the groups whose status file changed since
+WATCHER_INSTANCE_STATUS_CACHE_FILE = DATA_DIR + "/watcher.instance-status-cache"
+
 #: File containing Unix timestamp until which watcher should be paused
 WATCHER_PAUSEFILE = DATA_DIR + "/watcher.pause"
 
@@ -161,6 +169,8 @@ QUERY_SOCKET = SOCKET_DIR + "/ganeti-query"
 WCONFD_SOCKET = SOCKET_DIR + "/ganeti-wconfd"
 #: Metad socket
 METAD_SOCKET = SOCKET_DIR + "/ganeti-metad"
+#: Socket of the zygote forking job processes
+JOB_ZYGOTE_SOCKET = SOCKET_DIR + "/ganeti-job-zygote"
 
 LOG_OS_DIR = LOG_DIR + "/os"
 LOG_ES_DIR = LOG_DIR + "/extstorage"
@@ -0,0 +1,259 @@
+#
+#
+
+# Copyright (C) 2026 the Ganeti project
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+
+"""Cache of OS and ExtStorage provider definitions on a node.
+
+Loading a provider definition means checking and reading several files in
+its directory, which happens for every OS listing, cluster verification,
+instance creation or ExtStorage operation. Loaded definitions are therefore
+kept in memory and reused as long as the provider's directory doesn't
+change.
+
+Entries are normally validated by comparing the status of the provider
+directory and the files in it with the one at the time of loading. As the
+node daemon forks for every request, it additionally watches the search
+paths using inotify (see L{ProviderCache.StartWatching}): the entries of
+watched directories are kept up to date in the daemon's main process,
+inherited by the request processes and used there without any further
+checks.
+
+"""
+
+import logging
+import os
+
+try:
+  # pylint: disable=E0611
+  from pyinotify import pyinotify
+except ImportError:
+  import pyinotify
+
+from ganeti import asyncnotifier
+from ganeti import errors
+from ganeti import utils
+
+
+# Different Pyinotify versions have the flag constants at different places,
+# hence not accessing them directly
+_WATCH_MASK = (pyinotify.EventsCodes.ALL_FLAGS["IN_ATTRIB"] |
+               pyinotify.EventsCodes.ALL_FLAGS["IN_CLOSE_WRITE"] |
+               pyinotify.EventsCodes.ALL_FLAGS["IN_CREATE"] |
+               pyinotify.EventsCodes.ALL_FLAGS["IN_DELETE"] |
+               pyinotify.EventsCodes.ALL_FLAGS["IN_MODIFY"] |
+               pyinotify.EventsCodes.ALL_FLAGS["IN_MOVED_FROM"] |
+               pyinotify.EventsCodes.ALL_FLAGS["IN_MOVED_TO"])
+
+# Events on a search path directory which add a provider
+_ADD_MASK = (pyinotify.EventsCodes.ALL_FLAGS["IN_CREATE"] |
+             pyinotify.EventsCodes.ALL_FLAGS["IN_MOVED_TO"])
+
+
+def _GetSignature(path):
+  """Describes the current state of a provider directory.
+
+  @type path: string
+  @param path: path of the provider directory
+  @return: a value which changes whenever the directory or the files in it
+    change, or C{None} if the state can't be determined
+
+  """
+  try:
+    st = os.stat(path)
+    entries = []
+    with os.scandir(path) as it:
+      for entry in it:
+        est = entry.stat()
+        entries.append((entry.name, est.st_mode, est.st_ino, est.st_size,
+                        est.st_mtime_ns, est.st_ctime_ns))
+  except EnvironmentError:
+    return None
+
+  return (st.st_ino, st.st_mtime_ns, st.st_ctime_ns, frozenset(entries))
+
+
+class ProviderCache(object):
+  """Cache of provider definitions.
+
+  The cached values must not be modified by the callers.
+
+  """
+  def __init__(self, kind, load_fn):
+    """Initializes this class.
+
+    @type kind: string
+    @param kind: kind of the providers, used for logging
+    @type load_fn: callable
+    @param load_fn: function loading a provider, called with the name and
+      the directory of the provider
+
+    """
+    self._kind = kind
+    self._load_fn = load_fn
+    # Path -> (signature, value); the signature is C{None} for watched paths
+    self._entries = {}
+    self._watched = set()
+
+  def Get(self, path):
+    """Returns the definition of the provider in a directory.
+
+    @type path: string
+    @param path: path of the provider directory
+
+    """
+    if path in self._watched:
+      try:
+        return self._entries[path][1]
+      except KeyError:
+        signature = None
+    else:
+      signature = _GetSignature(path)
+      entry = self._entries.get(path)
+      if signature is not None and entry and entry[0] == signature:
+        return entry[1]
+
+    value = self._load_fn(os.path.basename(path), path)
+
+    if signature is not None or path in self._watched:
+      self._entries[path] = (signature, value)
+    else:
+      self._entries.pop(path, None)
+
+    return value
+
+  def Invalidate(self, path):
+    """Forgets about the provider in a directory.
+
+    """
+    self._entries.pop(path, None)
+    self._watched.discard(path)
+
+  def Refresh(self, path):
+    """Reloads a watched provider after a change.
+
+    """
+    if path in self._watched:
+      logging.debug("%s provider in %s changed, reloading", self._kind, path)
+      self._entries.pop(path, None)
+      self.Get(path)
+
+  def Clear(self):
+    """Forgets about all providers.
+
+    """
+    self._entries.clear()
+    self._watched.clear()
+
+  def _SetWatched(self, path):
+    """Marks a provider directory as being watched, and loads it.
+
+    """
+    self._entries.pop(path, None)
+    self._watched.add(path)
+    self.Get(path)
+
+  def StartWatching(self, search_path):
+    """Watches the provider directories using inotify.
+
+    The entries of watched directories are kept up to date while the
+    daemon's main loop runs, and used without further checks. Directories
+    which can't be watched are validated as usual.
+
+    @type search_path: list of strings
+    @param search_path: directories containing the provider directories
+
+    """
+    wm = pyinotify.WatchManager()
+    handler = _ProviderEventHandler(wm, self, search_path)
+    asyncnotifier.ErrorLoggingAsyncNotifier(wm, default_proc_fun=handler)
+    return handler
+
+
+class _ProviderEventHandler(asyncnotifier.FileEventHandlerBase):
+  """Updates a provider cache on inotify events.
+
+  """
+  def __init__(self, wm, cache, search_path):
+    """Initializes this class.
+
+    @param wm: Inotify watch manager
+    @type cache: L{ProviderCache}
+    @param cache: the cache to update
+    @type search_path: list of strings
+    @param search_path: directories containing the provider directories
+
+    """
+    asyncnotifier.FileEventHandlerBase.__init__(self, wm)
+
+    self._cache = cache
+    self._search_path = []
+
+    for dir_name in search_path:
+      if not os.path.isdir(dir_name):
+        continue
+      try:
+        self.AddWatch(dir_name, _WATCH_MASK)
+      except errors.InotifyError as err:
+        logging.warning("Can't watch %s: %s", dir_name, err)
+        continue
+      self._search_path.append(dir_name)
+      for name in utils.ListVisibleFiles(dir_name):
+        self._WatchProvider(utils.PathJoin(dir_name, name))
+
+  def _WatchProvider(self, path):
+    """Starts watching a provider directory.
+
+    """
+    if not os.path.isdir(path):
+      return
+    try:
+      self.AddWatch(path, _WATCH_MASK)
+    except errors.InotifyError as err:
+      logging.warning("Can't watch %s: %s", path, err)
+      return
+    self._cache._SetWatched(path) # pylint: disable=W0212
+
+  def process_IN_IGNORED(self, event):
+    """Called when a watch was removed, e.g. because of a deleted directory.
+
+    """
+    self._cache.Invalidate(event.path)
+
+  def process_default(self, event):
+    """Called upon inotify event.
+
+    """
+    if event.path in self._search_path:
+      path = utils.PathJoin(event.path, event.name)
+      self._cache.Invalidate(path)
+      if event.dir and event.mask & _ADD_MASK:
+        self._WatchProvider(path)
+    else:
+      self._cache.Refresh(event.path)
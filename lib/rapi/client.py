@@ -112,6 +112,14 @@ _REQ_DATA_VERSION_FIELD = "__version__"
 _QPARAM_DRY_RUN = "dry-run"
 _QPARAM_FORCE = "force"
 
+#: Streaming responses can last arbitrarily long and are not subject to the
+#: transfer timeout; they are aborted if less than C{_STREAM_LOW_SPEED_LIMIT}
+#: bytes per second arrive for C{_STREAM_LOW_SPEED_TIME} seconds instead. The
+#: server sends a heartbeat every 10 seconds while nothing changes.
+_STREAM_CONNECT_TIMEOUT = 60
+_STREAM_LOW_SPEED_LIMIT = 1
+_STREAM_LOW_SPEED_TIME = 60
+
 # Feature strings
 INST_CREATE_REQV1 = "instance-create-reqv1"
 INST_REINSTALL_REQV1 = "instance-reinstall-reqv1"
@@ -305,7 +313,8 @@ def GenericCurlConfig(verbose=False, use_signal=False,
   @param connect_timeout: Timeout for establishing connection in seconds
   @type timeout: number
   @param timeout: Timeout for complete transfer in seconds (see
-                  curl_easy_setopt(3)).
+                  curl_easy_setopt(3)); not used for streaming requests,
+                  which are aborted if they stall instead
 
   """
   if use_curl_cabundle and (cafile or capath):
@@ -412,6 +421,35 @@ class _CompatIO(object):
     return self.buffer.seek(*args, **kwargs)
 
 
+class _JsonLineReader(object):
+  """Decodes a stream of newline-delimited JSON documents.
+
+  """
+  def __init__(self, fn):
+    """Initializes this class.
+
+    @type fn: callable
+    @param fn: Function called with every decoded document, except for
+      C{null} documents
+
+    """
+    self._fn = fn
+    self._buf = b""
+
+  def write(self, data):
+    if not isinstance(data, bytes):
+      data = data.encode("utf-8")
+
+    lines = (self._buf + data).split(b"\n")
+    self._buf = lines.pop()
+
+    for line in lines:
+      if line.strip():
+        value = json.loads(line)
+        if value is not None:
+          self._fn(value)
+
+
 class GanetiRapiClient(object): # pylint: disable=R0904
   """Ganeti RAPI client.
 
@@ -457,9 +495,12 @@ class GanetiRapiClient(object): # pylint: disable=R0904
     elif password:
       raise Error("Specified password without username")
 
-  def _CreateCurl(self):
+  def _CreateCurl(self, streaming=False):
     """Creates a cURL object.
 
+    @type streaming: bool
+    @param streaming: Whether the object is used for a streaming request
+
     """
     # Create pycURL object if no factory is provided
     if self._curl_factory:
@@ -489,10 +530,20 @@ class GanetiRapiClient(object): # pylint: disable=R0904
       curl.setopt(pycurl.USERPWD,
                   str("%s:%s" % (self._username, self._password)))
 
+    if streaming:
+      # Can be overridden by the configuration function
+      curl.setopt(pycurl.CONNECTTIMEOUT, _STREAM_CONNECT_TIMEOUT)
+
     # Call external configuration function
     if self._curl_config_fn:
       self._curl_config_fn(curl, self._logger)
 
+    if streaming:
+      # A timeout for the whole transfer would abort long streams
+      curl.setopt(pycurl.TIMEOUT, 0)
+      curl.setopt(pycurl.LOW_SPEED_LIMIT, _STREAM_LOW_SPEED_LIMIT)
+      curl.setopt(pycurl.LOW_SPEED_TIME, _STREAM_LOW_SPEED_TIME)
+
     return curl
 
   @staticmethod
@@ -523,7 +574,7 @@ class GanetiRapiClient(object): # pylint: disable=R0904
 
     return result
 
-  def _SendRequest(self, method, path, query, content):
+  def _SendRequest(self, method, path, query, content, stream_fn=None):
     """Sends an HTTP request.
 
     This constructs a full URL, encodes and decodes HTTP bodies, and
@@ -537,6 +588,9 @@ class GanetiRapiClient(object): # pylint: disable=R0904
     @param query: query arguments to pass to urlencode
     @type content: str or None
     @param content: HTTP body content
+    @type stream_fn: callable
+    @param stream_fn: For streaming responses, function called with every
+      document as soon as it is received
 
     @rtype: str
     @return: JSON-Decoded response
@@ -547,7 +601,7 @@ class GanetiRapiClient(object): # pylint: disable=R0904
     """
     assert path.startswith("/")
 
-    curl = self._CreateCurl()
+    curl = self._CreateCurl(streaming=(stream_fn is not None))
 
     if content is not None:
       encoded_content = self._json_encoder.encode(content)
@@ -568,11 +622,23 @@ class GanetiRapiClient(object): # pylint: disable=R0904
     # Buffer for response
     encoded_resp_body = _CompatIO()
 
+    if stream_fn is None:
+      write_fn = encoded_resp_body.write
+    else:
+      reader = _JsonLineReader(stream_fn)
+
+      def write_fn(data):
+        # Error responses are not streamed
+        if curl.getinfo(pycurl.RESPONSE_CODE) == HTTP_OK:
+          reader.write(data)
+        else:
+          encoded_resp_body.write(data)
+
     # Configure cURL
     curl.setopt(pycurl.CUSTOMREQUEST, str(method))
     curl.setopt(pycurl.URL, str(url))
     curl.setopt(pycurl.POSTFIELDS, str(encoded_content))
-    curl.setopt(pycurl.WRITEFUNCTION, encoded_resp_body.write)
+    curl.setopt(pycurl.WRITEFUNCTION, write_fn)
 
     try:
       # Send request and wait for response
@@ -1536,9 +1602,9 @@ class GanetiRapiClient(object): # pylint: disable=R0904
 
     @rtype: bool
     @return: C{True} if job succeeded or C{False} if failed/status timeout
-    @deprecated: It is recommended to use L{WaitForJobChange} wherever
-      possible; L{WaitForJobChange} returns immediately after a job changed and
-      does not use polling
+    @deprecated: It is recommended to use L{WaitForJobChange} or
+      L{WaitForJobsCompletion} wherever possible; they return immediately
+      after a job changed and do not use polling
 
     """
     while retries != 0:
@@ -1577,6 +1643,54 @@ class GanetiRapiClient(object): # pylint: disable=R0904
                              "/%s/jobs/%s/wait" % (GANETI_RAPI_VERSION, job_id),
                              None, body)
 
+  def StreamJobEvents(self, job_ids, event_fn, fields=None):
+    """Watches a set of jobs over a single connection.
+
+    The server pushes status and log changes of all given jobs as soon as
+    they happen; this call returns once all of them are finalized.
+
+    @type job_ids: list
+    @param job_ids: IDs of the jobs to watch
+    @type event_fn: callable
+    @param event_fn: Function called with a dict for every change, containing
+      the keys C{job_id}, C{status}, C{job_info} (values of the requested
+      fields) and C{log_entries}; C{status} is C{None} if the job could not
+      be found
+    @type fields: list of strings
+    @param fields: Additional job fields to report
+
+    """
+    body = {
+      "jobs": job_ids,
+      "fields": fields or [],
+      }
+
+    self._SendRequest(HTTP_GET, "/%s/jobs/events" % GANETI_RAPI_VERSION,
+                      None, body, stream_fn=event_fn)
+
+  def WaitForJobsCompletion(self, job_ids):
+    """Waits for a set of jobs to finish.
+
+    Unlike L{WaitForJobCompletion}, this doesn't poll and watches all jobs
+    over a single connection.
+
+    @type job_ids: list
+    @param job_ids: IDs of the jobs to wait for
+    @rtype: dict
+    @return: Job ID (as integer) as key, C{True} if the job succeeded and
+      C{False} if it failed or was lost as value
+
+    """
+    result = {}
+
+    def _Record(event):
+      if event["status"] is None or event["status"] in JOB_STATUS_FINALIZED:
+        result[event["job_id"]] = (event["status"] == JOB_STATUS_SUCCESS)
+
+    self.StreamJobEvents(job_ids, _Record)
+
+    return result
+
   def CancelJob(self, job_id, dry_run=False):
     """Cancels a job.
 
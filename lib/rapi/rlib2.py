@@ -567,6 +567,106 @@ class R_2_jobs_id_wait(baserlib.ResourceBase):
       }
 
 
+def _StreamJobEvents(client, jobs, fields, changes):
+  """Generates change events for a set of jobs.
+
+  @type jobs: dict
+  @param jobs: Job ID as key, tuple of previously received job information and
+    log serial as value; modified in place as the jobs change
+  @type fields: list of strings
+  @param fields: Fields to report for each job
+  @param changes: Result of a first call to C{WaitForJobsChangeOnce}
+
+  """
+  while True:
+    if not changes:
+      # Keep-alive, lets the server notice clients which went away
+      yield None
+
+    for (job_id, update) in changes:
+      (_, prev_log_serial) = jobs[job_id]
+
+      if update is None:
+        del jobs[job_id]
+        yield {
+          "job_id": job_id,
+          "status": None,
+          "job_info": None,
+          "log_entries": [],
+          }
+        continue
+
+      (job_info, log_entries) = update
+      for (serial, _, _, _) in log_entries:
+        prev_log_serial = serial if prev_log_serial is None \
+            else max(prev_log_serial, serial)
+
+      status = job_info[0]
+      if status in constants.JOBS_FINALIZED:
+        del jobs[job_id]
+      else:
+        jobs[job_id] = (job_info, prev_log_serial)
+
+      yield {
+        "job_id": job_id,
+        "status": status,
+        "job_info": job_info[1:],
+        "log_entries": log_entries,
+        }
+
+    if not jobs:
+      break
+
+    changes = client.WaitForJobsChangeOnce(
+      [(job_id, prev_job_info, prev_log_serial)
+       for (job_id, (prev_job_info, prev_log_serial)) in jobs.items()],
+      ["status"] + fields, timeout=_WFJC_TIMEOUT)
+
+
+class R_2_jobs_events(baserlib.ResourceBase):
+  """/2/jobs/events resource.
+
+  """
+  # Same as for /2/jobs/[job_id]/wait, this provides access to sensitive
+  # information and keeps a connection open for a long time
+  GET_ACCESS = [rapi.RAPI_ACCESS_WRITE]
+
+  def GET(self):
+    """Streams status and log changes of a set of jobs.
+
+    The response consists of one JSON document per line, each describing a
+    change of one job. Lines containing C{null} are sent while no job changes.
+    The stream ends once all jobs are finalized or lost.
+
+    """
+    job_ids = self.getBodyParameter("jobs")
+    fields = self.getBodyParameter("fields", [])
+
+    if not (isinstance(job_ids, list) and job_ids):
+      raise http.HttpBadRequest("The 'jobs' parameter should be a non-empty"
+                                " list")
+
+    try:
+      job_ids = [int(job_id) for job_id in job_ids]
+    except (TypeError, ValueError):
+      raise http.HttpBadRequest("The 'jobs' parameter should be a list of"
+                                " job IDs")
+
+    if not isinstance(fields, list):
+      raise http.HttpBadRequest("The 'fields' parameter should be a list")
+
+    jobs = dict((job_id, (None, None)) for job_id in job_ids)
+
+    # The first call is made before the response is started, so that errors
+    # are still reported with the proper status code
+    client = self.GetClient()
+    changes = client.WaitForJobsChangeOnce(
+      [(job_id, None, None) for job_id in jobs], ["status"] + fields,
+      timeout=_WFJC_TIMEOUT)
+
+    return _StreamJobEvents(client, jobs, fields, changes)
+
+
 class R_2_nodes(baserlib.OpcodeResource):
   """/2/nodes resource.
 
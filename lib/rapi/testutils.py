@@ -215,6 +215,8 @@ class FakeCurl(object):
       self._handler.FetchResponse(path, method, headers, request_body)
 
     self._info[pycurl.RESPONSE_CODE] = code
+    if isinstance(resp_body, http.HttpStreamingBody):
+      resp_body = b"".join(resp_body)
     if isinstance(resp_body, bytes):
       resp_body = resp_body.decode("utf-8")
     if resp_body is not None:
@@ -290,8 +290,7 @@ def _SsconfResolver(ssconf_ips, node_list, _,
   family = ss.GetPrimaryIPFamily()
 
   if ssconf_ips:
-    iplist = ss.GetNodePrimaryIPList()
-    ipmap = dict(entry.split() for entry in iplist)
+    ipmap = ss.GetNodePrimaryIPMap()
   else:
     ipmap = {}
 
@@ -439,32 +438,37 @@ class _RpcProcessor(object):
 
     return results
 
-  def __call__(self, nodes, procedure, body, read_timeout, resolver_opts,
-               _req_process_fn=None):
-    """Makes an RPC request to a number of nodes.
+  def Prepare(self, nodes, procedure, body, read_timeout, resolver_opts):
+    """Resolves the nodes and prepares the requests of an RPC call.
 
-    @type nodes: sequence
-    @param nodes: node UUIDs or Hostnames
-    @type procedure: string
-    @param procedure: Request path
-    @type body: dictionary
-    @param body: dictionary with request bodies per host
-    @type read_timeout: int or None
-    @param read_timeout: Read timeout for request
-    @rtype: dictionary
-    @return: a dictionary mapping host names to rpc.RpcResult objects
+    @see: L{__call__} for the parameters
+    @return: the prepared requests, to be passed to L{Send}
 
     """
     assert read_timeout is not None, \
       "Missing RPC read timeout for procedure '%s'" % procedure
 
-    if _req_process_fn is None:
-      _req_process_fn = http.client.ProcessRequests
-
     (results, requests) = \
       self._PrepareRequests(self._resolver(nodes, resolver_opts), self._port,
                             procedure, body, read_timeout)
 
+    return (procedure, results, requests)
+
+  def Send(self, prepared, _req_process_fn=None):
+    """Sends the requests prepared by L{Prepare}.
+
+    Doesn't use the resolver, so this can be called from another thread than
+    the one which prepared the requests.
+
+    @rtype: dictionary
+    @return: a dictionary mapping host names to rpc.RpcResult objects
+
+    """
+    (procedure, results, requests) = prepared
+
+    if _req_process_fn is None:
+      _req_process_fn = http.client.ProcessRequests
+
     _req_process_fn(list(requests.values()),
                     lock_monitor_cb=self._lock_monitor_cb)
 
@@ -472,6 +476,26 @@ class _RpcProcessor(object):
 
     return self._CombineResults(results, requests, procedure)
 
+  def __call__(self, nodes, procedure, body, read_timeout, resolver_opts,
+               _req_process_fn=None):
+    """Makes an RPC request to a number of nodes.
+
+    @type nodes: sequence
+    @param nodes: node UUIDs or Hostnames
+    @type procedure: string
+    @param procedure: Request path
+    @type body: dictionary
+    @param body: dictionary with request bodies per host
+    @type read_timeout: int or None
+    @param read_timeout: Read timeout for request
+    @rtype: dictionary
+    @return: a dictionary mapping host names to rpc.RpcResult objects
+
+    """
+    return self.Send(self.Prepare(nodes, procedure, body, read_timeout,
+                                  resolver_opts),
+                     _req_process_fn=_req_process_fn)
+
 
 class _RpcClientBase(object):
   def __init__(self, resolver, encoder_fn, lock_monitor_cb=None,
@@ -479,10 +503,10 @@ class _RpcClientBase(object):
     """Initializes this class.
 
     """
-    proc = _RpcProcessor(resolver,
-                         netutils.GetDaemonPort(constants.NODED),
-                         lock_monitor_cb=lock_monitor_cb)
-    self._proc = compat.partial(proc, _req_process_fn=_req_process_fn)
+    self._proc = _RpcProcessor(resolver,
+                               netutils.GetDaemonPort(constants.NODED),
+                               lock_monitor_cb=lock_monitor_cb)
+    self._req_process_fn = _req_process_fn
     self._encoder = compat.partial(self._EncodeArg, encoder_fn)
 
   @staticmethod
@@ -499,6 +523,15 @@ class _RpcClientBase(object):
   def _Call(self, cdef, node_list, args):
     """Entry point for automatically generated RPC wrappers.
 
+    """
+    return self._PrepareCall(cdef, node_list, args)()
+
+  def _PrepareCall(self, cdef, node_list, args):
+    """Encodes the arguments of an RPC call and prepares its requests.
+
+    @rtype: callable
+    @return: function sending the requests and returning the results
+
     """
     (procedure, _, resolver_opts, timeout, argdefs,
      prep_fn, postproc_fn, _) = cdef
@@ -531,13 +564,64 @@ class _RpcClientBase(object):
       for n in node_list
     )
 
-    result = self._proc(node_list, procedure, pnbody, read_timeout,
-                        req_resolver_opts)
+    prepared = self._proc.Prepare(node_list, procedure, pnbody, read_timeout,
+                                  req_resolver_opts)
+
+    def _Send():
+      result = self._proc.Send(prepared,
+                               _req_process_fn=self._req_process_fn)
+      if postproc_fn:
+        return dict((k, postproc_fn(v)) for (k, v) in result.items())
+      else:
+        return result
+
+    return _Send
+
+  def PrepareCalls(self):
+    """Returns a client preparing RPC calls without sending them.
+
+    @rtype: L{_PreparedCalls}
+
+    """
+    return _PreparedCalls(self)
 
-    if postproc_fn:
-      return dict((k, postproc_fn(v)) for (k, v) in result.items())
-    else:
-      return result
+
+class _PreparedCalls(object):
+  """Client preparing RPC calls to be sent later.
+
+  The C{call_*} methods encode their arguments and resolve the node in the
+  calling thread, like the ones of the wrapped client, but return a function
+  sending the request and returning its result. As the configuration is only
+  used while preparing, the calls can be sent from other threads.
+
+  Only calls to a single node are supported.
+
+  """
+  def __init__(self, client):
+    """Initializes this class.
+
+    @type client: L{_RpcClientBase}
+    @param client: the client whose calls are prepared
+
+    """
+    self._client = client
+
+  def __getattr__(self, name):
+    if not name.startswith("call_"):
+      raise AttributeError(name)
+    return compat.partial(getattr(type(self._client), name), self)
+
+  def _Call(self, cdef, node_list, args):
+    """Replacement for L{_RpcClientBase._Call} used by the wrappers.
+
+    """
+    if len(node_list) != 1:
+      raise errors.ProgrammerError("Only calls to a single node can be"
+                                   " prepared")
+    (node, ) = node_list
+    # pylint: disable=W0212
+    send_fn = self._client._PrepareCall(cdef, node_list, args)
+    return {node: lambda: send_fn()[node]}
 
 
 def _ObjectToDict(_, value):
@@ -833,6 +917,7 @@ class RpcRunner(_RpcClientBase,
       rpc_defs.ED_FILE_DETAILS: compat.partial(_PrepareFileUpload, _getents),
 
       rpc_defs.ED_IMPEXP_IO: self._EncodeImportExportIO,
+      rpc_defs.ED_BLOCKDEV_ASSEMBLE: self._EncodeBlockdevAssemble,
       })
 
     # Resolver using configuration
@@ -971,14 +1056,29 @@ class RpcRunner(_RpcClientBase,
     return dict((name, [self._SingleDiskDictDP(node, disk) for disk in disks])
                 for name, disks in value.items())
 
+  def _EncodeBlockdevAssemble(self, node, disks):
+    """Encodes a list of (disk, instance, idx) tuples for blockdev_assemble.
+
+    """
+    idicts = {}
+    result = []
+    for (disk, instance, idx) in disks:
+      if instance.uuid not in idicts:
+        idicts[instance.uuid] = self._InstDict(node, instance)
+      result.append((self._SingleDiskDictDP(node, (disk, instance)),
+                     idicts[instance.uuid], idx))
+    return result
+
   def _EncodeImportExportIO(self, node, ieinfo):
     """Encodes import/export I/O information.
 
     """
     (ieio, ieioargs) = ieinfo
-    if ieio == constants.IEIO_RAW_DISK:
-      assert len(ieioargs) == 2
-      return (ieio, (self._SingleDiskDictDP(node, ieioargs), ))
+    if ieio in (constants.IEIO_RAW_DISK, constants.IEIO_SPARSE_DISK):
+      # Optionally followed by offset and size of the part to transfer
+      assert len(ieioargs) in (2, 4)
+      return (ieio, (self._SingleDiskDictDP(node, ieioargs[:2]), ) +
+              tuple(ieioargs[2:]))
 
     if ieio == constants.IEIO_SCRIPT:
       assert len(ieioargs) == 2
@@ -82,7 +82,8 @@ ACCEPT_OFFLINE_NODE = object()
  ED_MULTI_DISKS_DICT_DP,
  ED_SINGLE_DISK_DICT_DP,
  ED_NIC_DICT,
- ED_DEVICE_DICT) = range(1, 17)
+ ED_DEVICE_DICT,
+ ED_BLOCKDEV_ASSEMBLE) = range(1, 18)
 
 
 def _Prepare(calls):
@@ -110,6 +111,17 @@ def _BlockdevFindPostProc(result):
   return result
 
 
+def _BlockdevFindMultiPostProc(result):
+  """Post-processor for L{rpc.node.RpcRunner.call_blockdev_find_multi}.
+
+  """
+  if not result.fail_msg:
+    for idx, (success, status) in enumerate(result.payload):
+      if success and status is not None:
+        result.payload[idx] = (success, objects.BlockDevStatus.FromDict(status))
+  return result
+
+
 def _BlockdevGetMirrorStatusPostProc(result):
   """Post-processor for call_blockdev_getmirrorstatus.
 
@@ -386,6 +398,7 @@ _BLOCKDEV_CALLS = [
     ("bdev", ED_SINGLE_DISK_DICT_DP, None),
     ("image", None, None),
     ("size", None, None),
+    ("clone", None, None),
     ], None, None,
     "Request to dump an image with given size onto a block device"),
   ("blockdev_wipe", SINGLE, None, constants.RPC_TMO_SLOW, [
@@ -407,9 +420,16 @@ _BLOCKDEV_CALLS = [
     ("on_primary", None, None),
     ("idx", None, None),
     ], None, None, "Request assembling of a given block device"),
+  ("blockdev_assemble_multi", SINGLE, None, constants.RPC_TMO_NORMAL, [
+    ("disks", ED_BLOCKDEV_ASSEMBLE, None),
+    ("on_primary", None, None),
+    ], None, None, "Request assembling of several block devices"),
   ("blockdev_shutdown", SINGLE, None, constants.RPC_TMO_NORMAL, [
     ("disk", ED_SINGLE_DISK_DICT_DP, None),
     ], None, None, "Request shutdown of a given block device"),
+  ("blockdev_shutdown_multi", SINGLE, None, constants.RPC_TMO_NORMAL, [
+    ("disks", ED_MULTI_DISKS_DICT_DP, None),
+    ], None, None, "Request shutdown of several block devices"),
   ("blockdev_addchildren", SINGLE, None, constants.RPC_TMO_NORMAL, [
     ("bdev", ED_SINGLE_DISK_DICT_DP, None),
     ("ndevs", ED_DISKS_DICT_DP, None),
@@ -468,6 +488,10 @@ _BLOCKDEV_CALLS = [
     ("disk", ED_SINGLE_DISK_DICT_DP, None),
     ], None, _BlockdevFindPostProc,
     "Request identification of a given block device"),
+  ("blockdev_find_multi", SINGLE, None, constants.RPC_TMO_NORMAL, [
+    ("disks", ED_MULTI_DISKS_DICT_DP, None),
+    ], None, _BlockdevFindMultiPostProc,
+    "Request identification of several block devices"),
   ("blockdev_getmirrorstatus", SINGLE, None, constants.RPC_TMO_NORMAL, [
     ("disks", ED_DISKS_DICT_DP, None),
     ], None, _BlockdevGetMirrorStatusPostProc,
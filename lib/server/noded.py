@@ -118,9 +118,9 @@ def _DecodeImportExportIO(ieio, ieioargs):
   """Decodes import/export I/O information.
 
   """
-  if ieio == constants.IEIO_RAW_DISK:
-    assert len(ieioargs) == 1
-    return (objects.Disk.FromDict(ieioargs[0]), )
+  if ieio in (constants.IEIO_RAW_DISK, constants.IEIO_SPARSE_DISK):
+    assert len(ieioargs) in (1, 3)
+    return (objects.Disk.FromDict(ieioargs[0]), ) + tuple(ieioargs[1:])
 
   if ieio == constants.IEIO_SCRIPT:
     assert len(ieioargs) == 2
@@ -245,9 +245,9 @@ class NodeRequestHandler(http.server.HttpServerHandler):
     """Image a block device.
 
     """
-    bdev_s, image, size = params
+    bdev_s, image, size, clone = params
     bdev = objects.Disk.FromDict(bdev_s)
-    return backend.BlockdevImage(bdev, image, size)
+    return backend.BlockdevImage(bdev, image, size, clone=clone)
 
   @staticmethod
   def perspective_blockdev_wipe(params):
@@ -287,6 +287,17 @@ class NodeRequestHandler(http.server.HttpServerHandler):
       raise ValueError("can't unserialize data!")
     return backend.BlockdevAssemble(bdev, instance, on_primary, idx)
 
+  @staticmethod
+  def perspective_blockdev_assemble_multi(params):
+    """Assemble several block devices.
+
+    """
+    (disks_s, on_primary) = params
+    disks = [(objects.Disk.FromDict(bdev_s), objects.Instance.FromDict(idict),
+              idx)
+             for (bdev_s, idict, idx) in disks_s]
+    return backend.BlockdevAssembleMulti(disks, on_primary)
+
   @staticmethod
   def perspective_blockdev_shutdown(params):
     """Shutdown a block device.
@@ -298,6 +309,14 @@ class NodeRequestHandler(http.server.HttpServerHandler):
       raise ValueError("can't unserialize data!")
     return backend.BlockdevShutdown(bdev)
 
+  @staticmethod
+  def perspective_blockdev_shutdown_multi(params):
+    """Shutdown several block devices.
+
+    """
+    disks = [objects.Disk.FromDict(bdev_s) for bdev_s in params[0]]
+    return backend.BlockdevShutdownMulti(disks)
+
   @staticmethod
   def perspective_blockdev_addchildren(params):
     """Add a child to a mirror device.
@@ -372,6 +391,21 @@ class NodeRequestHandler(http.server.HttpServerHandler):
 
     return result.ToDict()
 
+  @staticmethod
+  def perspective_blockdev_find_multi(params):
+    """Find several disks, without activating them.
+
+    """
+    disks = [objects.Disk.FromDict(cf) for cf in params[0]]
+
+    result = []
+    for (success, status) in backend.BlockdevFindMulti(disks):
+      if success and status is not None:
+        status = status.ToDict()
+      result.append((success, status))
+
+    return result
+
   @staticmethod
   def perspective_blockdev_snapshot(params):
     """Create a snapshot device.
@@ -1306,6 +1340,14 @@ def CheckNoded(options, args):
                           sys.argv[0], file=sys.stderr)
     sys.exit(constants.EXIT_FAILURE)
 
+  if options.image_cache_size is not None:
+    try:
+      options.image_cache_size = utils.ParseUnit(options.image_cache_size)
+    except errors.UnitParseError as err:
+      print("%s: invalid --image-cache-size argument: %s" %
+            (sys.argv[0], err), file=sys.stderr)
+      sys.exit(constants.EXIT_FAILURE)
+
 
 def SSLVerifyPeer(conn, cert, errnum, errdepth, ok):
   """Callback function to verify a peer against the candidate cert map.
@@ -1408,9 +1450,21 @@ def PrepNoded(options, _):
     # startup of the whole node daemon because of this
     logging.critical("Can't init/verify the queue, proceeding anyway: %s", err)
 
+  if options.image_cache_size is not None:
+    backend.SetImageCacheSize(options.image_cache_size * 1024 * 1024)
+
   handler = NodeRequestHandler()
 
   mainloop = daemon.Mainloop()
+
+  # Keep the OS and ExtStorage definitions loaded in this process, from where
+  # they're inherited by the forked request handlers
+  try:
+    backend.StartWatchingProviders()
+  except (EnvironmentError, errors.GenericError) as err:
+    logging.warning("Can't watch the OS and ExtStorage providers,"
+                    " proceeding without: %s", err)
+
   server = http.server.HttpServer(
       mainloop, options.bind_address, options.port, options.max_clients,
       handler, ssl_params=ssl_params, ssl_verify_peer=True,
@@ -1448,6 +1502,10 @@ def Main():
                     default=20, type="int",
                     help="Number of simultaneous connections accepted"
                     " by noded")
+  parser.add_option("--image-cache-size", dest="image_cache_size",
+                    default=None, metavar="SIZE",
+                    help="Size the cache of downloaded instance images is"
+                    " pruned to (default unit is MiB)")
 
   daemon.GenericMain(constants.NODED, parser, CheckNoded, PrepNoded, ExecNoded,
                      default_ssl_cert=pathutils.NODED_CERT_FILE,
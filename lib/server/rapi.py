@@ -43,6 +43,7 @@ import sys
 import os
 import os.path
 import errno
+import types
 
 try:
   from pyinotify import pyinotify # pylint: disable=E0611
@@ -211,6 +212,12 @@ class RemoteApiHandler(http.auth.HttpServerRequestAuthentication,
     except rpcerr.ProtocolError as err:
       raise http.HttpBadGateway(str(err))
 
+    if isinstance(result, types.GeneratorType):
+      # Stream results as they are generated, one JSON document per line
+      req.resp_headers[http.HTTP_CONTENT_TYPE] = http.HTTP_APP_NDJSON
+      return http.HttpStreamingBody(serializer.DumpJson(item)
+                                    for item in result)
+
     req.resp_headers[http.HTTP_CONTENT_TYPE] = http.HTTP_APP_JSON
 
     return serializer.DumpJson(result)
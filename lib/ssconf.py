@@ -36,8 +36,11 @@ configuration data, which is mostly static and available to all nodes.
 """
 
 import sys
+import os
 import errno
 import logging
+import mmap
+import struct
 
 from ganeti import errors
 from ganeti import constants
@@ -54,6 +57,47 @@ _VALID_KEYS = constants.VALID_SS_KEYS
 #: Maximum size for ssconf files
 _MAX_SIZE = 128 * 1024
 
+#: Name of the snapshot file in the ssconf directory
+_SNAPSHOT_FILENAME = "ssconf-snapshot"
+
+#: Magic bytes and format version at the start of snapshot files
+_SNAPSHOT_MAGIC = b"GNTSSCNF"
+_SNAPSHOT_VERSION = 2
+
+#: Snapshot header: magic, version and number of sections
+_SNAPSHOT_HEADER = struct.Struct("<8sII")
+
+#: Snapshot section table entry: kind, length of the name, offset and length
+#: of the section's data; directly followed by the name
+_SNAPSHOT_SECTION = struct.Struct("<BHII")
+
+#: Number of entries at the start of a map section
+_SNAPSHOT_MAP_COUNT = struct.Struct("<I")
+
+#: Map section entry: offset and length of the key, offset and length of the
+#: value
+_SNAPSHOT_MAP_ENTRY = struct.Struct("<IIII")
+
+#: Source section: identity of the ssconf file a value was read from, see
+#: L{_GetFileIdentity}
+_SNAPSHOT_SOURCE = struct.Struct("<QQQq")
+
+#: Section kinds; plain ssconf values, precomputed maps and the identities of
+#: the ssconf files
+_SECTION_VALUE = 0
+_SECTION_MAP = 1
+_SECTION_SOURCE = 2
+
+#: Ssconf keys whose values are also stored as precomputed maps, with the
+#: separator between key and value on each line (C{None} for whitespace)
+_SNAPSHOT_MAPS = dict([
+  (constants.SS_MASTER_CANDIDATES_CERTS, "="),
+  (constants.SS_NODE_PRIMARY_IPS, None),
+  (constants.SS_NODE_VM_CAPABLE, "="),
+  (constants.SS_SSH_PORTS, "="),
+  ] + [(constants.SS_HVPARAMS_PREF + hv, "=")
+       for hv in constants.HYPER_TYPES])
+
 
 def ReadSsconfFile(filename):
   """Reads an ssconf file and verifies its size.
@@ -77,6 +121,282 @@ def ReadSsconfFile(filename):
   return data.rstrip("\n")
 
 
+def _ParseSsconfMap(data, separator):
+  """Splits the lines of an ssconf value into a dictionary.
+
+  @rtype: dict or None
+  @return: the keys mapped to the values, C{None} if a line doesn't consist of
+    exactly one key and one value
+
+  """
+  mapping = {}
+  for line in data.splitlines(False):
+    parts = line.split(separator)
+    if len(parts) != 2:
+      return None
+    mapping[parts[0]] = parts[1]
+  return mapping
+
+
+def _PackSnapshotMap(mapping, offset):
+  """Serializes a map section placed at the given offset.
+
+  """
+  items = sorted((key.encode("utf-8"), value.encode("utf-8"))
+                 for (key, value) in mapping.items())
+
+  pos = (offset + _SNAPSHOT_MAP_COUNT.size +
+         len(items) * _SNAPSHOT_MAP_ENTRY.size)
+  entries = []
+  strings = []
+  for (key, value) in items:
+    entries.append(_SNAPSHOT_MAP_ENTRY.pack(pos, len(key),
+                                            pos + len(key), len(value)))
+    strings.extend([key, value])
+    pos += len(key) + len(value)
+
+  return b"".join([_SNAPSHOT_MAP_COUNT.pack(len(items))] + entries + strings)
+
+
+def _BuildSnapshot(values, sources):
+  """Serializes ssconf values into a snapshot.
+
+  Besides the values themselves, the snapshot contains the keys listed in
+  L{_SNAPSHOT_MAPS} already split into maps, and the identities of the files
+  the values were read from.
+
+  @type values: dict
+  @param values: ssconf keys mapped to their values as returned by
+    L{ReadSsconfFile}
+  @type sources: dict
+  @param sources: ssconf keys mapped to the identity of their file, see
+    L{_GetFileIdentity}
+  @rtype: bytes
+
+  """
+  sections = [(_SECTION_VALUE, key, value)
+              for (key, value) in sorted(values.items())]
+  sections.extend((_SECTION_SOURCE, key, sources[key])
+                  for key in sorted(values))
+
+  for (key, separator) in sorted(_SNAPSHOT_MAPS.items()):
+    if key in values:
+      mapping = _ParseSsconfMap(values[key], separator)
+      if mapping is not None:
+        sections.append((_SECTION_MAP, key, mapping))
+
+  names = [name.encode("utf-8") for (_, name, _) in sections]
+
+  offset = _SNAPSHOT_HEADER.size + sum(_SNAPSHOT_SECTION.size + len(name)
+                                       for name in names)
+  table = [_SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, _SNAPSHOT_VERSION,
+                                 len(sections))]
+  data = []
+
+  for ((kind, _, value), name) in zip(sections, names):
+    if kind == _SECTION_VALUE:
+      blob = value.encode("utf-8")
+    elif kind == _SECTION_SOURCE:
+      blob = _SNAPSHOT_SOURCE.pack(*value)
+    else:
+      blob = _PackSnapshotMap(value, offset)
+    table.append(_SNAPSHOT_SECTION.pack(kind, len(name), offset, len(blob)))
+    table.append(name)
+    data.append(blob)
+    offset += len(blob)
+
+  return b"".join(table + data)
+
+
+class _SsconfSnapshot(object):
+  """Read-only view of a memory-mapped ssconf snapshot.
+
+  Only the section table is read when opening the snapshot. Values are
+  decoded when requested, maps once per snapshot. Whether the ssconf file of
+  a key still is the one the snapshot was written from must be checked with
+  L{IsCurrent} before using its value.
+
+  """
+  def __init__(self, filename):
+    """Maps a snapshot file into memory.
+
+    @raise ValueError: if the file doesn't contain a valid snapshot
+
+    """
+    fd = os.open(filename, os.O_RDONLY)
+    try:
+      st = os.fstat(fd)
+      self._mmap = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+    finally:
+      os.close(fd)
+
+    #: Identity of the mapped file, see L{_GetFileIdentity}
+    self.identity = _GetFileIdentity(st)
+
+    self._sections = self._ReadSectionTable()
+    self._maps = {}
+
+  def _ReadSectionTable(self):
+    """Returns the offset and length of every section.
+
+    """
+    try:
+      (magic, version, count) = _SNAPSHOT_HEADER.unpack_from(self._mmap, 0)
+    except struct.error:
+      raise ValueError("File too short")
+
+    if magic != _SNAPSHOT_MAGIC:
+      raise ValueError("Not an ssconf snapshot")
+
+    if version != _SNAPSHOT_VERSION:
+      raise ValueError("Unsupported snapshot version %s" % version)
+
+    sections = {}
+    pos = _SNAPSHOT_HEADER.size
+
+    try:
+      for _ in range(count):
+        (kind, namelen, offset, length) = \
+          _SNAPSHOT_SECTION.unpack_from(self._mmap, pos)
+        pos += _SNAPSHOT_SECTION.size
+        name = self._mmap[pos:pos + namelen].decode("utf-8")
+        pos += namelen
+        if offset + length > len(self._mmap):
+          raise ValueError("Section '%s' exceeds the file size" % name)
+        if kind == _SECTION_SOURCE and length != _SNAPSHOT_SOURCE.size:
+          raise ValueError("Invalid source section '%s'" % name)
+        sections[(kind, name)] = (offset, length)
+    except (struct.error, UnicodeDecodeError) as err:
+      raise ValueError("Invalid section table: %s" % err)
+
+    return sections
+
+  def IsCurrent(self, key, filename):
+    """Checks whether the snapshot is current for an ssconf key.
+
+    This is the case if the ssconf file of the key is still the one the
+    snapshot was written from. Ssconf files can be replaced or removed
+    without the snapshot being updated, e.g. when they are copied to a node
+    or when the master candidate certificates are renewed.
+
+    @type key: string
+    @param key: the ssconf key
+    @type filename: string
+    @param filename: the path of the ssconf file of the key
+    @rtype: bool
+
+    """
+    try:
+      (offset, _) = self._sections[(_SECTION_SOURCE, key)]
+    except KeyError:
+      return False
+
+    try:
+      identity = _GetFileIdentity(os.stat(filename))
+    except EnvironmentError:
+      return False
+
+    return _SNAPSHOT_SOURCE.unpack_from(self._mmap, offset) == identity
+
+  def GetValue(self, key):
+    """Returns the value of an ssconf key.
+
+    @rtype: string or None
+    @return: the value, C{None} if the snapshot doesn't contain the key
+
+    """
+    try:
+      (offset, length) = self._sections[(_SECTION_VALUE, key)]
+    except KeyError:
+      return None
+
+    return self._mmap[offset:offset + length].decode("utf-8")
+
+  def GetMap(self, key):
+    """Returns the precomputed map of an ssconf key.
+
+    The returned dictionary is shared and must not be modified.
+
+    @rtype: dict or None
+    @return: the map, C{None} if the snapshot doesn't contain one for the key
+
+    """
+    try:
+      return self._maps[key]
+    except KeyError:
+      pass
+
+    try:
+      (offset, _) = self._sections[(_SECTION_MAP, key)]
+    except KeyError:
+      return None
+
+    data = self._mmap
+    (count, ) = _SNAPSHOT_MAP_COUNT.unpack_from(data, offset)
+    offset += _SNAPSHOT_MAP_COUNT.size
+    entries = data[offset:offset + count * _SNAPSHOT_MAP_ENTRY.size]
+
+    mapping = dict((data[koff:koff + klen].decode("utf-8"),
+                    data[voff:voff + vlen].decode("utf-8"))
+                   for (koff, klen, voff, vlen)
+                   in _SNAPSHOT_MAP_ENTRY.iter_unpack(entries))
+
+    self._maps[key] = mapping
+
+    return mapping
+
+
+def _GetFileIdentity(st):
+  """Returns the values identifying a version of a file.
+
+  Snapshots and ssconf files are always replaced, never modified in place.
+
+  """
+  return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+#: Snapshots used by this process, keyed by filename; values are the file's
+#: identity and the snapshot, C{None} for invalid files
+_snapshots = {}
+
+
+def _GetSnapshot(filename):
+  """Returns the current snapshot in a file.
+
+  A snapshot is mapped only once per process and reused as long as the file
+  has not been replaced.
+
+  @rtype: L{_SsconfSnapshot} or None
+  @return: the snapshot, C{None} if the file doesn't exist or is invalid
+
+  """
+  try:
+    identity = _GetFileIdentity(os.stat(filename))
+  except EnvironmentError:
+    return None
+
+  try:
+    (cached_identity, snapshot) = _snapshots[filename]
+  except KeyError:
+    pass
+  else:
+    if cached_identity == identity:
+      return snapshot
+
+  try:
+    snapshot = _SsconfSnapshot(filename)
+  except (EnvironmentError, ValueError) as err:
+    logging.warning("Ignoring ssconf snapshot '%s': %s", filename, err)
+    snapshot = None
+
+  if snapshot is not None:
+    identity = snapshot.identity
+
+  _snapshots[filename] = (identity, snapshot)
+
+  return snapshot
+
+
 class SimpleStore(object):
   """Interface to static cluster data.
 
@@ -86,6 +406,9 @@ class SimpleStore(object):
 
   Other particularities of the datastore:
     - keys are restricted to predefined values
+    - values are read from the snapshot written by L{WriteSsconfFiles} if
+      there is one and the individual file hasn't changed since, falling back
+      to the individual files
 
   """
   def __init__(self, cfg_location=None, _lockfile=pathutils.SSCONF_LOCK_FILE):
@@ -95,6 +418,7 @@ class SimpleStore(object):
       self._cfg_dir = cfg_location
 
     self._lockfile = _lockfile
+    self._snapshot_file = self._cfg_dir + "/" + _SNAPSHOT_FILENAME
 
   def KeyToFilename(self, key):
     """Convert a given key into filename.
@@ -107,14 +431,42 @@ class SimpleStore(object):
     filename = self._cfg_dir + "/" + constants.SSCONF_FILEPREFIX + key
     return filename
 
+  def GetSnapshotFilename(self):
+    """Returns the path of the snapshot file.
+
+    """
+    return self._snapshot_file
+
+  def _GetCurrentSnapshot(self, key):
+    """Returns the snapshot if it is current for an ssconf key.
+
+    @rtype: L{_SsconfSnapshot} or None
+    @return: the snapshot, C{None} if there is none or the ssconf file of the
+      key has changed since the snapshot was written
+
+    """
+    snapshot = _GetSnapshot(self._snapshot_file)
+    if snapshot is None or not snapshot.IsCurrent(key,
+                                                  self.KeyToFilename(key)):
+      return None
+
+    return snapshot
+
   def _ReadFile(self, key, default=None):
     """Generic routine to read keys.
 
-    This will read the file which holds the value requested. Errors
-    will be changed into ConfigurationErrors.
+    This will read the value from the snapshot or else the file which holds
+    the value requested. Errors will be changed into ConfigurationErrors.
 
     """
     filename = self.KeyToFilename(key)
+
+    snapshot = self._GetCurrentSnapshot(key)
+    if snapshot is not None:
+      value = snapshot.GetValue(key)
+      if value is not None:
+        return value
+
     try:
       return ReadSsconfFile(filename)
     except EnvironmentError as err:
@@ -143,13 +495,59 @@ class SimpleStore(object):
 
     return dict(result)
 
-  def WriteFiles(self, values, dry_run=False):
+  def _GetSnapshotMap(self, key):
+    """Returns a copy of the precomputed map of a key from the snapshot.
+
+    @rtype: dict or None
+    @return: the map, C{None} if there is no current snapshot for the key or
+      it has no map for the key
+
+    """
+    snapshot = self._GetCurrentSnapshot(key)
+    if snapshot is None:
+      return None
+
+    mapping = snapshot.GetMap(key)
+    if mapping is None:
+      return None
+
+    return dict(mapping)
+
+  def _WriteSnapshot(self):
+    """Writes the snapshot from the current content of the ssconf files.
+
+    Must be called with the ssconf lock held.
+
+    """
+    values = {}
+    sources = {}
+
+    for key in _VALID_KEYS:
+      filename = self.KeyToFilename(key)
+      try:
+        # Should the file be replaced after this, the snapshot isn't used for
+        # the key
+        sources[key] = _GetFileIdentity(os.stat(filename))
+        values[key] = ReadSsconfFile(filename)
+      except EnvironmentError as err:
+        if err.errno != errno.ENOENT:
+          raise errors.ConfigurationError("Can't read ssconf file %s: %s" %
+                                          (filename, str(err)))
+
+    utils.WriteFile(self._snapshot_file,
+                    data=_BuildSnapshot(values, sources),
+                    mode=constants.SS_FILE_PERMS)
+
+  def WriteFiles(self, values, dry_run=False, snapshot=False):
     """Writes ssconf files used by external scripts.
 
     @type values: dict
     @param values: Dictionary of (name, value)
     @type dry_run boolean
     @param dry_run: Whether to perform a dry run
+    @type snapshot: boolean
+    @param snapshot: Whether to also rewrite the snapshot from all ssconf
+      files
 
     """
     ssconf_lock = utils.FileLock.Open(self._lockfile)
@@ -171,6 +569,9 @@ class SimpleStore(object):
         utils.WriteFile(self.KeyToFilename(name), data=value,
                         mode=constants.SS_FILE_PERMS,
                         dry_run=dry_run)
+
+      if snapshot and not dry_run:
+        self._WriteSnapshot()
     finally:
       ssconf_lock.Unlock()
 
@@ -235,6 +636,10 @@ class SimpleStore(object):
     @return: a dictionary mapping the keys to the values
 
     """
+    mapping = self._GetSnapshotMap(ss_file_key)
+    if mapping is not None:
+      return mapping
+
     data = self._ReadFile(ss_file_key)
     lines = data.splitlines(False)
     mapping = {}
@@ -317,6 +722,18 @@ class SimpleStore(object):
     nl = data.splitlines(False)
     return nl
 
+  def GetNodePrimaryIPMap(self):
+    """Return the map of cluster node names to their primary IP.
+
+    @rtype: dict of string to string
+
+    """
+    mapping = self._GetSnapshotMap(constants.SS_NODE_PRIMARY_IPS)
+    if mapping is not None:
+      return mapping
+
+    return dict(entry.split() for entry in self.GetNodePrimaryIPList())
+
   def GetNodeSecondaryIPList(self):
     """Return the list of cluster nodes' secondary IP.
 
@@ -332,6 +749,11 @@ class SimpleStore(object):
     @return: mapping of node names to vm capable values
 
     """
+    mapping = self._GetSnapshotMap(constants.SS_NODE_VM_CAPABLE)
+    if mapping is not None:
+      return dict((node_uuid, node_vm_capable == "True")
+                  for (node_uuid, node_vm_capable) in mapping.items())
+
     data = self._ReadFile(constants.SS_NODE_VM_CAPABLE)
     vm_capable = {}
     for line in data.splitlines(False):
@@ -438,12 +860,12 @@ class SimpleStore(object):
 
 
 def WriteSsconfFiles(values, dry_run=False):
-  """Update all ssconf files.
+  """Update all ssconf files and the snapshot.
 
   Wrapper around L{SimpleStore.WriteFiles}.
 
   """
-  SimpleStore().WriteFiles(values, dry_run=dry_run)
+  SimpleStore().WriteFiles(values, dry_run=dry_run, snapshot=True)
 
 
 def GetMasterAndMyself(ss=None):
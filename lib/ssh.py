@@ -728,20 +728,32 @@ def InitPubKeyFile(master_uuid, key_type, key_file=pathutils.SSH_PUB_KEYS):
   AddPublicKey(master_uuid, key, key_file=key_file)
 
 
+#: How long (in seconds) shared SSH connections are kept open
+CONTROL_PERSIST_TIMEOUT = 60
+
+
 class SshRunner(object):
   """Wrapper for SSH commands.
 
   """
-  def __init__(self, cluster_name):
+  def __init__(self, cluster_name, control_persist=None):
     """Initializes this class.
 
     @type cluster_name: str
     @param cluster_name: name of the cluster
+    @type control_persist: int
+    @param control_persist: if set, all commands to the same node share a
+        single SSH connection, which is kept open for this many seconds after
+        the last command finished (see C{ControlMaster} in ssh_config(5))
 
     """
     self.cluster_name = cluster_name
     family = ssconf.SimpleStore().GetPrimaryIPFamily()
     self.ipv6 = (family == netutils.IP6Address.family)
+    self.control_persist = control_persist
+    if control_persist:
+      utils.EnsureDirs([(pathutils.SSH_CONTROL_DIR,
+                         constants.SECURE_DIR_MODE)])
 
   def _BuildSshOptions(self, batch, ask_key, use_cluster_key,
                        strict_host_check, private_key=None, quiet=True,
@@ -783,6 +795,14 @@ class SshRunner(object):
     if port:
       options.append("-oPort=%d" % port)
 
+    if self.control_persist:
+      # %C is a hash of the local and remote host, port and user
+      options.extend([
+        "-oControlMaster=auto",
+        "-oControlPath=%s" % utils.PathJoin(pathutils.SSH_CONTROL_DIR, "%C"),
+        "-oControlPersist=%d" % self.control_persist,
+        ])
+
     # TODO: Too many boolean options, maybe convert them to more descriptive
     # constants.
 
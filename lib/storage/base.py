@@ -36,6 +36,7 @@ from ganeti import objects
 from ganeti import constants
 from ganeti import utils
 from ganeti import errors
+from ganeti import pathutils
 
 
 class BlockDev(object):
@@ -211,7 +212,16 @@ class BlockDev(object):
     """
     raise NotImplementedError
 
-  def Import(self):
+  def SupportsSparseTransfer(self):
+    """Returns whether data can be transferred as a sparse stream.
+
+    Block devices which use their own utility for L{Import} and L{Export}
+    should return C{False}.
+
+    """
+    return True
+
+  def Import(self, offset=None, size=None, sparse=False):
     """Builds the shell command for importing data to device.
 
     This method returns the command that will be used by the caller to
@@ -221,6 +231,13 @@ class BlockDev(object):
     Block devices that provide a more efficient way to transfer their
     data can override this method to use their specific utility.
 
+    @type offset: int or None
+    @param offset: if given, the offset (in MiB) at which to start writing
+    @type size: int or None
+    @param size: if given, the amount of data (in MiB) to write
+    @type sparse: boolean
+    @param sparse: whether the data is in the sparse stream format written
+        by L{Export}; the range is then taken from the stream
     @rtype: list of strings
     @return: List containing the import command for device
 
@@ -228,14 +245,27 @@ class BlockDev(object):
     if not self.minor and not self.Attach():
       ThrowError("Can't attach to target device during Import()")
 
+    if sparse:
+      return [pathutils.SPARSE_COPY, "import", self.dev_path]
+
     # we use the 'notrunc' argument to not attempt to truncate on the
     # given device
-    return [constants.DD_CMD,
-            "of=%s" % self.dev_path,
-            "bs=%s" % constants.DD_BLOCK_SIZE,
-            "oflag=direct", "conv=notrunc"]
+    cmd = [constants.DD_CMD,
+           "of=%s" % self.dev_path,
+           "bs=%s" % constants.DD_BLOCK_SIZE,
+           "oflag=direct", "conv=notrunc"]
+
+    if offset:
+      cmd.append("seek=%s" % offset)
+
+    if size is not None:
+      # dd counts short reads from the pipe as full blocks, so without
+      # 'fullblock' it would stop before the whole range has been written
+      cmd.extend(["count=%s" % size, "iflag=fullblock"])
 
-  def Export(self):
+    return cmd
+
+  def Export(self, offset=None, size=None, sparse=False):
     """Builds the shell command for exporting data from device.
 
     This method returns the command that will be used by the caller to
@@ -245,6 +275,14 @@ class BlockDev(object):
     Block devices that provide a more efficient way to transfer their
     data can override this method to use their specific utility.
 
+    @type offset: int or None
+    @param offset: if given, the offset (in MiB) at which to start reading
+    @type size: int or None
+    @param size: if given, the amount of data (in MiB) to read instead of the
+        whole device
+    @type sparse: boolean
+    @param sparse: whether to only send the extents containing data, see
+        L{SupportsSparseTransfer}
     @rtype: list of strings
     @return: List containing the export command for device
 
@@ -252,11 +290,25 @@ class BlockDev(object):
     if not self.minor and not self.Attach():
       ThrowError("Can't attach to source device during Import()")
 
-    return [constants.DD_CMD,
-            "if=%s" % self.dev_path,
-            "bs=%s" % constants.DD_BLOCK_SIZE,
-            "count=%s" % self.size,
-            "iflag=direct"]
+    if size is None:
+      size = self.size
+
+    if sparse:
+      return [pathutils.SPARSE_COPY, "export",
+              "--offset=%s" % (offset or 0),
+              "--size=%s" % size,
+              self.dev_path]
+
+    cmd = [constants.DD_CMD,
+           "if=%s" % self.dev_path,
+           "bs=%s" % constants.DD_BLOCK_SIZE,
+           "count=%s" % size,
+           "iflag=direct"]
+
+    if offset:
+      cmd.append("skip=%s" % offset)
+
+    return cmd
 
   def Snapshot(self, snap_name, snap_size):
     """Creates a snapshot of the block device.
@@ -274,6 +326,25 @@ class BlockDev(object):
     ThrowError("Snapshot is not supported for disk %s of type %s.",
                self.unique_id, self.__class__.__name__)
 
+  def CloneImage(self, image_id, image_path):
+    """Replaces the device by a copy-on-write clone of an image.
+
+    Block devices supporting this keep a golden copy of the image in their
+    storage, created from C{image_path} on first use, and replace the
+    device by a clone of it. The device must not be in use.
+
+    @type image_id: string
+    @param image_id: identifier of the image's content, see
+        L{imagecache.GetImageId}
+    @type image_path: string
+    @param image_path: path of the image
+    @rtype: boolean
+    @return: whether the device was cloned; if not, the image has to be
+        written to it instead
+
+    """
+    return False
+
   def SetSyncParams(self, params):
     """Adjust the synchronization parameters of the mirror.
 
@@ -46,6 +46,7 @@ from ganeti import compat
 from ganeti import serializer
 from ganeti.storage import base
 from ganeti.storage import drbd
+from ganeti.storage import imagecache
 from ganeti.storage.filestorage import FileStorage
 from ganeti.storage.gluster import GlusterStorage
 from ganeti.storage.extstorage import ExtStorageDevice
@@ -93,6 +94,7 @@ class LogicalVolume(base.BlockDev):
     self._ValidateName(self._lv_name)
     self.dev_path = utils.PathJoin("/dev", self._vg_name, self._lv_name)
     self._degraded = True
+    self._thin = False
     self.major = self.minor = self.pe_size = self.stripe_count = None
     self.pv_names = None
     lvs_cache = kwargs.get("lvs_cache")
@@ -422,12 +424,23 @@ class LogicalVolume(base.BlockDev):
     if not self.minor and not self.Attach():
       # the LV does not exist
       return
+
+    origin = None
+    if self._thin:
+      result = utils.RunCmd(["lvs", "--noheadings", "-oorigin",
+                             self.dev_path])
+      if not result.failed:
+        origin = result.stdout.strip()
+
     result = utils.RunCmd(["lvremove", "-f", "%s/%s" %
                            (self._vg_name, self._lv_name)])
     if result.failed:
       base.ThrowError("Can't lvremove: %s - %s",
                       result.fail_reason, result.output)
 
+    if origin and origin.startswith(constants.GOLDEN_IMAGE_PREFIX):
+      self._RemoveUnusedGoldenImages()
+
   def Rename(self, new_id):
     """Rename this logical volume.
 
@@ -537,6 +550,7 @@ class LogicalVolume(base.BlockDev):
     self.stripe_count = stripes
     self._degraded = status[0] == "v" # virtual volume, i.e. doesn't backing
                                       # storage
+    self._thin = status[0] == "V"
     self.pv_names = pv_names
     self.attached = True
     return True
@@ -645,6 +659,237 @@ class LogicalVolume(base.BlockDev):
 
     return (self._vg_name, snap_name)
 
+  def _GetThinVolumes(self):
+    """Lists the thin pools and thin volumes in our volume group.
+
+    @rtype: list of tuples or None
+    @return: (name, attributes, size in MiB, pool, origin) for each thin pool
+        and thin volume, or None if the volumes can't be listed
+
+    """
+    result = utils.RunCmd(["lvs", "--noheadings", "--separator=|",
+                           "--units=m", "--nosuffix",
+                           "-olv_name,lv_attr,lv_size,pool_lv,origin",
+                           self._vg_name])
+    if result.failed:
+      logging.warning("Can't list volumes of vg %s: %s - %s", self._vg_name,
+                      result.fail_reason, result.output)
+      return None
+
+    volumes = []
+    for line in result.stdout.splitlines():
+      fields = line.strip().split("|")
+      if len(fields) != 5 or fields[1][:1] not in ("t", "V"):
+        continue
+      try:
+        size = float(fields[2])
+      except ValueError:
+        continue
+      volumes.append((fields[0], fields[1], size, fields[3], fields[4]))
+
+    return volumes
+
+  @staticmethod
+  def _GetThinPool(volumes):
+    """Returns the name of the thin pool clones are created in.
+
+    @param volumes: thin volumes as returned by L{_GetThinVolumes}
+    @rtype: string or None
+    @return: the name of the first thin pool, or None if there is none
+
+    """
+    pools = [name for (name, attr, _, _, _) in volumes if attr[0] == "t"]
+    if not pools:
+      return None
+    return min(pools)
+
+  @staticmethod
+  def _GetThinPoolFree(volumes, pool):
+    """Returns how much of a thin pool is not yet provisioned.
+
+    Thin volumes can be written completely, so the space they may occupy is
+    their size, regardless of how much of it is allocated at the moment.
+
+    @param volumes: thin volumes as returned by L{_GetThinVolumes}
+    @type pool: string
+    @param pool: name of the thin pool
+    @rtype: float
+    @return: size in MiB
+
+    """
+    free = 0.0
+    for (name, attr, size, vol_pool, _) in volumes:
+      if attr[0] == "t" and name == pool:
+        free += size
+      elif attr[0] == "V" and vol_pool == pool:
+        free -= size
+    return free
+
+  def _LockGoldenImages(self):
+    """Acquires the lock serializing the use of our golden images.
+
+    One lock is used for all golden images in the volume group, so the thin
+    pool's space and the references to golden images don't change while
+    holding it.
+
+    @rtype: L{utils.FileLock}
+
+    """
+    return imagecache.LockGoldenImage("%svg-%s" %
+                                      (constants.GOLDEN_IMAGE_PREFIX,
+                                       self._vg_name))
+
+  def _RemoveUnusedGoldenImages(self):
+    """Removes the golden images no thin volume is cloned from anymore.
+
+    Errors are only logged, as the golden images are just a cache.
+
+    """
+    try:
+      lock = self._LockGoldenImages()
+    except EnvironmentError as err:
+      logging.warning("Can't lock golden images of vg %s: %s", self._vg_name,
+                      err)
+      return
+
+    try:
+      volumes = self._GetThinVolumes()
+      if not volumes:
+        return
+
+      used = frozenset(origin for (_, _, _, _, origin) in volumes)
+      for (name, attr, _, _, _) in volumes:
+        if (attr[0] != "V" or name in used or
+            not name.startswith(constants.GOLDEN_IMAGE_PREFIX)):
+          continue
+        logging.info("Removing unused golden image %s/%s", self._vg_name,
+                     name)
+        result = utils.RunCmd(["lvremove", "-f",
+                               "%s/%s" % (self._vg_name, name)])
+        if result.failed:
+          logging.warning("Can't remove golden image %s/%s: %s - %s",
+                          self._vg_name, name, result.fail_reason,
+                          result.output)
+    finally:
+      lock.Close()
+
+  def _CreateGoldenImage(self, pool, name, image_path):
+    """Creates a read-only thin volume holding an image.
+
+    """
+    tmp_name = name + ".tmp"
+    _CheckResult(utils.RunCmd(["lvcreate", "-Wn", "-V%dm" % self.size,
+                               "-T", "%s/%s" % (self._vg_name, pool),
+                               "-n%s" % tmp_name]))
+    try:
+      imagecache.WriteImage(image_path,
+                            utils.PathJoin("/dev", self._vg_name, tmp_name),
+                            self.size * 1024 * 1024)
+      _CheckResult(utils.RunCmd(["lvchange", "-pr",
+                                 "%s/%s" % (self._vg_name, tmp_name)]))
+      _CheckResult(utils.RunCmd(["lvrename", self._vg_name, tmp_name, name]))
+    except:
+      utils.RunCmd(["lvremove", "-f", "%s/%s" % (self._vg_name, tmp_name)])
+      raise
+
+  def CloneImage(self, image_id, image_path):
+    """Replaces the volume by a thin snapshot of a golden image.
+
+    This is only possible if the volume group contains a thin pool, which
+    is used for the golden image and therefore the clone. The pool is not
+    overcommitted: if it can't hold the full size of the clone (and of the
+    golden image, if it has to be created), the image is written to the
+    volume instead. Golden images are removed once no volume is cloned from
+    them anymore.
+
+    Clones don't respect exclusive storage; L{cmdlib} doesn't ask for them
+    when it is enabled.
+
+    @see: L{BlockDev.CloneImage} for details
+
+    """
+    golden = imagecache.GetGoldenImageName(image_id, self.size)
+
+    lock = self._LockGoldenImages()
+    try:
+      volumes = self._GetThinVolumes()
+      if not volumes:
+        return False
+      pool = self._GetThinPool(volumes)
+      if pool is None:
+        return False
+
+      names = [name for (name, _, _, _, _) in volumes]
+      if golden + ".tmp" in names:
+        # Left over by an interrupted creation of the golden image
+        _CheckResult(utils.RunCmd(["lvremove", "-f", "%s/%s.tmp" %
+                                   (self._vg_name, golden)]))
+        volumes = [v for v in volumes if v[0] != golden + ".tmp"]
+
+      have_golden = golden in names
+      required = self.size
+      if not have_golden:
+        required += self.size
+      free = self._GetThinPoolFree(volumes, pool)
+      if free < required:
+        logging.warning("Thin pool %s/%s has %d MiB left to provision, %d MiB"
+                        " are needed to clone %s", self._vg_name, pool, free,
+                        required, self.dev_path)
+        return False
+
+      if not have_golden:
+        logging.info("Creating golden image %s/%s from %s", self._vg_name,
+                     golden, image_path)
+        self._CreateGoldenImage(pool, golden, image_path)
+
+      # Keep the tags identifying the owner of the volume
+      result = utils.RunCmd(["lvs", "-o", "tags", "--noheadings",
+                             "--nosuffix", self.dev_path])
+      _CheckResult(result)
+      tags = [t.strip() for t in result.stdout.strip().split(",")
+              if t.strip()]
+
+      clone = self._lv_name + ".clone"
+      cmd = ["lvcreate", "-s", "-kn", "-prw", "-n%s" % clone]
+      for tag in tags:
+        cmd.append("--addtag=%s" % tag)
+      _CheckResult(utils.RunCmd(cmd + ["%s/%s" % (self._vg_name, golden)]))
+    finally:
+      lock.Close()
+
+    # The original volume is only removed once the clone has taken its
+    # place, so the disk survives a failed rename
+    old = self._lv_name + ".old"
+    result = utils.RunCmd(["lvrename", self._vg_name, self._lv_name, old])
+    if result.failed:
+      utils.RunCmd(["lvremove", "-f", "%s/%s" % (self._vg_name, clone)])
+      base.ThrowError("Can't rename %s to %s: %s - %s", self.dev_path, old,
+                      result.fail_reason, result.output)
+
+    result = utils.RunCmd(["lvrename", self._vg_name, clone, self._lv_name])
+    if result.failed:
+      logging.error("Can't rename clone %s/%s to %s: %s - %s",
+                    self._vg_name, clone, self._lv_name, result.fail_reason,
+                    result.output)
+      _CheckResult(utils.RunCmd(["lvrename", self._vg_name, old,
+                                 self._lv_name]))
+      utils.RunCmd(["lvremove", "-f", "%s/%s" % (self._vg_name, clone)])
+      self.Attach()
+      base.ThrowError("Can't replace %s by a clone of %s: %s", self.dev_path,
+                      golden, result.output)
+
+    self.Attach()
+
+    result = utils.RunCmd(["lvremove", "-f", "%s/%s" % (self._vg_name, old)])
+    if result.failed:
+      logging.warning("Can't remove the replaced volume %s/%s: %s - %s",
+                      self._vg_name, old, result.fail_reason, result.output)
+
+    # Golden images of other sizes might have been left behind
+    self._RemoveUnusedGoldenImages()
+
+    return True
+
   def _RemoveOldInfo(self):
     """Try to remove old tags from the lv.
 
@@ -855,7 +1100,15 @@ class PersistentBlockDevice(base.BlockDev):
     """
     base.ThrowError("Grow is not supported for PersistentBlockDev storage")
 
-  def Import(self):
+  def SupportsSparseTransfer(self):
+    """Returns whether data can be transferred as a sparse stream.
+
+    @see: L{BlockDev.SupportsSparseTransfer} for details
+
+    """
+    return False
+
+  def Import(self, offset=None, size=None, sparse=False):
     """Builds the shell command for importing data to device.
 
     @see: L{BlockDev.Import} for details
@@ -886,7 +1139,7 @@ class RADOSBlockDevice(base.BlockDev):
     self.rbd_pool = params[constants.LDP_POOL]
 
     self.major = self.minor = None
-    self.Attach()
+    self.Attach(rbd_showmapped=kwargs.get("rbd_showmapped"))
 
   @classmethod
   def Create(cls, unique_id, children, size, spindles, params, excl_stor,
@@ -943,17 +1196,22 @@ class RADOSBlockDevice(base.BlockDev):
     """
     pass
 
-  def Attach(self):
+  def Attach(self, rbd_showmapped=None, **kwargs):
     """Attach to an existing rbd device.
 
     This method maps the rbd volume that matches our name with
     an rbd device and then attaches to this device.
 
+    @type rbd_showmapped: string
+    @param rbd_showmapped: previously read output of L{GetShowmapped} to
+        use, if any
+
     """
     self.attached = False
 
     # Map the rbd volume to a block device under /dev
-    self.dev_path = self._MapVolumeToBlockdev(self.unique_id)
+    self.dev_path = self._MapVolumeToBlockdev(self.unique_id,
+                                              showmapped=rbd_showmapped)
 
     try:
       st = os.stat(self.dev_path)
@@ -971,11 +1229,14 @@ class RADOSBlockDevice(base.BlockDev):
 
     return True
 
-  def _MapVolumeToBlockdev(self, unique_id):
+  def _MapVolumeToBlockdev(self, unique_id, showmapped=None):
     """Maps existing rbd volumes to block devices.
 
     This method should be idempotent if the mapping already exists.
 
+    @type showmapped: string
+    @param showmapped: previously read output of L{GetShowmapped} to use
+        for checking the existing mappings, if any
     @rtype: string
     @return: the block device path that corresponds to the volume
 
@@ -984,7 +1245,10 @@ class RADOSBlockDevice(base.BlockDev):
     name = unique_id[1]
 
     # Check if the mapping already exists.
-    rbd_dev = self._VolumeToBlockdev(pool, name)
+    if showmapped is None:
+      rbd_dev = self._VolumeToBlockdev(pool, name)
+    else:
+      rbd_dev = self._ParseRbdShowmappedJson(showmapped, pool, name)
     if rbd_dev:
       # The mapping exists. Return it.
       return rbd_dev
@@ -1005,6 +1269,22 @@ class RADOSBlockDevice(base.BlockDev):
     # The device was successfully mapped. Return it.
     return rbd_dev
 
+  @staticmethod
+  def GetShowmapped():
+    """Reads the existing mappings of all rbd volumes.
+
+    @rtype: string or None
+    @return: the json output of `rbd showmapped', or C{None} if the rbd
+        tool doesn't support json output
+
+    """
+    result = utils.RunCmd([constants.RBD_CMD, "showmapped", "--format", "json"])
+    if result.failed:
+      logging.debug("Can't read the rbd mappings in JSON format (%s): %s",
+                    result.fail_reason, result.output)
+      return None
+    return result.output
+
   @classmethod
   def _VolumeToBlockdev(cls, pool, volume_name):
     """Do the 'volume name'-to-'rbd block device' resolving.
@@ -1230,12 +1510,137 @@ class RADOSBlockDevice(base.BlockDev):
       base.ThrowError("rbd resize failed (%s): %s",
                       result.fail_reason, result.output)
 
-  def Import(self):
+  #: Name of the snapshot of golden images that clones are created from
+  _GOLDEN_SNAPSHOT = "golden"
+
+  def _VolumeExists(self, name):
+    result = utils.RunCmd([constants.RBD_CMD, "info", "-p", self.rbd_pool,
+                           name])
+    return not result.failed
+
+  def _CreateGoldenImage(self, name, image_path):
+    """Creates a volume holding an image, with a protected snapshot.
+
+    """
+    tmp_name = name + ".tmp"
+    tmp_id = (self.driver, tmp_name)
+    snapshot = "%s/%s@%s" % (self.rbd_pool, tmp_name, self._GOLDEN_SNAPSHOT)
+    if self._VolumeExists(tmp_name):
+      self._UnmapVolumeFromBlockdev(tmp_id)
+      self._RemoveGoldenImage(tmp_name, snapshot)
+
+    _CheckResult(utils.RunCmd([constants.RBD_CMD, "create", "-p",
+                               self.rbd_pool, tmp_name,
+                               "--size", "%s" % self.size]))
+    try:
+      try:
+        imagecache.WriteImage(image_path,
+                              self._MapVolumeToBlockdev(tmp_id),
+                              self.size * 1024 * 1024)
+      finally:
+        self._UnmapVolumeFromBlockdev(tmp_id)
+
+      _CheckResult(utils.RunCmd([constants.RBD_CMD, "snap", "create",
+                                 snapshot]))
+      _CheckResult(utils.RunCmd([constants.RBD_CMD, "snap", "protect",
+                                 snapshot]))
+      _CheckResult(utils.RunCmd([constants.RBD_CMD, "rename", "-p",
+                                 self.rbd_pool, tmp_name, name]))
+    except:
+      base.IgnoreError(self._RemoveGoldenImage, tmp_name, snapshot)
+      raise
+
+  def _RemoveGoldenImage(self, name, snapshot):
+    """Removes a (partially created) golden image.
+
+    """
+    # The snapshot may not exist or not be protected yet
+    utils.RunCmd([constants.RBD_CMD, "snap", "unprotect", snapshot])
+    utils.RunCmd([constants.RBD_CMD, "snap", "purge", "-p", self.rbd_pool,
+                  name])
+    _CheckResult(utils.RunCmd([constants.RBD_CMD, "rm", "-p", self.rbd_pool,
+                               name]))
+
+  def CloneImage(self, image_id, image_path):
+    """Replaces the volume by a clone of a golden image.
+
+    The clone depends on the golden image, which can only be removed once
+    all its clones are flattened or removed.
+
+    @see: L{BlockDev.CloneImage} for details
+
+    """
+    golden = imagecache.GetGoldenImageName(image_id, self.size)
+    lock = imagecache.LockGoldenImage(golden)
+    try:
+      if not self._VolumeExists(golden):
+        logging.info("Creating golden image %s/%s from %s", self.rbd_pool,
+                     golden, image_path)
+        self._CreateGoldenImage(golden, image_path)
+    finally:
+      lock.Close()
+
+    clone = self.rbd_name + ".clone"
+    _CheckResult(utils.RunCmd([constants.RBD_CMD, "clone",
+                               "%s/%s@%s" % (self.rbd_pool, golden,
+                                             self._GOLDEN_SNAPSHOT),
+                               "%s/%s" % (self.rbd_pool, clone)]))
+
+    # The original volume is only removed once the clone has taken its
+    # place, so the disk survives a failed rename
+    old = self.rbd_name + ".old"
+    self.Shutdown()
+    result = utils.RunCmd([constants.RBD_CMD, "rename", "-p", self.rbd_pool,
+                           self.rbd_name, old])
+    if result.failed:
+      utils.RunCmd([constants.RBD_CMD, "rm", "-p", self.rbd_pool, clone])
+      self.Attach()
+      base.ThrowError("Can't rename rbd volume %s to %s: %s - %s",
+                      self.rbd_name, old, result.fail_reason, result.output)
+
+    result = utils.RunCmd([constants.RBD_CMD, "rename", "-p", self.rbd_pool,
+                           clone, self.rbd_name])
+    if result.failed:
+      logging.error("Can't rename clone %s/%s to %s: %s - %s",
+                    self.rbd_pool, clone, self.rbd_name, result.fail_reason,
+                    result.output)
+      _CheckResult(utils.RunCmd([constants.RBD_CMD, "rename", "-p",
+                                 self.rbd_pool, old, self.rbd_name]))
+      utils.RunCmd([constants.RBD_CMD, "rm", "-p", self.rbd_pool, clone])
+      self.Attach()
+      base.ThrowError("Can't replace rbd volume %s by a clone of %s: %s",
+                      self.rbd_name, golden, result.output)
+
+    self.Attach()
+
+    result = utils.RunCmd([constants.RBD_CMD, "rm", "-p", self.rbd_pool, old])
+    if result.failed:
+      logging.warning("Can't remove the replaced rbd volume %s/%s: %s - %s",
+                      self.rbd_pool, old, result.fail_reason, result.output)
+
+    return True
+
+  def SupportsSparseTransfer(self):
+    """Returns whether data can be transferred as a sparse stream.
+
+    The 'rbd import' command already skips zeroed parts of its input, but
+    can't read the sparse stream format.
+
+    @see: L{BlockDev.SupportsSparseTransfer} for details
+
+    """
+    return False
+
+  def Import(self, offset=None, size=None, sparse=False):
     """Builds the shell command for importing data to device.
 
     @see: L{BlockDev.Import} for details
 
     """
+    if offset is not None or size is not None or sparse:
+      base.ThrowError("Partial or sparse imports are not supported for rbd"
+                      " devices")
+
     if not self.minor and not self.Attach():
       # The rbd device doesn't exist.
       base.ThrowError("Can't attach to rbd device during Import()")
@@ -1270,12 +1675,16 @@ class RADOSBlockDevice(base.BlockDev):
             "-p", rbd_pool,
             "-", rbd_name]
 
-  def Export(self):
+  def Export(self, offset=None, size=None, sparse=False):
     """Builds the shell command for exporting data from device.
 
     @see: L{BlockDev.Export} for details
 
     """
+    if offset is not None or size is not None or sparse:
+      base.ThrowError("Partial or sparse exports are not supported for rbd"
+                      " devices")
+
     if not self.minor and not self.Attach():
       # The rbd device doesn't exist.
       base.ThrowError("Can't attach to rbd device during Export()")
@@ -1338,7 +1747,40 @@ def FindDevice(disk, children, **kwargs):
   return device
 
 
-def Assemble(disk, children):
+def GetDeviceCaches(dev_types):
+  """Reads the state of all devices of the given types at once.
+
+  The result can be passed as keyword arguments to L{FindDevice} and
+  L{Assemble}, so that finding many devices doesn't query the system
+  again for each of them. Device types whose state can't be read are
+  left out, in which case the devices query the system themselves.
+
+  @type dev_types: collection of strings
+  @param dev_types: the disk types of the devices (and their children)
+      which are going to be looked up
+  @rtype: dict
+
+  """
+  caches = {}
+
+  if constants.DT_PLAIN in dev_types:
+    caches["lvs_cache"] = LogicalVolume.GetLvGlobalInfo()
+
+  if constants.DT_DRBD8 in dev_types:
+    try:
+      caches["drbd_info"] = drbd.DRBD8.GetProcInfo()
+    except errors.BlockDeviceError as err:
+      logging.warning("Can't read the DRBD status: %s", err)
+
+  if constants.DT_RBD in dev_types:
+    showmapped = RADOSBlockDevice.GetShowmapped()
+    if showmapped is not None:
+      caches["rbd_showmapped"] = showmapped
+
+  return caches
+
+
+def Assemble(disk, children, **kwargs):
   """Try to attach or assemble an existing device.
 
   This will attach to assemble the device, as needed, to bring it
@@ -1355,7 +1797,7 @@ def Assemble(disk, children):
   _VerifyDiskParams(disk)
   device = DEV_MAP[disk.dev_type](disk.logical_id, children, disk.size,
                                   disk.params, disk.dynamic_params,
-                                  name=disk.name, uuid=disk.uuid)
+                                  name=disk.name, uuid=disk.uuid, **kwargs)
   device.Assemble()
   return device
 
@@ -95,13 +95,16 @@ class DRBD8(object):
     return DRBD8Info.CreateFromFile()
 
   @staticmethod
-  def GetUsedDevs():
+  def GetUsedDevs(info=None):
     """Compute the list of used DRBD minors.
 
+    @type info: L{DRBD8Info}
+    @param info: previously read /proc/drbd info to use, if any
     @rtype: list of ints
 
     """
-    info = DRBD8.GetProcInfo()
+    if info is None:
+      info = DRBD8.GetProcInfo()
     return [m for m in info.GetMinors()
             if not info.GetMinorStatus(m).is_unconfigured]
 
@@ -211,7 +214,9 @@ class DRBD8Dev(base.BlockDev):
                                    dyn_params, **kwargs)
     self.major = self._DRBD_MAJOR
 
-    info = DRBD8.GetProcInfo()
+    info = kwargs.get("drbd_info")
+    if info is None:
+      info = DRBD8.GetProcInfo()
     version = info.GetVersion()
     if version["k_major"] != 8:
       base.ThrowError("Mismatch in DRBD kernel version and requested ganeti"
@@ -229,7 +234,7 @@ class DRBD8Dev(base.BlockDev):
             self._lport == self._rport):
       raise ValueError("Invalid configuration data, same local/remote %s, %s" %
                        (unique_id, dyn_params))
-    self.Attach()
+    self.Attach(drbd_info=kwargs.get("drbd_info"))
 
   @staticmethod
   def _DevPath(minor):
@@ -815,7 +820,7 @@ class DRBD8Dev(base.BlockDev):
                       dual_pri=multimaster, hmac=constants.DRBD_HMAC_ALG,
                       secret=self._secret)
 
-  def Attach(self, **kwargs):
+  def Attach(self, drbd_info=None, **kwargs):
     """Check if our minor is configured.
 
     This doesn't do any device configurations - it only checks if the
@@ -825,8 +830,11 @@ class DRBD8Dev(base.BlockDev):
     any way (except in case of side-effects caused by reading from
     /proc).
 
+    @type drbd_info: L{DRBD8Info}
+    @param drbd_info: previously read /proc/drbd info to use, if any
+
     """
-    used_devs = DRBD8.GetUsedDevs()
+    used_devs = DRBD8.GetUsedDevs(info=drbd_info)
     if self._aminor in used_devs:
       minor = self._aminor
     else:
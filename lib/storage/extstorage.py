@@ -42,6 +42,7 @@ from ganeti import errors
 from ganeti import constants
 from ganeti import objects
 from ganeti import pathutils
+from ganeti import providercache
 from ganeti.storage import base
 
 
@@ -458,6 +459,22 @@ def ExtStorageFromDisk(name, base_dir=None):
     return False, ("Directory for External Storage Provider %s not"
                    " found in search path" % name)
 
+  return _ES_CACHE.Get(es_dir)
+
+
+def _LoadExtStorageFromDir(name, es_dir):
+  """Create an ExtStorage instance from its directory.
+
+  @type name: string
+  @param name: name of the ExtStorage provider
+  @type es_dir: string
+  @param es_dir: directory containing the ExtStorage provider
+  @rtype: tuple
+  @return: True and the ExtStorage instance if we find a valid one, or
+      False and the diagnose message on error
+
+  """
+
   # ES Files dictionary: this will be populated later with the absolute path
   # names for each script; currently we denote for each script if it is
   # required (True) or optional (False)
@@ -506,6 +523,17 @@ def ExtStorageFromDisk(name, base_dir=None):
   return True, es_obj
 
 
+#: Cache of the providers loaded by L{ExtStorageFromDisk}
+_ES_CACHE = providercache.ProviderCache("ExtStorage", _LoadExtStorageFromDir)
+
+
+def StartWatchingProviders():
+  """Keeps the cache of ExtStorage providers up to date using inotify.
+
+  """
+  _ES_CACHE.StartWatching(pathutils.ES_SEARCH_PATH)
+
+
 def _ExtStorageEnvironment(unique_id, ext_params,
                            size=None, grow=None, metadata=None,
                            name=None, uuid=None,
@@ -34,7 +34,9 @@
 
 import logging
 import errno
+import fcntl
 import os
+import tempfile
 
 from ganeti import compat
 from ganeti import constants
@@ -43,18 +45,61 @@ from ganeti import pathutils
 from ganeti import utils
 from ganeti.utils import io
 from ganeti.storage import base
+from ganeti.storage import imagecache
+
+#: ioctl cloning the extents of a file into another one (FICLONE)
+_FICLONE = 0x40049409
+
+#: Errors returned by L{_FICLONE} if reflinks aren't supported
+_REFLINK_UNSUPPORTED = compat.UniqueFrozenset([
+  errno.EOPNOTSUPP,
+  errno.ENOTTY,
+  errno.EXDEV,
+  errno.EINVAL,
+  ])
+
+
+#: Size of the blocks written when fully preallocating a file
+_PREALLOC_BLOCK_SIZE = 1024 * 1024
+
+
+def _PreallocateFile(fd, offset, length, preallocation):
+  """Allocates the blocks of a range of a file.
+
+  @type fd: int
+  @param fd: file descriptor of the file, which must already be at least
+      C{offset + length} bytes long
+  @type offset: int
+  @param offset: start of the range in bytes
+  @type length: int
+  @param length: length of the range in bytes
+  @type preallocation: string
+  @param preallocation: one of L{constants.FILE_PREALLOC_MODES}
+
+  """
+  if preallocation == constants.FILE_PREALLOC_FALLOC:
+    os.posix_fallocate(fd, offset, length)
+  elif preallocation == constants.FILE_PREALLOC_FULL:
+    zeros = memoryview(bytes(_PREALLOC_BLOCK_SIZE))
+    end = offset + length
+    while offset < end:
+      offset += os.pwrite(fd, zeros[:end - offset], offset)
+    os.fsync(fd)
 
 
 class FileDeviceHelper(object):
 
   @classmethod
   def CreateFile(cls, path, size, create_folders=False,
+                 preallocation=constants.FILE_PREALLOC_DEFAULT,
                  _file_path_acceptance_fn=None):
     """Create a new file and its file device helper.
 
     @param size: the size in MiBs the file should be truncated to.
     @param create_folders: create the directories for the path if necessary
                            (using L{ganeti.utils.io.Makedirs})
+    @param preallocation: how the blocks of the file are allocated, one of
+                          L{constants.FILE_PREALLOC_MODES}
 
     @rtype: FileDeviceHelper
     @return: The FileDeviceHelper object representing the object.
@@ -66,6 +111,10 @@ class FileDeviceHelper(object):
       _file_path_acceptance_fn = CheckFileStoragePathAcceptance
     _file_path_acceptance_fn(path)
 
+    if preallocation not in constants.FILE_PREALLOC_MODES:
+      base.ThrowError("%s: invalid preallocation mode '%s'", path,
+                      preallocation)
+
     if create_folders:
       folder = os.path.dirname(path)
       io.Makedirs(folder)
@@ -73,8 +122,11 @@ class FileDeviceHelper(object):
     try:
       fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_EXCL)
       f = os.fdopen(fd, "w")
-      f.truncate(size * 1024 * 1024)
-      f.close()
+      try:
+        f.truncate(size * 1024 * 1024)
+        _PreallocateFile(fd, 0, size * 1024 * 1024, preallocation)
+      finally:
+        f.close()
     except EnvironmentError as err:
       base.ThrowError("%s: can't create: %s", path, str(err))
 
@@ -142,10 +194,13 @@ class FileDeviceHelper(object):
     except OSError as err:
       base.ThrowError("%s: can't stat: %s", self.path, err)
 
-  def Grow(self, amount, dryrun, backingstore, _excl_stor):
+  def Grow(self, amount, dryrun, backingstore, _excl_stor,
+           preallocation=constants.FILE_PREALLOC_DEFAULT):
     """Grow the file
 
     @param amount: the amount (in mebibytes) to grow by.
+    @param preallocation: how the blocks added to the file are allocated, one
+                          of L{constants.FILE_PREALLOC_MODES}
 
     """
     # Check that the file exists
@@ -162,24 +217,36 @@ class FileDeviceHelper(object):
     current_size = self.Size()
     new_size = current_size + amount * 1024 * 1024
     try:
-      f = open(self.path, "a+")
-      f.truncate(new_size)
-      f.close()
+      # Not opened for appending, as O_APPEND makes pwrite ignore the offset
+      fd = os.open(self.path, os.O_RDWR)
+      try:
+        os.ftruncate(fd, new_size)
+        _PreallocateFile(fd, current_size, new_size - current_size,
+                         preallocation)
+      finally:
+        os.close(fd)
     except EnvironmentError as err:
-      base.ThrowError("%s: can't grow: ", self.path, str(err))
+      base.ThrowError("%s: can't grow: %s", self.path, str(err))
 
   def Move(self, new_path):
     """Move file to a location inside the file storage dir.
 
+    If the new location is on a different mount of the same file system (e.g.
+    another Btrfs subvolume), the file is copied as a reflink instead.
+
     """
     # Check that the file exists
     self.Exists(assert_exists=True)
     self.file_path_acceptance_fn(new_path)
     try:
-      os.rename(self.path, new_path)
-      self.path = new_path
-    except OSError as err:
+      try:
+        os.rename(self.path, new_path)
+      except OSError as err:
+        if err.errno != errno.EXDEV or not _MoveByReflink(self.path, new_path):
+          raise
+    except EnvironmentError as err:
       base.ThrowError("%s: can't rename to %s: ", str(err), new_path)
+    self.path = new_path
 
 
 class FileStorage(base.BlockDev):
@@ -263,7 +330,30 @@ class FileStorage(base.BlockDev):
       return
     if dryrun:
       return
-    self.file.Grow(amount, dryrun, backingstore, excl_stor)
+    self.file.Grow(amount, dryrun, backingstore, excl_stor,
+                   preallocation=_GetPreallocation(self.params))
+
+  def CloneFrom(self, source):
+    """Makes the file a reflink copy of another file device.
+
+    This is a fast path for copying the data of a disk, e.g. on disk template
+    conversions, if both files are on the same file system and the file
+    system supports reflinks.
+
+    @type source: L{FileStorage}
+    @param source: the device to copy the data from
+    @rtype: boolean
+    @return: whether the data could be cloned; if not, it has to be copied
+
+    """
+    size = self.file.Size()
+    if source.file.Size() > size:
+      return False
+    if not _TryCloneFile(source.dev_path, self.dev_path):
+      return False
+    # Cloning also copies the file size
+    os.truncate(self.dev_path, size)
+    return True
 
   def Attach(self, **kwargs):
     """Attach to an existing file.
@@ -285,6 +375,68 @@ class FileStorage(base.BlockDev):
     """
     return self.file.Size()
 
+  def _CreateGoldenImage(self, path, image_path):
+    """Writes an image to a read-only golden image file.
+
+    """
+    tmp_path = path + ".tmp"
+    max_size = self.size * 1024 * 1024
+    try:
+      with open(tmp_path, "wb") as fh:
+        fh.truncate(max_size)
+      written = imagecache.WriteImage(image_path, tmp_path, max_size)
+      os.truncate(tmp_path, written)
+      os.chmod(tmp_path, 0o440)
+      utils.RenameFile(tmp_path, path)
+    except:
+      utils.RemoveFile(tmp_path)
+      raise
+
+  def CloneImage(self, image_id, image_path):
+    """Replaces the file by a reflink copy of a golden image.
+
+    Golden images are kept next to the instance directories, so they're
+    usually on the same file system. Nothing is done if the file system
+    doesn't support reflinks.
+
+    @see: L{BlockDev.CloneImage} for details
+
+    """
+    golden_dir = utils.PathJoin(os.path.dirname(os.path.dirname(self.dev_path)),
+                                ".%sdisks" % constants.GOLDEN_IMAGE_PREFIX)
+    utils.Makedirs(golden_dir)
+
+    # Cloning the (still empty) file checks whether reflinks are possible
+    # between the two directories
+    (fd, probe_path) = tempfile.mkstemp(dir=golden_dir, prefix=".probe")
+    os.close(fd)
+    try:
+      _CloneFile(self.dev_path, probe_path)
+    except EnvironmentError as err:
+      if err.errno not in _REFLINK_UNSUPPORTED:
+        raise
+      logging.info("Can't use reflinks for %s: %s", self.dev_path, err)
+      return False
+    finally:
+      utils.RemoveFile(probe_path)
+
+    golden = utils.PathJoin(golden_dir,
+                            imagecache.GetGoldenImageName(image_id))
+    lock = imagecache.LockGoldenImage(os.path.basename(golden))
+    try:
+      if not os.path.exists(golden):
+        logging.info("Creating golden image %s from %s", golden, image_path)
+        self._CreateGoldenImage(golden, image_path)
+    finally:
+      lock.Close()
+
+    if os.path.getsize(golden) > self.size * 1024 * 1024:
+      return False
+
+    _CloneFile(golden, self.dev_path)
+    os.truncate(self.dev_path, self.size * 1024 * 1024)
+    return True
+
   @classmethod
   def Create(cls, unique_id, children, size, spindles, params, excl_stor,
              dyn_params, **kwargs):
@@ -305,11 +457,70 @@ class FileStorage(base.BlockDev):
 
     dev_path = unique_id[1]
 
-    FileDeviceHelper.CreateFile(dev_path, size)
+    FileDeviceHelper.CreateFile(dev_path, size,
+                                preallocation=_GetPreallocation(params))
     return FileStorage(unique_id, children, size, params, dyn_params,
                        **kwargs)
 
 
+def _GetPreallocation(params):
+  """Returns the preallocation mode from the parameters of a file disk.
+
+  """
+  return (params or {}).get(constants.FILE_PREALLOCATION,
+                            constants.FILE_PREALLOC_DEFAULT)
+
+
+def _CloneFile(src_path, dst_path):
+  """Makes a file share the extents of another one.
+
+  @raise EnvironmentError: if the file system doesn't support this
+
+  """
+  with open(src_path, "rb") as src:
+    with open(dst_path, "r+b") as dst:
+      fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+
+
+def _TryCloneFile(src_path, dst_path):
+  """Makes a file share the extents of another one, if possible.
+
+  @rtype: boolean
+  @return: whether the file system supports this
+
+  """
+  try:
+    _CloneFile(src_path, dst_path)
+  except EnvironmentError as err:
+    if err.errno not in _REFLINK_UNSUPPORTED:
+      raise
+    logging.debug("Can't clone %s to %s: %s", src_path, dst_path, err)
+    return False
+  return True
+
+
+def _MoveByReflink(old_path, new_path):
+  """Moves a file by cloning it and removing the original.
+
+  @rtype: boolean
+  @return: whether the file system supports this; if not, nothing is changed
+
+  """
+  fd = os.open(new_path, os.O_RDWR | os.O_CREAT | os.O_EXCL,
+               os.stat(old_path).st_mode & 0o7777)
+  os.close(fd)
+  try:
+    cloned = _TryCloneFile(old_path, new_path)
+  except:
+    utils.RemoveFile(new_path)
+    raise
+  if not cloned:
+    utils.RemoveFile(new_path)
+    return False
+  utils.RemoveFile(old_path)
+  return True
+
+
 def GetFileStorageSpaceInfo(path):
   """Retrieves the free and total space of the device where the file is
      located.
@@ -0,0 +1,964 @@
+#
+#
+
+# Copyright (C) 2026 the Ganeti project
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Node-local cache and streaming writer for disk images.
+
+Images given as URL are downloaded into a content-addressed cache before
+being written to a disk, so deploying the same image to many instances on
+a node only downloads it once. Downloads are resumed using HTTP range
+requests if they are interrupted, and can be verified against a checksum
+given in the URL fragment, e.g.
+C{http://example.com/debian.img.xz#sha256=0123...}.
+
+Images compressed with gzip, xz or zstd are decompressed while being
+written; qcow2 images are converted using C{qemu-img}.
+
+"""
+
+import errno
+import hashlib
+import logging
+import lzma
+import mmap
+import os
+import re
+import subprocess
+import time
+import zlib
+
+import pycurl
+
+from ganeti import constants
+from ganeti import errors
+from ganeti import http
+from ganeti import pathutils
+from ganeti import serializer
+from ganeti import utils
+
+
+#: Checksum algorithms which can be given in the URL fragment
+CHECKSUM_ALGORITHMS = frozenset(["sha1", "sha256", "sha512"])
+
+_CHECKSUM_RE = re.compile(r"^(?P<algo>[a-z0-9]+)=(?P<digest>[0-9a-fA-F]+)$")
+
+#: Algorithm used to address cache entries
+_CACHE_ALGORITHM = "sha256"
+
+_OBJECT_NAME_RE = re.compile(r"^%s-(?P<digest>[0-9a-f]+)$" % _CACHE_ALGORITHM)
+
+#: How often an interrupted download is resumed before giving up
+DOWNLOAD_ATTEMPTS = 5
+
+#: Seconds to wait between download attempts
+DOWNLOAD_RETRY_DELAY = 5.0
+
+#: Seconds to wait for the connection to the server
+_CONNECT_TIMEOUT = 60
+
+#: A download is aborted (and resumed later) if it transfers less than
+#: C{_LOW_SPEED_LIMIT} bytes per second for C{_LOW_SPEED_TIME} seconds
+_LOW_SPEED_LIMIT = 1024
+_LOW_SPEED_TIME = 120
+
+#: Size of the buffer used for writing to the target
+WRITE_BUFSIZE = 4 * 1024 * 1024
+
+#: Alignment required for direct I/O
+_DIRECT_IO_ALIGNMENT = 4096
+
+_HTTP_PARTIAL_CONTENT = 206
+_HTTP_REQUEST_TIMEOUT = 408
+_HTTP_RANGE_NOT_SATISFIABLE = 416
+_HTTP_TOO_MANY_REQUESTS = 429
+
+#: HTTP client errors after which a download is tried again; all other client
+#: errors are permanent
+_HTTP_TRANSIENT_CLIENT_ERRORS = frozenset([
+  _HTTP_REQUEST_TIMEOUT,
+  _HTTP_RANGE_NOT_SATISFIABLE,
+  _HTTP_TOO_MANY_REQUESTS,
+  ])
+
+#: Curl errors which won't go away by trying again
+_CURL_PERMANENT_ERRORS = frozenset([
+  pycurl.E_UNSUPPORTED_PROTOCOL,
+  pycurl.E_URL_MALFORMAT,
+  pycurl.E_REMOTE_ACCESS_DENIED,
+  pycurl.E_REMOTE_FILE_NOT_FOUND,
+  pycurl.E_FILE_COULDNT_READ_FILE,
+  pycurl.E_LOGIN_DENIED,
+  ])
+
+#: The cache is pruned to this size (in bytes) after each download, unless
+#: another size is given to L{ImageCache}
+DEFAULT_CACHE_SIZE = 100 * 1024 * 1024 * 1024
+
+(IMG_RAW,
+ IMG_GZIP,
+ IMG_XZ,
+ IMG_ZSTD,
+ IMG_QCOW2) = ("raw", "gzip", "xz", "zstd", "qcow2")
+
+#: Magic values at the start of images, used to detect their format
+_IMAGE_MAGIC = [
+  (b"QFI\xfb", IMG_QCOW2),
+  (b"\x1f\x8b", IMG_GZIP),
+  (b"\xfd7zXZ\x00", IMG_XZ),
+  (b"\x28\xb5\x2f\xfd", IMG_ZSTD),
+  ]
+
+_ZSTD_CMD = "zstd"
+
+
+class ImageError(errors.GenericError):
+  """Error while fetching or writing an image.
+
+  """
+
+
+class ImageTooLargeError(ImageError):
+  """The image doesn't fit on the target disk.
+
+  """
+
+
+def ParseImageUrl(url):
+  """Splits the checksum specification off an image URL.
+
+  @type url: string
+  @param url: Image URL, optionally followed by C{#algorithm=hexdigest}
+  @rtype: tuple
+  @return: The URL without fragment and a tuple of (algorithm, digest), or
+    C{None} if no checksum was given
+
+  """
+  (base, sep, fragment) = url.partition("#")
+  if not sep:
+    return (url, None)
+
+  m = _CHECKSUM_RE.match(fragment)
+  if not m or m.group("algo") not in CHECKSUM_ALGORITHMS:
+    raise ImageError("Invalid checksum specification '%s', expected"
+                     " '<algorithm>=<hex digest>' with algorithm one of %s" %
+                     (fragment, utils.CommaJoin(sorted(CHECKSUM_ALGORITHMS))))
+
+  return (base, (m.group("algo"), m.group("digest").lower()))
+
+
+def _IsTransientError(err, status):
+  """Tells whether a failed download should be tried again.
+
+  @type err: L{pycurl.error}
+  @param err: The error raised by curl
+  @type status: int
+  @param status: HTTP status of the response, 0 if there was none
+
+  """
+  if err.args and err.args[0] in _CURL_PERMANENT_ERRORS:
+    return False
+
+  if 400 <= status < 500:
+    return status in _HTTP_TRANSIENT_CLIENT_ERRORS
+
+  # Server errors, connection problems and interrupted transfers
+  return True
+
+
+def _HashFile(path, algorithms):
+  """Computes digests of a file's content.
+
+  @rtype: dict
+  @return: Hash objects keyed by algorithm name
+
+  """
+  hashes = dict((algo, hashlib.new(algo)) for algo in algorithms)
+  with open(path, "rb") as fh:
+    while True:
+      data = fh.read(WRITE_BUFSIZE)
+      if not data:
+        break
+      for h in hashes.values():
+        h.update(data)
+  return hashes
+
+
+class _DownloadState(object):
+  """Progress of a single download, used by the curl callbacks.
+
+  When resuming, the data is only appended to the partial file if the server
+  sends the requested range. Any other response carries the whole image, in
+  which case the partial file is truncated first.
+
+  """
+  def __init__(self, fh, algorithms, hashes, offset):
+    self.fh = fh
+    self.hashes = hashes
+    self.offset = offset
+    self.restarted = False
+    self.status = None
+    self.headers = {}
+    self._algorithms = algorithms
+
+  def WriteHeader(self, line):
+    line = line.decode("iso-8859-1").strip()
+    if line.startswith("HTTP/"):
+      # A new response (e.g. after a redirect) starts
+      self.headers = {}
+      try:
+        self.status = int(line.split()[1])
+      except (IndexError, ValueError):
+        self.status = None
+    elif ":" in line:
+      (name, value) = line.split(":", 1)
+      self.headers[name.strip().lower()] = value.strip()
+
+  def CheckResumed(self):
+    """Discards the partial data unless the response continues it.
+
+    """
+    if self.offset and self.status != _HTTP_PARTIAL_CONTENT:
+      self.fh.seek(0)
+      self.fh.truncate()
+      self.hashes = dict((algo, hashlib.new(algo))
+                         for algo in self._algorithms)
+      self.offset = 0
+      self.restarted = True
+
+  def WriteData(self, data):
+    self.CheckResumed()
+    self.fh.write(data)
+    for h in self.hashes.values():
+      h.update(data)
+
+
+class ImageCache(object):
+  """Content-addressed cache of downloaded images.
+
+  Images are stored by their SHA256 digest in the C{objects} directory. The
+  C{urls} directory maps source URLs to these digests and records the HTTP
+  validators (C{ETag} and C{Last-Modified}) so cached images can be
+  revalidated with a conditional request. Unfinished downloads are kept in
+  the C{partial} directory to be resumed.
+
+  """
+  def __init__(self, cache_dir, max_size=DEFAULT_CACHE_SIZE,
+               _curl_fn=pycurl.Curl):
+    """Initializes this class.
+
+    @type cache_dir: string
+    @param cache_dir: Cache directory
+    @type max_size: int
+    @param max_size: Size (in bytes) the cache is pruned to after downloads
+
+    """
+    self._cache_dir = cache_dir
+    self._max_size = max_size
+    self._curl_fn = _curl_fn
+
+    self._objects_dir = utils.PathJoin(cache_dir, "objects")
+    self._urls_dir = utils.PathJoin(cache_dir, "urls")
+    self._partial_dir = utils.PathJoin(cache_dir, "partial")
+
+  def _EnsureDirs(self):
+    for path in [self._cache_dir, self._objects_dir, self._urls_dir,
+                 self._partial_dir]:
+      utils.Makedirs(path, mode=0o750)
+
+  def _ObjectPath(self, algo, digest):
+    return utils.PathJoin(self._objects_dir, "%s-%s" % (algo, digest))
+
+  @staticmethod
+  def _UrlKey(url):
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+  def _ReadUrlEntry(self, url):
+    path = utils.PathJoin(self._urls_dir, self._UrlKey(url))
+    try:
+      entry = serializer.LoadJson(utils.ReadFile(path))
+    except EnvironmentError as err:
+      if err.errno != errno.ENOENT:
+        logging.warning("Can't read image cache entry for %s: %s", url, err)
+      return None
+    except ValueError as err:
+      logging.warning("Ignoring invalid image cache entry for %s: %s", url, err)
+      return None
+
+    if (entry.get("url") != url or
+        not os.path.exists(self._ObjectPath(_CACHE_ALGORITHM,
+                                            entry.get(_CACHE_ALGORITHM)))):
+      return None
+
+    return entry
+
+  def _WriteUrlEntry(self, url, digest, headers):
+    entry = {
+      "url": url,
+      _CACHE_ALGORITHM: digest,
+      "etag": headers.get("etag"),
+      "last_modified": headers.get("last-modified"),
+      }
+    utils.WriteFile(utils.PathJoin(self._urls_dir, self._UrlKey(url)),
+                    data=serializer.DumpJson(entry), mode=0o640)
+
+  def _Touch(self, path):
+    """Marks a cache entry as recently used.
+
+    """
+    try:
+      os.utime(path, None)
+    except EnvironmentError as err:
+      logging.debug("Can't update timestamp of %s: %s", path, err)
+
+  def Fetch(self, url):
+    """Returns a cached copy of an image, downloading it if needed.
+
+    The image is pinned in the cache, L{Prune} doesn't remove it until the
+    returned lock is closed.
+
+    @type url: string
+    @param url: Image URL, optionally with checksum (see L{ParseImageUrl})
+    @rtype: tuple; (string, L{utils.FileLock})
+    @return: Path of the image in the cache, the file must not be modified,
+      and the lock pinning it
+
+    """
+    (url, checksum) = ParseImageUrl(url)
+
+    self._EnsureDirs()
+
+    if checksum:
+      path = self._ObjectPath(*checksum)
+      pin = self._PinImage(path)
+      if pin:
+        logging.info("Using cached image %s for %s", path, url)
+        self._Touch(path)
+        return (path, pin)
+
+    # Concurrent requests for the same URL wait for a single download
+    lock = self._LockUrl(url)
+    try:
+      entry = self._ReadUrlEntry(url)
+      if checksum and entry and checksum[0] == _CACHE_ALGORITHM:
+        # Another request may have downloaded the image meanwhile
+        path = self._ObjectPath(*checksum)
+        pin = self._PinImage(path)
+        if pin:
+          self._Touch(path)
+          return (path, pin)
+
+      path = self._Download(url, checksum, entry)
+      pin = self._PinImage(path)
+      if not pin:
+        raise ImageError("Image %s for %s was removed from the cache" %
+                         (path, url))
+      self._Touch(path)
+    finally:
+      # Remove the lock file while still holding the lock, L{_LockUrl} makes
+      # waiting requests notice this and retry with a new file
+      utils.RemoveFile(lock.filename)
+      lock.Close()
+
+    try:
+      self.Prune()
+    except:
+      pin.Close()
+      raise
+
+    return (path, pin)
+
+  @staticmethod
+  def _PinImage(path):
+    """Acquires a shared lock on an image to keep L{Prune} from removing it.
+
+    @rtype: L{utils.FileLock} or None
+    @return: The acquired lock, or C{None} if the image is not in the cache
+
+    """
+    try:
+      fh = open(path, "rb")
+    except EnvironmentError as err:
+      if err.errno == errno.ENOENT:
+        return None
+      raise
+
+    pin = utils.FileLock(fh, path)
+    pinned = False
+    try:
+      # L{Prune} holds its exclusive lock only while removing the image
+      pin.Shared(blocking=True)
+      try:
+        pinned = os.path.samestat(os.fstat(fh.fileno()), os.stat(path))
+      except EnvironmentError as err:
+        if err.errno != errno.ENOENT:
+          raise
+    finally:
+      if not pinned:
+        pin.Close()
+
+    if pinned:
+      return pin
+
+    return None
+
+  def Discard(self, path):
+    """Removes an image which turned out to be unusable from the cache.
+
+    The image is downloaded again the next time it's needed.
+
+    @type path: string
+    @param path: Path of the image as returned by L{Fetch}
+
+    """
+    path = os.path.realpath(path)
+    if os.path.dirname(path) != os.path.realpath(self._objects_dir):
+      raise ImageError("%s is not in the image cache" % path)
+
+    logging.info("Discarding %s from image cache", path)
+    utils.RemoveFile(path)
+
+  @staticmethod
+  def _RemoveUnpinnedImage(path):
+    """Removes an image from the cache unless it is pinned.
+
+    @rtype: boolean
+    @return: Whether the image is gone
+
+    """
+    try:
+      fh = open(path, "rb")
+    except EnvironmentError as err:
+      if err.errno == errno.ENOENT:
+        return True
+      raise
+
+    lock = utils.FileLock(fh, path)
+    try:
+      try:
+        lock.Exclusive(blocking=False)
+      except (EnvironmentError, errors.LockError):
+        return False
+
+      if not os.path.samestat(os.fstat(fh.fileno()), os.stat(path)):
+        # Replaced by a new download meanwhile
+        return False
+
+      utils.RemoveFile(path)
+    finally:
+      lock.Close()
+
+    return True
+
+  def _LockUrl(self, url):
+    """Acquires the lock serializing the downloads of an URL.
+
+    The lock file is removed once the download is finished, so after
+    acquiring the lock it is verified that the file is still in place.
+
+    @rtype: L{utils.FileLock}
+    @return: The acquired lock
+
+    """
+    path = utils.PathJoin(self._partial_dir, self._UrlKey(url) + ".lock")
+
+    while True:
+      lock = utils.FileLock.Open(path)
+      acquired = False
+      try:
+        lock.Exclusive(blocking=True)
+        try:
+          acquired = os.path.samestat(os.fstat(lock.fd.fileno()),
+                                      os.stat(path))
+        except EnvironmentError as err:
+          if err.errno != errno.ENOENT:
+            raise
+      finally:
+        if not acquired:
+          # Either failed or the lock file was removed by the previous holder
+          lock.Close()
+
+      if acquired:
+        return lock
+
+  def _Download(self, url, checksum, entry):
+    """Downloads an image into the cache, resuming partial downloads.
+
+    @param entry: Existing URL entry used for revalidation, or C{None}
+
+    """
+    algorithms = set([_CACHE_ALGORITHM])
+    if checksum:
+      algorithms.add(checksum[0])
+
+    partial_path = utils.PathJoin(self._partial_dir, self._UrlKey(url))
+    partial_info_path = partial_path + ".info"
+
+    for attempt in range(1, DOWNLOAD_ATTEMPTS + 1):
+      # Find out where to continue
+      offset = 0
+      validator = None
+      if os.path.exists(partial_path):
+        try:
+          validator = serializer.LoadJson(utils.ReadFile(partial_info_path))
+        except (EnvironmentError, ValueError):
+          validator = None
+
+        if validator:
+          offset = os.path.getsize(partial_path)
+        else:
+          utils.RemoveFile(partial_path)
+
+      if offset:
+        hashes = _HashFile(partial_path, algorithms)
+      else:
+        hashes = dict((algo, hashlib.new(algo)) for algo in algorithms)
+
+      with open(partial_path, "ab") as fh:
+        state = _DownloadState(fh, algorithms, hashes, offset)
+
+        curl = self._curl_fn()
+        curl.setopt(pycurl.NOSIGNAL, True)
+        curl.setopt(pycurl.FOLLOWLOCATION, True)
+        curl.setopt(pycurl.FAILONERROR, True)
+        curl.setopt(pycurl.CONNECTTIMEOUT, _CONNECT_TIMEOUT)
+        curl.setopt(pycurl.LOW_SPEED_LIMIT, _LOW_SPEED_LIMIT)
+        curl.setopt(pycurl.LOW_SPEED_TIME, _LOW_SPEED_TIME)
+        curl.setopt(pycurl.USERAGENT, http.HTTP_GANETI_VERSION)
+        curl.setopt(pycurl.URL, url)
+        curl.setopt(pycurl.HEADERFUNCTION, state.WriteHeader)
+        curl.setopt(pycurl.WRITEFUNCTION, state.WriteData)
+
+        request_headers = []
+        if offset:
+          logging.info("Resuming download of %s at byte %s", url, offset)
+          curl.setopt(pycurl.RANGE, "%d-" % offset)
+          if validator.get("etag"):
+            request_headers.append("If-Range: %s" % validator["etag"])
+          elif validator.get("last_modified"):
+            request_headers.append("If-Range: %s" %
+                                   validator["last_modified"])
+        elif entry and not checksum:
+          # Revalidate the cached copy
+          if entry.get("etag"):
+            request_headers.append("If-None-Match: %s" % entry["etag"])
+          if entry.get("last_modified"):
+            request_headers.append("If-Modified-Since: %s" %
+                                   entry["last_modified"])
+        curl.setopt(pycurl.HTTPHEADER, request_headers)
+
+        try:
+          curl.perform()
+        except pycurl.error as err:
+          fh.flush()
+          status = curl.getinfo(pycurl.RESPONSE_CODE)
+          if state.restarted or (offset and status == http.HTTP_OK):
+            # The server didn't resume the download and the new transfer
+            # failed as well, start from scratch next time
+            utils.RemoveFile(partial_path)
+            utils.RemoveFile(partial_info_path)
+          # Keep the partial download if it can be resumed later
+          elif (state.headers.get("etag") or
+                state.headers.get("last-modified")):
+            utils.WriteFile(partial_info_path, mode=0o640,
+                            data=serializer.DumpJson({
+                              "etag": state.headers.get("etag"),
+                              "last_modified":
+                                state.headers.get("last-modified"),
+                              }))
+          elif not offset or status == _HTTP_RANGE_NOT_SATISFIABLE:
+            utils.RemoveFile(partial_path)
+            utils.RemoveFile(partial_info_path)
+          if not _IsTransientError(err, status):
+            utils.RemoveFile(partial_path)
+            utils.RemoveFile(partial_info_path)
+            raise ImageError("Download of %s failed: %s" % (url, err))
+          logging.warning("Download of %s failed (attempt %s of %s): %s",
+                          url, attempt, DOWNLOAD_ATTEMPTS, err)
+          if attempt < DOWNLOAD_ATTEMPTS:
+            time.sleep(DOWNLOAD_RETRY_DELAY)
+          continue
+        finally:
+          status = curl.getinfo(pycurl.RESPONSE_CODE)
+          curl.close()
+
+        # The server may have sent the whole file again (e.g. because it
+        # changed) without any data, in which case nothing was truncated yet
+        state.CheckResumed()
+
+      if status == http.HTTP_NOT_MODIFIED and entry:
+        logging.info("Cached image for %s is still valid", url)
+        utils.RemoveFile(partial_path)
+        return self._ObjectPath(_CACHE_ALGORITHM, entry[_CACHE_ALGORITHM])
+
+      if state.restarted:
+        logging.info("Server didn't resume download of %s, downloaded the"
+                     " whole image again", url)
+
+      digests = dict((algo, h.hexdigest())
+                     for (algo, h) in state.hashes.items())
+
+      if checksum and digests[checksum[0]] != checksum[1]:
+        utils.RemoveFile(partial_path)
+        utils.RemoveFile(partial_info_path)
+        raise ImageError("Checksum mismatch for %s: expected %s %s, got %s" %
+                         (url, checksum[0], checksum[1],
+                          digests[checksum[0]]))
+
+      path = self._ObjectPath(_CACHE_ALGORITHM, digests[_CACHE_ALGORITHM])
+      os.chmod(partial_path, 0o440)
+      utils.RenameFile(partial_path, path)
+      utils.RemoveFile(partial_info_path)
+
+      if checksum and checksum[0] != _CACHE_ALGORITHM:
+        # Make the image findable by the requested checksum as well
+        alias = self._ObjectPath(*checksum)
+        utils.RemoveFile(alias)
+        os.symlink(os.path.basename(path), alias)
+
+      self._WriteUrlEntry(url, digests[_CACHE_ALGORITHM], state.headers)
+
+      logging.info("Downloaded %s to %s", url, path)
+
+      return path
+
+    raise ImageError("Failed to download %s after %s attempts" %
+                     (url, DOWNLOAD_ATTEMPTS))
+
+  def Prune(self):
+    """Removes the least recently used images until the cache is small enough.
+
+    """
+    images = []
+    aliases = []
+
+    for name in utils.ListVisibleFiles(self._objects_dir):
+      path = utils.PathJoin(self._objects_dir, name)
+      if os.path.islink(path):
+        aliases.append(path)
+        continue
+      try:
+        st = os.stat(path)
+      except EnvironmentError:
+        continue
+      images.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for (_, size, _) in images)
+
+    for (_, size, path) in sorted(images):
+      if total <= self._max_size:
+        break
+      if self._RemoveUnpinnedImage(path):
+        logging.info("Removed %s from image cache", path)
+        total -= size
+      else:
+        logging.debug("Not removing %s from image cache, it's in use", path)
+
+    # Remove aliases whose image is gone
+    for path in aliases:
+      if not os.path.exists(path):
+        utils.RemoveFile(path)
+
+
+def GetImageId(path):
+  """Returns an identifier for the content of an image file.
+
+  Images from the cache are identified by their digest. Other files are
+  identified by their path, size and modification time, so they don't have
+  to be read.
+
+  @type path: string
+  @param path: Path of the image
+  @rtype: string
+  @return: Hexadecimal identifier
+
+  """
+  path = os.path.realpath(path)
+
+  m = _OBJECT_NAME_RE.match(os.path.basename(path))
+  if m:
+    return m.group("digest")
+
+  st = os.stat(path)
+  key = "%s\0%d\0%d" % (path, st.st_size, st.st_mtime_ns)
+  return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def GetGoldenImageName(image_id, size=None):
+  """Returns the name of the golden copy of an image.
+
+  @type image_id: string
+  @param image_id: Image identifier, see L{GetImageId}
+  @type size: int or None
+  @param size: Size of the golden copy in MiB, for storage types where
+    clones have the size of their origin
+  @rtype: string
+
+  """
+  name = "%s%s" % (constants.GOLDEN_IMAGE_PREFIX, image_id[:32])
+  if size is not None:
+    name += "-%dm" % size
+  return name
+
+
+def LockGoldenImage(name):
+  """Acquires the lock serializing the creation of a golden image.
+
+  @type name: string
+  @param name: Name of the golden image, see L{GetGoldenImageName}
+  @rtype: L{utils.FileLock}
+  @return: The acquired lock, to be closed by the caller
+
+  """
+  utils.Makedirs(pathutils.IMAGE_CACHE_DIR, mode=0o750)
+  lock = utils.FileLock.Open(utils.PathJoin(pathutils.IMAGE_CACHE_DIR,
+                                            "%s.lock" % name))
+  lock.Exclusive(blocking=True)
+  return lock
+
+
+def DetectImageFormat(path):
+  """Detects the format of an image from its first bytes.
+
+  @rtype: string
+  @return: One of the C{IMG_*} constants
+
+  """
+  with open(path, "rb") as fh:
+    head = fh.read(16)
+
+  for (magic, fmt) in _IMAGE_MAGIC:
+    if head.startswith(magic):
+      return fmt
+
+  return IMG_RAW
+
+
+class _AlignedWriter(object):
+  """Writes a stream to a file or device in large, aligned blocks.
+
+  Direct I/O is used if the target supports it, so the page cache isn't
+  filled with data that is never read again. The final, possibly unaligned,
+  part is written without direct I/O.
+
+  """
+  def __init__(self, path, max_size):
+    """Initializes this class.
+
+    @type path: string
+    @param path: Target path
+    @type max_size: int
+    @param max_size: Maximum number of bytes to write
+
+    """
+    self._path = path
+    self._max_size = max_size
+    self._offset = 0
+    self._buf = mmap.mmap(-1, WRITE_BUFSIZE)
+    self._used = 0
+
+    try:
+      self._fd = os.open(path, os.O_WRONLY | getattr(os, "O_DIRECT", 0))
+      self._direct = hasattr(os, "O_DIRECT")
+    except EnvironmentError as err:
+      if err.errno != errno.EINVAL:
+        raise
+      # Filesystems such as tmpfs don't support direct I/O
+      self._fd = os.open(path, os.O_WRONLY)
+      self._direct = False
+
+  @property
+  def written(self):
+    """Returns the number of bytes written so far.
+
+    """
+    return self._offset + self._used
+
+  def Write(self, data):
+    """Appends data to the target.
+
+    """
+    if self.written + len(data) > self._max_size:
+      raise ImageTooLargeError("Disk image larger than the disk")
+
+    view = memoryview(data)
+    while view:
+      count = min(len(view), WRITE_BUFSIZE - self._used)
+      self._buf[self._used:self._used + count] = view[:count]
+      self._used += count
+      view = view[count:]
+
+      if self._used == WRITE_BUFSIZE:
+        self._Flush()
+
+  def _Flush(self):
+    data = memoryview(self._buf)[:self._used]
+    aligned = self._used - (self._used % _DIRECT_IO_ALIGNMENT)
+
+    if self._direct and aligned != self._used:
+      # Write the unaligned tail through the page cache
+      if aligned:
+        self._offset += os.pwrite(self._fd, data[:aligned], self._offset)
+      fd = os.open(self._path, os.O_WRONLY)
+      try:
+        self._offset += os.pwrite(fd, data[aligned:], self._offset)
+        os.fsync(fd)
+      finally:
+        os.close(fd)
+    else:
+      self._offset += os.pwrite(self._fd, data, self._offset)
+
+    data.release()
+    self._used = 0
+
+  def Close(self):
+    """Writes buffered data and closes the target.
+
+    """
+    try:
+      if self._used:
+        self._Flush()
+      os.fsync(self._fd)
+    finally:
+      os.close(self._fd)
+      self._buf.close()
+
+
+def _ReadChunks(fh):
+  while True:
+    data = fh.read(WRITE_BUFSIZE)
+    if not data:
+      break
+    yield data
+
+
+def _DecompressGzip(fh):
+  # Limit the output per call, highly compressed input could otherwise
+  # expand to a huge buffer
+  decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+  try:
+    for data in _ReadChunks(fh):
+      while data:
+        if decompressor.eof:
+          # A gzip file can consist of several members, each with its own
+          # header
+          decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        yield decompressor.decompress(data, WRITE_BUFSIZE)
+        data = decompressor.unconsumed_tail or decompressor.unused_data
+    yield decompressor.flush()
+  except zlib.error as err:
+    raise ImageError("Invalid gzip image: %s" % err)
+
+  if not decompressor.eof:
+    raise ImageError("Invalid gzip image: unexpected end of data")
+
+
+def _DecompressXz(fh):
+  decompressor = lzma.LZMADecompressor()
+  for data in _ReadChunks(fh):
+    yield decompressor.decompress(data, WRITE_BUFSIZE)
+    while not (decompressor.needs_input or decompressor.eof):
+      yield decompressor.decompress(b"", WRITE_BUFSIZE)
+
+
+def _ReadZstd(path):
+  proc = subprocess.Popen([_ZSTD_CMD, "-d", "-c", path],
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+  try:
+    for data in _ReadChunks(proc.stdout):
+      yield data
+  finally:
+    proc.stdout.close()
+    stderr = proc.stderr.read()
+    if proc.wait() != 0:
+      raise ImageError("Decompressing %s failed: %s" %
+                       (path, stderr.decode("utf-8", "replace").strip()))
+
+
+def _WriteQcow2(path, target_path, max_size):
+  """Converts a qcow2 image onto the target.
+
+  """
+  result = utils.RunCmd([constants.QEMUIMG_PATH, "info", "--output=json",
+                         path])
+  if result.failed:
+    raise ImageError("Can't read qcow2 image %s: %s" %
+                     (path, result.output))
+
+  virtual_size = serializer.LoadJson(result.stdout)["virtual-size"]
+  if virtual_size > max_size:
+    raise ImageTooLargeError("Disk image larger than the disk")
+
+  # "-n" writes to the existing target, "-t none" bypasses the page cache
+  result = utils.RunCmd([constants.QEMUIMG_PATH, "convert", "-n",
+                         "-t", "none", "-f", IMG_QCOW2, "-O", IMG_RAW,
+                         path, target_path])
+  if result.failed:
+    raise ImageError("Converting qcow2 image %s failed: %s" %
+                     (path, result.output))
+
+  return virtual_size
+
+
+def WriteImage(path, target_path, max_size):
+  """Writes an image to a device, decompressing or converting it if needed.
+
+  @type path: string
+  @param path: Path of the image
+  @type target_path: string
+  @param target_path: Path of the device or file to write to
+  @type max_size: int
+  @param max_size: Maximum number of bytes the image may occupy on the target
+  @rtype: int
+  @return: Number of bytes written
+
+  """
+  fmt = DetectImageFormat(path)
+
+  logging.info("Writing %s image %s to %s", fmt, path, target_path)
+
+  if fmt == IMG_QCOW2:
+    return _WriteQcow2(path, target_path, max_size)
+
+  writer = _AlignedWriter(target_path, max_size)
+  try:
+    with open(path, "rb") as fh:
+      if fmt == IMG_GZIP:
+        chunks = _DecompressGzip(fh)
+      elif fmt == IMG_XZ:
+        chunks = _DecompressXz(fh)
+      elif fmt == IMG_ZSTD:
+        chunks = _ReadZstd(path)
+      else:
+        chunks = _ReadChunks(fh)
+
+      for data in chunks:
+        writer.Write(data)
+  finally:
+    writer.Close()
+
+  return writer.written
@@ -459,7 +459,8 @@ class JobHandler(FeedbackAccumulator):
 
     """
     self.ClearFeedbackBuf()
-    jex = cli.JobExecutor(cl=self.cl, feedback_fn=self.Feedback)
+    jex = cli.JobExecutor(cl=self.cl, feedback_fn=self.Feedback,
+                          multiplex=True)
     for ops, name, _ in jobs:
       jex.QueueJob(name, *ops)
     try:
@@ -178,7 +178,7 @@ def GetPaths():
     ]
 
   ss = ssconf.SimpleStore()
-  for ss_path in ss.GetFileList():
+  for ss_path in ss.GetFileList() + [ss.GetSnapshotFilename()]:
     paths.append((ss_path, FILE, constants.SS_FILE_PERMS,
                   getent.noded_uid, getent.noded_gid, False))
 
@@ -215,6 +215,8 @@ def GetPaths():
      getent.noded_uid, getent.masterd_gid),
     (pathutils.IMPORT_EXPORT_DIR, DIR, 0o755,
      getent.noded_uid, getent.masterd_gid),
+    (pathutils.IMAGE_CACHE_DIR, DIR, 0o750,
+     getent.noded_uid, getent.masterd_gid),
     (pathutils.LOG_DIR, DIR, 0o770, getent.masterd_uid, getent.daemons_gid),
     (masterd_log, FILE, 0o600, getent.masterd_uid, getent.masterd_gid, False),
     (confd_log, FILE, 0o600, getent.confd_uid, getent.masterd_gid, False),
@@ -93,6 +93,7 @@ def Main():
       ]
     clean_files.extend((f, True) for f in pathutils.ALL_CERT_FILES)
     clean_files.extend((f, False) for f in ssconf.SimpleStore().GetFileList())
+    clean_files.append((ssconf.SimpleStore().GetSnapshotFilename(), False))
 
     if not opts.yes_do_it:
       cli.ToStderr("Cleaning a node is irreversible. If you really want to"
@@ -0,0 +1,452 @@
+#
+#
+
+# Copyright (C) 2026 the Ganeti project
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Tool to copy disk data as a stream of its non-zero extents.
+
+The exporting side reads a file or block device and writes only the
+extents containing data to standard output, together with their offsets.
+Holes in files are found using C{SEEK_DATA}/C{SEEK_HOLE}, everything else
+is checked for blocks consisting of zeros only. The importing side reads
+such a stream from standard input and writes the data extents to their
+offsets, zeroing the remainder of the range. On block devices this is done
+using C{BLKZEROOUT}, which lets thinly provisioned devices unmap the space,
+while files are left sparse.
+
+Stream format (all integers are unsigned 64-bit, big endian)::
+
+  header: magic, start offset, end offset
+  record: offset, length, followed by C{length} bytes of data
+  ...
+  record: end offset, 0
+
+"""
+
+import errno
+import fcntl
+import mmap
+import os
+import optparse
+import stat
+import struct
+import sys
+import logging
+
+from ganeti import cli
+from ganeti import constants
+from ganeti import errors
+from ganeti import utils
+
+
+#: Magic value at the beginning of each stream
+_MAGIC = b"GNTSPRS1"
+
+_HEADER = struct.Struct(">8sQQ")
+_RECORD = struct.Struct(">QQ")
+
+#: Amount of data read or written at once
+BUFSIZE = 1024 * 1024
+
+#: Granularity of the zero block detection
+ZERO_BLOCK_SIZE = 64 * 1024
+
+_ZERO_BUFFER = bytes(BUFSIZE)
+
+#: Alignment of reads from block devices opened with C{O_DIRECT}
+_DIRECT_ALIGNMENT = 4096
+
+#: ioctl to zero a range of a block device, _IO(0x12, 127) from linux/fs.h
+_BLKZEROOUT = 0x127f
+
+#: Operation modes
+MODE_EXPORT = "export"
+MODE_IMPORT = "import"
+
+
+class SparseCopyError(errors.GenericError):
+  """Local class for reporting errors.
+
+  """
+
+
+def _IsZero(buf):
+  """Checks whether a buffer consists of zero bytes only.
+
+  """
+  return buf == _ZERO_BUFFER[:len(buf)]
+
+
+def _SplitDataBlocks(buf):
+  """Finds runs of blocks containing data in a buffer.
+
+  @type buf: bytes
+  @param buf: Data buffer, at most L{BUFSIZE} bytes long
+  @return: Generator of (offset, memoryview) tuples, one for each run of
+    adjacent blocks not consisting of zeros only
+
+  """
+  view = memoryview(buf)
+  run_start = None
+
+  for offset in range(0, len(buf), ZERO_BLOCK_SIZE):
+    if _IsZero(view[offset:offset + ZERO_BLOCK_SIZE]):
+      if run_start is not None:
+        yield (run_start, view[run_start:offset])
+        run_start = None
+    elif run_start is None:
+      run_start = offset
+
+  if run_start is not None:
+    yield (run_start, view[run_start:])
+
+
+def _GetDataExtents(fd, start, end):
+  """Returns the extents of a range which may contain data.
+
+  For regular files on filesystems supporting C{SEEK_DATA} only the allocated
+  extents are returned, for everything else the whole range.
+
+  @type fd: int
+  @param fd: File descriptor
+  @type start: int
+  @param start: Start of range in bytes
+  @type end: int
+  @param end: End of range in bytes (exclusive)
+  @return: Generator of (offset, length) tuples
+
+  """
+  if not (stat.S_ISREG(os.fstat(fd).st_mode) and hasattr(os, "SEEK_DATA")):
+    if end > start:
+      yield (start, end - start)
+    return
+
+  pos = start
+  while pos < end:
+    try:
+      data = os.lseek(fd, pos, os.SEEK_DATA)
+    except EnvironmentError as err:
+      if err.errno == errno.ENXIO:
+        # No more data until the end of the file
+        return
+      if err.errno == errno.EINVAL:
+        # Not supported by the filesystem
+        yield (pos, end - pos)
+        return
+      raise
+
+    if data >= end:
+      return
+
+    hole = min(os.lseek(fd, data, os.SEEK_HOLE), end)
+    yield (data, hole - data)
+    pos = hole
+
+
+def _ReadExact(stream, length):
+  """Reads exactly the given number of bytes from a stream.
+
+  """
+  data = stream.read(length)
+  if len(data) != length:
+    raise SparseCopyError("Unexpected end of stream, expected %s bytes but"
+                          " got %s" % (length, len(data)))
+  return data
+
+
+def _WriteZeros(fd, start, length):
+  """Writes zeros to a range of a file descriptor.
+
+  """
+  pos = start
+  end = start + length
+  while pos < end:
+    pos += os.pwrite(fd, _ZERO_BUFFER[:min(BUFSIZE, end - pos)], pos)
+
+
+def _ZeroRange(fd, start, length):
+  """Makes sure a range of the target reads back as zeros.
+
+  @type fd: int
+  @param fd: File descriptor of the target
+  @type start: int
+  @param start: Start of range in bytes
+  @type length: int
+  @param length: Length of range in bytes
+
+  """
+  if stat.S_ISBLK(os.fstat(fd).st_mode):
+    try:
+      fcntl.ioctl(fd, _BLKZEROOUT, struct.pack("QQ", start, length))
+    except EnvironmentError as err:
+      logging.debug("BLKZEROOUT failed (%s), writing zeros instead", err)
+      _WriteZeros(fd, start, length)
+  else:
+    # Only overwrite extents which are actually allocated
+    for (ext_start, ext_length) in _GetDataExtents(fd, start, start + length):
+      _WriteZeros(fd, ext_start, ext_length)
+
+
+def _ReadDirect(fd, buf, pos, length):
+  """Reads from a file descriptor opened with C{O_DIRECT}.
+
+  Direct I/O needs the buffer, the offset and the length to be aligned, so
+  the data is read into a page-aligned buffer and the length is rounded up.
+  The offset must already be aligned.
+
+  @type fd: int
+  @param fd: File descriptor to read from
+  @type buf: mmap.mmap
+  @param buf: Buffer of L{BUFSIZE} bytes to read into
+  @type pos: int
+  @param pos: Offset to read at
+  @type length: int
+  @param length: Maximum number of bytes to return
+  @rtype: bytes
+
+  """
+  aligned = min(len(buf), -(-length // _DIRECT_ALIGNMENT) * _DIRECT_ALIGNMENT)
+
+  os.lseek(fd, pos, os.SEEK_SET)
+  count = os.readv(fd, [memoryview(buf)[:aligned]])
+
+  return buf[:min(count, length)]
+
+
+def ExportSparse(fd, start, end, output, direct=False):
+  """Writes a range of a file descriptor as a sparse stream.
+
+  @type fd: int
+  @param fd: File descriptor to read from
+  @type start: int
+  @param start: Start of range in bytes
+  @type end: int
+  @param end: End of range in bytes (exclusive)
+  @param output: File-like object to write the stream to
+  @type direct: boolean
+  @param direct: whether C{fd} was opened with C{O_DIRECT}
+  @rtype: int
+  @return: Number of data bytes written to the stream
+
+  """
+  if direct:
+    direct_buf = mmap.mmap(-1, BUFSIZE)
+    read_fn = lambda pos, length: _ReadDirect(fd, direct_buf, pos, length)
+  else:
+    direct_buf = None
+    read_fn = lambda pos, length: os.pread(fd, length, pos)
+
+  output.write(_HEADER.pack(_MAGIC, start, end))
+
+  data_bytes = 0
+
+  try:
+    for (ext_start, ext_length) in _GetDataExtents(fd, start, end):
+      pos = ext_start
+      ext_end = ext_start + ext_length
+
+      while pos < ext_end:
+        buf = read_fn(pos, min(BUFSIZE, ext_end - pos))
+        if not buf:
+          raise SparseCopyError("Unexpected end of input at offset %s" % pos)
+
+        for (offset, data) in _SplitDataBlocks(buf):
+          output.write(_RECORD.pack(pos + offset, len(data)))
+          output.write(data)
+          data_bytes += len(data)
+
+        pos += len(buf)
+  finally:
+    if direct_buf is not None:
+      direct_buf.close()
+
+  output.write(_RECORD.pack(end, 0))
+  output.flush()
+
+  return data_bytes
+
+
+def ImportSparse(stream, fd):
+  """Writes a sparse stream to a file descriptor.
+
+  @param stream: File-like object to read the stream from
+  @type fd: int
+  @param fd: File descriptor to write to
+  @rtype: int
+  @return: Number of data bytes read from the stream
+
+  """
+  (magic, start, end) = _HEADER.unpack(_ReadExact(stream, _HEADER.size))
+  if magic != _MAGIC:
+    raise SparseCopyError("Input is not a sparse stream (magic %r)" % magic)
+
+  data_bytes = 0
+  pos = start
+
+  while True:
+    (offset, length) = _RECORD.unpack(_ReadExact(stream, _RECORD.size))
+
+    if offset < pos or offset + length > end:
+      raise SparseCopyError("Extent of %s bytes at offset %s is not within"
+                            " %s-%s" % (length, offset, pos, end))
+
+    if offset > pos:
+      _ZeroRange(fd, pos, offset - pos)
+
+    if length == 0:
+      if offset != end:
+        raise SparseCopyError("Empty extent at offset %s before the end of"
+                              " the stream" % offset)
+      break
+
+    pos = offset
+    while pos < offset + length:
+      buf = _ReadExact(stream, min(BUFSIZE, offset + length - pos))
+      pos += os.pwrite(fd, buf, pos)
+
+    data_bytes += length
+
+  if (stat.S_ISREG(os.fstat(fd).st_mode) and
+      os.fstat(fd).st_size < end):
+    os.ftruncate(fd, end)
+
+  os.fsync(fd)
+
+  return data_bytes
+
+
+def _OpenExportSource(path):
+  """Opens the file or block device to export.
+
+  Block devices are read with C{O_DIRECT} where possible, so that the
+  export neither pollutes nor depends on the page cache.
+
+  @rtype: tuple; (int, boolean)
+  @return: The file descriptor and whether it uses direct I/O
+
+  """
+  if stat.S_ISBLK(os.stat(path).st_mode):
+    try:
+      return (os.open(path, os.O_RDONLY | os.O_DIRECT), True)
+    except EnvironmentError as err:
+      logging.debug("Can't open %s for direct I/O (%s), using buffered"
+                    " reads", path, err)
+
+  return (os.open(path, os.O_RDONLY), False)
+
+
+def _GetSize(fd):
+  """Returns the size of a file or block device in bytes.
+
+  """
+  return os.lseek(fd, 0, os.SEEK_END)
+
+
+def ParseOptions():
+  """Parses the options passed to the program.
+
+  @return: Options and arguments
+
+  """
+  parser = optparse.OptionParser(usage=("%%prog {%s|%s} <path>" %
+                                        (MODE_EXPORT, MODE_IMPORT)),
+                                 prog=os.path.basename(sys.argv[0]))
+  parser.add_option(cli.DEBUG_OPT)
+  parser.add_option(cli.VERBOSE_OPT)
+  parser.add_option("--offset", dest="offset", action="store", type="int",
+                    default=0, help="Offset to start reading at (MiB)")
+  parser.add_option("--size", dest="size", action="store", type="int",
+                    default=None,
+                    help="Amount of data to read (MiB, defaults to all)")
+
+  (opts, args) = parser.parse_args()
+
+  return VerifyOptions(parser, opts, args)
+
+
+def VerifyOptions(parser, opts, args):
+  """Verifies options and arguments for correctness.
+
+  """
+  if len(args) != 2:
+    parser.error("Expected exactly two arguments")
+
+  (mode, _) = args
+
+  if mode not in (MODE_EXPORT, MODE_IMPORT):
+    parser.error("Invalid mode: %s" % mode)
+
+  if opts.offset < 0 or (opts.size is not None and opts.size < 0):
+    parser.error("Offset and size must not be negative")
+
+  return (opts, args)
+
+
+def Main():
+  """Main routine.
+
+  """
+  (opts, (mode, path)) = ParseOptions()
+
+  utils.SetupToolLogging(opts.debug, opts.verbose)
+
+  try:
+    if mode == MODE_EXPORT:
+      (fd, direct) = _OpenExportSource(path)
+      try:
+        start = opts.offset * 1024 * 1024
+        if opts.size is None:
+          end = _GetSize(fd)
+        else:
+          end = start + opts.size * 1024 * 1024
+
+        data_bytes = ExportSparse(fd, start, end, sys.stdout.buffer,
+                                  direct=direct)
+      finally:
+        os.close(fd)
+
+      logging.info("Exported %s of %s bytes from %s", data_bytes,
+                   end - start, path)
+
+    else:
+      fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o600)
+      try:
+        data_bytes = ImportSparse(sys.stdin.buffer, fd)
+      finally:
+        os.close(fd)
+
+      logging.info("Imported %s data bytes to %s", data_bytes, path)
+
+  except Exception as err: # pylint: disable=W0703
+    logging.debug("Caught unhandled exception", exc_info=True)
+
+    (retcode, message) = cli.FormatError(err)
+    logging.error(message)
+
+    return retcode
+  else:
+    return constants.EXIT_SUCCESS
@@ -40,6 +40,8 @@ import select
 import logging
 import signal
 import resource
+import threading
+import time
 
 from io import StringIO
 
@@ -91,14 +93,18 @@ class RunResult(object):
   @ivar failed_by_timeout: True in case the program was
       terminated by timeout
   @ivar fail_reason: a string detailing the termination reason
+  @type duration: float or None
+  @ivar duration: how long the program ran, in seconds
 
   """
   __slots__ = ["exit_code", "signal", "stdout", "stderr",
-               "failed", "failed_by_timeout", "fail_reason", "cmd"]
+               "failed", "failed_by_timeout", "fail_reason", "cmd",
+               "duration"]
 
   def __init__(self, exit_code, signal_, stdout, stderr, cmd, timeout_action,
-               timeout):
+               timeout, duration=None):
     self.cmd = cmd
+    self.duration = duration
     self.exit_code = exit_code
     self.signal = signal_
     self.stdout = stdout
@@ -222,6 +228,7 @@ def RunCmd(cmd, env=None, output=None, cwd="/", reset_env=False,
 
   cmd_env = _BuildCmdEnvironment(env, reset_env)
 
+  start = time.monotonic()
   try:
     if output is None:
       out, err, status, timeout_action = _RunCmdPipe(cmd, cmd_env, shell, cwd,
@@ -250,7 +257,8 @@ def RunCmd(cmd, env=None, output=None, cwd="/", reset_env=False,
     exitcode = None
     signal_ = -status
 
-  return RunResult(exitcode, signal_, out, err, strcmd, timeout_action, timeout)
+  return RunResult(exitcode, signal_, out, err, strcmd, timeout_action, timeout,
+                   duration=time.monotonic() - start)
 
 
 def SetupDaemonEnv(cwd="/", umask=0o77):
@@ -714,7 +722,22 @@ def _RunCmdFile(cmd, env, via_shell, output, cwd, noclose_fds):
   return status
 
 
-def RunParts(dir_name, env=None, reset_env=False):
+def _RunPart(fname, env, reset_env):
+  """Runs a single script for L{RunParts}.
+
+  @rtype: tuple
+  @return: (one of RUNDIR_STATUS, RunResult or error message)
+
+  """
+  try:
+    result = RunCmd([fname], env=env, reset_env=reset_env)
+  except Exception as err: # pylint: disable=W0703
+    return (constants.RUNPARTS_ERR, str(err))
+  else:
+    return (constants.RUNPARTS_RUN, result)
+
+
+def RunParts(dir_name, env=None, reset_env=False, max_parallel=1):
   """Run Scripts or programs in a directory
 
   @type dir_name: string
@@ -723,8 +746,12 @@ def RunParts(dir_name, env=None, reset_env=False):
   @param env: The environment to use
   @type reset_env: boolean
   @param reset_env: whether to reset or keep the default os environment
+  @type max_parallel: int
+  @param max_parallel: how many scripts may run at the same time; if larger
+      than one, the scripts must not depend on each other
   @rtype: list of tuples
-  @return: list of (name, (one of RUNDIR_STATUS), RunResult)
+  @return: list of (name, (one of RUNDIR_STATUS), RunResult), sorted by name
+      regardless of the order in which the scripts finished
 
   """
   rr = []
@@ -735,18 +762,43 @@ def RunParts(dir_name, env=None, reset_env=False):
     logging.warning("RunParts: skipping %s (cannot list: %s)", dir_name, err)
     return rr
 
+  # Scripts to run, as (index in result list, path)
+  pending = []
+
   for relname in sorted(dir_contents):
     fname = utils_io.PathJoin(dir_name, relname)
     if not (constants.EXT_PLUGIN_MASK.match(relname) is not None and
             utils_wrapper.IsExecutable(fname)):
       rr.append((relname, constants.RUNPARTS_SKIP, None))
     else:
-      try:
-        result = RunCmd([fname], env=env, reset_env=reset_env)
-      except Exception as err: # pylint: disable=W0703
-        rr.append((relname, constants.RUNPARTS_ERR, str(err)))
-      else:
-        rr.append((relname, constants.RUNPARTS_RUN, result))
+      pending.append((len(rr), fname))
+      rr.append((relname, None, None))
+
+  def _Run(idx, fname):
+    (status, result) = _RunPart(fname, env, reset_env)
+    rr[idx] = (rr[idx][0], status, result)
+
+  if max_parallel <= 1 or len(pending) <= 1:
+    for (idx, fname) in pending:
+      _Run(idx, fname)
+    return rr
+
+  lock = threading.Lock()
+
+  def _Worker():
+    while True:
+      with lock:
+        if not pending:
+          return
+        (idx, fname) = pending.pop(0)
+      _Run(idx, fname)
+
+  workers = [threading.Thread(target=_Worker)
+             for _ in range(min(max_parallel, len(pending)))]
+  for thread in workers:
+    thread.start()
+  for thread in workers:
+    thread.join()
 
   return rr
 
@@ -43,6 +43,8 @@ import signal
 import time
 import logging
 import errno
+import threading
+import concurrent.futures
 from optparse import OptionParser
 
 from ganeti import utils
@@ -59,6 +61,7 @@ from ganeti import qlang
 from ganeti import ssconf
 from ganeti import ht
 from ganeti import pathutils
+from ganeti import serializer
 
 import ganeti.rapi.client # pylint: disable=W0611
 from ganeti.rapi.client import UsesRapiClient
@@ -81,6 +84,10 @@ ERROR = "ERROR"
 #: Number of seconds to wait between starting child processes for node groups
 CHILD_PROCESS_DELAY = 1.0
 
+#: Default number of node groups watched at the same time by the global
+#: watcher; zero starts one child process per node group instead
+GROUP_WATCHER_THREADS = 8
+
 #: How many seconds to wait for instance status file lock
 INSTANCE_STATUS_LOCK_TIMEOUT = 10.0
 
@@ -507,6 +514,12 @@ def ParseOptions():
   parser.add_option("--no-strict", dest="no_strict",
                     default=False, action="store_true",
                     help="Do not run group verify in strict mode")
+  parser.add_option("--group-threads", dest="group_threads", type="int",
+                    default=GROUP_WATCHER_THREADS,
+                    help=("Number of node groups to watch at the same time"
+                          " in the global watcher process, 0 to start a"
+                          " child process per node group (default %s)" %
+                          GROUP_WATCHER_THREADS))
   parser.add_option("--rapi-ip", dest="rapi_ip",
                     default=constants.IP4_ADDRESS_LOCALHOST,
                     help="Use this IP to talk to RAPI.")
@@ -518,25 +531,43 @@ def ParseOptions():
   if args:
     parser.error("No arguments expected")
 
+  if options.group_threads < 0:
+    parser.error("Number of group threads can't be negative")
+
   return (options, args)
 
 
 def _WriteInstanceStatus(filename, data):
   """Writes the per-group instance status file.
 
-  The entries are sorted.
+  The entries are sorted. The file is left untouched, keeping its
+  modification time, if it already has the same content.
 
   @type filename: string
   @param filename: Path to instance status file
   @type data: list of tuple; (instance name as string, status as string)
   @param data: Instance name and status
+  @rtype: bool
+  @return: Whether the file was written
 
   """
+  content = "\n".join("%s %s" % (n, s) for (n, s) in sorted(data))
+
+  try:
+    unchanged = (utils.ReadFile(filename) == content)
+  except EnvironmentError:
+    unchanged = False
+
+  if unchanged:
+    logging.debug("Instance status file '%s' is up to date", filename)
+    return False
+
   logging.debug("Updating instance status file '%s' with %s instances",
                 filename, len(data))
 
-  utils.WriteFile(filename,
-                  data="\n".join("%s %s" % (n, s) for (n, s) in sorted(data)))
+  utils.WriteFile(filename, data=content)
+
+  return True
 
 
 def _UpdateInstanceStatus(filename, instances):
@@ -578,9 +609,60 @@ def _ReadInstanceStatus(filename):
                                  for line in content.splitlines()])
 
 
-def _MergeInstanceStatus(filename, pergroup_filename, groups):
+def _GetFileVersion(st):
+  """Returns what identifies a version of a file in the merge cache.
+
+  The mtime alone can't tell apart updates in quick succession on file
+  systems with a coarse timestamp resolution. Status files are replaced on
+  every update, so their inode number changes as well.
+
+  @type st: C{os.stat_result}
+  @param st: the status of the file
+  @rtype: list; [inode number, size, mtime]
+
+  """
+  return [st.st_ino, st.st_size, st.st_mtime]
+
+
+def _ReadMergeCache(filename):
+  """Reads the per-group instance status of the last merge.
+
+  @type filename: string
+  @param filename: Path to the cache file
+  @rtype: tuple; (None or list, dict)
+  @return: version of the global instance status file written by the last
+    merge (see L{_GetFileVersion}) and the group UUIDs mapped to their status
+    file's version and entries; C{None} and an empty dict if the cache can't
+    be read
+
+  """
+  try:
+    cache = serializer.LoadJson(utils.ReadFile(filename))
+    return (cache["version"], cache["groups"])
+  except EnvironmentError as err:
+    if err.errno != errno.ENOENT:
+      logging.warning("Can't read '%s', merging all groups: %s", filename, err)
+  except Exception as err: # pylint: disable=W0703
+    logging.warning("Invalid content in '%s', merging all groups: %s",
+                    filename, err)
+
+  return (None, {})
+
+
+def _MergeInstanceStatus(filename, pergroup_filename, groups, cache_filename):
   """Merges all per-group instance status files into a global one.
 
+  Only the per-group files whose version (see L{_GetFileVersion}) differs
+  from the one recorded in the cache file are read, the entries of all others
+  are taken from the cache. If no group changed and the global file is still
+  the one written by the last merge, it is left alone.
+
+  An instance listed by several groups, e.g. while it is moved between
+  groups, gets its status from the file with the newest mtime. As per-group
+  files are only written when their content changes (see
+  L{_WriteInstanceStatus}), this is the group whose status changed last, not
+  the group whose watcher ran last.
+
   @type filename: string
   @param filename: Path to global instance status file
   @type pergroup_filename: string
@@ -588,6 +670,9 @@ def _MergeInstanceStatus(filename, pergroup_filename, groups):
     to be replaced with group UUID
   @type groups: sequence
   @param groups: UUIDs of known groups
+  @type cache_filename: string
+  @param cache_filename: Path to the file caching the per-group status of the
+    last merge
 
   """
   # Lock global status file in exclusive mode
@@ -604,23 +689,55 @@ def _MergeInstanceStatus(filename, pergroup_filename, groups):
 
   logging.debug("Acquired exclusive lock on '%s'", filename)
 
-  data = {}
+  (cached_version, cache) = _ReadMergeCache(cache_filename)
+  groupdata = {}
+  changed = []
 
-  # Load instance status from all groups
+  # Load instance status from all changed groups
   for group_uuid in groups:
-    (mtime, instdata) = _ReadInstanceStatus(pergroup_filename % group_uuid)
+    group_filename = pergroup_filename % group_uuid
+    cached = cache.get(group_uuid)
+
+    # The version is determined before reading the file; should it be
+    # replaced in between, it's read again by the next merge
+    try:
+      version = _GetFileVersion(os.stat(group_filename))
+    except EnvironmentError:
+      version = None
 
-    if mtime is not None:
-      for (instance_name, status) in instdata:
-        data.setdefault(instance_name, []).append((mtime, status))
+    if cached is not None and version == cached[0]:
+      groupdata[group_uuid] = cached
+      continue
+
+    (mtime, instdata) = _ReadInstanceStatus(group_filename)
+
+    if mtime is not None and version is not None:
+      groupdata[group_uuid] = [version, instdata]
+      changed.append(group_uuid)
+
+  if (not changed and frozenset(groupdata) == frozenset(cache) and
+      _GetFileVersion(os.stat(filename)) == cached_version):
+    logging.debug("No per-group instance status changed, not updating '%s'",
+                  filename)
+    return
+
+  logging.debug("Merging instance status, changed groups: %s",
+                utils.CommaJoin(changed))
+
+  data = {}
 
-  # Select last update based on file mtime
-  inststatus = [(instance_name, sorted(status, reverse=True)[0][1])
-                for (instance_name, status) in data.items()]
+  # Select last update based on file mtime by letting newer files override
+  # older ones
+  for (_, instdata) in sorted(groupdata.values(), key=lambda v: v[0][2]):
+    data.update(instdata)
 
-  # Write the global status file. Don't touch file after it's been
-  # updated--there is no lock anymore.
-  _WriteInstanceStatus(filename, inststatus)
+  # Write the global status file, followed by the cache. Don't touch the
+  # files after they've been updated--there is no lock anymore.
+  _WriteInstanceStatus(filename, list(data.items()))
+  utils.WriteFile(cache_filename, data=serializer.DumpJson({
+    "version": _GetFileVersion(os.stat(filename)),
+    "groups": groupdata,
+    }))
 
 
 def GetLuxiClient(try_restart):
@@ -693,6 +810,82 @@ def _StartGroupChildren(cl, wait):
       logging.debug("Child PID %s exited with status %s", child, result)
 
 
+def _WatchGroupsInProcess(cl, opts):
+  """Watches all node groups from within the global watcher process.
+
+  The state files of all node groups are locked first; groups whose state
+  file is locked by another watcher are skipped. The instances and nodes of
+  the remaining groups are then retrieved with one query each over the
+  global watcher's connection, after which up to C{opts.group_threads}
+  groups are checked at the same time. Every thread opens a single luxi
+  connection of its own for submitting and polling jobs.
+
+  @rtype: dict
+  @return: seconds taken by the check of each node group, keyed by UUID
+
+  """
+  start = time.time()
+
+  groups = [uuid for (uuid, ) in cl.QueryGroups([], ["uuid"], False)]
+
+  statefiles = {}
+  try:
+    for uuid in groups:
+      statefile = _OpenGroupStateFile(uuid)
+      if statefile:
+        statefiles[uuid] = statefile
+
+    groupdata = _GetAllGroupsData(cl, [uuid for uuid in groups
+                                       if uuid in statefiles])
+
+    for (uuid, (_, instances, _)) in groupdata.items():
+      _UpdateInstanceStatus(
+        pathutils.WATCHER_GROUP_INSTANCE_STATUS_FILE % uuid,
+        list(instances.values()))
+
+    _MergeInstanceStatus(pathutils.INSTANCE_STATUS_FILE,
+                         pathutils.WATCHER_GROUP_INSTANCE_STATUS_FILE,
+                         _LoadKnownGroups(),
+                         pathutils.WATCHER_INSTANCE_STATUS_CACHE_FILE)
+
+    query_time = time.time() - start
+    logging.info("Retrieved data of %s node groups in %.3f seconds",
+                 len(groupdata), query_time)
+
+    local = threading.local()
+
+    def _WatchOne(uuid):
+      group_start = time.time()
+      try:
+        if not hasattr(local, "client"):
+          local.client = GetLuxiClient(False)
+        (nodes, instances, locks) = groupdata[uuid]
+        _WatchGroup(local.client, opts, uuid, statefiles[uuid], nodes,
+                    instances, locks)
+      except Exception: # pylint: disable=W0703
+        logging.exception("Watching node group %s failed", uuid)
+      duration = time.time() - group_start
+      logging.info("Watched node group %s (%s instances) in %.3f seconds",
+                   uuid, len(groupdata[uuid][1]), duration)
+      return (uuid, duration)
+
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=opts.group_threads) as pool:
+      timings = dict(pool.map(_WatchOne, groupdata))
+  finally:
+    for statefile in statefiles.values():
+      statefile.close()
+
+  if timings:
+    slowest = max(timings, key=timings.get)
+    logging.info("Watched %s node groups in %.3f seconds (%s at a time,"
+                 " slowest group %s took %.3f seconds)", len(timings),
+                 time.time() - start, opts.group_threads, slowest,
+                 timings[slowest])
+
+  return timings
+
+
 def _ArchiveJobs(cl, age):
   """Archives old jobs.
 
@@ -760,14 +953,26 @@ def _GlobalWatcher(opts):
   _CheckMaster(client)
   _ArchiveJobs(client, opts.job_age)
 
-  # Spawn child processes for all node groups
-  _StartGroupChildren(client, opts.wait_children)
+  if opts.group_threads:
+    _WatchGroupsInProcess(client, opts)
+  else:
+    # Spawn child processes for all node groups
+    _StartGroupChildren(client, opts.wait_children)
 
   return constants.EXIT_SUCCESS
 
 
-def _GetGroupData(qcl, uuid):
-  """Retrieves instances and nodes per node group.
+#: Fields queried for the instances of node groups
+_INSTANCE_FIELDS = ["name", "status", "admin_state", "admin_state_source",
+                    "disks_active", "snodes", "pnode.group.uuid",
+                    "snodes.group.uuid", "disk_template"]
+
+#: Fields queried for the nodes of node groups
+_NODE_FIELDS = ["name", "bootid", "offline"]
+
+
+def _GetLockedInstances(qcl):
+  """Returns the names of all instances currently locked.
 
   """
   locks = qcl.Query(constants.QR_LOCK, ["name", "mode"], None)
@@ -781,14 +986,16 @@ def _GetGroupData(qcl, uuid):
     if name.startswith(prefix) and lock:
       locked_instances.add(name[prefix_len:])
 
+  return locked_instances
+
+
+def _QueryInstancesAndNodes(qcl, inst_filter, node_fields, node_filter):
+  """Queries instances and nodes, returning the raw field values.
+
+  """
   queries = [
-      (constants.QR_INSTANCE,
-       ["name", "status", "admin_state", "admin_state_source", "disks_active",
-        "snodes", "pnode.group.uuid", "snodes.group.uuid", "disk_template"],
-       [qlang.OP_EQUAL, "pnode.group.uuid", uuid]),
-      (constants.QR_NODE,
-       ["name", "bootid", "offline"],
-       [qlang.OP_EQUAL, "group.uuid", uuid]),
+      (constants.QR_INSTANCE, _INSTANCE_FIELDS, inst_filter),
+      (constants.QR_NODE, node_fields, node_filter),
       ]
 
   results_data = [
@@ -801,10 +1008,17 @@ def _GetGroupData(qcl, uuid):
       ht.TListOf(ht.TListOf(ht.TIsLength(2)))(d) for d in results_data)
 
   # Extract values ignoring result status
-  (raw_instances, raw_nodes) = [[[v[1] for v in values]
-                                 for values in res]
-                                for res in results_data]
+  return [[[v[1] for v in values]
+           for values in res]
+          for res in results_data]
+
+
+def _BuildGroupData(raw_instances, raw_nodes):
+  """Builds L{Instance} and L{Node} objects from raw query results.
+
+  @return: dictionaries of nodes and instances, keyed by name
 
+  """
   secondaries = {}
   instances = []
 
@@ -827,8 +1041,62 @@ def _GetGroupData(qcl, uuid):
            for (name, bootid, offline) in raw_nodes]
 
   return (dict((node.name, node) for node in nodes),
-          dict((inst.name, inst) for inst in instances),
-          locked_instances)
+          dict((inst.name, inst) for inst in instances))
+
+
+def _GetGroupData(qcl, uuid):
+  """Retrieves instances and nodes per node group.
+
+  """
+  locked_instances = _GetLockedInstances(qcl)
+
+  (raw_instances, raw_nodes) = \
+    _QueryInstancesAndNodes(qcl, [qlang.OP_EQUAL, "pnode.group.uuid", uuid],
+                            _NODE_FIELDS, [qlang.OP_EQUAL, "group.uuid", uuid])
+
+  (nodes, instances) = _BuildGroupData(raw_instances, raw_nodes)
+
+  return (nodes, instances, locked_instances)
+
+
+def _GetAllGroupsData(qcl, groups):
+  """Retrieves instances and nodes of several node groups at once.
+
+  Unlike L{_GetGroupData}, instances and nodes are queried only once for
+  the whole cluster and then split by node group.
+
+  @type groups: list of string
+  @param groups: UUIDs of the node groups to return data for
+  @rtype: dict
+  @return: the result of L{_GetGroupData} for each group, keyed by UUID
+
+  """
+  locked_instances = _GetLockedInstances(qcl)
+
+  (raw_instances, raw_nodes) = \
+    _QueryInstancesAndNodes(qcl, None, _NODE_FIELDS + ["group.uuid"], None)
+
+  pnode_group_idx = _INSTANCE_FIELDS.index("pnode.group.uuid")
+
+  group_instances = dict((uuid, []) for uuid in groups)
+  group_nodes = dict((uuid, []) for uuid in groups)
+
+  for row in raw_instances:
+    if row[pnode_group_idx] in group_instances:
+      group_instances[row[pnode_group_idx]].append(row)
+
+  for row in raw_nodes:
+    if row[-1] in group_nodes:
+      group_nodes[row[-1]].append(row[:-1])
+
+  result = {}
+
+  for uuid in groups:
+    (nodes, instances) = _BuildGroupData(group_instances[uuid],
+                                         group_nodes[uuid])
+    result[uuid] = (nodes, instances, locked_instances)
+
+  return result
 
 
 def _LoadKnownGroups():
@@ -866,19 +1134,11 @@ def _GroupWatcher(opts):
     raise errors.GenericError("Node group '%s' is not known by ssconf" %
                               group_uuid)
 
-  # Group UUID has been verified and should not contain any dangerous
-  # characters
-  state_path = pathutils.WATCHER_GROUP_STATE_FILE % group_uuid
-  inst_status_path = pathutils.WATCHER_GROUP_INSTANCE_STATUS_FILE % group_uuid
-
-  logging.debug("Using state file %s", state_path)
-
-  # Group watcher file lock
-  statefile = state.OpenStateFile(state_path) # pylint: disable=E0602
+  # Group watcher file lock, taken before anything is queried or written
+  statefile = _OpenGroupStateFile(group_uuid)
   if not statefile:
     return constants.EXIT_FAILURE
 
-  notepad = state.WatcherState(statefile) # pylint: disable=E0602
   try:
     # Connect to master daemon
     client = GetLuxiClient(False)
@@ -888,12 +1148,56 @@ def _GroupWatcher(opts):
     (nodes, instances, locks) = _GetGroupData(client, group_uuid)
 
     # Update per-group instance status file
-    _UpdateInstanceStatus(inst_status_path, list(instances.values()))
+    _UpdateInstanceStatus(
+      pathutils.WATCHER_GROUP_INSTANCE_STATUS_FILE % group_uuid,
+      list(instances.values()))
 
     _MergeInstanceStatus(pathutils.INSTANCE_STATUS_FILE,
                          pathutils.WATCHER_GROUP_INSTANCE_STATUS_FILE,
-                         known_groups)
+                         known_groups,
+                         pathutils.WATCHER_INSTANCE_STATUS_CACHE_FILE)
+
+    return _WatchGroup(client, opts, group_uuid, statefile, nodes, instances,
+                       locks)
+  finally:
+    statefile.close()
+
+
+def _OpenGroupStateFile(group_uuid):
+  """Opens and locks the state file of a node group.
 
+  @type group_uuid: string
+  @param group_uuid: UUID of the node group, already verified to be known
+  @return: the locked state file, or C{None} if another watcher holds the lock
+
+  """
+  # Group UUID has been verified and should not contain any dangerous
+  # characters
+  state_path = pathutils.WATCHER_GROUP_STATE_FILE % group_uuid
+
+  logging.debug("Using state file %s", state_path)
+
+  return state.OpenStateFile(state_path) # pylint: disable=E0602
+
+
+def _WatchGroup(client, opts, group_uuid, statefile, nodes, instances, locks):
+  """Restarts instances and activates disks of one node group.
+
+  @type group_uuid: string
+  @param group_uuid: UUID of the node group, already verified to be known
+  @type statefile: file
+  @param statefile: state file of the group, locked by
+    L{_OpenGroupStateFile} before the group's data was queried
+  @type nodes: dict
+  @param nodes: L{Node} objects of the group, keyed by name
+  @type instances: dict
+  @param instances: L{Instance} objects of the group, keyed by name
+  @type locks: set
+  @param locks: names of the locked instances
+
+  """
+  notepad = state.WatcherState(statefile) # pylint: disable=E0602
+  try:
     started = _CheckInstances(client, notepad, instances, locks)
     _CheckDisks(client, notepad, nodes, instances, started)
   except Exception as err:
@@ -901,7 +1205,7 @@ def _GroupWatcher(opts):
     raise
   else:
     # Save changes for next run
-    notepad.Save(state_path)
+    notepad.Save(pathutils.WATCHER_GROUP_STATE_FILE % group_uuid)
     notepad.Close()
 
   # Check if the nodegroup only has ext storage type
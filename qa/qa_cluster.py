@@ -148,6 +148,8 @@ def PrepareHvParameterSets():
     toggle_bool_params = [
       "acpi",
       "debug_threads",
+      "migration_adaptive",
+      "migration_auto_converge",
       "use_chroot",
       "use_guest_agent",
       "use_localtime",
@@ -320,6 +320,10 @@ maxWipeChunk = 1024
 minWipeChunkPercent :: Int
 minWipeChunkPercent = 10
 
+-- | Prefix of the golden image volumes from which disks are cloned
+goldenImagePrefix :: String
+goldenImagePrefix = "ganeti-golden-"
+
 -- * Directories
 
 runDirsMode :: Int
@@ -639,8 +643,17 @@ iecLzop = "lzop"
 iecNone :: String
 iecNone = "none"
 
+-- | Multithreaded gzip-compatible compressor
+iecPigz :: String
+iecPigz = "pigz"
+
+-- | Zstandard, run with one compression thread per core
+iecZstd :: String
+iecZstd = "zstd"
+
 iecAll :: [String]
-iecAll = [iecGzip, iecGzipFast, iecGzipSlow, iecLzop, iecNone]
+iecAll =
+  [iecGzip, iecGzipFast, iecGzipSlow, iecLzop, iecPigz, iecZstd, iecNone]
 
 iecDefaultTools :: [String]
 iecDefaultTools = [iecGzip, iecGzipFast, iecGzipSlow]
@@ -655,6 +668,18 @@ iecCompressionUtilities =
 ieCustomSize :: String
 ieCustomSize = "fd"
 
+-- | Default number of parallel streams used to transfer a single disk
+ieDefaultTransferStreams :: Int
+ieDefaultTransferStreams = 1
+
+-- | Maximum number of parallel streams used to transfer a single disk
+ieMaxTransferStreams :: Int
+ieMaxTransferStreams = 16
+
+-- | Minimum size (in MiB) of the part of a disk transferred by one stream
+ieMinStreamSize :: Int
+ieMinStreamSize = 1024
+
 -- * Import/export I/O
 
 -- | Direct file I/O, equivalent to a shell's I/O redirection using
@@ -670,6 +695,11 @@ ieioRawDisk = "raw"
 ieioScript :: String
 ieioScript = "script"
 
+-- | Block device I/O sending only extents containing data, using the
+-- stream format of "sparse-copy"
+ieioSparseDisk :: String
+ieioSparseDisk = "sparse"
+
 -- * Values
 
 valueDefault :: String
@@ -710,6 +740,12 @@ hooksPhasePre = "pre"
 hooksVersion :: Int
 hooksVersion = 2
 
+-- | Environment variable by which the master asks for the run time of each
+-- script in the hook results; nodes remove it before running the scripts,
+-- older masters don't set it and get results in the old format
+hooksResultDurationEnv :: String
+hooksResultDurationEnv = "GANETI_HOOKS_RESULT_DURATION"
+
 -- * Hooks subject type (what object type does the LU deal with)
 
 htypeCluster :: String
@@ -1101,6 +1137,31 @@ fileDriver =
   ConstantUtils.mkSet $
   map Types.fileDriverToRaw [minBound..]
 
+-- * File disk preallocation
+
+-- | Name of the disk parameter selecting how file disks are allocated
+filePreallocation :: String
+filePreallocation = "preallocation"
+
+-- | Sparse files, blocks are only allocated when written by the guest
+filePreallocOff :: String
+filePreallocOff = "off"
+
+-- | Extents are reserved using fallocate, without writing any data
+filePreallocFalloc :: String
+filePreallocFalloc = "falloc"
+
+-- | The whole file is written with zeros on creation
+filePreallocFull :: String
+filePreallocFull = "full"
+
+filePreallocDefault :: String
+filePreallocDefault = filePreallocOff
+
+filePreallocModes :: FrozenSet String
+filePreallocModes =
+  ConstantUtils.mkSet [filePreallocOff, filePreallocFalloc, filePreallocFull]
+
 -- | The set of drbd-like disk types
 dtsDrbd :: FrozenSet String
 dtsDrbd = ConstantUtils.mkSet [Types.diskTemplateToRaw DTDrbd8]
@@ -1334,6 +1395,16 @@ defaultMacPrefix = "aa:00:00"
 defaultShutdownTimeout :: Int
 defaultShutdownTimeout = 120
 
+-- | Default number of instances started or stopped at the same time by
+-- the node-wide startup/shutdown opcodes
+nodeInstanceConcurrency :: Int
+nodeInstanceConcurrency = 8
+
+-- | Maximum number of instances started or stopped at the same time by
+-- the node-wide startup/shutdown opcodes
+nodeMaxInstanceConcurrency :: Int
+nodeMaxInstanceConcurrency = 64
+
 -- | Node clock skew (seconds)
 nodeMaxClockSkew :: Int
 nodeMaxClockSkew = 150
@@ -1687,6 +1758,24 @@ hvKvmMachineVersion = "machine_version"
 hvKvmMigrationCaps :: String
 hvKvmMigrationCaps = "migration_caps"
 
+hvKvmMigrationAdaptive :: String
+hvKvmMigrationAdaptive = "migration_adaptive"
+
+hvKvmMigrationAutoConverge :: String
+hvKvmMigrationAutoConverge = "migration_auto_converge"
+
+hvKvmMigrationCompression :: String
+hvKvmMigrationCompression = "migration_compression"
+
+hvKvmMigrationMaxBandwidth :: String
+hvKvmMigrationMaxBandwidth = "migration_max_bandwidth"
+
+hvKvmMigrationMaxDowntime :: String
+hvKvmMigrationMaxDowntime = "migration_max_downtime"
+
+hvKvmMigrationMultifdChannels :: String
+hvKvmMigrationMultifdChannels = "migration_multifd_channels"
+
 hvKvmPath :: String
 hvKvmPath = "kvm_path"
 
@@ -1907,6 +1996,12 @@ hvsParameterTypes = Map.fromList
   , (hvKvmFloppyImagePath,              VTypeString)
   , (hvKvmMachineVersion,               VTypeString)
   , (hvKvmMigrationCaps,                VTypeString)
+  , (hvKvmMigrationAdaptive,            VTypeBool)
+  , (hvKvmMigrationAutoConverge,        VTypeBool)
+  , (hvKvmMigrationCompression,         VTypeString)
+  , (hvKvmMigrationMaxBandwidth,        VTypeInt)
+  , (hvKvmMigrationMaxDowntime,         VTypeInt)
+  , (hvKvmMigrationMultifdChannels,     VTypeInt)
   , (hvKvmPath,                         VTypeString)
   , (hvKvmDiskAio,                      VTypeString)
   , (hvKvmScsiControllerType,           VTypeString)
@@ -2416,7 +2511,8 @@ diskDtTypes =
                 (rbdPool, VTypeString),
                 (glusterHost, VTypeString),
                 (glusterVolume, VTypeString),
-                (glusterPort, VTypeInt)
+                (glusterPort, VTypeInt),
+                (filePreallocation, VTypeString)
                ]
 
 diskDtParameters :: FrozenSet String
@@ -2847,6 +2943,23 @@ htKvmValidAioTypes =
                        htKvmAioNative,
                        htKvmAioIoUring]
 
+-- * KVM live migration compression methods
+
+htMigrationCompressionNone :: String
+htMigrationCompressionNone = "none"
+
+htMigrationCompressionXbzrle :: String
+htMigrationCompressionXbzrle = "xbzrle"
+
+htMigrationCompressionZstd :: String
+htMigrationCompressionZstd = "zstd"
+
+htKvmValidMigrationCompressionTypes :: FrozenSet String
+htKvmValidMigrationCompressionTypes =
+  ConstantUtils.mkSet [htMigrationCompressionNone,
+                       htMigrationCompressionXbzrle,
+                       htMigrationCompressionZstd]
+
 -- * Mouse types
 
 htMouseMouse :: String
@@ -4146,6 +4259,12 @@ hvcDefaults =
           , (hvKvmExtra,                        PyValueEx "")
           , (hvKvmMachineVersion,               PyValueEx "")
           , (hvKvmMigrationCaps,                PyValueEx "")
+          , (hvKvmMigrationAdaptive,            PyValueEx False)
+          , (hvKvmMigrationAutoConverge,        PyValueEx False)
+          , (hvKvmMigrationCompression,   PyValueEx htMigrationCompressionNone)
+          , (hvKvmMigrationMaxBandwidth,        PyValueEx (0 :: Int))
+          , (hvKvmMigrationMaxDowntime,         PyValueEx (0 :: Int))
+          , (hvKvmMigrationMultifdChannels,     PyValueEx (0 :: Int))
           , (hvVnetHdr,                         PyValueEx True)])
   , (Fake, Map.fromList [(hvMigrationMode, PyValueEx htMigrationLive)])
   , (Chroot, Map.fromList [(hvInitScript, PyValueEx "/ganeti-chroot")])
@@ -4249,13 +4368,17 @@ diskLdDefaults =
   , (DTExt, Map.fromList
             [ (ldpAccess, PyValueEx diskKernelspace)
             ])
-  , (DTFile, Map.empty)
+  , (DTFile, Map.fromList
+             [ (filePreallocation, PyValueEx filePreallocDefault)
+             ])
   , (DTPlain, Map.fromList [(ldpStripes, PyValueEx lvmStripecount)])
   , (DTRbd, Map.fromList
             [ (ldpPool, PyValueEx defaultRbdPool)
             , (ldpAccess, PyValueEx diskKernelspace)
             ])
-  , (DTSharedFile, Map.empty)
+  , (DTSharedFile, Map.fromList
+                   [ (filePreallocation, PyValueEx filePreallocDefault)
+                   ])
   , (DTGluster, Map.fromList
                 [ (rbdAccess, PyValueEx diskKernelspace)
                 , (glusterHost, PyValueEx glusterHostDefault)
@@ -4289,13 +4412,17 @@ diskDtDefaults =
   , (DTExt,        Map.fromList
                    [ (rbdAccess, PyValueEx diskKernelspace)
                    ])
-  , (DTFile,       Map.empty)
+  , (DTFile,       Map.fromList
+                   [ (filePreallocation, PyValueEx filePreallocDefault)
+                   ])
   , (DTPlain,      Map.fromList [(lvStripes, PyValueEx lvmStripecount)])
   , (DTRbd,        Map.fromList
                    [ (rbdPool, PyValueEx defaultRbdPool)
                    , (rbdAccess, PyValueEx diskKernelspace)
                    ])
-  , (DTSharedFile, Map.empty)
+  , (DTSharedFile, Map.fromList
+                   [ (filePreallocation, PyValueEx filePreallocDefault)
+                   ])
   , (DTGluster, Map.fromList
                 [ (rbdAccess, PyValueEx diskKernelspace)
                 , (glusterHost, PyValueEx glusterHostDefault)
@@ -5088,6 +5215,9 @@ luxiReqSubmitManyJobs = "SubmitManyJobs"
 luxiReqWaitForJobChange :: String
 luxiReqWaitForJobChange = "WaitForJobChange"
 
+luxiReqWaitForJobsChange :: String
+luxiReqWaitForJobsChange = "WaitForJobsChange"
+
 luxiReqPickupJob :: String
 luxiReqPickupJob = "PickupJob"
 
@@ -5175,6 +5305,7 @@ luxiReqAll =
   , luxiReqSubmitJobToDrainedQueue
   , luxiReqSubmitManyJobs
   , luxiReqWaitForJobChange
+  , luxiReqWaitForJobsChange
   , luxiReqPickupJob
   , luxiReqQueryFilters
   , luxiReqReplaceFilter
@@ -240,6 +240,14 @@ opNodeEvacuate :: String
 opNodeEvacuate =
   "Evacuate instances off a number of nodes."
 
+opNodeStartupInstances :: String
+opNodeStartupInstances =
+  "Start the primary instances of a node."
+
+opNodeShutdownInstances :: String
+opNodeShutdownInstances =
+  "Stop the primary instances of a node."
+
 opInstanceCreate :: String
 opInstanceCreate =
   "Create an instance.\n\
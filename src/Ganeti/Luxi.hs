@@ -167,6 +167,12 @@ $(genLuxiOp "LuxiOp"
      , simpleField "prev_log" [t| JSValue |]
      , simpleField "tmout"    [t| Int     |]
      ])
+  , (luxiReqWaitForJobsChange,
+     -- (job, prev_job, prev_log) for each job to watch
+     [ simpleField "jobs"     [t| [(JobId, JSValue, JSValue)] |]
+     , simpleField "fields"   [t| [String] |]
+     , simpleField "tmout"    [t| Int      |]
+     ])
   , (luxiReqPickupJob,
      [ simpleField "job" [t| JobId |] ]
     )
@@ -307,6 +313,9 @@ decodeLuxiCall method args = do
                     J.readJSON e
                   _ -> J.Error "Not enough values"
               return $ WaitForJobChange jid fields pinfo pidx wtmout
+    ReqWaitForJobsChange -> do
+              (jobs, fields, wtmout) <- fromJVal args
+              return $ WaitForJobsChange jobs fields wtmout
     ReqPickupJob -> do
               [jid] <- fromJVal args
               return $ PickupJob jid
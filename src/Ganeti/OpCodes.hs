@@ -448,6 +448,33 @@ $(genOpCode "OpCode"
      , pIgnoreSoftErrors
      ],
      "node_name")
+  , ("OpNodeStartupInstances",
+     [t| [(NonEmptyString, Bool, String)] |],
+     OpDoc.opNodeStartupInstances,
+     [ pNodeName
+     , pNodeUuid
+     , withDoc "Instances to start, all primary instances if empty"
+         pInstances
+     , pForce
+     , pNoRemember
+     , pStartupPaused
+     , pInstanceOrderTags
+     , pInstanceConcurrency
+     ],
+     "node_name")
+  , ("OpNodeShutdownInstances",
+     [t| [(NonEmptyString, Bool, String)] |],
+     OpDoc.opNodeShutdownInstances,
+     [ pNodeName
+     , pNodeUuid
+     , withDoc "Instances to stop, all primary instances if empty"
+         pInstances
+     , pShutdownTimeout'
+     , pNoRemember
+     , pInstanceOrderTags
+     , pInstanceConcurrency
+     ],
+     "node_name")
   , ("OpInstanceCreate",
      [t| [NonEmptyString] |],
      OpDoc.opInstanceCreate,
@@ -472,6 +499,7 @@ $(genOpCode "OpCode"
      , pInstCreateMode
      , pInstNics
      , pNoInstall
+     , pCloneImage
      , pInstOsParams
      , pInstOsParamsPrivate
      , pInstOsParamsSecret
@@ -628,6 +656,7 @@ $(genOpCode "OpCode"
      , pMoveTargetNode
      , pMoveTargetNodeUuid
      , pMoveCompress
+     , pTransferStreams
      , pIgnoreConsistency
      ],
      "instance_name")
@@ -1018,6 +1047,10 @@ opSummaryVal OpNodeSetParams { opNodeName = s } = Just (fromNonEmpty s)
 opSummaryVal OpNodePowercycle { opNodeName = s } = Just (fromNonEmpty s)
 opSummaryVal OpNodeMigrate { opNodeName = s } = Just (fromNonEmpty s)
 opSummaryVal OpNodeEvacuate { opNodeName = s } = Just (fromNonEmpty s)
+opSummaryVal OpNodeStartupInstances { opNodeName = s } =
+  Just (fromNonEmpty s)
+opSummaryVal OpNodeShutdownInstances { opNodeName = s } =
+  Just (fromNonEmpty s)
 opSummaryVal OpInstanceCreate { opInstanceName = s } = Just s
 opSummaryVal OpInstanceReinstall { opInstanceName = s } = Just s
 opSummaryVal OpInstanceRemove { opInstanceName = s } = Just s
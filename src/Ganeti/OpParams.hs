@@ -97,8 +97,11 @@ module Ganeti.OpParams
   , pMoveTargetNode
   , pMoveTargetNodeUuid
   , pMoveCompress
+  , pTransferStreams
   , pBackupCompress
   , pStartupPaused
+  , pInstanceOrderTags
+  , pInstanceConcurrency
   , pVerbose
   , pDebug
   , pDebugSimulateErrors
@@ -193,6 +196,7 @@ module Ganeti.OpParams
   , pIgnoreSoftErrors
   , pInstCreateMode
   , pNoInstall
+  , pCloneImage
   , pInstOs
   , pPrimaryNode
   , pPrimaryNodeUuid
@@ -1208,6 +1212,12 @@ pNoInstall =
   withDoc "Do not install the OS (will disable automatic start)" .
   optionalField $ booleanField "no_install"
 
+pCloneImage :: Field
+pCloneImage =
+  withDoc "Create the disks as copy-on-write clones of a golden copy of the\
+          \ OS image, if the storage supports it" $
+  defaultFalse "clone_image"
+
 pInstOs :: Field
 pInstOs =
   withDoc "OS type for instance installation" $
@@ -1406,6 +1416,20 @@ pStartupPaused =
   withDoc "Pause instance at startup" $
   defaultFalse "startup_paused"
 
+pInstanceOrderTags :: Field
+pInstanceOrderTags =
+  withDoc "Instance tags defining the order in which instances are\
+          \ started; instances with the first tag are started first and\
+          \ untagged instances last, shutdown uses the reverse order" .
+  defaultField [| [] |] $
+  simpleField "order_tags" [t| [NonEmptyString] |]
+
+pInstanceConcurrency :: Field
+pInstanceConcurrency =
+  withDoc "Maximum number of instances to start or stop at the same time" .
+  defaultField [| forceNonNeg C.nodeInstanceConcurrency |] $
+  simpleField "concurrency" [t| NonNegative Int |]
+
 pIgnoreSecondaries :: Field
 pIgnoreSecondaries =
   withDoc "Whether to start the instance even if secondary disks are failing" $
@@ -1461,6 +1485,13 @@ pMoveCompress =
   defaultField [| C.iecNone |] $
   simpleField "compress" [t| String |]
 
+pTransferStreams :: Field
+pTransferStreams =
+  withDoc "Number of parallel streams to use for each disk during\
+          \ instance moves" .
+  defaultField [| forceNonNeg C.ieDefaultTransferStreams |] $
+  simpleField "transfer_streams" [t| NonNegative Int |]
+
 pBackupCompress :: Field
 pBackupCompress =
   withDoc "Compression mode to use for moves during backups/imports" .
@@ -54,7 +54,7 @@ import qualified Data.Set as Set (toList)
 import Data.Bits (finiteBitSize)
 import Data.IORef
 import Data.List (intersperse)
-import Data.Maybe (fromMaybe)
+import Data.Maybe (fromMaybe, catMaybes)
 import qualified Text.JSON as J
 import Text.JSON (encode, showJSON, JSValue(..))
 import System.Info (arch)
@@ -88,7 +88,7 @@ import Ganeti.Query.Filter (makeSimpleFilter)
 import Ganeti.THH.HsRPC (runRpcClient, RpcClientMonad)
 import Ganeti.Types
 import qualified Ganeti.UDSServer as U (Handler(..), listener)
-import Ganeti.Utils ( lockFile, exitIfBad, watchFile
+import Ganeti.Utils ( lockFile, exitIfBad, watchFile, watchFilesBy
                     , safeRenameFile, newUUID, isUUID )
 import Ganeti.Utils.Monad (orM)
 import Ganeti.Utils.MVarLock
@@ -445,6 +445,9 @@ handleCall qlock qstat cfg (SubmitManyJobs lops) =
 handleCall _ _ cfg (WaitForJobChange jid fields prev_job prev_log tmout) =
   waitForJobChange jid prev_job tmout $ computeJobUpdate cfg jid fields prev_log
 
+handleCall _ _ cfg (WaitForJobsChange jobs fields tmout) =
+  waitForJobsChange jobs tmout $ \jid -> computeJobUpdate cfg jid fields
+
 handleCall _ _ cfg (SetWatcherPause time) = do
   let mcs = Config.getMasterOrCandidates cfg
   _ <- executeRpcCall mcs $ RpcCallSetWatcherPause time
@@ -574,6 +577,34 @@ waitForJobChange jid prev_job tmout compute_fn = do
       return . Ok $ showJSON answer
     _ -> liftM (Ok . showJSON) compute_fn
 
+-- | Wait until at least one of the given jobs changes, and return the
+-- updates of all jobs which did as a list of (job id, (fields, logs))
+-- pairs. Jobs which can't be found are reported with a null update. An
+-- empty list is returned if nothing changed within the timeout.
+waitForJobsChange :: [(JobId, JSValue, JSValue)] -> Int
+                     -> (JobId -> JSValue -> IO (JSValue, JSValue))
+                     -> IO (ErrorResult JSValue)
+waitForJobsChange jobs tmout compute_fn = do
+  qDir <- queueDir
+  loaded <- mapM (\(jid, _, _) -> loadJobFromDisk qDir False jid) jobs
+  let annotated = zip jobs loaded
+      lost = [ (jid, JSNull) | ((jid, _, _), Bad _) <- annotated ]
+      present = [ job | (job, Ok _) <- annotated ]
+      running = [ liveJobFile qDir jid
+                | ((jid, _, _), Ok (job, _)) <- annotated
+                , not (jobFinalized job) ]
+      update (jid, prev_job, prev_log) = do
+        (info, logs) <- compute_fn jid prev_log
+        return $ if info /= prev_job || logs /= JSArray []
+                   then Just (jid, showJSON (info, logs))
+                   else Nothing
+      compute_all = liftM ((lost ++) . catMaybes) $ mapM update present
+  answer <- if null running
+              then compute_all
+              else watchFilesBy running (min tmout C.luxiWfjcTimeout)
+                     (not . null) compute_all
+  return . Ok . showJSON $ map (\(jid, upd) -> (fromJobId jid, upd)) answer
+
 -- | Query the status of a job and return the requested fields
 -- and the logs newer than the given log number.
 computeJobUpdate :: ConfigData -> JobId -> [String] -> JSValue
@@ -633,6 +664,10 @@ luxiExec (qlock, qstat, creader) args =
       | fields == ["status"] -> do
         result <- handleWaitForJobChangeStatus jid prev_job prev_log tmout
         return (True, result)
+    WaitForJobsChange jobs fields tmout
+      | fields == ["status"] -> do
+        result <- waitForJobsChange jobs tmout computeJobUpdateStatus
+        return (True, result)
     _ -> do
      cfg <- creader
      result <- handleCallWrapper qlock qstat cfg args
@@ -84,6 +84,7 @@ module Ganeti.Utils
   , needsReload
   , watchFile
   , watchFileBy
+  , watchFilesBy
   , safeRenameFile
   , FilePermissions(..)
   , ensurePermissions
@@ -662,27 +663,32 @@ watchFileEx endtime base ref check read_fn = do
 -- the given file changes on disk. If the file does not exist on disk, return
 -- immediately.
 watchFileBy :: FilePath -> Int -> (a -> Bool) -> IO a -> IO a
-watchFileBy fpath timeout check read_fn = do
+watchFileBy fpath = watchFilesBy [fpath]
+
+-- | Like 'watchFileBy', but for a method whose output may change whenever
+-- any of the given files changes on disk.
+watchFilesBy :: [FilePath] -> Int -> (a -> Bool) -> IO a -> IO a
+watchFilesBy fpaths timeout check read_fn = do
   current <- getCurrentTimeUSec
   let endtime = current + fromIntegral timeout * 1000000
-  fstat <- getFStatSafe fpath
-  ref <- newIORef fstat
+  fstats <- mapM getFStatSafe fpaths
+  ref <- newIORef fstats
   bracket initINotify killINotify $ \inotify -> do
-    let do_watch e = do
+    let watch fpath = addWatch inotify [Modify, Delete] (toInotifyPath fpath)
+                        (do_watch fpath)
+        do_watch fpath e = do
                        logDebug $ "Notified of change in " ++ fpath
                                     ++ "; event: " ++ show e
-                       when (e == Ignored)
-                         (addWatch inotify [Modify, Delete]
-                           (toInotifyPath fpath) do_watch >> return ())
-                       fstat' <- getFStatSafe fpath
-                       writeIORef ref fstat'
-    _ <- addWatch inotify [Modify, Delete] (toInotifyPath fpath) do_watch
+                       when (e == Ignored) (void $ watch fpath)
+                       fstats' <- mapM getFStatSafe fpaths
+                       writeIORef ref fstats'
+    mapM_ watch fpaths
     newval <- read_fn
     if check newval
       then do
-        logDebug $ "File " ++ fpath ++ " changed during setup of inotify"
+        logDebug $ "Files " ++ show fpaths ++ " changed during setup of inotify"
         return newval
-      else watchFileEx endtime fstat ref check read_fn
+      else watchFileEx endtime fstats ref check read_fn
 
 -- | Within the given timeout (in seconds), wait for for the output
 -- of the given method to change and return the new value; make use of
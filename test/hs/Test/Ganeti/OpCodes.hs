@@ -322,6 +322,14 @@ instance Arbitrary OpCodes.OpCode where
         OpCodes.OpNodeEvacuate <$> arbitrary <*> genNodeNameNE <*>
           return Nothing <*> genMaybe genNodeNameNE <*> return Nothing <*>
           genMaybe genNameNE <*> arbitrary <*> arbitrary
+      "OP_NODE_STARTUP_INSTANCES" ->
+        OpCodes.OpNodeStartupInstances <$> genNodeNameNE <*>
+          return Nothing <*> genListSet Nothing <*> arbitrary <*>
+          arbitrary <*> arbitrary <*> genListSet Nothing <*> arbitrary
+      "OP_NODE_SHUTDOWN_INSTANCES" ->
+        OpCodes.OpNodeShutdownInstances <$> genNodeNameNE <*>
+          return Nothing <*> genListSet Nothing <*> arbitrary <*>
+          arbitrary <*> genListSet Nothing <*> arbitrary
       "OP_INSTANCE_CREATE" ->
         OpCodes.OpInstanceCreate
           <$> genFQDN                         -- instance_name
@@ -345,6 +353,7 @@ instance Arbitrary OpCodes.OpCode where
           <*> arbitrary                       -- mode
           <*> arbitrary                       -- nics
           <*> arbitrary                       -- no_install
+          <*> arbitrary                       -- clone_image
           <*> pure emptyJSObject              -- osparams
           <*> genMaybe arbitraryPrivateJSObj  -- osparams_private
           <*> genMaybe arbitrarySecretJSObj  -- osparams_secret
@@ -401,7 +410,7 @@ instance Arbitrary OpCodes.OpCode where
       "OP_INSTANCE_MOVE" ->
         OpCodes.OpInstanceMove <$> genFQDN <*> return Nothing <*>
           arbitrary <*> arbitrary <*> genNodeNameNE <*> return Nothing <*>
-          genPrintableAsciiString <*> arbitrary
+          genPrintableAsciiString <*> arbitrary <*> arbitrary
       "OP_INSTANCE_CONSOLE" -> OpCodes.OpInstanceConsole <$> genFQDN <*>
           return Nothing
       "OP_INSTANCE_ACTIVATE_DISKS" ->
@@ -0,0 +1,128 @@
+#!/usr/bin/python3
+#
+
+# Copyright (C) 2026 the Ganeti project
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""Script for measuring the import time of the command line clients
+
+The time is taken from the output of C{python -X importtime}, which is
+available from Python 3.7 on. With a budget, the script fails if importing
+any client takes longer.
+
+"""
+
+import optparse
+import os
+import subprocess
+import sys
+
+
+CLIENTS = [
+  "gnt_backup",
+  "gnt_cluster",
+  "gnt_debug",
+  "gnt_filter",
+  "gnt_group",
+  "gnt_instance",
+  "gnt_job",
+  "gnt_network",
+  "gnt_node",
+  "gnt_os",
+  "gnt_storage",
+  ]
+
+
+def ParseOptions():
+  """Parses the command line options.
+
+  In case of command line errors, it will show the usage and exit the
+  program.
+
+  @return: the options in a tuple
+
+  """
+  parser = optparse.OptionParser(usage="%prog [options] [client...]")
+  parser.add_option("-r", dest="repeat", type="int", default=5,
+                    help="Number of imports per client, the fastest one is"
+                    " reported", metavar="NUM")
+  parser.add_option("-b", dest="budget", type="float", default=None,
+                    help="Maximum import time per client", metavar="MSECS")
+
+  (opts, args) = parser.parse_args()
+
+  if opts.repeat < 1:
+    parser.error("Number of imports must be positive")
+
+  for client in args:
+    if client not in CLIENTS:
+      parser.error("Unknown client '%s'" % client)
+
+  return (opts, args)
+
+
+def _MeasureImport(module):
+  """Imports a module in a new interpreter, returns the time in seconds.
+
+  """
+  env = os.environ.copy()
+  env["PYTHONPATH"] = os.pathsep.join(sys.path)
+  result = subprocess.run([sys.executable, "-X", "importtime", "-c",
+                           "import %s" % module],
+                          env=env, stdout=subprocess.DEVNULL,
+                          stderr=subprocess.PIPE, check=True)
+
+  # Lines look like "import time:  self [us] | cumulative | imported package",
+  # nested modules being indented
+  for line in result.stderr.decode().splitlines():
+    fields = [field.strip() for field in line.split("|")]
+    if len(fields) == 3 and fields[2] == module:
+      return int(fields[1]) / 1e6
+
+  raise Exception("No import time reported for %s" % module)
+
+
+def main():
+  (opts, args) = ParseOptions()
+
+  exceeded = []
+
+  print("%14s %12s" % ("Client", "Time(ms)"))
+  for client in args or CLIENTS:
+    module = "ganeti.client.%s" % client
+    duration = min(_MeasureImport(module) for _ in range(opts.repeat)) * 1000
+    print("%14s %12.3f" % (client, duration))
+    if opts.budget is not None and duration > opts.budget:
+      exceeded.append(client)
+
+  if exceeded:
+    print("Over the budget of %.3f ms: %s" % (opts.budget, ", ".join(exceeded)))
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+  main()
@@ -104,15 +104,10 @@ class TestLUBackupExportBase(CmdlibTestCase):
       self.RpcResultsBuilder() \
         .CreateSuccessfulNodeResult(self.master, True)
 
-    self.rpc.call_blockdev_assemble.return_value = \
-      self.RpcResultsBuilder() \
-        .CreateSuccessfulNodeResult(self.master, ("/dev/mock_path",
-                                                  "/dev/mock_link_name",
-                                                  None))
+    self.MockBlockdevAssembleMulti(("/dev/mock_path", "/dev/mock_link_name",
+                                    None))
 
-    self.rpc.call_blockdev_shutdown.return_value = \
-      self.RpcResultsBuilder() \
-        .CreateSuccessfulNodeResult(self.master, None)
+    self.MockBlockdevShutdownMulti()
 
     self.rpc.call_blockdev_snapshot.return_value = \
       self.RpcResultsBuilder() \
@@ -490,6 +490,23 @@ class TestLUClusterSetParams(CmdlibTestCase):
       })
       self.ExecOpCodeExpectOpPrereqError(op, "Invalid value of 'rbd:access'")
 
+  def testValidDiskparamsPreallocation(self):
+    for value in constants.FILE_PREALLOC_MODES:
+      self.ResetMocks()
+      op = opcodes.OpClusterSetParams(diskparams={
+        constants.DT_FILE: {constants.FILE_PREALLOCATION: value}
+      })
+      self.ExecOpCode(op)
+      got = self.cluster.diskparams[constants.DT_FILE]
+      self.assertEqual(value, got[constants.FILE_PREALLOCATION])
+
+  def testInvalidDiskparamsPreallocation(self):
+    op = opcodes.OpClusterSetParams(diskparams={
+      constants.DT_SHARED_FILE: {constants.FILE_PREALLOCATION: "sparse"}
+    })
+    self.ExecOpCodeExpectOpPrereqError(
+      op, "Invalid value of 'sharedfile:preallocation'")
+
   def testUnsetDrbdHelperWithDrbdDisks(self):
     self.cfg.AddNewInstance(disks=[
       self.cfg.CreateDisk(dev_type=constants.DT_DRBD8, create_nodes=True)])
@@ -59,9 +59,7 @@ class TestLUInstanceMigrate(CmdlibTestCase):
         .AddSuccessfulNode(self.snode, hv_info) \
         .Build()
 
-    self.rpc.call_blockdev_find.return_value = \
-      self.RpcResultsBuilder() \
-        .CreateSuccessfulNodeResult(self.master, objects.BlockDevStatus())
+    self.MockBlockdevFindMulti(objects.BlockDevStatus())
 
     self.rpc.call_migration_info.return_value = \
       self.RpcResultsBuilder() \
@@ -125,9 +123,7 @@ class TestLUInstanceFailover(CmdlibTestCase):
         .AddSuccessfulNode(self.snode, hv_info) \
         .Build()
 
-    self.rpc.call_blockdev_find.return_value = \
-      self.RpcResultsBuilder() \
-        .CreateSuccessfulNodeResult(self.master, objects.BlockDevStatus())
+    self.MockBlockdevFindMulti(objects.BlockDevStatus())
 
     self.rpc.call_instance_shutdown.return_value = \
       self.RpcResultsBuilder() \
@@ -193,6 +193,60 @@ class TestCheckComputeDisksInfo(unittest.TestCase):
       self.disks, constants.DT_EXT, self.default_vg, self.ext_params)
 
 
+class TestCheckDiskConsistencyInner(unittest.TestCase):
+  """Tests for instance_storage._CheckDiskConsistencyInner()
+
+  """
+  def setUp(self):
+    children = [
+      objects.Disk(dev_type=constants.DT_PLAIN, size=1024,
+                   logical_id=("ganeti", "data"), children=[]),
+      objects.Disk(dev_type=constants.DT_PLAIN, size=128,
+                   logical_id=("ganeti", "meta"), children=[]),
+      ]
+    self.disk = objects.Disk(dev_type=constants.DT_DRBD8, size=1024,
+                             children=children)
+    self.lu = mock.Mock()
+    self.instance = mock.Mock()
+
+  def _SetStatuses(self, statuses):
+    result = mock.Mock(fail_msg=None, payload=[(True, s) for s in statuses])
+    self.lu.rpc.call_blockdev_find_multi.return_value = result
+
+  def _Check(self, ldisk=False):
+    return instance_storage._CheckDiskConsistencyInner(
+      self.lu, self.instance, self.disk, "node1", True, ldisk=ldisk)
+
+  def testConsistent(self):
+    self._SetStatuses([objects.BlockDevStatus(is_degraded=False)] * 3)
+    self.assertTrue(self._Check())
+    # The whole device tree is looked up by a single call
+    self.lu.rpc.call_blockdev_find_multi.assert_called_once_with(
+      "node1", [([self.disk] + self.disk.children, self.instance)])
+
+  def testDegradedChild(self):
+    self._SetStatuses([objects.BlockDevStatus(is_degraded=False),
+                       objects.BlockDevStatus(is_degraded=True),
+                       objects.BlockDevStatus(is_degraded=False)])
+    self.assertFalse(self._Check())
+
+  def testLdisk(self):
+    self._SetStatuses([
+      objects.BlockDevStatus(is_degraded=True,
+                             ldisk_status=constants.LDS_OKAY),
+      objects.BlockDevStatus(is_degraded=False),
+      objects.BlockDevStatus(is_degraded=False),
+      ])
+    self.assertTrue(self._Check(ldisk=True))
+    self.assertFalse(self._Check())
+
+  def testMissing(self):
+    self._SetStatuses([objects.BlockDevStatus(is_degraded=False), None,
+                       objects.BlockDevStatus(is_degraded=False)])
+    self.assertFalse(self._Check())
+    self.assertTrue(self.lu.LogWarning.called)
+
+
 class TestLUInstanceReplaceDisks(CmdlibTestCase):
   """Tests for LUInstanceReplaceDisks."""
 
@@ -1793,9 +1793,7 @@ class TestLUInstanceMove(CmdlibTestCase):
 
     self.node = self.cfg.AddNewNode()
 
-    self.rpc.call_blockdev_assemble.return_value = \
-      self.RpcResultsBuilder() \
-        .CreateSuccessfulNodeResult(self.node, ("/dev/mocked_path",
+    self.MockBlockdevAssembleMulti(("/dev/mocked_path",
                                     "/var/run/ganeti/instance-disks/mocked_d",
                                     None))
     self.rpc.call_blockdev_remove.return_value = \
@@ -1938,12 +1936,8 @@ class TestLUInstanceRename(CmdlibTestCase):
       op, "Instance .* is already in the cluster")
 
   def testFileInstance(self):
-    self.rpc.call_blockdev_assemble.return_value = \
-      self.RpcResultsBuilder() \
-        .CreateSuccessfulNodeResult(self.master, (None, None, None))
-    self.rpc.call_blockdev_shutdown.return_value = \
-      self.RpcResultsBuilder() \
-        .CreateSuccessfulNodeResult(self.master, (None, None))
+    self.MockBlockdevAssembleMulti((None, None, None))
+    self.MockBlockdevShutdownMulti()
 
     inst = self.cfg.AddNewInstance(disk_template=constants.DT_FILE)
     op = self.CopyOpCode(self.op,
@@ -2151,9 +2145,7 @@ class TestLUInstanceSetParams(CmdlibTestCase):
       lambda node, _: self.RpcResultsBuilder() \
                         .CreateSuccessfulNodeResult(node, [])
 
-    self.rpc.call_blockdev_shutdown.side_effect = \
-      lambda node, _: self.RpcResultsBuilder() \
-                        .CreateSuccessfulNodeResult(node, [])
+    self.MockBlockdevShutdownMulti()
 
   def testNoChanges(self):
     op = self.CopyOpCode(self.op)
@@ -2554,7 +2546,7 @@ class TestLUInstanceSetParams(CmdlibTestCase):
                                  }]],
                          wait_for_sync=False)
     self.ExecOpCode(op)
-    self.assertFalse(self.rpc.call_blockdev_shutdown.called)
+    self.assertFalse(self.rpc.call_blockdev_shutdown_multi.called)
 
   def testAddDiskDownInstance(self):
     op = self.CopyOpCode(self.op,
@@ -2563,7 +2555,7 @@ class TestLUInstanceSetParams(CmdlibTestCase):
                                    constants.IDISK_SIZE: 1024
                                  }]])
     self.ExecOpCode(op)
-    self.assertTrue(self.rpc.call_blockdev_shutdown.called)
+    self.assertTrue(self.rpc.call_blockdev_shutdown_multi.called)
 
   def testAddDiskIndexBased(self):
     SPECIFIC_SIZE = 435 * 4
@@ -2624,7 +2616,7 @@ class TestLUInstanceSetParams(CmdlibTestCase):
                                  }]])
     self.ExecOpCode(op)
 
-    self.assertFalse(self.rpc.call_blockdev_shutdown.called)
+    self.assertFalse(self.rpc.call_blockdev_shutdown_multi.called)
 
   def testAddDiskNoneName(self):
     op = self.CopyOpCode(self.op,
@@ -2711,12 +2703,9 @@ class TestLUInstanceSetParams(CmdlibTestCase):
   def testAttachDiskRunningInstance(self):
     self.cfg.AddOrphanDisk(name=self.mocked_disk_name,
                            primary_node=self.master.uuid)
-    self.rpc.call_blockdev_assemble.return_value = \
-      self.RpcResultsBuilder() \
-        .CreateSuccessfulNodeResult(self.master,
-                                    ("/dev/mocked_path",
-                                     "/var/run/ganeti/instance-disks/mocked_d",
-                                     None))
+    self.MockBlockdevAssembleMulti(("/dev/mocked_path",
+                                    "/var/run/ganeti/instance-disks/mocked_d",
+                                    None))
     op = self.CopyOpCode(self.running_op,
                          disks=[[constants.DDM_ATTACH, -1,
                                  {
@@ -2724,18 +2713,15 @@ class TestLUInstanceSetParams(CmdlibTestCase):
                                  }]],
                          )
     self.ExecOpCode(op)
-    self.assertTrue(self.rpc.call_blockdev_assemble.called)
-    self.assertFalse(self.rpc.call_blockdev_shutdown.called)
+    self.assertTrue(self.rpc.call_blockdev_assemble_multi.called)
+    self.assertFalse(self.rpc.call_blockdev_shutdown_multi.called)
 
   def testAttachDiskRunningInstanceNoWaitForSync(self):
     self.cfg.AddOrphanDisk(name=self.mocked_disk_name,
                            primary_node=self.master.uuid)
-    self.rpc.call_blockdev_assemble.return_value = \
-      self.RpcResultsBuilder() \
-        .CreateSuccessfulNodeResult(self.master,
-                                    ("/dev/mocked_path",
-                                     "/var/run/ganeti/instance-disks/mocked_d",
-                                     None))
+    self.MockBlockdevAssembleMulti(("/dev/mocked_path",
+                                    "/var/run/ganeti/instance-disks/mocked_d",
+                                    None))
     op = self.CopyOpCode(self.running_op,
                          disks=[[constants.DDM_ATTACH, -1,
                                  {
@@ -2743,8 +2729,8 @@ class TestLUInstanceSetParams(CmdlibTestCase):
                                  }]],
                          wait_for_sync=False)
     self.ExecOpCode(op)
-    self.assertTrue(self.rpc.call_blockdev_assemble.called)
-    self.assertFalse(self.rpc.call_blockdev_shutdown.called)
+    self.assertTrue(self.rpc.call_blockdev_assemble_multi.called)
+    self.assertFalse(self.rpc.call_blockdev_shutdown_multi.called)
 
   def testAttachDiskDownInstance(self):
     self.cfg.AddOrphanDisk(name=self.mocked_disk_name,
@@ -2756,8 +2742,8 @@ class TestLUInstanceSetParams(CmdlibTestCase):
                                  }]])
     self.ExecOpCode(op)
 
-    self.assertTrue(self.rpc.call_blockdev_assemble.called)
-    self.assertTrue(self.rpc.call_blockdev_shutdown.called)
+    self.assertTrue(self.rpc.call_blockdev_assemble_multi.called)
+    self.assertTrue(self.rpc.call_blockdev_shutdown_multi.called)
 
   def testAttachDiskDownInstanceNoWaitForSync(self):
     self.cfg.AddOrphanDisk(name=self.mocked_disk_name)
@@ -2774,12 +2760,9 @@ class TestLUInstanceSetParams(CmdlibTestCase):
   def testHotAttachDisk(self):
     self.cfg.AddOrphanDisk(name=self.mocked_disk_name,
                            primary_node=self.master.uuid)
-    self.rpc.call_blockdev_assemble.return_value = \
-      self.RpcResultsBuilder() \
-        .CreateSuccessfulNodeResult(self.master,
-                                    ("/dev/mocked_path",
-                                     "/var/run/ganeti/instance-disks/mocked_d",
-                                     None))
+    self.MockBlockdevAssembleMulti(("/dev/mocked_path",
+                                    "/var/run/ganeti/instance-disks/mocked_d",
+                                    None))
     op = self.CopyOpCode(self.op,
                          disks=[[constants.DDM_ATTACH, -1,
                                  {
@@ -2791,7 +2774,7 @@ class TestLUInstanceSetParams(CmdlibTestCase):
         .CreateSuccessfulNodeResult(self.master)
     self.ExecOpCode(op)
     self.assertTrue(self.rpc.call_hotplug_supported.called)
-    self.assertTrue(self.rpc.call_blockdev_assemble.called)
+    self.assertTrue(self.rpc.call_blockdev_assemble_multi.called)
     self.assertTrue(self.rpc.call_hotplug_device.called)
 
   def testHotRemoveDisk(self):
@@ -2808,7 +2791,7 @@ class TestLUInstanceSetParams(CmdlibTestCase):
     self.ExecOpCode(op)
     self.assertTrue(self.rpc.call_hotplug_supported.called)
     self.assertTrue(self.rpc.call_hotplug_device.called)
-    self.assertTrue(self.rpc.call_blockdev_shutdown.called)
+    self.assertTrue(self.rpc.call_blockdev_shutdown_multi.called)
     self.assertTrue(self.rpc.call_blockdev_remove.called)
 
   def testHotDetachDisk(self):
@@ -2825,7 +2808,7 @@ class TestLUInstanceSetParams(CmdlibTestCase):
     self.ExecOpCode(op)
     self.assertTrue(self.rpc.call_hotplug_supported.called)
     self.assertTrue(self.rpc.call_hotplug_device.called)
-    self.assertTrue(self.rpc.call_blockdev_shutdown.called)
+    self.assertTrue(self.rpc.call_blockdev_shutdown_multi.called)
 
   def testDetachAttachFileBasedDisk(self):
     """Detach and re-attach a disk from a file-based instance."""
@@ -3085,7 +3068,7 @@ class TestLUInstanceSetParams(CmdlibTestCase):
                                 })]
     self.ExecOpCodeExpectOpPrereqError(
       op, "can't remove volume from a running instance without using hotplug")
-    self.assertFalse(self.rpc.call_blockdev_shutdown.called)
+    self.assertFalse(self.rpc.call_blockdev_shutdown_multi.called)
     self.assertFalse(self.rpc.call_blockdev_remove.called)
 
   def testModifyDiskWithSize(self):
@@ -3189,9 +3172,7 @@ class TestLUInstanceSetParams(CmdlibTestCase):
           " of the instance")
 
   def testConvertPlainToDRBD(self):
-    self.rpc.call_blockdev_shutdown.return_value = \
-      self.RpcResultsBuilder() \
-        .CreateSuccessfulNodeResult(self.master, True)
+    self.MockBlockdevShutdownMulti()
     self.rpc.call_blockdev_getmirrorstatus.return_value = \
       self.RpcResultsBuilder() \
         .CreateSuccessfulNodeResult(self.master, [objects.BlockDevStatus()])
@@ -3209,9 +3190,7 @@ class TestLUInstanceSetParams(CmdlibTestCase):
                                secondary_node=self.snode)
     self.cfg.AddInstanceDisk(self.inst.uuid, disk)
     self.inst.disk_template = constants.DT_DRBD8
-    self.rpc.call_blockdev_shutdown.return_value = \
-      self.RpcResultsBuilder() \
-        .CreateSuccessfulNodeResult(self.master, True)
+    self.MockBlockdevShutdownMulti()
     self.rpc.call_blockdev_remove.return_value = \
       self.RpcResultsBuilder() \
         .CreateSuccessfulNodeResult(self.master)
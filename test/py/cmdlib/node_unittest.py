@@ -32,6 +32,7 @@
 
 """
 
+import unittest
 from collections import defaultdict
 from unittest import mock
 
@@ -39,6 +40,7 @@ from ganeti import compat
 from ganeti import constants
 from ganeti import objects
 from ganeti import opcodes
+from ganeti.cmdlib import instance_operation
 from ganeti.cmdlib import node
 
 from testsupport import *
@@ -328,5 +330,273 @@ class TestLUNodeSetParams(CmdlibTestCase):
         ('node/blue_bunny', 'exclusive')])
 
 
+
+class TestOrderInstancesByTags(unittest.TestCase):
+  def _Inst(self, name, tags):
+    return objects.Instance(name=name, tags=set(tags))
+
+  def test(self):
+    instances = [
+      self._Inst("web2", ["app"]),
+      self._Inst("misc", []),
+      self._Inst("db", ["db", "app"]),
+      self._Inst("web1", ["app"]),
+      ]
+    stages = instance_operation._OrderInstancesByTags(instances,
+                                                      ["db", "app"])
+    self.assertEqual([[inst.name for inst in stage] for stage in stages],
+                     [["db"], ["web1", "web2"], ["misc"]])
+
+  def testNoTags(self):
+    instances = [self._Inst("b", ["app"]), self._Inst("a", [])]
+    stages = instance_operation._OrderInstancesByTags(instances, [])
+    self.assertEqual([[inst.name for inst in stage] for stage in stages],
+                     [["a", "b"]])
+
+  def testEmptyStages(self):
+    stages = instance_operation._OrderInstancesByTags(
+      [self._Inst("a", ["app"])], ["db", "app"])
+    self.assertEqual([[inst.name for inst in stage] for stage in stages],
+                     [["a"]])
+
+
+class _TestNodeInstancesBase(CmdlibTestCase):
+  def setUp(self):
+    super(_TestNodeInstancesBase, self).setUp()
+
+    self.node = self.cfg.AddNewNode()
+    self.calls = []
+
+    self.rpc.call_all_instances_info.side_effect = \
+      lambda nodes, _, __: self.RpcResultsBuilder() \
+        .AddSuccessfulNode(self.node, self.running) \
+        .Build()
+    self.running = {}
+
+    self.rpc.call_node_info.return_value = \
+      self.RpcResultsBuilder() \
+        .AddSuccessfulNode(self.node,
+                           (NotImplemented, NotImplemented,
+                            ({"memory_free": 10000}, ))) \
+        .Build()
+    self.rpc.call_bridges_exist.return_value = \
+      self.RpcResultsBuilder() \
+        .CreateSuccessfulNodeResult(self.node, True)
+
+    self.MockBlockdevAssembleMulti(("/dev/mocked_path",
+                                    "/dev/mocked_link_name",
+                                    None))
+    self.MockBlockdevShutdownMulti()
+
+  def _AddInstance(self, name, tags=(), admin_state=constants.ADMINST_UP):
+    inst = self.cfg.AddNewInstance(name=name, primary_node=self.node,
+                                   admin_state=admin_state)
+    for tag in tags:
+      inst.AddTag(tag)
+    return inst
+
+  def _RecordCall(self, fail=()):
+    def _Call(node_uuid, inst, *_):
+      if isinstance(inst, tuple):
+        inst = inst[0]
+      self.calls.append(inst.name)
+      if inst.name in fail:
+        return self.RpcResultsBuilder().CreateFailedNodeResult(node_uuid)
+      return self.RpcResultsBuilder().CreateSuccessfulNodeResult(node_uuid)
+    return _Call
+
+  def _RecordHooks(self, fail=()):
+    """Records the hooks run and fails the pre-hooks of some instances.
+
+    """
+    self.hooks = []
+    def _Call(node_uuids, hpath, phase, env):
+      name = env["GANETI_INSTANCE_NAME"]
+      self.hooks.append((hpath, phase, name))
+      self.assertEqual(set(node_uuids), set([self.master.uuid,
+                                             self.node.uuid]))
+      self.assertEqual(env["GANETI_OBJECT_TYPE"], constants.HTYPE_INSTANCE)
+      if phase == constants.HOOKS_PHASE_PRE and name in fail:
+        payload = [("check", constants.HKR_FAIL, "denied")]
+      else:
+        payload = []
+      return self.RpcResultsBuilder() \
+        .AddSuccessfulNode(self.master, payload) \
+        .Build()
+    self.rpc.call_hooks_runner.side_effect = _Call
+
+
+class TestLUNodeStartupInstances(_TestNodeInstancesBase):
+  def setUp(self):
+    super(TestLUNodeStartupInstances, self).setUp()
+
+    self.rpc.call_instance_start.side_effect = self._RecordCall()
+
+  def testStartMarkedUp(self):
+    self._AddInstance("up1.example.com")
+    self._AddInstance("up2.example.com")
+    self._AddInstance("down.example.com", admin_state=constants.ADMINST_DOWN)
+
+    op = opcodes.OpNodeStartupInstances(node_name=self.node.name)
+    result = self.ExecOpCode(op)
+
+    self.assertEqual(sorted(result), [
+      ("up1.example.com", True, ""),
+      ("up2.example.com", True, ""),
+      ])
+    self.assertEqual(sorted(self.calls),
+                     ["up1.example.com", "up2.example.com"])
+    # The disks of both instances are assembled by one call per pass
+    self.assertEqual(self.rpc.call_blockdev_assemble_multi.call_count, 2)
+
+  def testOrderTags(self):
+    self._AddInstance("web.example.com", tags=["app"])
+    self._AddInstance("other.example.com")
+    self._AddInstance("db.example.com", tags=["db"])
+
+    op = opcodes.OpNodeStartupInstances(node_name=self.node.name,
+                                        order_tags=["db", "app"],
+                                        concurrency=1)
+    self.ExecOpCode(op)
+
+    self.assertEqual(self.calls, ["db.example.com", "web.example.com",
+                                  "other.example.com"])
+
+  def testSelectedInstances(self):
+    inst = self._AddInstance("down.example.com",
+                             admin_state=constants.ADMINST_DOWN)
+    self._AddInstance("up.example.com")
+
+    op = opcodes.OpNodeStartupInstances(node_name=self.node.name,
+                                        instances=[inst.name])
+    self.ExecOpCode(op)
+
+    self.assertEqual(self.calls, [inst.name])
+    self.assertEqual(inst.admin_state, constants.ADMINST_UP)
+
+  def testAlreadyRunning(self):
+    inst = self._AddInstance("up.example.com")
+    self.running = {inst.name: {"state": "running"}}
+
+    op = opcodes.OpNodeStartupInstances(node_name=self.node.name)
+    result = self.ExecOpCode(op)
+
+    self.assertEqual(result, [(inst.name, True, "")])
+    self.assertEqual(self.calls, [])
+
+  def testStartFailure(self):
+    self._AddInstance("ok.example.com")
+    bad = self._AddInstance("bad.example.com")
+    self.rpc.call_instance_start.side_effect = \
+      self._RecordCall(fail=[bad.name])
+
+    op = opcodes.OpNodeStartupInstances(node_name=self.node.name)
+    result = dict((name, success) for (name, success, _) in
+                  self.ExecOpCode(op))
+
+    self.assertEqual(result, {
+      "ok.example.com": True,
+      "bad.example.com": False,
+      })
+    self.assertTrue(self.rpc.call_blockdev_shutdown_multi.called)
+
+  def testHooks(self):
+    self._AddInstance("ok.example.com")
+    bad = self._AddInstance("bad.example.com")
+    self._RecordHooks(fail=[bad.name])
+
+    op = opcodes.OpNodeStartupInstances(node_name=self.node.name)
+    result = dict((name, success) for (name, success, _) in
+                  self.ExecOpCode(op))
+
+    self.assertEqual(result, {
+      "ok.example.com": True,
+      "bad.example.com": False,
+      })
+    self.assertEqual(self.calls, ["ok.example.com"])
+    self.assertEqual(sorted(self.hooks), [
+      ("instance-start", constants.HOOKS_PHASE_POST, "ok.example.com"),
+      ("instance-start", constants.HOOKS_PHASE_PRE, "bad.example.com"),
+      ("instance-start", constants.HOOKS_PHASE_PRE, "ok.example.com"),
+      ])
+
+  def testNotPrimaryInstance(self):
+    inst = self.cfg.AddNewInstance()
+
+    op = opcodes.OpNodeStartupInstances(node_name=self.node.name,
+                                        instances=[inst.name])
+    self.ExecOpCodeExpectOpPrereqError(op, "is not a primary instance")
+
+  def testInvalidConcurrency(self):
+    op = opcodes.OpNodeStartupInstances(node_name=self.node.name,
+                                        concurrency=0)
+    self.ExecOpCodeExpectOpPrereqError(op, "concurrency must be between")
+
+
+class TestLUNodeShutdownInstances(_TestNodeInstancesBase):
+  def setUp(self):
+    super(TestLUNodeShutdownInstances, self).setUp()
+
+    self.rpc.call_instance_shutdown.side_effect = self._RecordCall()
+
+  def testStopReverseOrder(self):
+    db = self._AddInstance("db.example.com", tags=["db"])
+    self._AddInstance("web.example.com", tags=["app"])
+    self._AddInstance("other.example.com")
+
+    op = opcodes.OpNodeShutdownInstances(node_name=self.node.name,
+                                         order_tags=["db", "app"],
+                                         concurrency=1)
+    result = self.ExecOpCode(op)
+
+    self.assertEqual(self.calls, ["other.example.com", "web.example.com",
+                                  "db.example.com"])
+    self.assertTrue(compat.all(success for (_, success, _) in result))
+    self.assertEqual(db.admin_state, constants.ADMINST_DOWN)
+
+  def testNoRemember(self):
+    inst = self._AddInstance("up.example.com")
+
+    op = opcodes.OpNodeShutdownInstances(node_name=self.node.name,
+                                         no_remember=True)
+    self.ExecOpCode(op)
+
+    self.assertEqual(self.calls, [inst.name])
+    self.assertEqual(inst.admin_state, constants.ADMINST_UP)
+
+  def testShutdownFailure(self):
+    inst = self._AddInstance("up.example.com")
+    self.rpc.call_instance_shutdown.side_effect = \
+      self._RecordCall(fail=[inst.name])
+
+    op = opcodes.OpNodeShutdownInstances(node_name=self.node.name)
+    result = self.ExecOpCode(op)
+
+    self.assertEqual([(name, success) for (name, success, _) in result],
+                     [(inst.name, False)])
+    self.assertFalse(self.rpc.call_blockdev_shutdown_multi.called)
+
+  def testHooks(self):
+    self._AddInstance("ok.example.com")
+    bad = self._AddInstance("bad.example.com")
+    self._RecordHooks(fail=[bad.name])
+
+    op = opcodes.OpNodeShutdownInstances(node_name=self.node.name)
+    result = dict((name, success) for (name, success, _) in
+                  self.ExecOpCode(op))
+
+    self.assertEqual(result, {
+      "ok.example.com": True,
+      "bad.example.com": False,
+      })
+    self.assertEqual(self.calls, ["ok.example.com"])
+    # The instance whose hooks failed is neither stopped nor marked down
+    self.assertEqual(bad.admin_state, constants.ADMINST_UP)
+    self.assertEqual(sorted(self.hooks), [
+      ("instance-stop", constants.HOOKS_PHASE_POST, "ok.example.com"),
+      ("instance-stop", constants.HOOKS_PHASE_PRE, "bad.example.com"),
+      ("instance-stop", constants.HOOKS_PHASE_PRE, "ok.example.com"),
+      ])
+
 if __name__ == "__main__":
   testutils.GanetiTestProgram()
@@ -244,6 +244,36 @@ class CmdlibTestCase(testutils.GanetiTestCase):
     """
     return RpcResultsBuilder(cfg=self.cfg, use_node_names=use_node_names)
 
+  def MockBlockdevAssembleMulti(self, payload):
+    """Lets C{blockdev_assemble_multi} succeed for all disks.
+
+    @param payload: the result for each disk
+
+    """
+    self.rpc.call_blockdev_assemble_multi.side_effect = \
+      lambda node, disks, _: self.RpcResultsBuilder() \
+        .CreateSuccessfulNodeResult(node, [(True, payload)] * len(disks))
+
+  def MockBlockdevFindMulti(self, payload):
+    """Lets C{blockdev_find_multi} succeed for all disks.
+
+    @param payload: the status returned for each disk
+
+    """
+    self.rpc.call_blockdev_find_multi.side_effect = \
+      lambda node, disks: self.RpcResultsBuilder() \
+        .CreateSuccessfulNodeResult(node, [(True, payload)] *
+                                    sum(len(d) for (d, _) in disks))
+
+  def MockBlockdevShutdownMulti(self):
+    """Lets C{blockdev_shutdown_multi} succeed for all disks.
+
+    """
+    self.rpc.call_blockdev_shutdown_multi.side_effect = \
+      lambda node, disks: self.RpcResultsBuilder() \
+        .CreateSuccessfulNodeResult(node, [(True, None)] *
+                                    sum(len(d) for (d, _) in disks))
+
   def ExecOpCode(self, opcode):
     """Executes the given opcode.
 
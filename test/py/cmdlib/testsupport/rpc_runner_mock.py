@@ -39,11 +39,27 @@ from ganeti.rpc import node as rpc
 from cmdlib.testsupport.util import patchModule
 
 
+class _PreparedCallsMock(object):
+  """Prepares calls to a mocked L{rpc.RpcRunner}.
+
+  The calls are made on the mock when they are sent, see
+  L{rpc.RpcRunner.PrepareCalls}.
+
+  """
+  def __init__(self, runner):
+    self._runner = runner
+
+  def __getattr__(self, name):
+    fn = getattr(self._runner, name)
+    return lambda *args, **kwargs: lambda: fn(*args, **kwargs)
+
+
 def CreateRpcRunnerMock():
   """Creates a new L{mock.MagicMock} tailored for L{rpc.RpcRunner}
 
   """
   ret = mock.MagicMock(spec=rpc.RpcRunner)
+  ret.PrepareCalls.side_effect = lambda: _PreparedCallsMock(ret)
   return ret
 
 
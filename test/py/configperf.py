@@ -0,0 +1,309 @@
+#!/usr/bin/python3
+#
+
+# Copyright (C) 2026 the Ganeti project
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+
+"""Script for measuring configuration lookups on large clusters"""
+
+import optparse
+import time
+
+from ganeti import config
+from ganeti import constants
+from ganeti import objects
+
+from testutils import config_mock
+
+
+def ParseOptions():
+  """Parses the command line options.
+
+  In case of command line errors, it will show the usage and exit the
+  program.
+
+  @return: the options in a tuple
+
+  """
+  parser = optparse.OptionParser()
+  parser.add_option("-i", dest="instance_counts", default="1000,5000,20000",
+                    help="Comma-separated list of instance counts",
+                    metavar="LIST")
+  parser.add_option("-d", dest="instances_per_node", type="int", default=25,
+                    help="Number of primary instances per node", metavar="NUM")
+  parser.add_option("-s", dest="samples", type="int", default=20,
+                    help="Number of lookups per measurement", metavar="NUM")
+  parser.add_option("-a", dest="allocations", type="int", default=500,
+                    help="Number of instances created by one multi-allocation"
+                    " job", metavar="NUM")
+  parser.add_option("-c", dest="codec_instances", type="int", default=10000,
+                    help="Number of instances in the configuration converted"
+                    " to and from dicts", metavar="NUM")
+
+  (opts, args) = parser.parse_args()
+
+  try:
+    opts.instance_counts = [int(i) for i in opts.instance_counts.split(",")]
+  except ValueError:
+    parser.error("Invalid list of instance counts")
+
+  if (opts.instances_per_node < 1 or opts.samples < 1 or
+      opts.allocations < 1 or opts.codec_instances < 1):
+    parser.error("Number of instances per node, samples, allocations and"
+                 " instances to convert must be positive")
+
+  return (opts, args)
+
+
+def _CreateConfig(instance_count, instances_per_node):
+  """Creates a configuration with DRBD instances spread over all nodes.
+
+  """
+  node_count = max(2, instance_count // instances_per_node)
+  group = objects.NodeGroup(uuid="group-uuid", name="default", members=[])
+  nodes = {}
+  for i in range(node_count):
+    uuid = "node%s-uuid" % i
+    nodes[uuid] = objects.Node(uuid=uuid, name="node%s.example.com" % i,
+                               group=group.uuid)
+    group.members.append(uuid)
+
+  instances = {}
+  disks = {}
+  for i in range(instance_count):
+    pnode = "node%s-uuid" % (i % node_count)
+    snode = "node%s-uuid" % ((i + 1) % node_count)
+    nic = objects.NIC(uuid="nic%s-uuid" % i,
+                      mac="aa:00:%02x:%02x:%02x" % (i >> 16, (i >> 8) & 0xff,
+                                                    i & 0xff))
+    inst = objects.Instance(uuid="inst%s-uuid" % i,
+                            name="inst%s.example.com" % i,
+                            primary_node=pnode, disks=[], nics=[nic])
+    for j in range(2):
+      children = [objects.Disk(dev_type=constants.DT_PLAIN, size=1024,
+                               logical_id=("xenvg", "inst%s-%s-%s" % (i, j, k)))
+                  for k in ("data", "meta")]
+      disk = objects.Disk(uuid="disk%s-%s-uuid" % (i, j),
+                          name="disk%s-%s" % (i, j),
+                          dev_type=constants.DT_DRBD8, size=1024,
+                          logical_id=(pnode, snode, 11000, j, j,
+                                      "secret%s-%s" % (i, j)),
+                          children=children)
+      disks[disk.uuid] = disk
+      inst.disks.append(disk.uuid)
+    instances[inst.uuid] = inst
+
+  return objects.ConfigData(nodes=nodes, nodegroups={group.uuid: group},
+                            instances=instances, disks=disks)
+
+
+def _ScanNodeInstances(data, node_uuid):
+  """Computes the instances of a node by scanning the configuration.
+
+  This is how L{config.ConfigWriter.GetNodeInstances} worked before the
+  configuration indexes.
+
+  """
+  pri = []
+  sec = []
+  for inst in data.instances.values():
+    if inst.primary_node == node_uuid:
+      pri.append(inst.uuid)
+    all_nodes = set()
+    for disk_uuid in inst.disks:
+      all_nodes.update(data.disks[disk_uuid].all_nodes)
+    all_nodes.discard(inst.primary_node)
+    if node_uuid in all_nodes:
+      sec.append(inst.uuid)
+  return (pri, sec)
+
+
+def _ScanInstanceByName(data, name):
+  for inst in data.instances.values():
+    if inst.name == name:
+      return inst
+  return None
+
+
+def _AllocateInstances(cfg, node_uuids, names, rescan):
+  """Does the reservations and additions of a multi-allocation job.
+
+  Each instance gets a NIC and two DRBD disks, with their UUIDs, LV names, MAC
+  address and DRBD secrets generated like L{cmdlib.instance} does.
+
+  @param rescan: whether to drop the configuration indexes before every
+      reservation, which costs as much as the scans done without them
+
+  """
+  ec_id = "multi-alloc-job"
+
+  def _Call(fn, *args):
+    if rescan:
+      cfg._Indexes().Reset() # pylint: disable=W0212
+    return fn(*args)
+
+  for (i, name) in enumerate(names):
+    pnode = node_uuids[i % len(node_uuids)]
+    snode = node_uuids[(i + 1) % len(node_uuids)]
+    nic = objects.NIC(uuid=_Call(cfg.GenerateUniqueID, ec_id),
+                      mac=_Call(cfg.GenerateMAC, None, ec_id))
+    inst = objects.Instance(uuid=_Call(cfg.GenerateUniqueID, ec_id),
+                            name=name, primary_node=pnode, disks=[],
+                            nics=[nic])
+    disks = []
+    for idx in range(2):
+      children = [objects.Disk(dev_type=constants.DT_PLAIN, size=1024,
+                               logical_id=("xenvg",
+                                           _Call(cfg.GenerateUniqueID, ec_id)))
+                  for _ in range(2)]
+      logical_id = (pnode, snode, 11000, idx, idx,
+                    _Call(cfg.GenerateDRBDSecret, ec_id))
+      disks.append(objects.Disk(uuid=_Call(cfg.GenerateUniqueID, ec_id),
+                                dev_type=constants.DT_DRBD8, size=1024,
+                                logical_id=logical_id, children=children))
+    cfg.AddInstance(inst, ec_id)
+    for disk in disks:
+      cfg.AddInstanceDisk(inst.uuid, disk)
+
+
+def _MeasureAllocations(count, opts):
+  """Measures the reservations of a multi-allocation job.
+
+  @return: the average time per instance when rescanning and when using the
+      indexes, and the duration of the whole job
+
+  """
+  cfg = config_mock.ConfigMock()
+  with cfg.GetConfigManager():
+    data = cfg._ConfigData() # pylint: disable=W0212
+    synthetic = _CreateConfig(count, opts.instances_per_node)
+    for name in ("nodes", "nodegroups", "instances", "disks"):
+      getattr(data, name).update(getattr(synthetic, name))
+    cfg._Indexes().Reset() # pylint: disable=W0212
+
+    node_uuids = list(synthetic.nodes)
+    # Rescanning is slow enough on large configurations to only be sampled
+    start = time.time()
+    _AllocateInstances(cfg, node_uuids,
+                       ["rescan%s.example.com" % i
+                        for i in range(opts.samples)], True)
+    rescan = (time.time() - start) / opts.samples
+
+    start = time.time()
+    _AllocateInstances(cfg, node_uuids,
+                       ["new%s.example.com" % i
+                        for i in range(opts.allocations)], False)
+    job = time.time() - start
+
+  return (rescan, job / opts.allocations, job)
+
+
+def _MeasureCodecs(count, opts):
+  """Measures the conversion of a whole configuration to and from dicts.
+
+  @return: the duration of L{objects.ConfigData.ToDict},
+      L{objects.ConfigData.FromDict} and L{objects.ConfigData.Copy}
+
+  """
+  data = _CreateConfig(count, opts.instances_per_node)
+  data.cluster = objects.Cluster(cluster_name="cluster.example.com")
+  dict_data = data.ToDict()
+  return [min(_Measure(fn, [()]) for _ in range(opts.samples))
+          for fn in [data.ToDict,
+                     lambda: objects.ConfigData.FromDict(dict_data),
+                     data.Copy]]
+
+
+def _Measure(fn, args_list):
+  """Calls a function for each set of arguments, returns the average duration.
+
+  """
+  start = time.time()
+  for args in args_list:
+    fn(*args)
+  return (time.time() - start) / len(args_list)
+
+
+def main():
+  (opts, _) = ParseOptions()
+
+  print("%10s %16s %12s %12s %12s" %
+        ("Instances", "Lookup", "Scan(ms)", "Indexed(ms)", "Build(ms)"))
+
+  for count in opts.instance_counts:
+    data = _CreateConfig(count, opts.instances_per_node)
+    cfg = config.DetachedConfig(data)
+
+    node_uuids = [[uuid] for uuid in list(data.nodes)[:opts.samples]]
+    names = [["inst%s.example.com" % (i * count // opts.samples)]
+             for i in range(opts.samples)]
+    disk_uuids = [["disk%s-1-uuid" % (i * count // opts.samples)]
+                  for i in range(opts.samples)]
+
+    measurements = [
+      ("node-instances", node_uuids,
+       lambda node_uuid: _ScanNodeInstances(data, node_uuid),
+       cfg.GetNodeInstances),
+      ("instance-name", names,
+       lambda name: _ScanInstanceByName(data, name),
+       cfg.GetInstanceInfoByName),
+      ("disk-instance", disk_uuids,
+       lambda disk_uuid: [inst.uuid for inst in data.instances.values()
+                          if disk_uuid in inst.disks],
+       cfg.GetInstanceForDisk),
+      ]
+
+    for (name, args_list, scan_fn, indexed_fn) in measurements:
+      scan = _Measure(scan_fn, args_list)
+      cfg.OutDate()
+      cfg._SetConfigData(data) # pylint: disable=W0212
+      build = _Measure(indexed_fn, args_list[:1])
+      indexed = _Measure(indexed_fn, args_list)
+      print("%10d %16s %12.3f %12.3f %12.3f" %
+            (count, name, scan * 1000, indexed * 1000, build * 1000))
+
+  print()
+  print("%10s %10s %16s %17s %10s" %
+        ("Instances", "Job size", "Rescan(ms/inst)", "Indexed(ms/inst)",
+         "Job(s)"))
+
+  for count in opts.instance_counts:
+    (rescan, indexed, job) = _MeasureAllocations(count, opts)
+    print("%10d %10d %16.3f %17.3f %10.3f" %
+          (count, opts.allocations, rescan * 1000, indexed * 1000, job))
+
+  print()
+  print("%10s %12s %12s %12s" %
+        ("Instances", "ToDict(ms)", "FromDict(ms)", "Copy(ms)"))
+  (to_dict, from_dict, copy) = _MeasureCodecs(opts.codec_instances, opts)
+  print("%10d %12.3f %12.3f %12.3f" %
+        (opts.codec_instances, to_dict * 1000, from_dict * 1000, copy * 1000))
+
+
+if __name__ == "__main__":
+  main()
@@ -2105,5 +2105,94 @@ class TestOSEnvironment(unittest.TestCase):
     self.assertEqual("more_privacy", env["OSP_ANOTHER_PRIVATE_PARAM"])
 
 
+class TestBlockdevMulti(unittest.TestCase):
+  """Tests for the multi-disk block device functions."""
+
+  def setUp(self):
+    self.lv1 = objects.Disk(dev_type=constants.DT_PLAIN,
+                            logical_id=("xenvg", "lv1"), children=[])
+    self.lv2 = objects.Disk(dev_type=constants.DT_PLAIN,
+                            logical_id=("xenvg", "lv2"), children=[])
+    self.drbd = objects.Disk(dev_type=constants.DT_DRBD8,
+                             children=[self.lv1, self.lv2])
+    self.rbd = objects.Disk(dev_type=constants.DT_RBD, children=[])
+
+  def testGetDiskTypes(self):
+    self.assertEqual(backend._GetDiskTypes([]), set())
+    self.assertEqual(backend._GetDiskTypes([self.drbd, self.rbd]),
+                     set([constants.DT_DRBD8, constants.DT_PLAIN,
+                          constants.DT_RBD]))
+
+  @testutils.patch_object(backend.bdev, "FindDevice")
+  @testutils.patch_object(backend.bdev, "GetDeviceCaches")
+  def testFindMultiSharesCaches(self, get_caches, find_device):
+    caches = {"lvs_cache": {}, "drbd_info": object()}
+    get_caches.return_value = caches
+    status = objects.BlockDevStatus(dev_path="/dev/drbd0")
+    device = mock.Mock()
+    device.GetSyncStatus.return_value = status
+    find_device.side_effect = [mock.Mock(), mock.Mock(), device, None]
+
+    result = backend.BlockdevFindMulti([self.drbd, self.rbd])
+
+    self.assertEqual(result, [(True, status), (True, None)])
+    get_caches.assert_called_once_with(set([constants.DT_DRBD8,
+                                            constants.DT_PLAIN,
+                                            constants.DT_RBD]))
+    self.assertEqual(find_device.call_count, 4)
+    for call in find_device.call_args_list:
+      self.assertEqual(call[1], caches)
+
+  @testutils.patch_object(backend.bdev, "FindDevice")
+  @testutils.patch_object(backend.bdev, "GetDeviceCaches")
+  def testFindMultiErrors(self, get_caches, find_device):
+    get_caches.return_value = {}
+    find_device.side_effect = [errors.BlockDeviceError("broken"), None]
+
+    result = backend.BlockdevFindMulti([self.lv1, self.lv2])
+
+    self.assertEqual(len(result), 2)
+    self.assertFalse(result[0][0])
+    self.assertTrue("broken" in result[0][1])
+    self.assertEqual(result[1], (True, None))
+
+  @testutils.patch_object(backend, "DevCacheManager")
+  @testutils.patch_object(backend.bdev, "FindDevice")
+  @testutils.patch_object(backend.bdev, "GetDeviceCaches")
+  def testShutdownMulti(self, get_caches, find_device, _):
+    get_caches.return_value = {"lvs_cache": {}}
+    failing = mock.Mock()
+    failing.Shutdown.side_effect = errors.BlockDeviceError("busy")
+    find_device.side_effect = [failing, None]
+
+    result = backend.BlockdevShutdownMulti([self.lv1, self.lv2])
+
+    self.assertEqual(len(result), 2)
+    self.assertFalse(result[0][0])
+    self.assertTrue("busy" in result[0][1])
+    self.assertEqual(result[1], (True, None))
+    get_caches.assert_called_once_with(set([constants.DT_PLAIN]))
+    for call in find_device.call_args_list:
+      self.assertEqual(call[1], {"lvs_cache": {}})
+
+  @testutils.patch_object(backend, "BlockdevAssemble")
+  @testutils.patch_object(backend.bdev, "GetDeviceCaches")
+  def testAssembleMulti(self, get_caches, assemble):
+    get_caches.return_value = {"lvs_cache": {}}
+    inst = objects.Instance(name="inst1.example.com")
+    assemble.side_effect = [("/dev/xenvg/lv1", "/link", None),
+                            backend.RPCFail("can't assemble")]
+
+    result = backend.BlockdevAssembleMulti([(self.lv1, inst, 0),
+                                            (self.lv2, inst, 1)], True)
+
+    self.assertEqual(result, [(True, ("/dev/xenvg/lv1", "/link", None)),
+                              (False, "can't assemble")])
+    assemble.assert_has_calls([
+      mock.call(self.lv1, inst, True, 0, lvs_cache={}),
+      mock.call(self.lv2, inst, True, 1, lvs_cache={}),
+      ])
+
+
 if __name__ == "__main__":
   testutils.GanetiTestProgram()
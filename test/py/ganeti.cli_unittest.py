@@ -31,6 +31,9 @@
 """Script for unittesting the cli module"""
 
 import copy
+import os
+import subprocess
+import sys
 import testutils
 import time
 import unittest
@@ -42,6 +45,7 @@ from ganeti import cli
 from ganeti import errors
 from ganeti import utils
 from ganeti import objects
+from ganeti import opcodes
 from ganeti import qlang
 from ganeti.errors import OpPrereqError, ParameterError
 
@@ -688,6 +692,74 @@ class TestGenericPollJob(testutils.GanetiTestCase):
                          job_id, cbs, cbs, cancel_fn=(lambda: False)))
     cbs.CheckEmpty()
 
+
+class _FakeMultiplexClient(object):
+  def __init__(self, tc, wfjc_results, job_data):
+    self.tc = tc
+    self._wfjc_results = wfjc_results
+    self._job_data = job_data
+    self.wfjc_calls = []
+
+  def SubmitManyJobs(self, jobs):
+    return [(True, str(1000 + idx)) for idx in range(len(jobs))]
+
+  def WaitForJobsChangeOnce(self, jobs, fields,
+                            timeout=constants.DEFAULT_WFJC_TIMEOUT):
+    self.tc.assertEqual(fields, ["status"])
+    self.wfjc_calls.append(sorted(jobs))
+    return self._wfjc_results.pop(0)
+
+  def QueryJobs(self, job_ids, fields):
+    self.tc.assertEqual(fields, ["status", "opstatus", "opresult"])
+    return [self._job_data.get(job_id) for job_id in job_ids]
+
+
+class TestJobExecutorMultiplex(unittest.TestCase):
+  def _Run(self, cl):
+    feedback = []
+    jex = cli.JobExecutor(cl=cl, verbose=False, feedback_fn=feedback.append,
+                          multiplex=True)
+    for name in ["a", "b", "c"]:
+      jex.QueueJob(name, opcodes.OpTestDelay(duration=0))
+    return (jex.GetResults(), feedback)
+
+  def test(self):
+    running = ((constants.JOB_STATUS_RUNNING, ), [])
+    success = ((constants.JOB_STATUS_SUCCESS, ), [])
+    cl = _FakeMultiplexClient(self, [
+      [(1000, running), (1001, running),
+       (1002, ((constants.JOB_STATUS_RUNNING, ),
+               [(1, (1, 0), constants.ELOG_MESSAGE, "msg")]))],
+      [],
+      [(1002, success)],
+      [(1000, ((constants.JOB_STATUS_ERROR, ), [])), (1001, None)],
+      ], {
+      1000: [constants.JOB_STATUS_ERROR, [constants.OP_STATUS_ERROR],
+             ["failed"]],
+      1002: [constants.JOB_STATUS_SUCCESS, [constants.OP_STATUS_SUCCESS],
+             ["result"]],
+      })
+
+    (results, feedback) = self._Run(cl)
+
+    # results are still returned in submission order
+    self.assertEqual([success for (success, _) in results],
+                     [False, False, True])
+    self.assertEqual(results[2], (True, ["result"]))
+    self.assertEqual(feedback, [((1, 0), constants.ELOG_MESSAGE, "msg")])
+    self.assertEqual(cl.wfjc_calls, [
+      [(1000, None, None), (1001, None, None), (1002, None, None)],
+      [(1000, (constants.JOB_STATUS_RUNNING, ), None),
+       (1001, (constants.JOB_STATUS_RUNNING, ), None),
+       (1002, (constants.JOB_STATUS_RUNNING, ), 1)],
+      [(1000, (constants.JOB_STATUS_RUNNING, ), None),
+       (1001, (constants.JOB_STATUS_RUNNING, ), None),
+       (1002, (constants.JOB_STATUS_RUNNING, ), 1)],
+      [(1000, (constants.JOB_STATUS_RUNNING, ), None),
+       (1001, (constants.JOB_STATUS_RUNNING, ), None)],
+      ])
+
+
 class TestFormatLogMessage(unittest.TestCase):
   def test(self):
     self.assertEqual(cli.FormatLogMessage(constants.ELOG_MESSAGE,
@@ -1643,5 +1715,59 @@ class TestPrintIPolicyCommand(unittest.TestCase):
       self._CheckPrintIPolicyCommand(pol, False, exp)
 
 
+class TestClientImports(unittest.TestCase):
+  """Checks that the command line clients only import what they need.
+
+  The modules below are expensive to import and only used by some commands, so
+  they must not be imported when a client starts.
+
+  """
+  CLIENTS = [
+    "gnt_backup",
+    "gnt_cluster",
+    "gnt_debug",
+    "gnt_filter",
+    "gnt_group",
+    "gnt_instance",
+    "gnt_job",
+    "gnt_network",
+    "gnt_node",
+    "gnt_os",
+    "gnt_storage",
+    ]
+
+  LAZY_MODULES = frozenset([
+    "ganeti.bootstrap",
+    "ganeti.cmdlib",
+    "ganeti.config",
+    "ganeti.confd.client",
+    "ganeti.hypervisor",
+    "ganeti.opcodes",
+    "ganeti.qlang",
+    "ganeti.rpc.node",
+    "pycurl",
+    "pyparsing",
+    ])
+
+  @staticmethod
+  def _GetImportedModules(module):
+    env = os.environ.copy()
+    env["PYTHONPATH"] = os.pathsep.join(sys.path)
+    output = subprocess.check_output(
+      [sys.executable, "-c",
+       "import sys, %s; print(' '.join(sys.modules))" % module],
+      env=env)
+    return frozenset(output.decode().split())
+
+  def test(self):
+    for client in self.CLIENTS:
+      module = "ganeti.client.%s" % client
+      imported = self._GetImportedModules(module)
+      self.assertTrue(module in imported)
+      self.assertEqual(imported & self.LAZY_MODULES, frozenset(),
+                       msg="%s imports %s" %
+                           (module, ", ".join(imported & self.LAZY_MODULES)))
+
+
 if __name__ == "__main__":
   testutils.GanetiTestProgram()
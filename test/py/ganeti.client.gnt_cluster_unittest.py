@@ -35,6 +35,8 @@ import optparse
 import os
 import shutil
 import tempfile
+import threading
+import time
 from unittest import mock
 
 from ganeti import errors
@@ -472,5 +474,46 @@ class TestBuildGanetiPubKeys(testutils.GanetiTestCase):
     self.assertFalse("Pink Bunny" in self.pub_key_filename)
 
 
+class TestRunOnNodes(unittest.TestCase):
+  def setUp(self):
+    self.nodes = ["node%d" % i for i in range(10)]
+    self.reported = []
+
+  def _Report(self, node, result):
+    self.assertEqual(threading.current_thread(), threading.main_thread())
+    self.reported.append((node, result))
+
+  def testSerial(self):
+    gnt_cluster._RunOnNodes(str.upper, self.nodes, 1, self._Report)
+    self.assertEqual(self.reported, [(n, n.upper()) for n in self.nodes])
+
+  def testParallel(self):
+    lock = threading.Lock()
+    running = [0, 0]
+
+    def _Fn(node):
+      with lock:
+        running[0] += 1
+        running[1] = max(running)
+      time.sleep(0.01)
+      with lock:
+        running[0] -= 1
+      return node.upper()
+
+    gnt_cluster._RunOnNodes(_Fn, self.nodes, 3, self._Report)
+    self.assertEqual(sorted(self.reported),
+                     [(n, n.upper()) for n in sorted(self.nodes)])
+    self.assertTrue(1 < running[1] <= 3)
+
+  def testError(self):
+    def _Fn(node):
+      if node == "node5":
+        raise errors.GenericError("failed")
+      return node
+
+    self.assertRaises(errors.GenericError, gnt_cluster._RunOnNodes,
+                      _Fn, self.nodes, 4, self._Report)
+
+
 if __name__ == "__main__":
   testutils.GanetiTestProgram()
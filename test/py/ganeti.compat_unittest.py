@@ -31,6 +31,7 @@
 """Script for unittesting the compat module"""
 
 import inspect
+import sys
 import unittest
 
 from ganeti import compat
@@ -129,5 +130,18 @@ class TestUniqueFrozenset(unittest.TestCase):
                      frozenset(["Foo%s" % i for i in range(10)]))
 
 
+class TestLazyModule(unittest.TestCase):
+  def testImportOnUse(self):
+    sys.modules.pop("colorsys", None)
+    module = compat.LazyModule("colorsys")
+    self.assertFalse("colorsys" in sys.modules)
+    self.assertEqual(module.rgb_to_hsv(0.0, 0.0, 0.0), (0.0, 0.0, 0.0))
+    self.assertTrue("colorsys" in sys.modules)
+
+  def testMissing(self):
+    module = compat.LazyModule("ganeti.nonexistent_module")
+    self.assertRaises(ImportError, getattr, module, "Foo")
+
+
 if __name__ == "__main__":
   testutils.GanetiTestProgram()
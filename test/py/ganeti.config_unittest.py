@@ -657,6 +657,121 @@ class TestConfigRunner(unittest.TestCase):
     instance_disks = cfg.GetInstanceDisks("test-uuid")
     self.assertEqual(instance_disks, [disk])
 
+  def testGetInstanceForDisk(self):
+    cfg = self._get_object_mock()
+    inst, disk = self._CreateInstanceDisk(cfg)
+    self.assertEqual(cfg.GetInstanceForDisk(disk.uuid), inst.uuid)
+
+    cfg.DetachInstanceDisk(inst.uuid, disk.uuid)
+    self.assertEqual(cfg.GetInstanceForDisk(disk.uuid), None)
+
+    cfg.AttachInstanceDisk(inst.uuid, disk.uuid)
+    self.assertEqual(cfg.GetInstanceForDisk(disk.uuid), inst.uuid)
+
+  def testGetNodeInstances(self):
+    cfg = self._get_object_mock()
+    node1 = cfg.AddNewNode()
+    node2 = cfg.AddNewNode()
+    inst1 = cfg.AddNewInstance(primary_node=node1, secondary_node=node2,
+                               disk_template=constants.DT_DRBD8)
+    inst2 = cfg.AddNewInstance(primary_node=node2)
+    inst3 = cfg.AddNewInstance(primary_node=node1)
+
+    self.assertEqual(cfg.GetNodeInstances(node1.uuid),
+                     ([inst1.uuid, inst3.uuid], []))
+    self.assertEqual(cfg.GetNodeInstances(node2.uuid),
+                     ([inst2.uuid], [inst1.uuid]))
+    self.assertEqual(cfg.GetNodeGroupInstances(node1.group),
+                     frozenset([inst1.uuid, inst2.uuid, inst3.uuid]))
+
+    cfg.SetInstancePrimaryNode(inst3.uuid, node2.uuid)
+    self.assertEqual(cfg.GetNodeInstances(node1.uuid), ([inst1.uuid], []))
+    self.assertEqual(cfg.GetNodeInstances(node2.uuid),
+                     ([inst2.uuid, inst3.uuid], [inst1.uuid]))
+
+    cfg.RemoveInstance(inst1.uuid)
+    self.assertEqual(cfg.GetNodeInstances(node1.uuid), ([], []))
+    self.assertEqual(cfg.GetNodeInstances(node2.uuid),
+                     ([inst2.uuid, inst3.uuid], []))
+
+  def testUniqueValues(self):
+    cfg = self._get_object_mock()
+    node = cfg.AddNewNode()
+    inst = cfg.AddNewInstance(secondary_node=node,
+                              disk_template=constants.DT_DRBD8)
+    mac = inst.nics[0].mac
+    lv_name = "/".join(cfg.GetInstanceDisks(inst.uuid)[0]
+                       .children[0].logical_id)
+    group = objects.NodeGroup(name="group2", uuid=inst.uuid, members=[])
+
+    self.assertRaises(errors.ReservationError, cfg.ReserveMAC, mac, "job")
+    self.assertRaises(errors.ReservationError, cfg.ReserveLV, lv_name, "job")
+    self.assertRaises(errors.ConfigurationError, cfg.AddNodeGroup, group,
+                      "job")
+
+    cfg.RemoveInstance(inst.uuid)
+    cfg.ReserveMAC(mac, "job")
+    cfg.ReserveLV(lv_name, "job")
+    cfg.AddNodeGroup(group, "job")
+    self.assertNotEqual(cfg.GenerateUniqueID("job"), group.uuid)
+
+  def testRenameInstance(self):
+    cfg = self._get_object_mock()
+    inst = cfg.AddNewInstance(name="old.example.com")
+    self.assertEqual(cfg.GetInstanceInfoByName("old.example.com").uuid,
+                     inst.uuid)
+
+    cfg.RenameInstance(inst.uuid, "new.example.com")
+    self.assertEqual(cfg.GetInstanceInfoByName("old.example.com"), None)
+    self.assertEqual(cfg.GetInstanceInfoByName("new.example.com").uuid,
+                     inst.uuid)
+
+  def testIncrementalVerify(self):
+    cfg = self._get_object_mock()
+    inst1 = cfg.AddNewInstance()
+    inst2 = cfg.AddNewInstance()
+    old_mac = inst2.nics[0].mac
+    self.assertFalse(_IsErrorInList("duplicate",
+                                    cfg.VerifyConfig(incremental=True)))
+
+    inst2.nics[0].mac = inst1.nics[0].mac
+    cfg.Update(inst2, None)
+    self.assertTrue(_IsErrorInList("duplicate",
+                                   cfg.VerifyConfig(incremental=True)))
+
+    inst2.nics[0].mac = old_mac
+    cfg.Update(inst2, None)
+    self.assertFalse(_IsErrorInList("duplicate",
+                                    cfg.VerifyConfig(incremental=True)))
+
+    # changes not recorded through Update are only seen by a full verify
+    inst2.nics[0].mac = inst1.nics[0].mac
+    self.assertFalse(_IsErrorInList("duplicate",
+                                    cfg.VerifyConfig(incremental=True)))
+    self.assertTrue(_IsErrorInList("duplicate", cfg.VerifyConfig()))
+
+    cfg.RemoveInstance(inst1.uuid)
+    self.assertFalse(_IsErrorInList("duplicate",
+                                    cfg.VerifyConfig(incremental=True)))
+
+  def testIncrementalVerifyRename(self):
+    cfg = self._get_object_mock()
+    inst = cfg.AddNewInstance(name="old.example.com")
+    # Both NICs having the same MAC address, the instance itself is reported
+    inst.nics.append(inst.nics[0].Copy())
+    cfg.Update(inst, None)
+    self.assertTrue(_IsErrorInList("old.example.com",
+                                   cfg.VerifyConfig(incremental=True)))
+
+    serial_no = cfg.GetInstanceInfo(inst.uuid).serial_no
+    cfg.RenameInstance(inst.uuid, "new.example.com")
+    self.assertEqual(cfg.GetInstanceInfo(inst.uuid).serial_no, serial_no + 1)
+
+    result = cfg.VerifyConfig(incremental=True)
+    self.assertTrue(_IsErrorInList("new.example.com", result))
+    self.assertFalse(_IsErrorInList("old.example.com", result))
+
+
 def _IsErrorInList(err_str, err_list):
   return any((err_str in e) for e in err_list)
 
@@ -46,6 +46,7 @@ from ganeti import cmdlib
 from ganeti.rpc import node as rpc
 from ganeti import compat
 from ganeti import pathutils
+from ganeti import utils
 from ganeti.constants import HKR_SUCCESS, HKR_FAIL, HKR_SKIP
 
 from mocks import FakeConfig, FakeProc, FakeContext
@@ -78,7 +79,8 @@ class TestHooksRunner(unittest.TestCase):
       os.mkdir(dname)
       self.torm.append((dname, True))
       self.ph_dirs[i] = dname
-    self.hr = backend.HooksRunner(hooks_base_dir=self.tmpdir)
+    self.hr = backend.HooksRunner(hooks_base_dir=self.tmpdir,
+                                  max_parallel=1)
 
   def tearDown(self):
     self.torm.reverse()
@@ -91,10 +93,28 @@ class TestHooksRunner(unittest.TestCase):
   def _rname(self, fname):
     return "/".join(fname.split("/")[-2:])
 
+  def _RunHooks(self, phase, env, hr=None):
+    """Runs the hooks and returns the results without the run times.
+
+    """
+    if hr is None:
+      hr = self.hr
+    env = env.copy()
+    env[constants.HOOKS_RESULT_DURATION_ENV] = "1"
+    results = []
+    for (script, hkr, output, duration) in hr.RunHooks(self.hpath, phase,
+                                                       env):
+      if hkr == HKR_SKIP:
+        self.assertTrue(duration is None)
+      else:
+        self.assertTrue(duration >= 0)
+      results.append((script, hkr, output))
+    return results
+
   def testEmpty(self):
     """Test no hooks"""
     for phase in (constants.HOOKS_PHASE_PRE, constants.HOOKS_PHASE_POST):
-      self.assertEqual(self.hr.RunHooks(self.hpath, phase, {}), [])
+      self.assertEqual(self._RunHooks(phase, {}), [])
 
   def testSkipNonExec(self):
     """Test skip non-exec file"""
@@ -103,7 +123,7 @@ class TestHooksRunner(unittest.TestCase):
       f = open(fname, "w")
       f.close()
       self.torm.append((fname, False))
-      self.assertEqual(self.hr.RunHooks(self.hpath, phase, {}),
+      self.assertEqual(self._RunHooks(phase, {}),
                            [(self._rname(fname), HKR_SKIP, "")])
 
   def testSkipInvalidName(self):
@@ -115,7 +135,7 @@ class TestHooksRunner(unittest.TestCase):
       f.close()
       os.chmod(fname, 0o700)
       self.torm.append((fname, False))
-      self.assertEqual(self.hr.RunHooks(self.hpath, phase, {}),
+      self.assertEqual(self._RunHooks(phase, {}),
                            [(self._rname(fname), HKR_SKIP, "")])
 
   def testSkipDir(self):
@@ -124,7 +144,7 @@ class TestHooksRunner(unittest.TestCase):
       fname = "%s/testdir" % self.ph_dirs[phase]
       os.mkdir(fname)
       self.torm.append((fname, True))
-      self.assertEqual(self.hr.RunHooks(self.hpath, phase, {}),
+      self.assertEqual(self._RunHooks(phase, {}),
                            [(self._rname(fname), HKR_SKIP, "")])
 
   def testSuccess(self):
@@ -136,7 +156,7 @@ class TestHooksRunner(unittest.TestCase):
       f.close()
       self.torm.append((fname, False))
       os.chmod(fname, 0o700)
-      self.assertEqual(self.hr.RunHooks(self.hpath, phase, {}),
+      self.assertEqual(self._RunHooks(phase, {}),
                            [(self._rname(fname), HKR_SUCCESS, "")])
 
   def testSymlink(self):
@@ -145,7 +165,7 @@ class TestHooksRunner(unittest.TestCase):
       fname = "%s/success" % self.ph_dirs[phase]
       os.symlink("/bin/true", fname)
       self.torm.append((fname, False))
-      self.assertEqual(self.hr.RunHooks(self.hpath, phase, {}),
+      self.assertEqual(self._RunHooks(phase, {}),
                            [(self._rname(fname), HKR_SUCCESS, "")])
 
   def testFail(self):
@@ -157,7 +177,7 @@ class TestHooksRunner(unittest.TestCase):
       f.close()
       self.torm.append((fname, False))
       os.chmod(fname, 0o700)
-      self.assertEqual(self.hr.RunHooks(self.hpath, phase, {}),
+      self.assertEqual(self._RunHooks(phase, {}),
                            [(self._rname(fname), HKR_FAIL, "")])
 
   def testCombined(self):
@@ -175,7 +195,7 @@ class TestHooksRunner(unittest.TestCase):
         self.torm.append((fname, False))
         os.chmod(fname, 0o700)
         expect.append((self._rname(fname), rs, ""))
-      self.assertEqual(self.hr.RunHooks(self.hpath, phase, {}), expect)
+      self.assertEqual(self._RunHooks(phase, {}), expect)
 
   def testOrdering(self):
     for phase in (constants.HOOKS_PHASE_PRE, constants.HOOKS_PHASE_POST):
@@ -191,7 +211,34 @@ class TestHooksRunner(unittest.TestCase):
         self.torm.append((fname, False))
         expect.append((self._rname(fname), HKR_SUCCESS, ""))
       expect.sort()
-      self.assertEqual(self.hr.RunHooks(self.hpath, phase, {}), expect)
+      self.assertEqual(self._RunHooks(phase, {}), expect)
+
+  def testParallel(self):
+    """Test that running hooks in parallel keeps their order"""
+    hr = backend.HooksRunner(hooks_base_dir=self.tmpdir, max_parallel=3)
+    for phase in (constants.HOOKS_PHASE_PRE, constants.HOOKS_PHASE_POST):
+      expect = []
+      for (fbase, delay, ecode, rs) in [("00slow", 0.3, 0, HKR_SUCCESS),
+                                        ("10fail", 0.1, 1, HKR_FAIL),
+                                        ("20fast", 0, 0, HKR_SUCCESS),
+                                        ("30inv.", 0, 0, HKR_SKIP),
+                                        ]:
+        fname = "%s/%s" % (self.ph_dirs[phase], fbase)
+        utils.WriteFile(fname, mode=0o700,
+                        data="#!/bin/sh\nsleep %s\nexit %d\n" %
+                        (delay, ecode))
+        self.torm.append((fname, False))
+        expect.append((self._rname(fname), rs, ""))
+      self.assertEqual(self._RunHooks(phase, {}, hr=hr), expect)
+
+  def testWithoutDuration(self):
+    """Test the results for masters not asking for the run times"""
+    for phase in (constants.HOOKS_PHASE_PRE, constants.HOOKS_PHASE_POST):
+      fname = "%s/success" % self.ph_dirs[phase]
+      os.symlink("/bin/true", fname)
+      self.torm.append((fname, False))
+      self.assertEqual(self.hr.RunHooks(self.hpath, phase, {}),
+                       [(self._rname(fname), HKR_SUCCESS, "")])
 
   def testEnv(self):
     """Test environment execution"""
@@ -202,7 +249,7 @@ class TestHooksRunner(unittest.TestCase):
       self.torm.append((fname, False))
       env_snt = {"PHASE": phase}
       env_exp = "PHASE=%s" % phase
-      self.assertEqual(self.hr.RunHooks(self.hpath, phase, env_snt),
+      self.assertEqual(self._RunHooks(phase, env_snt),
                            [(self._rname(fname), HKR_SUCCESS, env_exp)])
 
 
@@ -285,6 +332,31 @@ class TestHooksMaster(unittest.TestCase):
     for phase in (constants.HOOKS_PHASE_PRE, constants.HOOKS_PHASE_POST):
       hm.RunPhase(phase)
 
+  def testForLuObject(self):
+    """Test running the hooks of an object the LU operates on"""
+    calls = []
+
+    def _HooksRpc(node_list, hpath, phase, env):
+      calls.append((sorted(node_list), hpath, phase, env))
+      return FakeHooksRpcSuccess(node_list, hpath, phase, env)
+
+    hm = hooksmaster.HooksMaster.BuildForLuObject(
+           _HooksRpc, self.lu, "instance-start", constants.HTYPE_INSTANCE,
+           (["node1"], ["node1", "node2"]), lambda: {"FOO": "bar"})
+    for phase in (constants.HOOKS_PHASE_PRE, constants.HOOKS_PHASE_POST):
+      hm.RunPhase(phase)
+
+    self.assertEqual([(nodes, hpath, phase)
+                      for (nodes, hpath, phase, _) in calls], [
+      (["node1"], "instance-start", constants.HOOKS_PHASE_PRE),
+      (["node1", "node2"], "instance-start", constants.HOOKS_PHASE_POST),
+      ])
+    for (_, _, _, env) in calls:
+      self.assertEqual(env["GANETI_OBJECT_TYPE"], constants.HTYPE_INSTANCE)
+      self.assertEqual(env["GANETI_OP_CODE"], self.op.OP_ID)
+      self.assertEqual(env["GANETI_FOO"], "bar")
+    self.assertEqual(calls[1][3]["GANETI_POST_FOO"], "bar")
+
 
 class FakeEnvLU(cmdlib.LogicalUnit):
   HPATH = "env_test_lu"
@@ -324,6 +396,7 @@ class TestHooksRunnerEnv(unittest.TestCase):
     self.assertEqual(env["GANETI_OP_CODE"], self.op.OP_ID)
     self.assertEqual(env["GANETI_HOOKS_VERSION"], str(constants.HOOKS_VERSION))
     self.assertEqual(env["GANETI_DATA_DIR"], pathutils.DATA_DIR)
+    self.assertEqual(env[constants.HOOKS_RESULT_DURATION_ENV], "1")
     if "GANETI_OBJECT_TYPE" in env:
       self.assertEqual(env["GANETI_OBJECT_TYPE"], constants.HTYPE_GROUP)
     else:
@@ -406,6 +406,46 @@ class TestParameterCheck(testutils.GanetiTestCase):
 
     self.assertTrue(validation.check_disk_cache_parameters(valid_data))
 
+  def _MigrationParams(self, **kwargs):
+    params = {
+      constants.HV_MIGRATION_BANDWIDTH: 32,
+      constants.HV_MIGRATION_DOWNTIME: 30,
+      constants.HV_KVM_MIGRATION_COMPRESSION:
+        constants.HT_MIGRATION_COMPRESSION_NONE,
+      constants.HV_KVM_MIGRATION_MULTIFD_CHANNELS: 0,
+      constants.HV_KVM_MIGRATION_MAX_BANDWIDTH: 0,
+      constants.HV_KVM_MIGRATION_MAX_DOWNTIME: 0,
+      }
+    for (key, value) in kwargs.items():
+      params[getattr(constants, key)] = value
+    return params
+
+  def testInvalidMigrationParameters(self):
+    for invalid_data in [
+      self._MigrationParams(
+        HV_KVM_MIGRATION_COMPRESSION=constants.HT_MIGRATION_COMPRESSION_ZSTD),
+      self._MigrationParams(
+        HV_KVM_MIGRATION_COMPRESSION=constants.HT_MIGRATION_COMPRESSION_XBZRLE,
+        HV_KVM_MIGRATION_MULTIFD_CHANNELS=4),
+      self._MigrationParams(HV_KVM_MIGRATION_MAX_BANDWIDTH=16),
+      self._MigrationParams(HV_KVM_MIGRATION_MAX_DOWNTIME=10),
+      ]:
+      self.assertRaises(errors.HypervisorError,
+                        validation.check_migration_parameters, invalid_data)
+
+  def testValidMigrationParameters(self):
+    for valid_data in [
+      self._MigrationParams(),
+      self._MigrationParams(
+        HV_KVM_MIGRATION_COMPRESSION=constants.HT_MIGRATION_COMPRESSION_ZSTD,
+        HV_KVM_MIGRATION_MULTIFD_CHANNELS=4),
+      self._MigrationParams(
+        HV_KVM_MIGRATION_COMPRESSION=constants.HT_MIGRATION_COMPRESSION_XBZRLE),
+      self._MigrationParams(HV_KVM_MIGRATION_MAX_BANDWIDTH=1024,
+                            HV_KVM_MIGRATION_MAX_DOWNTIME=500),
+      ]:
+      self.assertTrue(validation.check_migration_parameters(valid_data))
+
 
 class TestParameterValidation(testutils.GanetiTestCase):
   def testInvalidVncParameters(self):
@@ -953,6 +993,105 @@ class TestGetRuntimeInfo(unittest.TestCase):
     self.assertTrue(devinfo.hvinfo["addr"] == "0xa")
 
 
+class TestGetMigrationCapabilities(unittest.TestCase):
+  def setUp(self):
+    self.hvparams = constants.HVC_DEFAULTS[constants.HT_KVM].copy()
+
+  def testDefault(self):
+    self.assertEqual(hv_kvm._GetMigrationCapabilities(self.hvparams), [])
+
+  def testCombined(self):
+    self.hvparams.update({
+      constants.HV_KVM_MIGRATION_CAPS: "postcopy-ram:auto-converge",
+      constants.HV_KVM_MIGRATION_MULTIFD_CHANNELS: 4,
+      constants.HV_KVM_MIGRATION_AUTO_CONVERGE: True,
+      })
+    self.assertEqual(hv_kvm._GetMigrationCapabilities(self.hvparams),
+                     ["postcopy-ram", "auto-converge", "multifd"])
+
+  def testXbzrle(self):
+    self.hvparams[constants.HV_KVM_MIGRATION_COMPRESSION] = \
+      constants.HT_MIGRATION_COMPRESSION_XBZRLE
+    self.assertEqual(hv_kvm._GetMigrationCapabilities(self.hvparams),
+                     ["xbzrle"])
+
+
+class TestAdaptMigration(unittest.TestCase):
+  _MiB = 1024 * 1024
+
+  def setUp(self):
+    self.hvparams = constants.HVC_DEFAULTS[constants.HT_KVM].copy()
+    self.hvparams.update({
+      constants.HV_KVM_MIGRATION_ADAPTIVE: True,
+      constants.HV_KVM_MIGRATION_MAX_BANDWIDTH: 1024,
+      constants.HV_KVM_MIGRATION_MAX_DOWNTIME: 300,
+      })
+    self.parameters = {
+      "max-bandwidth": 256 * self._MiB,
+      "downtime-limit": 30,
+      }
+
+  def _Query(self, dirty_rate, throughput, sync_count=5,
+             status=constants.HV_MIGRATION_ACTIVE):
+    """Builds a query-migrate result, rates are in MiB/s."""
+    return {
+      "status": status,
+      "expected-downtime": 120,
+      "ram": {
+        "transferred": 10 * self._MiB,
+        "total": 100 * self._MiB,
+        "page-size": 4096,
+        "dirty-pages-rate": dirty_rate * self._MiB // 4096,
+        "dirty-sync-count": sync_count,
+        "mbps": throughput * self._MiB * 8 / 1000000.0,
+        },
+      }
+
+  def _Adapt(self, query):
+    return hv_kvm._AdaptMigration(query, self.parameters, self.hvparams)
+
+  def testConverging(self):
+    self.assertEqual(self._Adapt(self._Query(100, 256)), None)
+
+  def testFirstPass(self):
+    self.assertEqual(self._Adapt(self._Query(300, 256, sync_count=1)), None)
+
+  def testNotActive(self):
+    query = self._Query(300, 256, status=constants.HV_MIGRATION_COMPLETED)
+    self.assertEqual(self._Adapt(query), None)
+
+  def testBandwidth(self):
+    self.assertEqual(self._Adapt(self._Query(300, 256)),
+                     (hv_kvm._MIGRATION_ADAPT_BANDWIDTH, 512 * self._MiB))
+    self.parameters["max-bandwidth"] = 768 * self._MiB
+    self.assertEqual(self._Adapt(self._Query(800, 768)),
+                     (hv_kvm._MIGRATION_ADAPT_BANDWIDTH, 1024 * self._MiB))
+
+  def testDowntime(self):
+    # The network, not the bandwidth limit, is the bottleneck
+    self.assertEqual(self._Adapt(self._Query(150, 128)),
+                     (hv_kvm._MIGRATION_ADAPT_DOWNTIME, 120))
+    self.parameters["downtime-limit"] = 200
+    self.assertEqual(self._Adapt(self._Query(150, 128)),
+                     (hv_kvm._MIGRATION_ADAPT_DOWNTIME, 300))
+
+  def testPostcopy(self):
+    self.parameters["downtime-limit"] = 300
+    self.assertEqual(self._Adapt(self._Query(150, 128)), None)
+    self.hvparams[constants.HV_KVM_MIGRATION_CAPS] = "postcopy-ram"
+    self.assertEqual(self._Adapt(self._Query(150, 128)),
+                     (hv_kvm._MIGRATION_ADAPT_POSTCOPY, None))
+
+  def testThroughput(self):
+    query = self._Query(0, 256)
+    self.assertAlmostEqual(hv_kvm._GetMigrationThroughput(query),
+                           256 * self._MiB)
+    query["status"] = constants.HV_MIGRATION_COMPLETED
+    query["total-time"] = 2000
+    self.assertEqual(hv_kvm._GetMigrationThroughput(query), 5 * self._MiB)
+    self.assertEqual(hv_kvm._GetMigrationThroughput({"status": "setup"}), None)
+
+
 class TestDictToQemuStringNotation(unittest.TestCase):
   def test(self):
     tests = [
@@ -79,12 +79,16 @@ class TestCommandBuilder(unittest.TestCase):
       constants.IEC_GZIP_FAST: "gzip -d",
       constants.IEC_GZIP_SLOW: "gzip -d",
       constants.IEC_LZOP: "lzop -d",
+      constants.IEC_PIGZ: "pigz -d",
+      constants.IEC_ZSTD: "zstd -d",
       }
     compress_export = {
       constants.IEC_GZIP: "gzip -1",
       constants.IEC_GZIP_FAST: "gzip -1",
       constants.IEC_GZIP_SLOW: "gzip",
       constants.IEC_LZOP: "lzop",
+      constants.IEC_PIGZ: "pigz -1",
+      constants.IEC_ZSTD: "zstd -T0",
       }
 
     for mode in [constants.IEM_IMPORT, constants.IEM_EXPORT]:
@@ -269,5 +273,36 @@ class TestCalcThroughput(unittest.TestCase):
     self.assertAlmostEqual(impexpd._CalcThroughput(samples), 15.818, 3)
 
 
+class TestCombineProgress(unittest.TestCase):
+  def testNoProgress(self):
+    self.assertEqual(impexpd.CombineProgress([], 100), None)
+    self.assertEqual(impexpd.CombineProgress([None, None], 100), None)
+    self.assertEqual(impexpd.CombineProgress([(None, None, None, None)], 100),
+                     None)
+
+  def testSingleStream(self):
+    self.assertEqual(impexpd.CombineProgress([(50, 10.0, 50, 5)], 100),
+                     (50, 10.0, 50.0, 5.0))
+
+  def testMultipleStreams(self):
+    progress = [
+      (100, 20.0, 50, 5),
+      None,
+      (50, 10.0, 25, 15),
+      (150, None, 75, None),
+      ]
+    (mbytes, throughput, percent, eta) = \
+      impexpd.CombineProgress(progress, 800)
+    self.assertEqual(mbytes, 300)
+    self.assertAlmostEqual(throughput, 30.0)
+    self.assertAlmostEqual(percent, 37.5)
+    self.assertAlmostEqual(eta, 500.0 / 30.0)
+
+  def testUnknownSize(self):
+    self.assertEqual(impexpd.CombineProgress([(1, 2.0, None, None),
+                                              (3, 4.0, None, None)], None),
+                     (4, 6.0, None, None))
+
+
 if __name__ == "__main__":
   testutils.GanetiTestProgram()
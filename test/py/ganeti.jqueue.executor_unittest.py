@@ -0,0 +1,467 @@
+#!/usr/bin/python3
+#
+
+# Copyright (C) 2026 the Ganeti project
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+
+"""Script for testing ganeti.jqueue.executor and ganeti.jqueue.exec"""
+
+import array
+import os
+import select
+import shutil
+import signal
+import socket
+import stat
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from ganeti import constants
+from ganeti import serializer
+from ganeti import utils
+from ganeti.jqueue import exec as jqexec
+from ganeti.jqueue import executor
+
+import testutils
+
+
+#: Seconds after which a test gives up waiting
+_TIMEOUT = 10
+
+
+def _WriteJob(job_id, debug):
+  os.write(1, b"%d %d" % (job_id, debug))
+
+
+def _FailJob(job_id, debug):
+  raise Exception("Job %s failed" % job_id)
+
+
+def _KillJob(job_id, debug):
+  os.kill(os.getpid(), signal.SIGKILL)
+
+
+def _SleepJob(job_id, debug):
+  os.write(1, b"started")
+  time.sleep(_TIMEOUT * 2)
+
+
+def _WaitForJob(job_id, debug):
+  """Starts a job and waits for a line on its standard input."""
+  os.write(1, b"started")
+  os.read(0, 1)
+
+
+def _ReadAll(fd):
+  """Reads from a file descriptor until EOF, with a timeout."""
+  data = b""
+  while True:
+    (readable, _, _) = select.select([fd], [], [], _TIMEOUT)
+    if not readable:
+      raise AssertionError("Timeout reading from file descriptor %s" % fd)
+    chunk = os.read(fd, 4096)
+    if not chunk:
+      return data
+    data += chunk
+
+
+def _WaitForExit(pid):
+  """Waits until a child process exits, with a timeout."""
+  end = time.time() + _TIMEOUT
+  while time.time() < end:
+    (result, status) = os.waitpid(pid, os.WNOHANG)
+    if result == pid:
+      return status
+    time.sleep(0.01)
+  raise AssertionError("Timeout waiting for process %s" % pid)
+
+
+class _ZygoteTestCase(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.path = utils.PathJoin(self.tmpdir, "zygote")
+    self.zygote_pid = None
+    self.fds = []
+
+  def tearDown(self):
+    if self.zygote_pid is not None:
+      try:
+        os.kill(self.zygote_pid, signal.SIGKILL)
+      except OSError:
+        pass
+      try:
+        os.waitpid(self.zygote_pid, 0)
+      except ChildProcessError:
+        pass
+    for fd in self.fds:
+      try:
+        os.close(fd)
+      except OSError:
+        pass
+    shutil.rmtree(self.tmpdir)
+
+  def _Pipe(self):
+    fds = os.pipe()
+    self.fds.extend(fds)
+    return fds
+
+  def _StartZygote(self, run_job, master_pid=None, version="v1",
+                   idle_timeout=None, peer_uid=None):
+    """Starts a zygote in a child process and waits until it listens."""
+    if master_pid is None:
+      master_pid = os.getpid()
+    zygote = executor.Zygote(self.path, version, master_pid, 0)
+    zygote._CHECK_INTERVAL = 0.1
+    if idle_timeout is not None:
+      zygote._IDLE_TIMEOUT = idle_timeout
+    if peer_uid is None:
+      peer_uid = os.getuid()
+
+    pid = os.fork()
+    if pid == 0:
+      status = 1
+      try:
+        with testutils.patch_object(executor, "RunJob", run_job), \
+             testutils.patch_object(utils, "SetupLogging"), \
+             testutils.patch_object(executor.netutils, "GetSocketCredentials",
+                                    return_value=(0, peer_uid, 0)):
+          zygote.Run()
+        status = 0
+      finally:
+        os._exit(status)
+    self.zygote_pid = pid
+
+    end = time.time() + _TIMEOUT
+    while not os.path.exists(self.path):
+      if time.time() > end:
+        raise AssertionError("Zygote didn't create its socket")
+      time.sleep(0.01)
+    # The zygote drops connections without a request
+    self._Connect().close()
+
+  def _Connect(self):
+    """Connects to the zygote, which might not be listening yet."""
+    end = time.time() + _TIMEOUT
+    while True:
+      sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+      try:
+        sock.connect(self.path)
+        return sock
+      except ConnectionRefusedError:
+        sock.close()
+        if time.time() > end:
+          raise
+        time.sleep(0.01)
+
+  def _Request(self, job_id, version="v1"):
+    """Sends a request to the zygote like L{jqexec._ExecuteInZygote} does.
+
+    @return: the connection to the zygote, a file object for reading the
+        replies and the reading ends of pipes connected to the standard output
+        and the status pipe of the job
+
+    """
+    (in_read, self.in_write) = self._Pipe()
+    (out_read, out_write) = self._Pipe()
+    (status_read, status_write) = self._Pipe()
+    sock = self._Connect()
+    request = serializer.DumpJson({
+      "job_id": job_id,
+      "debug": 1,
+      "version": version,
+      })
+    fds = array.array("i", (in_read, out_write, out_write, status_write))
+    sock.sendmsg([request + b"\n"],
+                 [(socket.SOL_SOCKET, socket.SCM_RIGHTS, fds)])
+    for fd in (in_read, out_write, status_write):
+      os.close(fd)
+    return (sock, sock.makefile("rb"), out_read, status_read)
+
+
+class TestZygote(_ZygoteTestCase):
+  def testRunJob(self):
+    self._StartZygote(_WriteJob)
+    (sock, replies, out_read, status_read) = self._Request(17)
+    try:
+      self.assertTrue(int(replies.readline()) > 0)
+      self.assertEqual(_ReadAll(out_read), b"17 1")
+      self.assertEqual(replies.readline(), b"0\n")
+      self.assertEqual(_ReadAll(status_read), b"0\n")
+    finally:
+      sock.close()
+
+  def testSocketMode(self):
+    self._StartZygote(_WriteJob)
+    self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+
+  def testSeveralJobs(self):
+    self._StartZygote(_WriteJob)
+    requests = [self._Request(job_id) for job_id in range(3)]
+    pids = set()
+    for (job_id, (sock, replies, out_read, _)) in enumerate(requests):
+      try:
+        pids.add(int(replies.readline()))
+        self.assertEqual(_ReadAll(out_read), b"%d 1" % job_id)
+        self.assertEqual(replies.readline(), b"0\n")
+      finally:
+        sock.close()
+    self.assertEqual(len(pids), 3)
+
+  def testFailedJob(self):
+    self._StartZygote(_FailJob)
+    (sock, replies, _, status_read) = self._Request(1)
+    try:
+      self.assertTrue(int(replies.readline()) > 0)
+      self.assertEqual(replies.readline(), b"1\n")
+      self.assertEqual(_ReadAll(status_read), b"1\n")
+    finally:
+      sock.close()
+
+  def testKilledJob(self):
+    self._StartZygote(_KillJob)
+    (sock, replies, _, status_read) = self._Request(1)
+    try:
+      self.assertTrue(int(replies.readline()) > 0)
+      self.assertEqual(replies.readline(),
+                       b"%d\n" % (128 + signal.SIGKILL))
+      self.assertEqual(_ReadAll(status_read), b"")
+    finally:
+      sock.close()
+
+  def testRequesterGone(self):
+    self._StartZygote(_SleepJob)
+    (sock, replies, out_read, _) = self._Request(1)
+    self.assertTrue(int(replies.readline()) > 0)
+    self.assertEqual(os.read(out_read, 4096), b"started")
+    replies.close()
+    sock.close()
+    # Only the job process holds the other end of the pipe
+    self.assertEqual(_ReadAll(out_read), b"")
+
+  def testOtherVersion(self):
+    self._StartZygote(_WriteJob)
+    (sock, replies, out_read, _) = self._Request(1, version="v2")
+    try:
+      self.assertEqual(replies.readline(), b"\n")
+      self.assertEqual(_ReadAll(out_read), b"")
+    finally:
+      sock.close()
+    status = _WaitForExit(self.zygote_pid)
+    self.zygote_pid = None
+    self.assertEqual(os.WEXITSTATUS(status), 0)
+    self.assertFalse(os.path.exists(self.path))
+
+  def testOtherUser(self):
+    self._StartZygote(_WriteJob, peer_uid=os.getuid() + 1)
+    (sock, replies, out_read, _) = self._Request(1)
+    try:
+      self.assertEqual(replies.readline(), b"")
+      self.assertEqual(_ReadAll(out_read), b"")
+    finally:
+      sock.close()
+
+  def testIdle(self):
+    self._StartZygote(_WriteJob, idle_timeout=0.5)
+    status = _WaitForExit(self.zygote_pid)
+    self.zygote_pid = None
+    self.assertEqual(os.WEXITSTATUS(status), 0)
+    self.assertFalse(os.path.exists(self.path))
+
+  def testTerminate(self):
+    self._StartZygote(_WriteJob)
+    os.kill(self.zygote_pid, signal.SIGTERM)
+    status = _WaitForExit(self.zygote_pid)
+    self.zygote_pid = None
+    self.assertEqual(os.WEXITSTATUS(status), 0)
+    self.assertFalse(os.path.exists(self.path))
+
+  def testMasterGone(self):
+    master_pid = os.fork()
+    if master_pid == 0:
+      try:
+        time.sleep(_TIMEOUT * 2)
+      finally:
+        os._exit(0)
+
+    self._StartZygote(_WriteJob, master_pid=master_pid)
+    os.kill(master_pid, signal.SIGKILL)
+    os.waitpid(master_pid, 0)
+    status = _WaitForExit(self.zygote_pid)
+    self.zygote_pid = None
+    self.assertEqual(os.WEXITSTATUS(status), 0)
+    self.assertFalse(os.path.exists(self.path))
+
+  def testRetireWithRunningJob(self):
+    self._StartZygote(_WaitForJob)
+    (sock, replies, out_read, _) = self._Request(1)
+    try:
+      self.assertTrue(int(replies.readline()) > 0)
+      self.assertEqual(os.read(out_read, 4096), b"started")
+      os.kill(self.zygote_pid, signal.SIGTERM)
+      time.sleep(0.5)
+      self.assertEqual(os.waitpid(self.zygote_pid, os.WNOHANG), (0, 0))
+      os.write(self.in_write, b"\n")
+      self.assertEqual(replies.readline(), b"0\n")
+    finally:
+      sock.close()
+    _WaitForExit(self.zygote_pid)
+    self.zygote_pid = None
+
+
+class TestExecuteInZygote(_ZygoteTestCase):
+  def _Execute(self, job_id):
+    """Runs L{jqexec._ExecuteInZygote} in a child process.
+
+    @return: the process ID of the child process and the reading end of a pipe
+        connected to the standard output of the job
+
+    """
+    (out_read, out_write) = self._Pipe()
+    (in_read, self.in_write) = self._Pipe()
+    pid = os.fork()
+    if pid == 0:
+      status = 255
+      try:
+        os.dup2(in_read, 0)
+        os.dup2(out_write, 1)
+        result = jqexec._ExecuteInZygote(job_id, 0, path=self.path)
+        if result is not None:
+          status = result
+      finally:
+        os._exit(status)
+    os.close(in_read)
+    os.close(out_write)
+    return (pid, out_read)
+
+  def testNoZygote(self):
+    self.assertEqual(jqexec._ExecuteInZygote(1, 0, path=self.path), None)
+
+  def testOtherVersion(self):
+    self._StartZygote(_WriteJob, version="v0")
+    self.assertEqual(jqexec._ExecuteInZygote(1, 0, path=self.path), None)
+    _WaitForExit(self.zygote_pid)
+    self.zygote_pid = None
+
+  def testExecute(self):
+    self._StartZygote(_WriteJob, version=jqexec._GetCodeVersion())
+    (pid, out_read) = self._Execute(23)
+    self.assertEqual(_ReadAll(out_read), b"23 0")
+    self.assertEqual(os.WEXITSTATUS(_WaitForExit(pid)), 0)
+
+  def testFailedJob(self):
+    self._StartZygote(_FailJob, version=jqexec._GetCodeVersion())
+    (pid, _) = self._Execute(23)
+    self.assertEqual(os.WEXITSTATUS(_WaitForExit(pid)), 1)
+
+  def testKilledJob(self):
+    self._StartZygote(_KillJob, version=jqexec._GetCodeVersion())
+    (pid, _) = self._Execute(23)
+    self.assertEqual(os.WEXITSTATUS(_WaitForExit(pid)),
+                     128 + signal.SIGKILL)
+
+  def testZygoteGone(self):
+    self._StartZygote(_WaitForJob, version=jqexec._GetCodeVersion())
+    (pid, out_read) = self._Execute(23)
+    self.assertEqual(os.read(out_read, 4096), b"started")
+    os.kill(self.zygote_pid, signal.SIGKILL)
+    os.waitpid(self.zygote_pid, 0)
+    self.zygote_pid = None
+    time.sleep(0.1)
+    self.assertEqual(os.waitpid(pid, os.WNOHANG), (0, 0))
+    # The exit status is passed on by the job process itself
+    os.write(self.in_write, b"\n")
+    self.assertEqual(os.WEXITSTATUS(_WaitForExit(pid)), 0)
+
+
+class TestReadStatus(unittest.TestCase):
+  def _ReadStatus(self, data):
+    (read_fd, write_fd) = os.pipe()
+    try:
+      os.write(write_fd, data)
+      os.close(write_fd)
+      write_fd = None
+      return jqexec._ReadStatus(read_fd)
+    finally:
+      os.close(read_fd)
+      if write_fd is not None:
+        os.close(write_fd)
+
+  def test(self):
+    self.assertEqual(self._ReadStatus(b"0\n"), 0)
+    self.assertEqual(self._ReadStatus(b"1\n"), 1)
+    self.assertEqual(self._ReadStatus(b""), jqexec._UNKNOWN_STATUS)
+
+
+class TestCodeVersion(unittest.TestCase):
+  def test(self):
+    version = jqexec._GetCodeVersion()
+    self.assertEqual(version, jqexec._GetCodeVersion())
+    self.assertTrue(constants.RELEASE_VERSION in version)
+    self.assertTrue(os.path.dirname(os.path.realpath(constants.__file__))
+                    in version)
+
+
+class TestMain(unittest.TestCase):
+  def _Main(self, args, zygote_status):
+    executor_mod = mock.Mock()
+    with testutils.patch_object(sys, "argv", ["exec.py"] + args), \
+         testutils.patch_object(os, "environ", {"GNT_DEBUG": "1"}), \
+         testutils.patch_object(jqexec, "_ExecuteInZygote",
+                                return_value=zygote_status), \
+         testutils.patch_object(jqexec, "_StartZygote") as start_zygote, \
+         testutils.patch_object(jqexec, "_LoadExecutor",
+                                return_value=executor_mod):
+      with self.assertRaises(SystemExit) as ctx:
+        jqexec.main()
+    return (ctx.exception.code, start_zygote, executor_mod)
+
+  def testZygote(self):
+    (code, start_zygote, executor_mod) = self._Main(["12"], 3)
+    self.assertEqual(code, 3)
+    self.assertFalse(start_zygote.called)
+    self.assertFalse(executor_mod.RunJob.called)
+
+  def testFallback(self):
+    (code, start_zygote, executor_mod) = self._Main(["12"], None)
+    self.assertEqual(code, 0)
+    start_zygote.assert_called_once_with()
+    executor_mod.RunJob.assert_called_once_with(12, 1)
+
+  def testStartZygote(self):
+    (code, _, executor_mod) = self._Main(["--zygote", "4321"], None)
+    self.assertEqual(code, 0)
+    executor_mod.Zygote.assert_called_once_with(
+      jqexec.pathutils.JOB_ZYGOTE_SOCKET, jqexec._GetCodeVersion(), 4321, 1)
+    executor_mod.Zygote.return_value.Run.assert_called_once_with()
+
+
+if __name__ == "__main__":
+  testutils.GanetiTestProgram()
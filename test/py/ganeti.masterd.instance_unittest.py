@@ -37,13 +37,14 @@ import unittest
 from ganeti import constants
 from ganeti import errors
 from ganeti import utils
+from ganeti import objects
 from ganeti import masterd
 
 from ganeti.masterd.instance import \
   ImportExportTimeouts, _DiskImportExportBase, \
   ComputeRemoteExportHandshake, CheckRemoteExportHandshake, \
   ComputeRemoteImportDiskInfo, CheckRemoteExportDiskInfo, \
-  FormatProgress
+  FormatProgress, DiskTransfer, _SplitDiskTransfer
 
 import testutils
 
@@ -166,5 +167,48 @@ class TestFormatProgress(unittest.TestCase):
                      "1.5G, 12.0 MiB/s, 30%")
 
 
+class TestSplitDiskTransfer(unittest.TestCase):
+  def _MakeTransfer(self, size, dev_type=constants.DT_PLAIN,
+                    io=constants.IEIO_RAW_DISK):
+    disk = objects.Disk(dev_type=dev_type, size=size)
+    return DiskTransfer("disk/0", io, (disk, None), io, (disk, None), None)
+
+  def testSingleStream(self):
+    transfer = self._MakeTransfer(100 * 1024)
+    self.assertEqual(_SplitDiskTransfer(transfer, 1), [])
+
+  def testSplit(self):
+    transfer = self._MakeTransfer(4 * 1024)
+    self.assertEqual(_SplitDiskTransfer(transfer, 4),
+                     [(0, 1024), (1024, 1024), (2048, 1024), (3072, 1024)])
+
+  def testUnevenSplit(self):
+    size = 10 * 1024 + 1
+    ranges = _SplitDiskTransfer(self._MakeTransfer(size), 3)
+    self.assertEqual(len(ranges), 3)
+    self.assertEqual(sum(length for (_, length) in ranges), size)
+    self.assertEqual(ranges[0][0], 0)
+    for ((offset, length), (next_offset, _)) in zip(ranges, ranges[1:]):
+      self.assertEqual(offset + length, next_offset)
+
+  def testSparse(self):
+    transfer = self._MakeTransfer(2 * 1024, io=constants.IEIO_SPARSE_DISK)
+    self.assertEqual(_SplitDiskTransfer(transfer, 2), [(0, 1024), (1024, 1024)])
+
+  def testMinimumSize(self):
+    transfer = self._MakeTransfer(constants.IE_MIN_STREAM_SIZE * 2)
+    self.assertEqual(len(_SplitDiskTransfer(transfer, 8)), 2)
+
+    transfer = self._MakeTransfer(constants.IE_MIN_STREAM_SIZE)
+    self.assertEqual(_SplitDiskTransfer(transfer, 8), [])
+
+  def testUnsupported(self):
+    transfer = self._MakeTransfer(100 * 1024, dev_type=constants.DT_RBD)
+    self.assertEqual(_SplitDiskTransfer(transfer, 4), [])
+
+    transfer = self._MakeTransfer(100 * 1024, io=constants.IEIO_SCRIPT)
+    self.assertEqual(_SplitDiskTransfer(transfer, 4), [])
+
+
 if __name__ == "__main__":
   testutils.GanetiTestProgram()
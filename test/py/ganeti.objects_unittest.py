@@ -47,6 +47,28 @@ class SimpleObject(objects.ConfigObject):
   __slots__ = ["a", "b"]
 
 
+class TestFillDict(unittest.TestCase):
+  def testFill(self):
+    defaults = {"a": 1, "b": "x", "c": None}
+    result = objects.FillDict(defaults, {"b": "y", "d": 2.0}, skip_keys=["c"])
+    self.assertEqual(result, {"a": 1, "b": "y", "d": 2.0})
+    self.assertEqual(defaults, {"a": 1, "b": "x", "c": None})
+
+  def testMutableDefaultsCopied(self):
+    defaults = {"list": [1, 2], "dict": {"a": [3]}, "num": 4}
+    result = objects.FillDict(defaults, {})
+    self.assertEqual(result, defaults)
+    result["list"].append(5)
+    result["dict"]["a"].append(6)
+    self.assertEqual(defaults, {"list": [1, 2], "dict": {"a": [3]}, "num": 4})
+
+  def testDictSubclass(self):
+    defaults = serializer.PrivateDict({"a": 1})
+    result = objects.FillDict(defaults, {"b": 2})
+    self.assertTrue(isinstance(result, serializer.PrivateDict))
+    self.assertEqual(result.Unprivate(), {"a": 1, "b": 2})
+
+
 class TestDictState(unittest.TestCase):
   """Simple dict tansformation tests"""
 
@@ -61,6 +83,21 @@ class TestDictState(unittest.TestCase):
     o2 = SimpleObject.FromDict(o1.ToDict())
     self.assertEqual(o1.ToDict(), {"a": 2, "b": 5})
 
+  def testInheritedSlots(self):
+    class _DerivedObject(SimpleObject):
+      __slots__ = ["c"]
+
+    self.assertEqual(_DerivedObject.GetAllSlots(), ["c", "a", "b"])
+    self.assertEqual(SimpleObject.GetAllSlots(), ["a", "b"])
+    o1 = _DerivedObject.FromDict({"a": 1, "c": None})
+    self.assertEqual(o1.b, None)
+    self.assertEqual(o1.ToDict(), {"a": 1})
+    self.assertEqual(_DerivedObject.FromDict({"c": 3}).ToDict(), {"c": 3})
+
+  def testFromDictUnknownSlot(self):
+    self.assertRaises(TypeError, SimpleObject.FromDict, {"a": 1, "c": 2})
+    self.assertRaises(errors.ConfigurationError, SimpleObject.FromDict, [])
+
 
 class TestClusterObject(unittest.TestCase):
   """Tests done on a L{objects.Cluster}"""
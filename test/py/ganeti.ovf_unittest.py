@@ -32,15 +32,20 @@
 
 """
 
+import io
 import optparse
 import os
 import os.path
 import re
 import shutil
 import sys
+import tarfile
 import tempfile
+import threading
 import unittest
 
+from unittest import mock
+
 try:
   import xml.etree.ElementTree as ET
 except ImportError:
@@ -377,6 +382,8 @@ EXP_OPTS_COMPRESSED = _GetArgs(EXP_ARGS_COMPRESSED)
 OPTS_VBOX = _GetArgs(ARGS_VBOX)
 OPTS_COMPLETE = _GetArgs(ARGS_COMPLETE)
 OPTS_NONIC_NODISK = _GetArgs(ARGS_BROKEN)
+OPTS_STREAM = _GetArgs(dict(ARGS_EMPTY, stream=True))
+OPTS_STREAM_EXPORT_NO_NAME = _GetArgs(dict(ARGS_EXPORT_DIR, stream=True))
 
 
 def _GetFullFilename(file_name):
@@ -434,6 +441,79 @@ class TestOVFImporter(BetterUnitTest):
     self.assertEqual(self.importer.output_dir , pathutils.EXPORT_DIR)
     self.assertTrue(self.importer.temp_dir != None)
 
+  def testOVAStreamingDirectories(self):
+    self.importer = ovf.OVFImporter(self.ova_package, OPTS_STREAM)
+    self.assertEqual(self.importer.input_dir, self.importer.temp_dir)
+    self.assertEqual(self.importer.output_dir, pathutils.EXPORT_DIR)
+    # Only the descriptor is unpacked, the disk is read when parsing
+    self.assertEqual(os.listdir(self.importer.temp_dir), ["ganeti.ovf"])
+
+  def testWrongOVAArchiveStreamingError(self):
+    self.assertRaisesRegex(errors.OpPrereqError, "not a proper tar",
+      ovf.OVFImporter, self.wrong_ova_archive, OPTS_STREAM)
+
+  def testNoOVFFileInOVAPackageStreamingError(self):
+    self.assertRaisesRegex(errors.OpPrereqError, "No .ovf file",
+      ovf.OVFImporter, self.no_ovf_in_ova, OPTS_STREAM)
+
+  def testParseStreamedOva(self):
+    self.importer = ovf.OVFImporter(self.ova_package,
+                                    OPTS_STREAM_EXPORT_NO_NAME)
+    self.importer.Parse()
+    self.assertEqual(self.importer.results_disk, GANETI_DISKS)
+    self.assertEqual(self.importer.results_name, GANETI_NAME)
+
+  def _MakeOva(self, members):
+    """Writes an .ova package from (name, data) tuples and returns its path.
+
+    """
+    tmpdir = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, tmpdir)
+    path = utils.PathJoin(tmpdir, "package.ova")
+    with tarfile.open(path, "w") as tar:
+      for (name, data) in members:
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        tar.addfile(info, io.BytesIO(data))
+    return path
+
+  def testParseStreamedOvaMissingManifestFile(self):
+    manifest = (utils.ReadBinaryFile(_GetFullFilename("ganeti.mf")) +
+                b"SHA1(missing.vmdk)= " + b"0" * 40 + b"\n")
+    ova = self._MakeOva([
+      ("ganeti.ovf", utils.ReadBinaryFile(self.ganeti_ovf)),
+      ("ganeti.mf", manifest),
+      ("new_disk.vmdk",
+       utils.ReadBinaryFile(_GetFullFilename("new_disk.vmdk"))),
+      ])
+    self.importer = ovf.OVFImporter(ova, OPTS_STREAM_EXPORT_NO_NAME)
+    self.assertRaisesRegex(errors.OpPrereqError,
+      "missing from the .ova package: missing.vmdk", self.importer.Parse)
+
+  def testParseStreamedOvaGzipDisk(self):
+    ova = self._MakeOva([
+      ("gzip_disk.ovf",
+       utils.ReadBinaryFile(_GetFullFilename("gzip_disk.ovf"))),
+      ("compr_disk.vmdk.gz",
+       utils.ReadBinaryFile(_GetFullFilename("compr_disk.vmdk.gz"))),
+      ])
+    self.importer = ovf.OVFImporter(ova, OPTS_STREAM_EXPORT_NO_NAME)
+    # Decompress in small steps
+    with testutils.patch_object(ovf, "STREAM_BUFSIZE", 512):
+      self.importer.Parse()
+    self.assertEqual(self.importer.results_disk["disk_count"], "1")
+
+  def testParseStreamedOvaTruncatedGzipDisk(self):
+    data = utils.ReadBinaryFile(_GetFullFilename("compr_disk.vmdk.gz"))
+    ova = self._MakeOva([
+      ("gzip_disk.ovf",
+       utils.ReadBinaryFile(_GetFullFilename("gzip_disk.ovf"))),
+      ("compr_disk.vmdk.gz", data[:len(data) // 2]),
+      ])
+    self.importer = ovf.OVFImporter(ova, OPTS_STREAM_EXPORT_NO_NAME)
+    self.assertRaisesRegex(errors.OpPrereqError, "truncated",
+                           self.importer.Parse)
+
   def testOVFUnpackingDirectories(self):
     self.importer = ovf.OVFImporter(self.virtualbox_ovf,
       OPTS_EMPTY)
@@ -656,6 +736,76 @@ class TestOVFExporter(BetterUnitTest):
       self.exporter.Parse)
 
 
+  def testErrorUnsupportedCompressionTool(self):
+    self.exporter = ovf.OVFExporter(self.standard_export, EXP_OPTS)
+    self.assertRaisesRegex(errors.OpPrereqError,
+      "Unsupported compression tool", self.exporter._CompressDisk,
+      _GetFullFilename("rawdisk.raw"), "bzip2", ovf.COMPRESS)
+
+  def testDiskWorkers(self):
+    self.exporter = ovf.OVFExporter(self.standard_export, EXP_OPTS)
+    self.assertEqual(self.exporter.disk_workers, ovf.DEFAULT_DISK_WORKERS)
+    self.exporter.Cleanup()
+    self.exporter = ovf.OVFExporter(self.standard_export,
+                                    _GetArgs(dict(ARGS_EXPORT_DIR,
+                                                  disk_workers=2)))
+    self.assertEqual(self.exporter.disk_workers, 2)
+
+
+class TestCompressionCommand(unittest.TestCase):
+  def testCompress(self):
+    with mock.patch("shutil.which", return_value="/usr/bin/tool"):
+      for (tool, (_, ext, args, _)) in ovf.COMPRESSION_TOOLS.items():
+        self.assertEqual(ovf._GetCompressionCommand(tool, ovf.COMPRESS),
+                         (ext, args))
+    self.assertRaises(errors.OpPrereqError, ovf._GetCompressionCommand,
+                      "gzip-ng", ovf.COMPRESS)
+
+  def testCompressToolMissing(self):
+    with mock.patch("shutil.which", return_value=None):
+      self.assertRaisesRegex(errors.OpPrereqError, "pigz not found",
+                             ovf._GetCompressionCommand, "pigz", ovf.COMPRESS)
+
+  def testDecompressPreferred(self):
+    with mock.patch("shutil.which", return_value="/usr/bin/tool"):
+      self.assertEqual(ovf._GetCompressionCommand("gzip", ovf.DECOMPRESS),
+                       (".gz", ["pigz", "-dc"]))
+      self.assertEqual(ovf._GetCompressionCommand("zstd", ovf.DECOMPRESS),
+                       (".zst", ["zstd", "-q", "-dc"]))
+
+  def testDecompressFallback(self):
+    with mock.patch("shutil.which", return_value=None):
+      self.assertEqual(ovf._GetCompressionCommand("gzip", ovf.DECOMPRESS),
+                       (".gz", ["gzip", "-dc"]))
+
+  def testDecompressUnsupported(self):
+    self.assertRaises(errors.OpPrereqError, ovf._GetCompressionCommand,
+                      "pigz", ovf.DECOMPRESS)
+
+
+class TestRunInParallel(unittest.TestCase):
+  def testOrder(self):
+    self.assertEqual(ovf._RunInParallel(lambda a, b: a * b,
+                                        [(i, 2) for i in range(10)], 3),
+                     [i * 2 for i in range(10)])
+    self.assertEqual(ovf._RunInParallel(lambda a: a, [], 3), [])
+
+  def testConcurrency(self):
+    # Only succeeds if all three calls run at the same time
+    barrier = threading.Barrier(3, timeout=10)
+    results = ovf._RunInParallel(barrier.wait, [()] * 3, 3)
+    self.assertEqual(sorted(results), [0, 1, 2])
+
+  def testError(self):
+    def _Fn(value):
+      if value % 2:
+        raise errors.OpPrereqError("Failed %s" % value)
+      return value
+    self.assertRaisesRegex(errors.OpPrereqError, "Failed 1",
+                           ovf._RunInParallel, _Fn, [(i, ) for i in range(5)],
+                           2)
+
+
 class TestOVFReader(BetterUnitTest):
   def setUp(self):
     self.wrong_xml_file = _GetFullFilename("wrong_xml.ovf")
@@ -687,6 +837,19 @@ class TestOVFReader(BetterUnitTest):
     reader = ovf.OVFReader(self.ganeti_ovf)
     self.assertEqual(reader.VerifyManifest(), None)
 
+  def testParseManifest(self):
+    content = ("SHA1(a.ovf)= D298200D9044C54B0FDE13EFAA90E564BADC5961\n"
+               "SHA256(b.vmdk)= %s\n"
+               "MD5(c.vmdk)= 0123\n" % ("ab" * 32))
+    self.assertEqual(ovf._ParseManifest(content), {
+      "a.ovf": ("SHA1", "d298200d9044c54b0fde13efaa90e564badc5961"),
+      "b.vmdk": ("SHA256", "ab" * 32),
+      })
+
+  def testFileInResourcesNotChecked(self):
+    reader = ovf.OVFReader(self.corrupted_ovf, check_files=False)
+    self.assertTrue("other_disk.vmdk" in reader.files_list)
+
   def testGetDisksNamesOVFCorruptedError(self):
     reader = ovf.OVFReader(self.no_disk_in_ref_ovf)
     self.assertRaisesRegex(errors.OpPrereqError,
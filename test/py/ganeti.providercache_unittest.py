@@ -0,0 +1,177 @@
+#!/usr/bin/python3
+#
+
+# Copyright (C) 2026 the Ganeti project
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+
+"""Script for unittesting the providercache module"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+  # pylint: disable=E0611
+  from pyinotify import pyinotify
+except ImportError:
+  import pyinotify
+
+from ganeti import providercache
+from ganeti import utils
+
+import testutils
+
+
+_IN_CREATE = pyinotify.EventsCodes.ALL_FLAGS["IN_CREATE"]
+_IN_MODIFY = pyinotify.EventsCodes.ALL_FLAGS["IN_MODIFY"]
+_IN_DELETE = pyinotify.EventsCodes.ALL_FLAGS["IN_DELETE"]
+
+
+class _FakeEvent(object):
+  def __init__(self, path, name, mask, is_dir=False):
+    self.path = path
+    self.name = name
+    self.mask = mask
+    self.dir = is_dir
+
+
+class _Loader(object):
+  def __init__(self):
+    self.calls = []
+
+  def __call__(self, name, path):
+    self.calls.append((name, path))
+    return (True, utils.ReadFile(utils.PathJoin(path, "version")))
+
+
+class _TestBase(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.loader = _Loader()
+    self.cache = providercache.ProviderCache("test", self.loader)
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+
+  def _MakeProvider(self, name, version):
+    path = utils.PathJoin(self.tmpdir, name)
+    os.mkdir(path)
+    utils.WriteFile(utils.PathJoin(path, "version"), data=version)
+    return path
+
+
+class TestProviderCache(_TestBase):
+  def testCaching(self):
+    path = self._MakeProvider("prov1", "1")
+    for _ in range(5):
+      self.assertEqual(self.cache.Get(path), (True, "1"))
+    self.assertEqual(self.loader.calls, [("prov1", path)])
+
+  def testFileChanged(self):
+    path = self._MakeProvider("prov1", "1")
+    self.assertEqual(self.cache.Get(path), (True, "1"))
+    utils.WriteFile(utils.PathJoin(path, "version"), data="22")
+    self.assertEqual(self.cache.Get(path), (True, "22"))
+    self.assertEqual(len(self.loader.calls), 2)
+
+  def testFileAdded(self):
+    path = self._MakeProvider("prov1", "1")
+    self.cache.Get(path)
+    utils.WriteFile(utils.PathJoin(path, "variants.list"), data="default\n")
+    self.cache.Get(path)
+    self.assertEqual(len(self.loader.calls), 2)
+
+  def testModeChanged(self):
+    path = self._MakeProvider("prov1", "1")
+    self.cache.Get(path)
+    os.chmod(utils.PathJoin(path, "version"), 0o755)
+    self.cache.Get(path)
+    self.assertEqual(len(self.loader.calls), 2)
+
+  def testMissingDirectory(self):
+    path = utils.PathJoin(self.tmpdir, "missing")
+    loader = lambda name, path: (False, "not found")
+    cache = providercache.ProviderCache("test", loader)
+    self.assertEqual(cache.Get(path), (False, "not found"))
+    self.assertFalse(cache._entries)
+
+  def testInvalidate(self):
+    path = self._MakeProvider("prov1", "1")
+    self.cache.Get(path)
+    self.cache.Invalidate(path)
+    self.cache.Get(path)
+    self.cache.Clear()
+    self.cache.Get(path)
+    self.assertEqual(len(self.loader.calls), 3)
+
+
+class TestEventHandler(_TestBase):
+  def setUp(self):
+    _TestBase.setUp(self)
+    self.path1 = self._MakeProvider("prov1", "1")
+    self.handler = self.cache.StartWatching([self.tmpdir,
+                                             "/nonexistent/directory"])
+
+  def testWatchedEntriesTrusted(self):
+    self.assertEqual(self.loader.calls, [("prov1", self.path1)])
+    # Changes are only picked up through inotify events
+    utils.WriteFile(utils.PathJoin(self.path1, "version"), data="22")
+    self.assertEqual(self.cache.Get(self.path1), (True, "1"))
+    self.assertEqual(len(self.loader.calls), 1)
+
+  def testProviderChanged(self):
+    utils.WriteFile(utils.PathJoin(self.path1, "version"), data="22")
+    self.handler.process_default(_FakeEvent(self.path1, "version",
+                                            _IN_MODIFY))
+    self.assertEqual(len(self.loader.calls), 2)
+    self.assertEqual(self.cache.Get(self.path1), (True, "22"))
+    self.assertEqual(len(self.loader.calls), 2)
+
+  def testProviderAdded(self):
+    path2 = self._MakeProvider("prov2", "2")
+    self.handler.process_default(_FakeEvent(self.tmpdir, "prov2",
+                                            _IN_CREATE, is_dir=True))
+    self.assertEqual(self.loader.calls[-1], ("prov2", path2))
+    self.assertEqual(self.cache.Get(path2), (True, "2"))
+    self.assertEqual(len(self.loader.calls), 2)
+
+  def testProviderRemoved(self):
+    shutil.rmtree(self.path1)
+    self.handler.process_default(_FakeEvent(self.tmpdir, "prov1",
+                                            _IN_DELETE, is_dir=True))
+    self.assertRaises(EnvironmentError, self.cache.Get, self.path1)
+
+  def testWatchRemoved(self):
+    self.handler.process_IN_IGNORED(_FakeEvent(self.path1, "", 0))
+    utils.WriteFile(utils.PathJoin(self.path1, "version"), data="22")
+    self.assertEqual(self.cache.Get(self.path1), (True, "22"))
+
+
+if __name__ == "__main__":
+  testutils.GanetiTestProgram()
@@ -885,6 +885,56 @@ class GanetiRapiClientTests(testutils.GanetiTestCase):
     self.assertHandler(rlib2.R_2_jobs_id_wait)
     self.assertItems(["123"])
 
+  def _AddJobEvents(self):
+    events = [
+      {"job_id": 1, "status": client.JOB_STATUS_RUNNING, "job_info": [],
+       "log_entries": [[1, [0, 0], "message", "hello"]]},
+      None,
+      {"job_id": 1, "status": client.JOB_STATUS_SUCCESS, "job_info": [],
+       "log_entries": []},
+      {"job_id": 2, "status": None, "job_info": None, "log_entries": []},
+      ]
+    self.rapi.AddResponse(b"".join(serializer.DumpJson(event)
+                                   for event in events))
+    return [event for event in events if event is not None]
+
+  def testStreamJobEvents(self):
+    expected = self._AddJobEvents()
+    received = []
+    self.assertTrue(self.client.StreamJobEvents([1, 2], received.append,
+                                                fields=["id"]) is None)
+    self.assertEqual(received, expected)
+    self.assertHandler(rlib2.R_2_jobs_events)
+    self.assertEqual(serializer.LoadJson(self.rapi.GetLastRequestData()),
+                     {"jobs": [1, 2], "fields": ["id"]})
+
+  def testStreamJobEventsTimeouts(self):
+    def _ConfigCurl(curl, _):
+      curl.setopt(pycurl.TIMEOUT, 30)
+
+    cl = client.GanetiRapiClient("master.example.com",
+                                 curl_config_fn=_ConfigCurl,
+                                 curl_factory=lambda: self.curl)
+
+    self.rapi.AddResponse("[]")
+    cl.GetJobs()
+    self.assertEqual(self.curl.getopt(pycurl.TIMEOUT), 30)
+    self.assertEqual(self.curl.getopt(pycurl.LOW_SPEED_TIME), None)
+
+    # Streams are only aborted if they stall
+    self._AddJobEvents()
+    cl.StreamJobEvents([1, 2], lambda _: None)
+    self.assertEqual(self.curl.getopt(pycurl.TIMEOUT), 0)
+    self.assertTrue(self.curl.getopt(pycurl.CONNECTTIMEOUT) > 0)
+    self.assertTrue(self.curl.getopt(pycurl.LOW_SPEED_LIMIT) > 0)
+    self.assertTrue(self.curl.getopt(pycurl.LOW_SPEED_TIME) > 0)
+
+  def testWaitForJobsCompletion(self):
+    self._AddJobEvents()
+    self.assertEqual(self.client.WaitForJobsCompletion([1, 2]),
+                     {1: True, 2: False})
+    self.assertHandler(rlib2.R_2_jobs_events)
+
   def testCancelJob(self):
     self.rapi.AddResponse("[true, \"Job 123 will be canceled\"]")
     self.assertEqual([True, "Job 123 will be canceled"],
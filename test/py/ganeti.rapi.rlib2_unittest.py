@@ -1454,6 +1454,53 @@ class TestClusterInfo(unittest.TestCase):
     self.assertEqual(result, cl.cluster_info)
 
 
+class TestJobEvents(unittest.TestCase):
+  class _JobEventsClient:
+    RESULTS = [
+      [(1, (["running", "x"], [[1, [0, 0], "message", "hello"]])),
+       (2, None)],
+      [],
+      [(1, (["success", "x"], []))],
+      ]
+
+    def __init__(self, address=None):
+      self.calls = []
+
+    def WaitForJobsChangeOnce(self, jobs, fields, timeout=None):
+      self.calls.append((sorted(jobs), fields))
+      return self.RESULTS[len(self.calls) - 1]
+
+  def test(self):
+    clfactory = _FakeClientFactory(self._JobEventsClient)
+    handler = _CreateHandler(rlib2.R_2_jobs_events, [], {},
+                             {"jobs": ["1", 2], "fields": ["id"]}, clfactory)
+    events = list(handler.GET())
+    cl = clfactory.GetNextClient()
+    self.assertRaises(IndexError, clfactory.GetNextClient)
+
+    self.assertEqual(events, [
+      {"job_id": 1, "status": "running", "job_info": ["x"],
+       "log_entries": [[1, [0, 0], "message", "hello"]]},
+      {"job_id": 2, "status": None, "job_info": None, "log_entries": []},
+      None,
+      {"job_id": 1, "status": "success", "job_info": ["x"],
+       "log_entries": []},
+      ])
+    self.assertEqual(cl.calls, [
+      ([(1, None, None), (2, None, None)], ["status", "id"]),
+      ([(1, ["running", "x"], 1)], ["status", "id"]),
+      ([(1, ["running", "x"], 1)], ["status", "id"]),
+      ])
+
+  def testInvalid(self):
+    clfactory = _FakeClientFactory(self._JobEventsClient)
+    for body in [{}, {"jobs": []}, {"jobs": ["foo"]},
+                 {"jobs": [1], "fields": "id"}]:
+      handler = _CreateHandler(rlib2.R_2_jobs_events, [], {}, body, clfactory)
+      self.assertRaises(http.HttpBadRequest, handler.GET)
+    self.assertRaises(IndexError, clfactory.GetNextClient)
+
+
 class TestInstancesMultiAlloc(unittest.TestCase):
   def testInstanceUpdate(self):
     clfactory = _FakeClientFactory(_FakeClient)
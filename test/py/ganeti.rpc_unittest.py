@@ -65,6 +65,7 @@ class _FakeRequestProcessor:
 def GetFakeSimpleStoreClass(fn):
   class FakeSimpleStore:
     GetNodePrimaryIPList = fn
+    GetNodePrimaryIPMap = lambda self: dict(entry.split() for entry in fn(self))
     GetPrimaryIPFamily = lambda _: None
 
   return FakeSimpleStore
@@ -721,6 +722,50 @@ class TestRpcClientBase(unittest.TestCase):
       self.assertEqual(len(result), len(nodes))
       for (idx, (node, res)) in enumerate(result.items()):
         self.assertFalse(res.fail_msg)
+  def testPrepareCalls(self):
+    resolved = []
+    encoded = []
+
+    def _Resolver(hosts, _):
+      resolved.append(hosts)
+      return [(host, "192.0.2.1", host) for host in hosts]
+
+    def _Encode(node, value):
+      encoded.append((node, value))
+      return value * 2
+
+    def _Respond(req):
+      req.success = True
+      req.resp_status_code = http.HTTP_OK
+      req.resp_body = serializer.DumpJson((True, req.post_data))
+
+    cdef = ("test_call", NotImplemented, None, constants.RPC_TMO_NORMAL, [
+      ("arg0", "kind", NotImplemented),
+      ], None, None, NotImplemented)
+
+    class _Client(rpc._RpcClientBase):
+      def call_test(self, node, arg0, _def=cdef):
+        return self._Call(_def, [node], [arg0])[node]
+
+    http_proc = _FakeRequestProcessor(_Respond)
+    client = _Client(_Resolver, lambda _: _Encode, _req_process_fn=http_proc)
+
+    send_fn = client.PrepareCalls().call_test("node1", 21)
+    # The configuration is only used while preparing the call
+    self.assertEqual(resolved, [["node1"]])
+    self.assertEqual(encoded, [("node1", 21)])
+    self.assertEqual(http_proc.reqcount, 0)
+
+    result = send_fn()
+    self.assertEqual(http_proc.reqcount, 1)
+    self.assertFalse(result.fail_msg)
+    self.assertEqual(serializer.LoadJson(result.payload), [42])
+    self.assertEqual(len(resolved), 1)
+    self.assertEqual(len(encoded), 1)
+
+    self.assertRaises(AttributeError, getattr, client.PrepareCalls(),
+                      "PrepareCalls")
+
 
 
 class _FakeConfigForRpcRunner:
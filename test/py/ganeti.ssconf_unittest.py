@@ -267,6 +267,187 @@ class TestSimpleStore(unittest.TestCase):
       self.assertEqual(value, result[key])
 
 
+class TestSnapshot(unittest.TestCase):
+  def setUp(self):
+    self._tmpdir = tempfile.mkdtemp()
+    self.ssdir = utils.PathJoin(self._tmpdir, "files")
+    lockfile = utils.PathJoin(self._tmpdir, "lock")
+
+    os.mkdir(self.ssdir)
+
+    self.sstore = ssconf.SimpleStore(cfg_location=self.ssdir,
+                                     _lockfile=lockfile)
+    self.snapshot_file = self.sstore.GetSnapshotFilename()
+
+    self.values = {
+      constants.SS_CLUSTER_NAME: "cluster.example.com",
+      constants.SS_NODE_LIST: ["node1.example.com", "node2.example.com"],
+      constants.SS_NODE_PRIMARY_IPS: ["node1.example.com 192.0.2.1",
+                                      "node2.example.com 192.0.2.2"],
+      constants.SS_NODE_VM_CAPABLE: ["node1-uuid=True", "node2-uuid=False"],
+      constants.SS_SSH_PORTS: ["node1.example.com=22",
+                               "node2.example.com=2222"],
+      constants.SS_MASTER_CANDIDATES_CERTS: ["node1-uuid=digest1"],
+      constants.SS_HVPARAMS_PREF + constants.HT_KVM: ["kernel_args=ro"],
+      }
+
+  def tearDown(self):
+    shutil.rmtree(self._tmpdir)
+
+  def _Check(self):
+    self.assertEqual(self.sstore.GetClusterName(), "cluster.example.com")
+    self.assertEqual(self.sstore.GetNodeList(),
+                     ["node1.example.com", "node2.example.com"])
+    self.assertEqual(self.sstore.GetNodePrimaryIPMap(), {
+      "node1.example.com": "192.0.2.1",
+      "node2.example.com": "192.0.2.2",
+      })
+    self.assertEqual(self.sstore.GetNodesVmCapable(), {
+      "node1-uuid": True,
+      "node2-uuid": False,
+      })
+    self.assertEqual(self.sstore.GetSshPortMap(), {
+      "node1.example.com": 22,
+      "node2.example.com": 2222,
+      })
+    self.assertEqual(self.sstore.GetMasterCandidatesCertMap(),
+                     {"node1-uuid": "digest1"})
+    self.assertEqual(self.sstore.GetHvparamsForHypervisor(constants.HT_KVM),
+                     {"kernel_args": "ro"})
+    self.assertRaises(errors.ConfigurationError,
+                      self.sstore.GetHvparamsForHypervisor,
+                      constants.HT_XEN_PVM)
+    self.assertRaises(errors.ConfigurationError, self.sstore.GetMasterNode)
+
+  def testWrite(self):
+    self.sstore.WriteFiles(self.values, snapshot=True)
+    self.assertTrue(os.path.exists(self.snapshot_file))
+    self._Check()
+
+    # Values are read from the snapshot, not the files
+    with mock.patch.object(ssconf, "ReadSsconfFile") as read_fn:
+      self.assertEqual(self.sstore.GetClusterName(), "cluster.example.com")
+      self.assertEqual(self.sstore.GetSshPortMap(), {
+        "node1.example.com": 22,
+        "node2.example.com": 2222,
+        })
+    self.assertFalse(read_fn.called)
+    self.assertEqual(self.sstore.ReadAll(), {
+      constants.SS_CLUSTER_NAME: "cluster.example.com",
+      constants.SS_NODE_LIST: "node1.example.com\nnode2.example.com",
+      constants.SS_NODE_PRIMARY_IPS:
+        "node1.example.com 192.0.2.1\nnode2.example.com 192.0.2.2",
+      constants.SS_NODE_VM_CAPABLE: "node1-uuid=True\nnode2-uuid=False",
+      constants.SS_SSH_PORTS:
+        "node1.example.com=22\nnode2.example.com=2222",
+      constants.SS_MASTER_CANDIDATES_CERTS: "node1-uuid=digest1",
+      constants.SS_HVPARAMS_PREF + constants.HT_KVM: "kernel_args=ro",
+      })
+
+  def testFileChanged(self):
+    self.sstore.WriteFiles(self.values, snapshot=True)
+    self._Check()
+
+    # Written without updating the snapshot, like "gnt-cluster renew-crypto"
+    # does
+    certs_file = self.sstore.KeyToFilename(
+      constants.SS_MASTER_CANDIDATES_CERTS)
+    utils.WriteFile(certs_file, data="%s=digest2" % constants.CRYPTO_BOOTSTRAP)
+    self.assertEqual(self.sstore.GetMasterCandidatesCertMap(),
+                     {constants.CRYPTO_BOOTSTRAP: "digest2"})
+
+    # Only the changed file is read
+    with mock.patch.object(ssconf, "ReadSsconfFile",
+                           wraps=ssconf.ReadSsconfFile) as read_fn:
+      self.assertEqual(self.sstore.GetClusterName(), "cluster.example.com")
+      self.assertEqual(self.sstore.GetMasterCandidatesCertMap(),
+                       {constants.CRYPTO_BOOTSTRAP: "digest2"})
+    read_fn.assert_called_once_with(certs_file)
+
+    # Removed without updating the snapshot, like "ssl_update" does
+    utils.RemoveFile(certs_file)
+    self.assertRaises(errors.ConfigurationError,
+                      self.sstore.GetMasterCandidatesCertMap)
+    self.assertFalse(constants.SS_MASTER_CANDIDATES_CERTS in
+                     self.sstore.ReadAll())
+
+    # The next snapshot covers the current files again
+    self.sstore.WriteFiles({
+      constants.SS_MASTER_CANDIDATES_CERTS: ["node1-uuid=digest3"],
+      }, snapshot=True)
+    with mock.patch.object(ssconf, "ReadSsconfFile") as read_fn:
+      self.assertEqual(self.sstore.GetMasterCandidatesCertMap(),
+                       {"node1-uuid": "digest3"})
+    self.assertFalse(read_fn.called)
+
+  def testFilesRemoved(self):
+    self.sstore.WriteFiles(self.values, snapshot=True)
+    for key in self.values:
+      utils.RemoveFile(self.sstore.KeyToFilename(key))
+    self.assertRaises(errors.ConfigurationError, self.sstore.GetClusterName)
+    self.assertEqual(self.sstore.ReadAll(), {})
+
+  def testWithoutSnapshot(self):
+    self.sstore.WriteFiles(self.values)
+    self.assertFalse(os.path.exists(self.snapshot_file))
+    self._Check()
+
+  def testDryRun(self):
+    self.sstore.WriteFiles(self.values, dry_run=True, snapshot=True)
+    self.assertEqual(os.listdir(self.ssdir), [])
+
+  def testPartialUpdate(self):
+    self.sstore.WriteFiles(self.values, snapshot=True)
+    self.sstore.WriteFiles({
+      constants.SS_MASTER_NODE: "node2.example.com",
+      constants.SS_SSH_PORTS: ["node1.example.com=22"],
+      }, snapshot=True)
+
+    self.assertEqual(self.sstore.GetClusterName(), "cluster.example.com")
+    self.assertEqual(self.sstore.GetMasterNode(), "node2.example.com")
+    self.assertEqual(self.sstore.GetSshPortMap(), {"node1.example.com": 22})
+
+  def testUnsplittableMap(self):
+    self.values[constants.SS_HVPARAMS_PREF + constants.HT_KVM] = \
+      ["kernel_args=console=ttyS0"]
+    self.sstore.WriteFiles(self.values, snapshot=True)
+
+    snapshot = ssconf._GetSnapshot(self.snapshot_file)
+    self.assertEqual(
+      snapshot.GetValue(constants.SS_HVPARAMS_PREF + constants.HT_KVM),
+      "kernel_args=console=ttyS0")
+    self.assertTrue(
+      snapshot.GetMap(constants.SS_HVPARAMS_PREF + constants.HT_KVM) is None)
+
+  def testReplaced(self):
+    self.sstore.WriteFiles(self.values, snapshot=True)
+    snapshot = ssconf._GetSnapshot(self.snapshot_file)
+    self.assertTrue(ssconf._GetSnapshot(self.snapshot_file) is snapshot)
+
+    self.sstore.WriteFiles({
+      constants.SS_CLUSTER_NAME: "other.example.com",
+      }, snapshot=True)
+    self.assertFalse(ssconf._GetSnapshot(self.snapshot_file) is snapshot)
+    self.assertEqual(self.sstore.GetClusterName(), "other.example.com")
+
+  def testInvalid(self):
+    self.sstore.WriteFiles(self.values)
+
+    key = constants.SS_CLUSTER_NAME
+    data = ssconf._BuildSnapshot({
+      key: "wrong.example.com",
+      }, {
+      key: ssconf._GetFileIdentity(os.stat(self.sstore.KeyToFilename(key))),
+      })
+
+    for content in [b"", b"invalid", data[:-1],
+                    data.replace(ssconf._SNAPSHOT_MAGIC, b"X" * 8),
+                    data[:8] + b"\xff" + data[9:]]:
+      utils.WriteFile(self.snapshot_file, data=content)
+      self.assertTrue(ssconf._GetSnapshot(self.snapshot_file) is None)
+      self._Check()
+
+
 class TestVerifyClusterName(unittest.TestCase):
   def setUp(self):
     self.tmpdir = tempfile.mkdtemp()
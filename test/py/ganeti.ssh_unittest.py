@@ -34,6 +34,7 @@ import os
 import tempfile
 import unittest
 import shutil
+from unittest import mock
 
 import testutils
 import mocks
@@ -42,6 +43,33 @@ from ganeti import constants
 from ganeti import utils
 from ganeti import ssh
 from ganeti import errors
+from ganeti import netutils
+from ganeti import pathutils
+
+
+class TestSshRunner(unittest.TestCase):
+  def setUp(self):
+    patcher = mock.patch("ganeti.ssconf.SimpleStore")
+    store = patcher.start()
+    self.addCleanup(patcher.stop)
+    store.return_value.GetPrimaryIPFamily.return_value = \
+      netutils.IP4Address.family
+
+  def testNoControlMaster(self):
+    runner = ssh.SshRunner("cluster.example.com")
+    cmd = runner.BuildCmd("node1.example.com", "root", "true")
+    self.assertFalse([arg for arg in cmd if arg.startswith("-oControl")])
+
+  @mock.patch("ganeti.utils.EnsureDirs")
+  def testControlMaster(self, ensure_dirs):
+    runner = ssh.SshRunner("cluster.example.com", control_persist=30)
+    ensure_dirs.assert_called_once_with([(pathutils.SSH_CONTROL_DIR,
+                                          constants.SECURE_DIR_MODE)])
+    cmd = runner.BuildCmd("node1.example.com", "root", "true")
+    self.assertTrue("-oControlMaster=auto" in cmd)
+    self.assertTrue("-oControlPersist=30" in cmd)
+    self.assertTrue("-oControlPath=%s/%%C" % pathutils.SSH_CONTROL_DIR in cmd)
+    self.assertEqual(cmd[-2:], ["root@node1.example.com", "true"])
 
 
 class TestKnownHosts(testutils.GanetiTestCase):
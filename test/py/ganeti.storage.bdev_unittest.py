@@ -33,6 +33,9 @@
 
 import os
 import random
+import shutil
+import subprocess
+import tempfile
 import unittest
 
 from ganeti import compat
@@ -41,6 +44,7 @@ from ganeti import errors
 from ganeti import objects
 from ganeti import utils
 from ganeti.storage import bdev
+from ganeti.storage import drbd
 
 import testutils
 
@@ -174,6 +178,39 @@ class TestRADOSBlockDevice(testutils.GanetiTestCase):
 
     self.assertEqual(inst.Export(), export_cmd)
 
+  @testutils.patch_object(utils, "RunCmd")
+  @testutils.patch_object(bdev.imagecache, "LockGoldenImage")
+  @testutils.patch_object(bdev.RADOSBlockDevice, "_VolumeExists")
+  @testutils.patch_object(bdev.RADOSBlockDevice, "Shutdown")
+  @testutils.patch_object(bdev.RADOSBlockDevice, "Attach")
+  def testRADOSBlockDeviceCloneRenameFails(self, attach_mock, shutdown_mock,
+                                           exists_mock, lock_mock,
+                                           run_cmd_mock):
+    """Test for bdev.RADOSBlockDevice.CloneImage() failing to rename"""
+    attach_mock.return_value = True
+    exists_mock.return_value = True
+
+    inst = bdev.RADOSBlockDevice(self.test_unique_id, [], 1024,
+                                 self.test_params, {})
+    clone = inst.rbd_name + ".clone"
+    old = inst.rbd_name + ".old"
+
+    failing = [constants.RBD_CMD, "rename", "-p", inst.rbd_pool, clone,
+               inst.rbd_name]
+    run_cmd_mock.side_effect = \
+      lambda cmd: _FakeRunCmd(cmd != failing, "", cmd)
+
+    self.assertRaises(errors.BlockDeviceError, inst.CloneImage,
+                      "0123456789abcdef0123456789abcdef" * 2, "/dev/null")
+
+    commands = [args[0] for (args, _) in run_cmd_mock.call_args_list]
+    # The original volume is put back and the clone removed
+    self.assertEqual([cmd[4:] for cmd in commands if cmd[1] == "rename"],
+                     [[inst.rbd_name, old], [clone, inst.rbd_name],
+                      [old, inst.rbd_name]])
+    self.assertEqual([cmd[4:] for cmd in commands if cmd[1] == "rm"],
+                     [[clone]])
+
   @testutils.patch_object(utils, "RunCmd")
   @testutils.patch_object(bdev.RADOSBlockDevice, "Attach")
   def testRADOSBlockDeviceCreate(self, attach_mock, run_cmd_mock):
@@ -235,6 +272,58 @@ class TestRADOSBlockDevice(testutils.GanetiTestCase):
 
     self.assertEqual(dev.Attach(), False)
 
+  @testutils.patch_object(utils, "RunCmd")
+  def testMapVolumeWithShowmapped(self, run_cmd_mock):
+    """Test for bdev.RADOSBlockDevice._MapVolumeToBlockdev() with a snapshot"""
+    dev = bdev.RADOSBlockDevice.__new__(bdev.RADOSBlockDevice)
+    dev.params = {constants.LDP_POOL: self.pool_name}
+
+    self.assertEqual(dev._MapVolumeToBlockdev(self.test_unique_id,
+                                              showmapped=self.json_output_ok),
+                     "/dev/rbd3")
+    self.assertFalse(run_cmd_mock.called)
+
+  @testutils.patch_object(utils, "RunCmd")
+  def testGetShowmapped(self, run_cmd_mock):
+    """Test for bdev.RADOSBlockDevice.GetShowmapped()"""
+    run_cmd_mock.return_value = _FakeRunCmd(True, self.json_output_ok,
+                                            "rbd showmapped")
+    self.assertEqual(bdev.RADOSBlockDevice.GetShowmapped(),
+                     self.json_output_ok)
+
+    run_cmd_mock.return_value = _FakeRunCmd(False, "", "rbd showmapped")
+    self.assertEqual(bdev.RADOSBlockDevice.GetShowmapped(), None)
+
+
+class TestGetDeviceCaches(unittest.TestCase):
+  """Tests for bdev.GetDeviceCaches"""
+
+  @testutils.patch_object(bdev.RADOSBlockDevice, "GetShowmapped")
+  @testutils.patch_object(drbd.DRBD8, "GetProcInfo")
+  @testutils.patch_object(bdev.LogicalVolume, "GetLvGlobalInfo")
+  def testTypes(self, lvs_mock, drbd_mock, rbd_mock):
+    self.assertEqual(bdev.GetDeviceCaches([constants.DT_FILE]), {})
+    self.assertFalse(lvs_mock.called or drbd_mock.called or rbd_mock.called)
+
+    lvs_mock.return_value = {"/dev/xenvg/lv1": NotImplemented}
+    drbd_mock.return_value = NotImplemented
+    rbd_mock.return_value = "[]"
+    self.assertEqual(bdev.GetDeviceCaches([constants.DT_DRBD8,
+                                           constants.DT_PLAIN,
+                                           constants.DT_RBD]), {
+      "lvs_cache": {"/dev/xenvg/lv1": NotImplemented},
+      "drbd_info": NotImplemented,
+      "rbd_showmapped": "[]",
+      })
+
+  @testutils.patch_object(bdev.RADOSBlockDevice, "GetShowmapped")
+  @testutils.patch_object(drbd.DRBD8, "GetProcInfo")
+  def testUnavailable(self, drbd_mock, rbd_mock):
+    drbd_mock.side_effect = errors.BlockDeviceError("module not loaded")
+    rbd_mock.return_value = None
+    self.assertEqual(bdev.GetDeviceCaches([constants.DT_DRBD8,
+                                           constants.DT_RBD]), {})
+
 
 class TestExclusiveStoragePvs(unittest.TestCase):
   """Test cases for functions dealing with LVM PV and exclusive storage"""
@@ -431,6 +520,46 @@ class TestLogicalVolume(testutils.GanetiTestCase):
 
     self.assertEqual(inst.Import(), import_cmd)
 
+  @testutils.patch_object(bdev.LogicalVolume, "Attach")
+  def testLogicalVolumeImportRange(self, attach_mock):
+    """Tests bdev.LogicalVolume.Import() with a range fed through a pipe"""
+    attach_mock.return_value = True
+
+    inst = bdev.LogicalVolume(self.test_unique_id, [], 1024, {}, {})
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+      inst.dev_path = os.path.join(tmpdir, "disk")
+      utils.WriteFile(inst.dev_path, data=bytes(8 * constants.DD_BLOCK_SIZE))
+
+      # Direct I/O is not supported by all filesystems used for tests
+      cmd = [i for i in inst.Import(offset=2, size=3) if i != "oflag=direct"]
+      self.assertTrue("iflag=fullblock" in cmd)
+
+      data = os.urandom(3 * constants.DD_BLOCK_SIZE)
+      proc = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL)
+      try:
+        # Small writes make dd see short reads
+        for pos in range(0, len(data), 4096):
+          proc.stdin.write(data[pos:pos + 4096])
+          proc.stdin.flush()
+        proc.stdin.close()
+      except BrokenPipeError:
+        pass
+      self.assertEqual(proc.wait(), 0)
+
+      written = utils.ReadBinaryFile(inst.dev_path)
+      self.assertEqual(len(written), 8 * constants.DD_BLOCK_SIZE)
+      self.assertEqual(written[:2 * constants.DD_BLOCK_SIZE],
+                       bytes(2 * constants.DD_BLOCK_SIZE))
+      self.assertEqual(written[2 * constants.DD_BLOCK_SIZE:
+                               5 * constants.DD_BLOCK_SIZE], data)
+      self.assertEqual(written[5 * constants.DD_BLOCK_SIZE:],
+                       bytes(3 * constants.DD_BLOCK_SIZE))
+    finally:
+      shutil.rmtree(tmpdir)
+
   @testutils.patch_object(bdev.LogicalVolume, "Attach")
   def testLogicalVolumeExport(self, attach_mock):
     """Test for bdev.LogicalVolume.Export()"""
@@ -594,6 +723,125 @@ class TestLogicalVolume(testutils.GanetiTestCase):
     self.assertEqual(dev.Attach(), False)
 
 
+class TestLogicalVolumeClone(unittest.TestCase):
+  """Tests for cloning logical volumes from golden images."""
+
+  _GOLDEN = constants.GOLDEN_IMAGE_PREFIX + "0123456789abcdef0123456789abcdef"
+
+  def setUp(self):
+    self.commands = []
+    self.lvs_output = ""
+    self.failing = []
+
+  def _RunCmd(self, cmd):
+    self.commands.append(cmd)
+    if cmd in self.failing:
+      return _FakeRunCmd(False, "", cmd)
+    if cmd[0] == "lvs" and "-olv_name,lv_attr,lv_size,pool_lv,origin" in cmd:
+      return _FakeRunCmd(True, self.lvs_output, cmd)
+    return _FakeRunCmd(True, "", cmd)
+
+  def _Commands(self, name):
+    return [cmd for cmd in self.commands if cmd[0] == name]
+
+  def _NewVolume(self):
+    with testutils.patch_object(bdev.LogicalVolume, "Attach"):
+      return bdev.LogicalVolume(("xenvg", "disk0"), [], 1024, {}, {})
+
+  def testThinPoolFree(self):
+    volumes = [
+      ("pool", "twi-aotz--", 10240.0, "", ""),
+      ("other", "twi-aotz--", 4096.0, "", ""),
+      ("lv1", "Vwi-a-tz--", 2048.0, "pool", ""),
+      ("lv2", "Vwi-a-tz--", 1024.0, "pool", "lv1"),
+      ("lv3", "Vwi-a-tz--", 1024.0, "other", ""),
+      ]
+    self.assertEqual(bdev.LogicalVolume._GetThinPool(volumes), "other")
+    self.assertEqual(bdev.LogicalVolume._GetThinPoolFree(volumes, "pool"),
+                     7168.0)
+    self.assertEqual(bdev.LogicalVolume._GetThinPoolFree(volumes, "other"),
+                     3072.0)
+
+  def _CloneImage(self, dev):
+    with testutils.patch_object(utils, "RunCmd", self._RunCmd):
+      with testutils.patch_object(bdev.LogicalVolume, "_LockGoldenImages"):
+        with testutils.patch_object(bdev.LogicalVolume, "Attach"):
+          return dev.CloneImage("0123456789abcdef0123456789abcdef" * 2,
+                                "/dev/null")
+
+  def testCloneNoThinPool(self):
+    self.lvs_output = ""
+    self.assertFalse(self._CloneImage(self._NewVolume()))
+    self.assertFalse(self._Commands("lvcreate"))
+
+  def testClone(self):
+    self.lvs_output = ("  pool|twi-aotz--|10240.00||\n"
+                       "  %s-1024m|Vri-a-tz--|1024.00|pool|\n" % self._GOLDEN)
+    self.assertTrue(self._CloneImage(self._NewVolume()))
+    self.assertEqual(self._Commands("lvcreate"),
+                     [["lvcreate", "-s", "-kn", "-prw", "-ndisk0.clone",
+                       "xenvg/%s-1024m" % self._GOLDEN]])
+    # The original volume is removed only after the clone took its place
+    self.assertEqual(self._Commands("lvrename"),
+                     [["lvrename", "xenvg", "disk0", "disk0.old"],
+                      ["lvrename", "xenvg", "disk0.clone", "disk0"]])
+    removed = self._Commands("lvremove")[0]
+    self.assertEqual(removed, ["lvremove", "-f", "xenvg/disk0.old"])
+    self.assertTrue(self.commands.index(removed) >
+                    self.commands.index(self._Commands("lvrename")[1]))
+
+  def testCloneRenameFails(self):
+    self.lvs_output = ("  pool|twi-aotz--|10240.00||\n"
+                       "  %s-1024m|Vri-a-tz--|1024.00|pool|\n" % self._GOLDEN)
+    self.failing = [["lvrename", "xenvg", "disk0.clone", "disk0"]]
+    self.assertRaises(errors.BlockDeviceError, self._CloneImage,
+                      self._NewVolume())
+    # The original volume is put back and the clone removed
+    self.assertEqual(self._Commands("lvrename"),
+                     [["lvrename", "xenvg", "disk0", "disk0.old"],
+                      ["lvrename", "xenvg", "disk0.clone", "disk0"],
+                      ["lvrename", "xenvg", "disk0.old", "disk0"]])
+    self.assertEqual(self._Commands("lvremove"),
+                     [["lvremove", "-f", "xenvg/disk0.clone"]])
+
+    # Nothing is touched if the original volume can't be renamed
+    self.commands = []
+    self.failing = [["lvrename", "xenvg", "disk0", "disk0.old"]]
+    self.assertRaises(errors.BlockDeviceError, self._CloneImage,
+                      self._NewVolume())
+    self.assertEqual(self._Commands("lvrename"),
+                     [["lvrename", "xenvg", "disk0", "disk0.old"]])
+    self.assertEqual(self._Commands("lvremove"),
+                     [["lvremove", "-f", "xenvg/disk0.clone"]])
+
+  def testCloneNoOvercommit(self):
+    # The golden image exists, but the pool can't hold the full clone
+    self.lvs_output = ("  pool|twi-aotz--|10240.00||\n"
+                       "  %s-1024m|Vri-a-tz--|1024.00|pool|\n"
+                       "  lv1|Vwi-a-tz--|8704.00|pool|\n" % self._GOLDEN)
+    self.assertFalse(self._CloneImage(self._NewVolume()))
+    self.assertFalse(self._Commands("lvcreate"))
+
+    # Creating the golden image needs space as well
+    self.lvs_output = ("  pool|twi-aotz--|10240.00||\n"
+                       "  lv1|Vwi-a-tz--|8704.00|pool|\n")
+    self.assertFalse(self._CloneImage(self._NewVolume()))
+    self.assertFalse(self._Commands("lvcreate"))
+
+  def testRemoveUnusedGoldenImages(self):
+    self.lvs_output = ("  pool|twi-aotz--|10240.00||\n"
+                       "  %s-1024m|Vri-a-tz--|1024.00|pool|\n"
+                       "  %s-2048m|Vri-a-tz--|2048.00|pool|\n"
+                       "  lv1|Vwi-a-tz--|1024.00|pool|%s-1024m\n" %
+                       (self._GOLDEN, self._GOLDEN, self._GOLDEN))
+    dev = self._NewVolume()
+    with testutils.patch_object(utils, "RunCmd", self._RunCmd):
+      with testutils.patch_object(bdev.LogicalVolume, "_LockGoldenImages"):
+        dev._RemoveUnusedGoldenImages()
+    self.assertEqual(self._Commands("lvremove"),
+                     [["lvremove", "-f", "xenvg/%s-2048m" % self._GOLDEN]])
+
+
 class TestPersistentBlockDevice(testutils.GanetiTestCase):
   """Tests for bdev.PersistentBlockDevice volumes
 
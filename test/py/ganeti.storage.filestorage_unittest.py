@@ -30,13 +30,16 @@
 
 """Script for unittesting the ganeti.storage.filestorage module"""
 
+import errno
 import os
 import shutil
 import tempfile
 import unittest
+from unittest import mock
 
 from ganeti import errors
 from ganeti.storage import filestorage
+from ganeti.storage import imagecache
 from ganeti.utils import io
 from ganeti import utils
 from ganeti import constants
@@ -234,12 +237,13 @@ class TestCheckFileStoragePathExistance(testutils.GanetiTestCase):
 class TestFileDeviceHelper(testutils.GanetiTestCase):
 
   @staticmethod
-  def _Make(path, create_with_size=None, create_folders=False):
+  def _Make(path, create_with_size=None, create_folders=False,
+            preallocation=constants.FILE_PREALLOC_DEFAULT):
     skip_checks = lambda path: None
     if create_with_size:
       return filestorage.FileDeviceHelper.CreateFile(
         path, create_with_size, create_folders=create_folders,
-        _file_path_acceptance_fn=skip_checks
+        preallocation=preallocation, _file_path_acceptance_fn=skip_checks
       )
     else:
       return filestorage.FileDeviceHelper(path,
@@ -300,6 +304,29 @@ class TestFileDeviceHelper(testutils.GanetiTestCase):
     self.assertRaises(errors.BlockDeviceError, TestFileDeviceHelper._Make,
                       "/enoent", create_with_size=0.042)
 
+  @staticmethod
+  def _IsAllocated(path):
+    st = os.stat(path)
+    return st.st_blocks * 512 >= st.st_size
+
+  def testFileCreationPreallocation(self):
+    for (preallocation, allocated) in [
+        (constants.FILE_PREALLOC_OFF, False),
+        (constants.FILE_PREALLOC_FALLOC, True),
+        (constants.FILE_PREALLOC_FULL, True),
+        ]:
+      with TestFileDeviceHelper.TempEnvironment() as env:
+        TestFileDeviceHelper._Make(env.path, create_with_size=2,
+                                   preallocation=preallocation)
+        self.assertEqual(os.path.getsize(env.path), 2 * 1024 * 1024)
+        self.assertEqual(self._IsAllocated(env.path), allocated)
+
+  def testFileCreationInvalidPreallocation(self):
+    with TestFileDeviceHelper.TempEnvironment(delete_file=False) as env:
+      self.assertRaises(errors.BlockDeviceError, TestFileDeviceHelper._Make,
+                        env.path, create_with_size=1, preallocation="some")
+      self.assertFalse(os.path.exists(env.path))
+
   def testFailSizeDirectory(self):
   # This should still fail.
    with TestFileDeviceHelper.TempEnvironment(delete_file=False) as env:
@@ -313,6 +340,15 @@ class TestFileDeviceHelper(testutils.GanetiTestCase):
 
       env.volume.Grow(2, False, True, None)
       self.assertEqual(2.0, env.volume.Size() / 1024.0**2)
+      self.assertFalse(self._IsAllocated(env.path))
+
+  def testGrowFilePreallocated(self):
+    for preallocation in [constants.FILE_PREALLOC_FALLOC,
+                          constants.FILE_PREALLOC_FULL]:
+      with TestFileDeviceHelper.TempEnvironment(create_file=True) as env:
+        env.volume.Grow(2, False, True, None, preallocation=preallocation)
+        self.assertEqual(2.0, env.volume.Size() / 1024.0**2)
+        self.assertTrue(self._IsAllocated(env.path))
 
   def testRemoveFile(self):
     with TestFileDeviceHelper.TempEnvironment(create_file=True,
@@ -329,6 +365,32 @@ class TestFileDeviceHelper(testutils.GanetiTestCase):
       env.volume.Exists(assert_exists=True)
       env.path = new_path # update the path for the context manager
 
+  @testutils.patch_object(filestorage, "_CloneFile")
+  def testRenameFileAcrossMounts(self, clone_fn):
+    clone_fn.side_effect = _FakeCloneFile
+    with TestFileDeviceHelper.TempEnvironment(create_file=True) as env:
+      utils.WriteFile(env.path, data="data")
+      new_path = os.path.join(env.subdirectory, "middle")
+      with mock.patch.object(os, "rename",
+                             side_effect=OSError(errno.EXDEV, "Cross-device")):
+        env.volume.Move(new_path)
+      self.assertEqual(new_path, env.volume.path)
+      self.assertFalse(os.path.exists(env.path))
+      self.assertEqual(utils.ReadFile(new_path), "data")
+      env.path = new_path
+
+  @testutils.patch_object(filestorage, "_CloneFile")
+  def testRenameFileAcrossMountsUnsupported(self, clone_fn):
+    clone_fn.side_effect = OSError(errno.EXDEV, "Cross-device")
+    with TestFileDeviceHelper.TempEnvironment(create_file=True) as env:
+      new_path = os.path.join(env.subdirectory, "middle")
+      with mock.patch.object(os, "rename",
+                             side_effect=OSError(errno.EXDEV, "Cross-device")):
+        self.assertRaises(errors.BlockDeviceError, env.volume.Move, new_path)
+      self.assertEqual(env.path, env.volume.path)
+      self.assertFalse(os.path.exists(new_path))
+      env.volume.Exists(assert_exists=True)
+
 
 class TestFileStorage(testutils.GanetiTestCase):
 
@@ -353,5 +415,114 @@ class TestFileStorage(testutils.GanetiTestCase):
                       test_unique_id, [], 123, None, {}, True, {})
 
 
+def _FakeCloneFile(src_path, dst_path):
+  with open(src_path, "rb") as src:
+    with open(dst_path, "r+b") as dst:
+      dst.truncate(0)
+      shutil.copyfileobj(src, dst)
+
+
+@testutils.patch_object(imagecache, "LockGoldenImage", mock.MagicMock())
+class TestCloneImage(testutils.GanetiTestCase):
+  def setUp(self):
+    testutils.GanetiTestCase.setUp(self)
+    self.tmpdir = tempfile.mkdtemp()
+    self.image = utils.PathJoin(self.tmpdir, "image.raw")
+    self.data = os.urandom(1024 * 1024 + 17)
+    utils.WriteFile(self.image, data=self.data)
+
+  def tearDown(self):
+    testutils.GanetiTestCase.tearDown(self)
+    shutil.rmtree(self.tmpdir)
+
+  def _MakeDevice(self, name, size=2):
+    path = utils.PathJoin(self.tmpdir, name, "disk0")
+    utils.Makedirs(os.path.dirname(path))
+    with open(path, "wb") as fh:
+      fh.truncate(size * 1024 * 1024)
+    with mock.patch.object(filestorage, "FileDeviceHelper"):
+      return filestorage.FileStorage(("loop", path), [], size, {}, {})
+
+  def _GetGoldenImages(self):
+    golden_dir = utils.PathJoin(self.tmpdir,
+                                ".%sdisks" % constants.GOLDEN_IMAGE_PREFIX)
+    return os.listdir(golden_dir)
+
+  @testutils.patch_object(filestorage, "_CloneFile")
+  def testUnsupported(self, clone_fn):
+    clone_fn.side_effect = OSError(errno.EOPNOTSUPP, "Not supported")
+    dev = self._MakeDevice("inst1")
+    self.assertFalse(dev.CloneImage("abc", self.image))
+    self.assertEqual(self._GetGoldenImages(), [])
+
+  @testutils.patch_object(filestorage, "_CloneFile")
+  def testClone(self, clone_fn):
+    clone_fn.side_effect = _FakeCloneFile
+
+    with mock.patch.object(imagecache, "WriteImage",
+                           wraps=imagecache.WriteImage) as write_fn:
+      for name in ["inst1", "inst2"]:
+        dev = self._MakeDevice(name)
+        self.assertTrue(dev.CloneImage("abc", self.image))
+        self.assertEqual(utils.ReadBinaryFile(dev.dev_path),
+                         self.data +
+                         bytes(2 * 1024 * 1024 - len(self.data)))
+
+    # The golden image is only written once
+    self.assertEqual(write_fn.call_count, 1)
+    self.assertEqual(self._GetGoldenImages(),
+                     [imagecache.GetGoldenImageName("abc")])
+
+  @testutils.patch_object(filestorage, "_CloneFile")
+  def testTooLarge(self, clone_fn):
+    clone_fn.side_effect = _FakeCloneFile
+    dev = self._MakeDevice("inst1", size=1)
+    self.assertRaises(imagecache.ImageTooLargeError, dev.CloneImage, "abc",
+                      self.image)
+    self.assertEqual(self._GetGoldenImages(), [])
+
+
+class TestCloneFrom(testutils.GanetiTestCase):
+  def setUp(self):
+    testutils.GanetiTestCase.setUp(self)
+    self.tmpdir = tempfile.mkdtemp()
+    self.data = os.urandom(1024 * 1024)
+
+  def tearDown(self):
+    testutils.GanetiTestCase.tearDown(self)
+    shutil.rmtree(self.tmpdir)
+
+  def _MakeDevice(self, name, size, data=b""):
+    path = utils.PathJoin(self.tmpdir, name)
+    with open(path, "wb") as fh:
+      fh.write(data)
+      fh.truncate(size * 1024 * 1024)
+    with mock.patch.object(filestorage, "CheckFileStoragePathAcceptance"):
+      return filestorage.FileStorage(("loop", path), [], size, {}, {})
+
+  @testutils.patch_object(filestorage, "_CloneFile")
+  def testClone(self, clone_fn):
+    clone_fn.side_effect = _FakeCloneFile
+    src = self._MakeDevice("src", 1, data=self.data)
+    dest = self._MakeDevice("dest", 2)
+    self.assertTrue(dest.CloneFrom(src))
+    self.assertEqual(utils.ReadBinaryFile(dest.dev_path),
+                     self.data + bytes(1024 * 1024))
+
+  @testutils.patch_object(filestorage, "_CloneFile")
+  def testUnsupported(self, clone_fn):
+    clone_fn.side_effect = OSError(errno.EOPNOTSUPP, "Not supported")
+    src = self._MakeDevice("src", 1, data=self.data)
+    dest = self._MakeDevice("dest", 1)
+    self.assertFalse(dest.CloneFrom(src))
+
+  @testutils.patch_object(filestorage, "_CloneFile")
+  def testSourceTooLarge(self, clone_fn):
+    src = self._MakeDevice("src", 2, data=self.data)
+    dest = self._MakeDevice("dest", 1)
+    self.assertFalse(dest.CloneFrom(src))
+    self.assertFalse(clone_fn.called)
+
+
 if __name__ == "__main__":
   testutils.GanetiTestProgram()
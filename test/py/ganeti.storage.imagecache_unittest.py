@@ -0,0 +1,379 @@
+#!/usr/bin/python3
+#
+
+# Copyright (C) 2026 the Ganeti project
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Script for unittesting the ganeti.storage.imagecache module"""
+
+import gzip
+import hashlib
+import lzma
+import os
+import shutil
+import tempfile
+import unittest
+
+import pycurl
+
+from ganeti import utils
+from ganeti.storage import imagecache
+
+import testutils
+
+
+class _FakeServer(object):
+  """Serves a single file to L{_FakeCurl}.
+
+  """
+  def __init__(self, content, etag="\"v1\""):
+    self.content = content
+    self.etag = etag
+    self.fail_after = None
+    self.ignore_range = False
+    self.errors = []
+    self.requests = []
+    self.opts = None
+
+  def Handle(self, opts):
+    headers = dict(h.split(": ", 1) for h in opts.get(pycurl.HTTPHEADER, []))
+    self.requests.append((opts.get(pycurl.RANGE), headers))
+    self.opts = opts
+
+    if self.errors:
+      return (self.errors.pop(0), b"", False)
+
+    if headers.get("If-None-Match") == self.etag:
+      return (304, b"", False)
+
+    data = self.content
+    status = 200
+    byte_range = opts.get(pycurl.RANGE)
+    if (byte_range and headers.get("If-Range") == self.etag and
+        not self.ignore_range):
+      status = 206
+      data = data[int(byte_range.rstrip("-")):]
+
+    fail = False
+    if self.fail_after is not None:
+      data = data[:self.fail_after]
+      self.fail_after = None
+      fail = True
+
+    return (status, data, fail)
+
+
+class _FakeCurl(object):
+  def __init__(self, server):
+    self._server = server
+    self._opts = {}
+    self._status = 0
+
+  def setopt(self, opt, value):
+    self._opts[opt] = value
+
+  def getinfo(self, _):
+    return self._status
+
+  def perform(self):
+    (self._status, data, fail) = self._server.Handle(self._opts)
+    self._opts[pycurl.HEADERFUNCTION](b"HTTP/1.1 %d X\r\n" % self._status)
+    self._opts[pycurl.HEADERFUNCTION](
+      ("ETag: %s\r\n" % self._server.etag).encode("ascii"))
+    if self._status >= 400:
+      raise pycurl.error(pycurl.E_HTTP_RETURNED_ERROR,
+                         "The requested URL returned error: %d" % self._status)
+    if data:
+      self._opts[pycurl.WRITEFUNCTION](data)
+    if fail:
+      raise pycurl.error(pycurl.E_PARTIAL_FILE, "Connection reset")
+
+  def close(self):
+    pass
+
+
+class TestParseImageUrl(unittest.TestCase):
+  def testNoChecksum(self):
+    self.assertEqual(imagecache.ParseImageUrl("http://example.com/a.img"),
+                     ("http://example.com/a.img", None))
+
+  def testChecksum(self):
+    self.assertEqual(
+      imagecache.ParseImageUrl("http://example.com/a.img#sha256=ABC123"),
+      ("http://example.com/a.img", ("sha256", "abc123")))
+
+  def testInvalid(self):
+    for fragment in ["md5=abc", "sha256", "sha256=xyz", "foo"]:
+      self.assertRaises(imagecache.ImageError, imagecache.ParseImageUrl,
+                        "http://example.com/a.img#" + fragment)
+
+
+class TestImageCache(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.content = os.urandom(100 * 1024)
+    self.server = _FakeServer(self.content)
+    self.cache = imagecache.ImageCache(self.tmpdir,
+                                       _curl_fn=self._NewCurl)
+    self._retry_delay = imagecache.DOWNLOAD_RETRY_DELAY
+    imagecache.DOWNLOAD_RETRY_DELAY = 0
+
+  def tearDown(self):
+    imagecache.DOWNLOAD_RETRY_DELAY = self._retry_delay
+    shutil.rmtree(self.tmpdir)
+
+  def _NewCurl(self):
+    return _FakeCurl(self.server)
+
+  def _Fetch(self, url, cache=None):
+    if cache is None:
+      cache = self.cache
+    (path, pin) = cache.Fetch(url)
+    pin.Close()
+    return path
+
+  def _Read(self, path):
+    with open(path, "rb") as fh:
+      return fh.read()
+
+  def testDownload(self):
+    path = self._Fetch("http://example.com/a.img")
+    self.assertEqual(self._Read(path), self.content)
+    self.assertEqual(len(self.server.requests), 1)
+
+  def testRevalidate(self):
+    path = self._Fetch("http://example.com/a.img")
+    self.assertEqual(self._Fetch("http://example.com/a.img"), path)
+    self.assertEqual(self.server.requests[1][1]["If-None-Match"],
+                     self.server.etag)
+
+  def testChangedImage(self):
+    self._Fetch("http://example.com/a.img")
+    self.server.content = self.content = os.urandom(1000)
+    self.server.etag = "\"v2\""
+    path = self._Fetch("http://example.com/a.img")
+    self.assertEqual(self._Read(path), self.content)
+
+  def testCachedByChecksum(self):
+    url = ("http://example.com/a.img#sha256=%s" %
+           hashlib.sha256(self.content).hexdigest())
+    path = self._Fetch(url)
+    self.assertEqual(self._Fetch(url), path)
+    self.assertEqual(len(self.server.requests), 1)
+
+  def testOtherChecksum(self):
+    url = ("http://example.com/a.img#sha1=%s" %
+           hashlib.sha1(self.content).hexdigest())
+    path = self._Fetch(url)
+    self.assertEqual(self._Read(path), self.content)
+    self.assertEqual(self._Read(self._Fetch(url)), self.content)
+    self.assertEqual(len(self.server.requests), 1)
+
+  def testChecksumMismatch(self):
+    url = "http://example.com/a.img#sha256=%s" % ("0" * 64)
+    self.assertRaises(imagecache.ImageError, self.cache.Fetch, url)
+
+  def testResume(self):
+    self.server.fail_after = 4096
+    path = self._Fetch("http://example.com/a.img")
+    self.assertEqual(self._Read(path), self.content)
+    self.assertEqual([r for (r, _) in self.server.requests], [None, "4096-"])
+
+  def testResumeChangedImage(self):
+    self.server.fail_after = 4096
+    self.server.etag = "\"v2\""
+    orig_handle = self.server.Handle
+
+    def _Handle(opts):
+      # The image changes while the download is interrupted
+      if self.server.requests:
+        self.server.etag = "\"v3\""
+      return orig_handle(opts)
+
+    self.server.Handle = _Handle
+    path = self._Fetch("http://example.com/a.img")
+    self.assertEqual(self._Read(path), self.content)
+
+  def testResumeIgnored(self):
+    self.server.fail_after = 4096
+    orig_handle = self.server.Handle
+
+    def _Handle(opts):
+      if len(self.server.requests) == 1:
+        # The whole image is sent instead of the range and the transfer
+        # fails again
+        self.server.ignore_range = True
+        self.server.fail_after = 8192
+      return orig_handle(opts)
+
+    self.server.Handle = _Handle
+    path = self._Fetch("http://example.com/a.img")
+    self.assertEqual(self._Read(path), self.content)
+    self.assertEqual([r for (r, _) in self.server.requests],
+                     [None, "4096-", None])
+
+  def testResumeIgnoredComplete(self):
+    self.server.fail_after = 4096
+    self.server.ignore_range = True
+    path = self._Fetch("http://example.com/a.img")
+    self.assertEqual(self._Read(path), self.content)
+    self.assertEqual([r for (r, _) in self.server.requests], [None, "4096-"])
+
+  def testTimeouts(self):
+    self._Fetch("http://example.com/a.img")
+    self.assertTrue(self.server.opts[pycurl.CONNECTTIMEOUT] > 0)
+    self.assertTrue(self.server.opts[pycurl.LOW_SPEED_LIMIT] > 0)
+    self.assertTrue(self.server.opts[pycurl.LOW_SPEED_TIME] > 0)
+    self.assertFalse(pycurl.TIMEOUT in self.server.opts)
+
+  def testPermanentError(self):
+    self.server.errors = [404]
+    self.assertRaises(imagecache.ImageError, self.cache.Fetch,
+                      "http://example.com/a.img")
+    self.assertEqual(len(self.server.requests), 1)
+
+  def testServerError(self):
+    self.server.errors = [503, 429]
+    path = self._Fetch("http://example.com/a.img")
+    self.assertEqual(self._Read(path), self.content)
+    self.assertEqual(len(self.server.requests), 3)
+
+  def testTooManyErrors(self):
+    self.server.errors = [500] * imagecache.DOWNLOAD_ATTEMPTS
+    self.assertRaises(imagecache.ImageError, self.cache.Fetch,
+                      "http://example.com/a.img")
+
+  def testLockRemoved(self):
+    self._Fetch("http://example.com/a.img")
+    self.server.errors = [404]
+    self.assertRaises(imagecache.ImageError, self.cache.Fetch,
+                      "http://example.com/b.img")
+    self.assertEqual(os.listdir(utils.PathJoin(self.tmpdir, "partial")), [])
+
+  def testPrune(self):
+    cache = imagecache.ImageCache(self.tmpdir, max_size=150 * 1024,
+                                  _curl_fn=self._NewCurl)
+    first = self._Fetch("http://example.com/a.img", cache=cache)
+    os.utime(first, (0, 0))
+    self.server.content = os.urandom(100 * 1024)
+    second = self._Fetch("http://example.com/b.img", cache=cache)
+    self.assertFalse(os.path.exists(first))
+    self.assertTrue(os.path.exists(second))
+
+  def testPrunePinned(self):
+    cache = imagecache.ImageCache(self.tmpdir, max_size=150 * 1024,
+                                  _curl_fn=self._NewCurl)
+    (first, pin) = cache.Fetch("http://example.com/a.img")
+    try:
+      os.utime(first, (0, 0))
+      self.server.content = os.urandom(100 * 1024)
+      second = self._Fetch("http://example.com/b.img", cache=cache)
+      self.assertTrue(os.path.exists(first))
+      self.assertTrue(os.path.exists(second))
+    finally:
+      pin.Close()
+
+    cache.Prune()
+    self.assertFalse(os.path.exists(first))
+    self.assertTrue(os.path.exists(second))
+
+  def testDiscard(self):
+    url = ("http://example.com/a.img#sha1=%s" %
+           hashlib.sha1(self.content).hexdigest())
+    path = self._Fetch(url)
+    self.cache.Discard(path)
+    self.assertFalse(os.path.exists(path))
+    self.assertEqual(self._Read(self._Fetch(url)), self.content)
+    self.assertEqual(len(self.server.requests), 2)
+    self.assertRaises(imagecache.ImageError, self.cache.Discard,
+                      utils.PathJoin(self.tmpdir, "other.img"))
+
+
+class TestWriteImage(testutils.GanetiTestCase):
+  def setUp(self):
+    testutils.GanetiTestCase.setUp(self)
+    self.data = (os.urandom(imagecache.WRITE_BUFSIZE + 123) +
+                 bytes(imagecache.WRITE_BUFSIZE) + b"end")
+    self.target = self._CreateTempFile()
+    with open(self.target, "wb") as fh:
+      fh.write(b"\xff" * (3 * imagecache.WRITE_BUFSIZE))
+
+  def _Check(self, image):
+    path = self._CreateTempFile()
+    with open(path, "wb") as fh:
+      fh.write(image)
+
+    written = imagecache.WriteImage(path, self.target,
+                                    3 * imagecache.WRITE_BUFSIZE)
+    self.assertEqual(written, len(self.data))
+    with open(self.target, "rb") as fh:
+      content = fh.read()
+    self.assertEqual(content[:len(self.data)], self.data)
+    self.assertEqual(len(content), 3 * imagecache.WRITE_BUFSIZE)
+
+  def testRaw(self):
+    self._Check(self.data)
+
+  def testGzip(self):
+    self._Check(gzip.compress(self.data))
+
+  def testGzipMultiMember(self):
+    self._Check(gzip.compress(self.data[:1000]) +
+                gzip.compress(self.data[1000:]))
+
+  def testGzipCorrupt(self):
+    image = gzip.compress(self.data)
+    for data in [image[:len(image) // 2], image + b"garbage",
+                 image[:100] + b"x" * 100 + image[200:]]:
+      path = self._CreateTempFile()
+      with open(path, "wb") as fh:
+        fh.write(data)
+      self.assertRaises(imagecache.ImageError, imagecache.WriteImage,
+                        path, self.target, 3 * imagecache.WRITE_BUFSIZE)
+
+  def testXz(self):
+    self._Check(lzma.compress(self.data))
+
+  def testTooLarge(self):
+    path = self._CreateTempFile()
+    with open(path, "wb") as fh:
+      fh.write(gzip.compress(self.data))
+    self.assertRaises(imagecache.ImageTooLargeError, imagecache.WriteImage,
+                      path, self.target, imagecache.WRITE_BUFSIZE)
+
+  def testDetectFormat(self):
+    for (data, fmt) in [(self.data, imagecache.IMG_RAW),
+                        (gzip.compress(b"x"), imagecache.IMG_GZIP),
+                        (lzma.compress(b"x"), imagecache.IMG_XZ),
+                        (b"QFI\xfb\x00\x00\x00\x03", imagecache.IMG_QCOW2)]:
+      path = self._CreateTempFile()
+      with open(path, "wb") as fh:
+        fh.write(data)
+      self.assertEqual(imagecache.DetectImageFormat(path), fmt)
+
+
+if __name__ == "__main__":
+  testutils.GanetiTestProgram()
@@ -0,0 +1,168 @@
+#!/usr/bin/python3
+#
+
+# Copyright (C) 2026 the Ganeti project
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""Script for testing ganeti.tools.sparse_copy"""
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from ganeti.tools import sparse_copy
+
+import testutils
+
+
+class TestSparseCopy(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.src = os.path.join(self.tmpdir, "src")
+    self.dest = os.path.join(self.tmpdir, "dest")
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+
+  def _WriteSource(self, size, extents):
+    with open(self.src, "wb") as fh:
+      fh.truncate(size)
+      for (offset, data) in extents:
+        fh.seek(offset)
+        fh.write(data)
+
+  def _Copy(self, start, end, direct=False):
+    stream = io.BytesIO()
+
+    fd = os.open(self.src, os.O_RDONLY)
+    try:
+      exported = sparse_copy.ExportSparse(fd, start, end, stream,
+                                          direct=direct)
+    finally:
+      os.close(fd)
+
+    stream.seek(0)
+
+    fd = os.open(self.dest, os.O_WRONLY | os.O_CREAT)
+    try:
+      imported = sparse_copy.ImportSparse(stream, fd)
+    finally:
+      os.close(fd)
+
+    self.assertEqual(exported, imported)
+
+    return (exported, len(stream.getvalue()))
+
+  def _CheckRange(self, start, end):
+    with open(self.src, "rb") as fh:
+      src_data = fh.read()[start:end]
+    with open(self.dest, "rb") as fh:
+      dest_data = fh.read()[start:end]
+    self.assertEqual(src_data, dest_data)
+
+  def testEmpty(self):
+    size = 8 * sparse_copy.BUFSIZE
+    self._WriteSource(size, [])
+
+    (data_bytes, stream_size) = self._Copy(0, size)
+    self.assertEqual(data_bytes, 0)
+    self.assertTrue(stream_size < 100)
+    self.assertEqual(os.path.getsize(self.dest), size)
+    self._CheckRange(0, size)
+
+  def testSkipsZeros(self):
+    size = 16 * sparse_copy.BUFSIZE
+    self._WriteSource(size, [
+      (3 * sparse_copy.BUFSIZE + 100, os.urandom(1000)),
+      # Explicitly written zeros are skipped as well
+      (8 * sparse_copy.BUFSIZE, bytes(2 * sparse_copy.BUFSIZE)),
+      (size - 10, b"x" * 10),
+      ])
+
+    # Depending on the filesystem, holes are found with a finer granularity
+    # than the zero block detection
+    (data_bytes, _) = self._Copy(0, size)
+    self.assertTrue(1010 <= data_bytes <= 2 * sparse_copy.ZERO_BLOCK_SIZE)
+    self._CheckRange(0, size)
+
+  def testOverwritesOldData(self):
+    size = 4 * sparse_copy.BUFSIZE
+    self._WriteSource(size, [(sparse_copy.BUFSIZE, b"data")])
+
+    with open(self.dest, "wb") as fh:
+      fh.write(os.urandom(size))
+
+    self._Copy(0, size)
+    self._CheckRange(0, size)
+
+  def testRange(self):
+    size = 8 * sparse_copy.BUFSIZE
+    self._WriteSource(size, [(0, os.urandom(size))])
+
+    with open(self.dest, "wb") as fh:
+      fh.write(bytes(size))
+
+    start = 2 * sparse_copy.BUFSIZE
+    end = 5 * sparse_copy.BUFSIZE
+    (data_bytes, _) = self._Copy(start, end)
+    self.assertEqual(data_bytes, end - start)
+    self._CheckRange(start, end)
+
+    # Data outside the range must not be touched
+    with open(self.dest, "rb") as fh:
+      self.assertEqual(fh.read(start), bytes(start))
+
+  def testAlignedReads(self):
+    # The size is not a multiple of the direct I/O alignment
+    size = 3 * sparse_copy.BUFSIZE + 1000
+    self._WriteSource(size, [(0, os.urandom(size))])
+
+    (data_bytes, _) = self._Copy(0, size, direct=True)
+    self.assertEqual(data_bytes, size)
+    self._CheckRange(0, size)
+
+    start = sparse_copy.BUFSIZE
+    end = start + 100
+    (data_bytes, _) = self._Copy(start, end, direct=True)
+    self.assertEqual(data_bytes, 100)
+    self._CheckRange(start, end)
+
+  def testInvalidStream(self):
+    fd = os.open(self.dest, os.O_WRONLY | os.O_CREAT)
+    try:
+      self.assertRaises(sparse_copy.SparseCopyError, sparse_copy.ImportSparse,
+                        io.BytesIO(b"garbage" * 10), fd)
+      self.assertRaises(sparse_copy.SparseCopyError, sparse_copy.ImportSparse,
+                        io.BytesIO(b""), fd)
+    finally:
+      os.close(fd)
+
+
+if __name__ == "__main__":
+  testutils.GanetiTestProgram()
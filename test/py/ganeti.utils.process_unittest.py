@@ -538,6 +538,12 @@ class TestRunParts(testutils.GanetiTestCase):
     self.assertTrue(runresult.failed)
 
   def testRunMix(self):
+    self._TestRunMix(1)
+
+  def testRunMixParallel(self):
+    self._TestRunMix(4)
+
+  def _TestRunMix(self, max_parallel):
     files = []
     files.append(os.path.join(self.rundir, "00test"))
     files.append(os.path.join(self.rundir, "42test"))
@@ -561,7 +567,8 @@ class TestRunParts(testutils.GanetiTestCase):
     utils.WriteFile(files[3], data="#!/bin/sh\n\necho -n ciao")
     os.chmod(files[3], stat.S_IREAD | stat.S_IEXEC)
 
-    results = utils.RunParts(self.rundir, reset_env=True)
+    results = utils.RunParts(self.rundir, reset_env=True,
+                             max_parallel=max_parallel)
 
     (relname, status, runresult) = results[0]
     self.assertEqual(relname, os.path.basename(files[0]))
@@ -590,6 +597,34 @@ class TestRunParts(testutils.GanetiTestCase):
     nosuchdir = utils.PathJoin(self.rundir, "no/such/directory")
     self.assertEqual(utils.RunParts(nosuchdir), [])
 
+  def testParallel(self):
+    """Test that scripts run at the same time"""
+    markerdir = tempfile.mkdtemp(prefix="ganeti-test")
+    try:
+      names = ["00test", "10test", "20test"]
+      for name in names:
+        # Each script waits for all others to have started
+        utils.WriteFile(os.path.join(self.rundir, name), mode=0o700,
+                        data=("#!/bin/sh\n"
+                              "touch %s/%s\n"
+                              "for i in $(seq 100); do\n"
+                              "  [ $(ls %s | wc -l) -eq %d ] && exit 0\n"
+                              "  sleep 0.1\n"
+                              "done\n"
+                              "exit 1\n" %
+                              (markerdir, name, markerdir, len(names))))
+
+      results = utils.RunParts(self.rundir, reset_env=True,
+                               max_parallel=len(names))
+    finally:
+      shutil.rmtree(markerdir)
+
+    self.assertEqual([relname for (relname, _, _) in results], names)
+    for (_, status, runresult) in results:
+      self.assertEqual(status, constants.RUNPARTS_RUN)
+      self.assertFalse(runresult.failed)
+      self.assertTrue(runresult.duration >= 0)
+
 
 class TestStartDaemon(testutils.GanetiTestCase):
   def setUp(self):
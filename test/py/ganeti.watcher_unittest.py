@@ -0,0 +1,313 @@
+#!/usr/bin/python3
+#
+
+# Copyright (C) 2026 the Ganeti project
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""Script for testing ganeti.watcher"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from ganeti import constants
+from ganeti import qlang
+from ganeti import utils
+from ganeti import watcher
+
+import testutils
+
+
+class _FakeQueryResult(object):
+  def __init__(self, rows):
+    self.data = [[(constants.RS_NORMAL, value) for value in row]
+                 for row in rows]
+
+
+class _FakeQueryClient(object):
+  _FIELDS = {
+    constants.QR_INSTANCE: watcher._INSTANCE_FIELDS,
+    constants.QR_NODE: watcher._NODE_FIELDS + ["group.uuid"],
+    constants.QR_LOCK: ["name", "mode"],
+    }
+
+  def __init__(self, instances, nodes, locks):
+    self._rows = {
+      constants.QR_INSTANCE: instances,
+      constants.QR_NODE: nodes,
+      constants.QR_LOCK: locks,
+      }
+    self.queries = []
+
+  def Query(self, what, fields, qfilter):
+    self.queries.append((what, fields, qfilter))
+    allfields = self._FIELDS[what]
+    rows = self._rows[what]
+    if qfilter is not None:
+      assert qfilter[0] == qlang.OP_EQUAL
+      idx = allfields.index(qfilter[1])
+      rows = [row for row in rows if row[idx] == qfilter[2]]
+    return _FakeQueryResult([[row[allfields.index(field)] for field in fields]
+                             for row in rows])
+
+
+class TestGetGroupData(unittest.TestCase):
+  def setUp(self):
+    instances = [
+      ["inst1", constants.INSTST_RUNNING, constants.ADMINST_UP,
+       constants.ADMIN_SOURCE, True, ["node2"], "g1", ["g1"],
+       constants.DT_DRBD8],
+      ["inst2", constants.INSTST_ERRORDOWN, constants.ADMINST_UP,
+       constants.ADMIN_SOURCE, True, [], "g2", [], constants.DT_PLAIN],
+      ["inst3", constants.INSTST_RUNNING, constants.ADMINST_UP,
+       constants.ADMIN_SOURCE, True, ["node3"], "g1", ["g2"],
+       constants.DT_DRBD8],
+      ]
+    nodes = [
+      ["node1", "boot1", False, "g1"],
+      ["node2", "boot2", False, "g1"],
+      ["node3", "boot3", True, "g2"],
+      ]
+    locks = [
+      ["instance/inst2", "exclusive"],
+      ["instance/inst1", None],
+      ["node/node1", "shared"],
+      ]
+    self.client = _FakeQueryClient(instances, nodes, locks)
+
+  def _Check(self, data, uuid):
+    (nodes, instances, locks) = data
+    self.assertEqual(locks, set(["inst2"]))
+    if uuid == "g1":
+      self.assertEqual(sorted(nodes), ["node1", "node2"])
+      self.assertEqual(nodes["node2"].secondaries, set(["inst1"]))
+      self.assertEqual(nodes["node1"].secondaries, set())
+      # inst3 is split between groups and ignored
+      self.assertEqual(sorted(instances), ["inst1"])
+    else:
+      self.assertEqual(sorted(nodes), ["node3"])
+      self.assertTrue(nodes["node3"].offline)
+      self.assertEqual(sorted(instances), ["inst2"])
+      self.assertEqual(instances["inst2"].status, constants.INSTST_ERRORDOWN)
+
+  def testSingleGroup(self):
+    for uuid in ["g1", "g2"]:
+      self._Check(watcher._GetGroupData(self.client, uuid), uuid)
+
+  def testAllGroups(self):
+    result = watcher._GetAllGroupsData(self.client, ["g1", "g2", "g3"])
+    self.assertEqual(sorted(result), ["g1", "g2", "g3"])
+    self._Check(result["g1"], "g1")
+    self._Check(result["g2"], "g2")
+    self.assertEqual(result["g3"], ({}, {}, set(["inst2"])))
+
+    # One query each for locks, instances and nodes
+    self.assertEqual(len(self.client.queries), 3)
+    self.assertTrue(all(qfilter is None
+                        for (_, _, qfilter) in self.client.queries))
+
+
+class TestWatchGroupsInProcess(unittest.TestCase):
+  def _Run(self, groups, locked):
+    groupdata = dict((uuid, ({}, {}, set())) for uuid in groups
+                     if uuid not in locked)
+    statefiles = dict((uuid, mock.Mock()) for uuid in groups)
+
+    client = mock.Mock()
+    client.QueryGroups.return_value = [[uuid] for uuid in groups]
+    opts = mock.Mock(group_threads=3)
+
+    with mock.patch.multiple(watcher,
+                             _OpenGroupStateFile=mock.DEFAULT,
+                             _GetAllGroupsData=mock.DEFAULT,
+                             _UpdateInstanceStatus=mock.DEFAULT,
+                             _MergeInstanceStatus=mock.DEFAULT,
+                             _LoadKnownGroups=mock.DEFAULT,
+                             GetLuxiClient=mock.DEFAULT,
+                             _WatchGroup=mock.DEFAULT) as mocks:
+      mocks["_OpenGroupStateFile"].side_effect = \
+        lambda uuid: None if uuid in locked else statefiles[uuid]
+      mocks["_GetAllGroupsData"].return_value = groupdata
+      mocks["_WatchGroup"].side_effect = \
+        lambda _, __, uuid, *args: uuid == "g4" and 1 / 0
+      timings = watcher._WatchGroupsInProcess(client, opts)
+
+    watched = [uuid for uuid in groups if uuid not in locked]
+    self.assertEqual(sorted(timings), watched)
+    # The state files are locked before the data is queried
+    self.assertEqual(mocks["_OpenGroupStateFile"].call_count, len(groups))
+    mocks["_GetAllGroupsData"].assert_called_once_with(client, watched)
+    self.assertEqual(mocks["_UpdateInstanceStatus"].call_count, len(watched))
+    mocks["_MergeInstanceStatus"].assert_called_once()
+    self.assertEqual(sorted((call[0][2], call[0][3]) for call in
+                            mocks["_WatchGroup"].call_args_list),
+                     [(uuid, statefiles[uuid]) for uuid in watched])
+    # At most one job client per thread
+    self.assertTrue(mocks["GetLuxiClient"].call_count <= opts.group_threads)
+    for uuid in watched:
+      statefiles[uuid].close.assert_called_once_with()
+
+  def test(self):
+    self._Run(["g%d" % i for i in range(10)], [])
+
+  def testLockedGroups(self):
+    self._Run(["g%d" % i for i in range(10)], ["g2", "g7"])
+
+
+class TestMergeInstanceStatus(unittest.TestCase):
+  GROUPS = 100
+  INSTANCES = 20000
+
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.filename = utils.PathJoin(self.tmpdir, "instance-status")
+    self.pergroup = utils.PathJoin(self.tmpdir, "watcher.%s.instance-status")
+    self.cachefile = utils.PathJoin(self.tmpdir, "cache")
+    self.groups = ["group%s" % i for i in range(self.GROUPS)]
+    self.status = {}
+
+    for (idx, group) in enumerate(self.groups):
+      self._WriteGroup(group,
+                       [("inst%s" % i, constants.INSTST_RUNNING)
+                        for i in range(idx, self.INSTANCES, self.GROUPS)],
+                       mtime=1000)
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+
+  def _WriteGroup(self, group, data, mtime=None):
+    filename = self.pergroup % group
+    watcher._WriteInstanceStatus(filename, data)
+    if mtime is not None:
+      os.utime(filename, (mtime, mtime))
+    self.status.update(data)
+
+  def _Merge(self):
+    with mock.patch.object(watcher, "_ReadInstanceStatus",
+                           wraps=watcher._ReadInstanceStatus) as read_fn:
+      watcher._MergeInstanceStatus(self.filename, self.pergroup, self.groups,
+                                   self.cachefile)
+    return read_fn.call_count
+
+  def _Check(self):
+    (_, data) = watcher._ReadInstanceStatus(self.filename)
+    self.assertEqual(dict(data), self.status)
+
+  def testMerge(self):
+    self.assertEqual(self._Merge(), self.GROUPS)
+    self._Check()
+    self.assertEqual(len(self.status), self.INSTANCES)
+    st = os.stat(self.filename)
+
+    # Nothing changed, neither reading groups nor writing the global file
+    self.assertEqual(self._Merge(), 0)
+    self.assertEqual(os.stat(self.filename).st_ino, st.st_ino)
+    self._Check()
+
+    # Rewriting a group with the same content doesn't change it
+    self.assertFalse(watcher._WriteInstanceStatus(
+      self.pergroup % "group7",
+      [("inst%s" % i, constants.INSTST_RUNNING)
+       for i in range(7, self.INSTANCES, self.GROUPS)]))
+    self.assertEqual(self._Merge(), 0)
+
+    # Only the changed group is read
+    self._WriteGroup("group3", [("inst3", constants.INSTST_ERRORDOWN)] +
+                     [("inst%s" % i, constants.INSTST_RUNNING)
+                      for i in range(103, self.INSTANCES, self.GROUPS)])
+    self.assertEqual(self._Merge(), 1)
+    self._Check()
+
+    # Instance moved to another group, the newer file wins
+    self._WriteGroup("group4", [("inst5", constants.INSTST_ADMINDOWN)] +
+                     [("inst%s" % i, constants.INSTST_RUNNING)
+                      for i in range(4, self.INSTANCES, self.GROUPS)],
+                     mtime=2000)
+    self.assertEqual(self._Merge(), 1)
+    self._Check()
+
+    # A changed group is read even if its mtime stayed the same
+    self._WriteGroup("group8", [("inst8", constants.INSTST_ERRORDOWN)] +
+                     [("inst%s" % i, constants.INSTST_RUNNING)
+                      for i in range(108, self.INSTANCES, self.GROUPS)],
+                     mtime=1000)
+    self.assertEqual(self._Merge(), 1)
+    self._Check()
+
+  def testInstanceInTwoGroups(self):
+    group5 = [("inst%s" % i, constants.INSTST_RUNNING)
+              for i in range(5, self.INSTANCES, self.GROUPS)]
+    self._WriteGroup("group4", [("inst5", constants.INSTST_ADMINDOWN)] +
+                     [("inst%s" % i, constants.INSTST_RUNNING)
+                      for i in range(4, self.INSTANCES, self.GROUPS)],
+                     mtime=2000)
+    self.assertEqual(self._Merge(), self.GROUPS)
+    self._Check()
+
+    # Rewriting the older group with the same content leaves its mtime alone,
+    # so the group which changed last still wins
+    self.assertFalse(watcher._WriteInstanceStatus(self.pergroup % "group5",
+                                                  group5))
+    self.assertEqual(self._Merge(), 0)
+    self._Check()
+
+    # Once the older group changes, it wins
+    self._WriteGroup("group5", [("inst5", constants.INSTST_ERRORDOWN)] +
+                     group5[1:], mtime=3000)
+    self.assertEqual(self._Merge(), 1)
+    self._Check()
+
+  def testMissingFiles(self):
+    self.assertEqual(self._Merge(), self.GROUPS)
+
+    # Global file is gone, e.g. after a reboot
+    os.unlink(self.filename)
+    self.assertEqual(self._Merge(), 0)
+    self._Check()
+
+    # Cache is gone
+    os.unlink(self.cachefile)
+    self.assertEqual(self._Merge(), self.GROUPS)
+    self._Check()
+
+    # Broken cache
+    utils.WriteFile(self.cachefile, data="{")
+    self.assertEqual(self._Merge(), self.GROUPS)
+    self._Check()
+
+    # Group removed
+    os.unlink(self.pergroup % "group9")
+    for i in range(9, self.INSTANCES, self.GROUPS):
+      del self.status["inst%s" % i]
+    self.assertEqual(self._Merge(), 1)
+    self._Check()
+
+
+if __name__ == "__main__":
+  testutils.GanetiTestProgram()
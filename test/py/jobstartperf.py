@@ -0,0 +1,94 @@
+#!/usr/bin/python3
+#
+
+# Copyright (C) 2026 the Ganeti project
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""Script for measuring the start-up latency of jobs
+
+It needs to be run on the master node of a cluster. Each job consists of a
+single OpTestDelay opcode without delay, and the time between the job being
+received by the master daemon and the start of its opcode is reported. The
+first job may include the start of a job executor zygote.
+
+"""
+
+import optparse
+
+from ganeti import cli
+from ganeti import opcodes
+from ganeti import utils
+
+
+def ParseOptions():
+  """Parses the command line options.
+
+  In case of command line errors, it will show the usage and exit the
+  program.
+
+  @return: the options in a tuple
+
+  """
+  parser = optparse.OptionParser()
+  parser.add_option("-n", dest="job_count", type="int", default=20,
+                    help="Number of jobs to run", metavar="NUM")
+
+  (opts, args) = parser.parse_args()
+
+  if opts.job_count < 1:
+    parser.error("Number of jobs must be positive")
+
+  return (opts, args)
+
+
+def _RunJob(cl):
+  """Runs a job and returns the time until its opcode started, in seconds.
+
+  """
+  job_id = cl.SubmitJob([opcodes.OpTestDelay(duration=0)])
+  cli.PollJob(job_id, cl=cl, feedback_fn=lambda _: None)
+  ((received_ts, opstart), ) = cl.QueryJobs([job_id],
+                                            ["received_ts", "opstart"])
+  return utils.MergeTime(opstart[0]) - utils.MergeTime(received_ts)
+
+
+def main():
+  (opts, _) = ParseOptions()
+
+  cl = cli.GetClient()
+  latencies = [_RunJob(cl) for _ in range(opts.job_count)]
+
+  print("%12s %12s" % ("Job", "Latency(ms)"))
+  print("%12s %12.3f" % ("first", latencies[0] * 1000))
+  latencies.sort()
+  print("%12s %12.3f" % ("min", latencies[0] * 1000))
+  print("%12s %12.3f" % ("median", latencies[len(latencies) // 2] * 1000))
+  print("%12s %12.3f" % ("max", latencies[-1] * 1000))
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,123 @@
+#!/usr/bin/python3
+#
+
+# Copyright (C) 2026 the Ganeti project
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+
+"""Script for measuring the time needed to list the OS definitions"""
+
+import os
+import shutil
+import tempfile
+import time
+import optparse
+
+from ganeti import backend
+from ganeti import constants
+from ganeti import utils
+
+
+def ParseOptions():
+  """Parses the command line options.
+
+  In case of command line errors, it will show the usage and exit the
+  program.
+
+  @return: the options in a tuple
+
+  """
+  parser = optparse.OptionParser()
+  parser.add_option("-n", dest="os_count", type="int", default=50,
+                    help="Number of OS definitions", metavar="NUM")
+  parser.add_option("-v", dest="variant_count", type="int", default=10,
+                    help="Number of variants per OS", metavar="NUM")
+  parser.add_option("-r", dest="repeat", type="int", default=100,
+                    help="Number of listings per measurement", metavar="NUM")
+
+  (opts, args) = parser.parse_args()
+
+  if opts.os_count < 1 or opts.repeat < 1:
+    parser.error("Number of OS definitions and listings must be positive")
+
+  return (opts, args)
+
+
+def _CreateOS(directory, name, variant_count):
+  """Creates an OS definition using the latest API version.
+
+  """
+  os_dir = utils.PathJoin(directory, name)
+  os.mkdir(os_dir)
+  utils.WriteFile(utils.PathJoin(os_dir, constants.OS_API_FILE),
+                  data="%s\n" % constants.OS_API_V20)
+  for script in constants.OS_SCRIPTS:
+    utils.WriteFile(utils.PathJoin(os_dir, script), mode=0o755,
+                    data="#!/bin/sh\nexit 0\n")
+  utils.WriteFile(utils.PathJoin(os_dir, constants.OS_VARIANTS_FILE),
+                  data="".join("variant%s\n" % i
+                               for i in range(variant_count)))
+  utils.WriteFile(utils.PathJoin(os_dir, constants.OS_PARAMETERS_FILE),
+                  data="".join("param%s Parameter number %s\n" % (i, i)
+                               for i in range(5)))
+
+
+def _Measure(top_dir, repeat, clear):
+  """Lists the OS definitions several times, returns the average duration.
+
+  """
+  start = time.time()
+  for _ in range(repeat):
+    if clear:
+      backend._OS_CACHE.Clear() # pylint: disable=W0212
+    result = backend.DiagnoseOS([top_dir])
+    assert all(status for (_, _, status, _, _, _, _, _) in result)
+  return (time.time() - start) / repeat
+
+
+def main():
+  (opts, _) = ParseOptions()
+
+  top_dir = tempfile.mkdtemp()
+  try:
+    for i in range(opts.os_count):
+      _CreateOS(top_dir, "os%s" % i, opts.variant_count)
+
+    print("%12s %12s" % ("Mode", "Time(ms)"))
+    print("%12s %12.3f" %
+          ("uncached", _Measure(top_dir, opts.repeat, True) * 1000))
+    print("%12s %12.3f" %
+          ("validated", _Measure(top_dir, opts.repeat, False) * 1000))
+    backend._OS_CACHE.StartWatching([top_dir]) # pylint: disable=W0212
+    print("%12s %12.3f" %
+          ("watched", _Measure(top_dir, opts.repeat, False) * 1000))
+  finally:
+    shutil.rmtree(top_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+  main()
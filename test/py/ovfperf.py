@@ -0,0 +1,176 @@
+#!/usr/bin/python3
+#
+
+# Copyright (C) 2026 the Ganeti project
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+
+"""Script for measuring the disk export time of ovfconverter"""
+
+import os
+import shutil
+import tempfile
+import time
+import optparse
+
+from ganeti import ovf
+
+
+CONFIG_TEMPLATE = """[instance]
+name = perf-test
+hypervisor = xen-pvm
+nic_count = 0
+disk_count = %(disk_count)s
+%(disks)s
+
+[hypervisor]
+
+[export]
+version = 0
+os = lenny-image
+
+[os]
+
+[backend]
+vcpus = 1
+memory = 512
+"""
+
+
+def ParseOptions():
+  """Parses the command line options.
+
+  In case of command line errors, it will show the usage and exit the
+  program.
+
+  @return: the options in a tuple
+
+  """
+  parser = optparse.OptionParser()
+  parser.add_option("-n", dest="disk_counts", default="1,2,4",
+                    help="Comma-separated numbers of disks", metavar="LIST")
+  parser.add_option("-s", dest="disk_sizes", default="64,256",
+                    help="Comma-separated disk sizes", metavar="MB")
+  parser.add_option("-t", dest="tools", default="gzip,pigz,zstd",
+                    help="Comma-separated compression tools", metavar="LIST")
+  parser.add_option("-w", dest="workers", default="1,4",
+                    help="Comma-separated numbers of disk workers",
+                    metavar="LIST")
+
+  (opts, args) = parser.parse_args()
+
+  for tool in opts.tools.split(","):
+    if tool not in ovf.COMPRESSION_TOOLS:
+      parser.error("Unknown compression tool '%s'" % tool)
+
+  return (opts, args)
+
+
+def _WriteDisk(path, size_mb):
+  """Writes a disk image which is half random and half zero data.
+
+  """
+  chunk = 1024 * 1024
+  with open(path, "wb") as fh:
+    for i in range(size_mb):
+      if i % 2:
+        fh.write(bytes(chunk))
+      else:
+        fh.write(os.urandom(chunk))
+
+
+def _PrepareInput(directory, disk_count, size_mb):
+  """Creates the config.ini file and the disks of an instance export.
+
+  """
+  disks = []
+  for i in range(disk_count):
+    disk_file = "disk%s.raw" % i
+    _WriteDisk(os.path.join(directory, disk_file), size_mb)
+    disks.append("disk%s_dump = %s" % (i, disk_file))
+  config_path = os.path.join(directory, "config.ini")
+  with open(config_path, "w") as fh:
+    fh.write(CONFIG_TEMPLATE % {
+      "disk_count": disk_count,
+      "disks": "\n".join(disks),
+      })
+  return config_path
+
+
+def _Export(config_path, output_dir, tool, workers):
+  """Converts and compresses the disks of the instance, returns the duration.
+
+  """
+  options = optparse.Values()
+  options._update_loose({ # pylint: disable=W0212
+    "output_dir": output_dir,
+    "name": None,
+    "ova_package": False,
+    "ext_usage": False,
+    "disk_format": ovf.RAW,
+    "compression": True,
+    "compression_tool": tool,
+    "disk_workers": workers,
+    })
+  exporter = ovf.OVFExporter(config_path, options)
+  try:
+    start = time.time()
+    exporter.Parse()
+    return time.time() - start
+  finally:
+    exporter.Cleanup()
+    shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def main():
+  (opts, _) = ParseOptions()
+
+  disk_counts = [int(i) for i in opts.disk_counts.split(",")]
+  disk_sizes = [int(i) for i in opts.disk_sizes.split(",")]
+  tools = opts.tools.split(",")
+  workers_list = [int(i) for i in opts.workers.split(",")]
+
+  print("%6s %8s %6s %8s %10s %10s" %
+        ("Disks", "Size(MB)", "Tool", "Workers", "Time(s)", "MB/s"))
+  for disk_count in disk_counts:
+    for size_mb in disk_sizes:
+      input_dir = tempfile.mkdtemp()
+      try:
+        config_path = _PrepareInput(input_dir, disk_count, size_mb)
+        for tool in tools:
+          for workers in workers_list:
+            output_dir = os.path.join(input_dir, "output")
+            duration = _Export(config_path, output_dir, tool, workers)
+            print("%6d %8d %6s %8d %10.3f %10.1f" %
+                  (disk_count, size_mb, tool, workers, duration,
+                   disk_count * size_mb / duration))
+      finally:
+        shutil.rmtree(input_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+  main()
@@ -872,6 +872,7 @@ class ConfigMock(config.ConfigWriter):
     instance.serial_no = 1
     instance.ctime = instance.mtime = time.time()
     self._ConfigData().instances[instance.uuid] = instance
+    self._Indexes().AddInstance(instance)
     self._ConfigData().cluster.serial_no += 1 # pylint: disable=E1103
     self.ReleaseDRBDMinors(instance.uuid)
     self._UnlockedCommitTemporaryIps(ec_id)
@@ -879,6 +880,7 @@ class ConfigMock(config.ConfigWriter):
   def _UnlockedAddDisk(self, disk):
     disk.UpgradeConfig()
     self._ConfigData().disks[disk.uuid] = disk
+    self._Indexes().AddDisk(disk)
     self._ConfigData().cluster.serial_no += 1 # pylint: disable=E1103
     self.ReleaseDRBDMinors(disk.uuid)
 
@@ -887,6 +889,7 @@ class ConfigMock(config.ConfigWriter):
     if idx is None:
       idx = len(instance.disks)
     instance.disks.insert(idx, disk_uuid)
+    self._Indexes().UpdateInstance(inst_uuid)
     instance_disks = self._UnlockedGetInstanceDisks(inst_uuid)
     for (disk_idx, disk) in enumerate(instance_disks[idx:]):
       disk.iv_name = "disk/%s" % (idx + disk_idx)
@@ -928,6 +931,10 @@ class ConfigMock(config.ConfigWriter):
     elif isinstance(target, objects.Disk):
       replace_in(target, self._ConfigData().disks)
 
+    # Objects may have been modified in place before, e.g. an instance moved
+    # to another node
+    self._Indexes().Reset()
+
     target.serial_no += 1
     target.mtime = now = time.time()
 
@@ -937,6 +944,7 @@ class ConfigMock(config.ConfigWriter):
 
   def SetInstancePrimaryNode(self, inst_uuid, target_node_uuid):
     self._UnlockedGetInstanceInfo(inst_uuid).primary_node = target_node_uuid
+    self._Indexes().UpdateInstance(inst_uuid)
 
   def _SetInstanceStatus(self, inst_uuid, status,
                          disks_active, admin_state_source):
@@ -988,6 +996,7 @@ class ConfigMock(config.ConfigWriter):
 
     idx = instance.disks.index(disk_uuid)
     instance.disks.remove(disk_uuid)
+    self._Indexes().UpdateInstance(inst_uuid)
     instance_disks = self._UnlockedGetInstanceDisks(inst_uuid)
     _UpdateIvNames(idx, instance_disks[idx:])
     instance.serial_no += 1
@@ -1001,7 +1010,8 @@ class ConfigMock(config.ConfigWriter):
     self._UnlockedRemoveDisk(disk_uuid)
 
   def RemoveInstance(self, inst_uuid):
-    del self._ConfigData().instances[inst_uuid]
+    instance = self._ConfigData().instances.pop(inst_uuid)
+    self._Indexes().RemoveInstance(instance)
 
   def AddTcpUdpPort(self, port):
     self._ConfigData().cluster.tcpudp_port_pool.add(port)
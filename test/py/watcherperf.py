@@ -0,0 +1,117 @@
+#!/usr/bin/python3
+#
+
+# Copyright (C) 2026 the Ganeti project
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Script for measuring the merging of the watcher's instance status files"""
+
+import shutil
+import tempfile
+import time
+import optparse
+
+from ganeti import constants
+from ganeti import utils
+from ganeti import watcher
+
+
+def ParseOptions():
+  """Parses the command line options.
+
+  In case of command line errors, it will show the usage and exit the
+  program.
+
+  @return: the options in a tuple
+
+  """
+  parser = optparse.OptionParser()
+  parser.add_option("-g", dest="group_count", type="int", default=100,
+                    help="Number of node groups", metavar="NUM")
+  parser.add_option("-i", dest="instance_count", type="int", default=20000,
+                    help="Number of instances", metavar="NUM")
+  parser.add_option("-r", dest="repeat", type="int", default=20,
+                    help="Number of merges per measurement", metavar="NUM")
+
+  (opts, args) = parser.parse_args()
+
+  if opts.group_count < 1 or opts.instance_count < 1 or opts.repeat < 1:
+    parser.error("Number of node groups, instances and merges must be"
+                 " positive")
+
+  return (opts, args)
+
+
+def _GroupStatus(opts, idx, status):
+  """Returns the instance status of one node group.
+
+  """
+  return [("inst%s.example.com" % i, status)
+          for i in range(idx, opts.instance_count, opts.group_count)]
+
+
+def main():
+  (opts, _) = ParseOptions()
+
+  top_dir = tempfile.mkdtemp()
+  try:
+    filename = utils.PathJoin(top_dir, "instance-status")
+    pergroup = utils.PathJoin(top_dir, "watcher.%s.instance-status")
+    cachefile = utils.PathJoin(top_dir, "cache")
+    groups = ["group%s" % i for i in range(opts.group_count)]
+
+    for (idx, group) in enumerate(groups):
+      watcher._WriteInstanceStatus(pergroup % group,
+                                   _GroupStatus(opts, idx,
+                                                constants.INSTST_RUNNING))
+
+    def _Full(_):
+      utils.RemoveFile(cachefile)
+
+    def _Unchanged(_):
+      pass
+
+    def _OneChanged(i):
+      status = [constants.INSTST_RUNNING, constants.INSTST_ERRORDOWN][i % 2]
+      watcher._WriteInstanceStatus(pergroup % groups[0],
+                                   _GroupStatus(opts, 0, status))
+
+    print("%12s %12s" % ("Mode", "Time(ms)"))
+    for (name, prepare_fn) in [("full", _Full), ("unchanged", _Unchanged),
+                               ("one group", _OneChanged)]:
+      total = 0.0
+      for i in range(opts.repeat):
+        prepare_fn(i)
+        start = time.time()
+        watcher._MergeInstanceStatus(filename, pergroup, groups, cachefile)
+        total += time.time() - start
+      print("%12s %12.3f" % (name, total / opts.repeat * 1000))
+  finally:
+    shutil.rmtree(top_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+  main()